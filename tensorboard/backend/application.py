@@ -39,9 +39,12 @@ from werkzeug import wrappers
 
 from tensorboard import db
 from tensorboard.backend import http_util
+from tensorboard.backend.event_processing import change_watcher
 from tensorboard.backend.event_processing import db_import_multiplexer
+from tensorboard.backend.event_processing import io_wrapper
 from tensorboard.backend.event_processing import plugin_event_accumulator as event_accumulator  # pylint: disable=line-too-long
 from tensorboard.backend.event_processing import plugin_event_multiplexer as event_multiplexer  # pylint: disable=line-too-long
+from tensorboard.backend.event_processing import published_multiplexer
 from tensorboard.plugins import base_plugin
 from tensorboard.plugins.audio import metadata as audio_metadata
 from tensorboard.plugins.core import core_plugin
@@ -87,11 +90,38 @@ def tensor_size_guidance_from_flags(flags):
 
   for token in flags.samples_per_plugin.split(','):
     k, v = token.strip().split('=')
-    tensor_size_guidance[k] = int(v)
+    tensor_size_guidance[k] = _parse_samples(v)
 
   return tensor_size_guidance
 
 
+# The multiples of the units of byte sizes in --samples_per_plugin.
+_BYTE_UNITS = {'B': 1, 'KB': 1024, 'MB': 1024 ** 2, 'GB': 1024 ** 3}
+
+
+def _parse_samples(value):
+  """Parses a number of samples, like "500", "stratified:500" or "200MB"."""
+  (policy, _, size) = value.strip().rpartition(':')
+  if not policy:
+    match = re.match(r'^(\d+)\s*([KMG]?B)$', size, re.IGNORECASE)
+    if match:
+      return event_accumulator.Bytes(
+          int(match.group(1)) * _BYTE_UNITS[match.group(2).upper()])
+    return int(size)
+  if policy != 'stratified':
+    raise ValueError('Unknown sampling policy %r in --samples_per_plugin'
+                     % policy)
+  return event_accumulator.Stratified(int(size))
+
+
+def plugin_names_from_flags(flags):
+  """Returns the plugins whose data to load, or None to load all of them."""
+  if not flags or not flags.load_plugins:
+    return None
+  return [name.strip() for name in flags.load_plugins.split(',')
+          if name.strip()]
+
+
 def standard_tensorboard_wsgi(flags, plugin_loaders, assets_zip_provider):
   """Construct a TensorBoardWSGIApp with standard plugins and multiplexer.
 
@@ -106,11 +136,14 @@ def standard_tensorboard_wsgi(flags, plugin_loaders, assets_zip_provider):
   :type plugin_loaders: list[base_plugin.TBLoader]
   :rtype: TensorBoardWSGI
   """
-  multiplexer = event_multiplexer.EventMultiplexer(
-      size_guidance=DEFAULT_SIZE_GUIDANCE,
-      tensor_size_guidance=tensor_size_guidance_from_flags(flags),
-      purge_orphaned_data=flags.purge_orphaned_data,
-      max_reload_threads=flags.max_reload_threads)
+  if flags.ingestion_dir and not flags.db_import and not flags.db:
+    # Ingestion mode: another process loads the logdir, and this one only
+    # serves what it publishes.
+    start_ingestion_daemon(flags)
+    multiplexer = published_multiplexer.PublishedMultiplexer(
+        flags.ingestion_dir)
+  else:
+    multiplexer = create_event_multiplexer(flags)
   loading_multiplexer = multiplexer
   reload_interval = flags.reload_interval
   # For db import op mode, prefer reloading in a child process. See
@@ -118,6 +151,7 @@ def standard_tensorboard_wsgi(flags, plugin_loaders, assets_zip_provider):
   reload_task = flags.reload_task
   if reload_task == 'auto' and flags.db_import and flags.db_import_use_op:
     reload_task == 'process'
+  reload_on_change = flags.reload_on_change
   db_uri = flags.db
   # For DB import mode, create a DB file if we weren't given one.
   if flags.db_import and not flags.db:
@@ -135,9 +169,15 @@ def standard_tensorboard_wsgi(flags, plugin_loaders, assets_zip_provider):
         purge_orphaned_data=flags.purge_orphaned_data,
         max_reload_threads=flags.max_reload_threads,
         use_import_op=flags.db_import_use_op)
+    # The DB import multiplexer can only reload all runs at once.
+    reload_on_change = False
   elif flags.db:
     # DB read-only mode, never load event logs.
     reload_interval = -1
+  elif flags.ingestion_dir:
+    reload_interval = published_multiplexer.POLL_INTERVAL_SECS
+    reload_task = 'thread'
+    reload_on_change = False
   plugin_name_to_instance = {}
   context = base_plugin.TBContext(
       db_module=db_module,
@@ -158,11 +198,84 @@ def standard_tensorboard_wsgi(flags, plugin_loaders, assets_zip_provider):
     plugin_name_to_instance[plugin.plugin_name] = plugin
   return TensorBoardWSGIApp(flags.logdir, plugins, loading_multiplexer,
                             reload_interval, flags.path_prefix,
-                            reload_task)
+                            reload_task, reload_on_change)
+
+
+def create_event_multiplexer(flags):
+  """Returns an `EventMultiplexer` configured by TensorBoard CLI flags."""
+  return event_multiplexer.EventMultiplexer(
+      size_guidance=DEFAULT_SIZE_GUIDANCE,
+      tensor_size_guidance=tensor_size_guidance_from_flags(flags),
+      purge_orphaned_data=flags.purge_orphaned_data,
+      max_reload_threads=flags.max_reload_threads,
+      use_mmap=flags.mmap_event_files,
+      decode_processes=flags.decode_processes,
+      prefetch_threads=flags.prefetch_threads,
+      prefetch_bytes=flags.prefetch_buffer_mb * 1024 * 1024,
+      discovery_threads=flags.discovery_threads,
+      concurrent_writers=flags.concurrent_writers,
+      snapshot_dir=flags.snapshot_dir or None,
+      reload_workers=flags.reload_workers,
+      max_reload_backoff=flags.max_reload_backoff,
+      lazy_load=flags.lazy_load,
+      warm_runs=flags.warm_runs,
+      max_memory_bytes=flags.max_memory_mb * 1024 * 1024,
+      plugin_names=plugin_names_from_flags(flags),
+      tag_pattern=flags.tag_filter or None)
+
+
+def start_ingestion_daemon(flags):
+  """Starts a process that loads the logdir into `flags.ingestion_dir`.
+
+  The process reloads an `EventMultiplexer` as TensorBoard would, and
+  publishes what changed after each reload with a
+  `published_multiplexer.Publisher`. It exits along with this process.
+
+  Args:
+    flags: An argparse.Namespace containing TensorBoard CLI flags.
+
+  Returns:
+    The `multiprocessing.Process`.
+  """
+  import multiprocessing
+  logger.info('Launching ingestion into %s in a child process',
+              flags.ingestion_dir)
+  process = multiprocessing.Process(
+      target=_ingest, args=(flags, os.getpid()), name='Ingestion')
+  # The process is not a daemon, so that it can start processes of its own
+  # (see --reload_workers), and is terminated on exit instead.
+  process.start()
+  atexit.register(process.terminate)
+  return process
+
+
+def _ingest(flags, parent_pid):
+  """Loads the logdir and publishes it until the parent process exits."""
+  multiplexer = create_event_multiplexer(flags)
+  publisher = published_multiplexer.Publisher(flags.ingestion_dir)
+
+  def publish():
+    start = time.time()
+    try:
+      version = publisher.Publish(multiplexer)
+    except (IOError, OSError) as e:
+      logger.error('Unable to publish the loaded runs: %s', e)
+      return
+    if version is not None:
+      logger.info('Published version %d of the runs in %0.3f secs', version,
+                  time.time() - start)
+
+  start_reloading_multiplexer(
+      multiplexer, parse_event_files_spec(flags.logdir),
+      max(flags.reload_interval, 0), 'thread', flags.reload_on_change,
+      on_reload=publish)
+  while os.getppid() == parent_pid:
+    time.sleep(1)
 
 
 def TensorBoardWSGIApp(logdir, plugins, multiplexer, reload_interval,
-                       path_prefix='', reload_task='auto'):
+                       path_prefix='', reload_task='auto',
+                       reload_on_change=False):
   """Constructs the TensorBoard application.
 
   Args:
@@ -175,6 +288,9 @@ def TensorBoardWSGIApp(logdir, plugins, multiplexer, reload_interval,
       Zero means reload just once at startup; negative means never load.
     path_prefix: A prefix of the path when app isn't served from root.
     reload_task: Indicates the type of background task to reload with.
+    reload_on_change: Whether to reload runs as their directories change,
+      rather than every `reload_interval` seconds. See
+      `start_reloading_multiplexer`.
 
   Returns:
     A WSGI application that implements the TensorBoard backend.
@@ -190,7 +306,7 @@ def TensorBoardWSGIApp(logdir, plugins, multiplexer, reload_interval,
     # We either reload the multiplexer once when TensorBoard starts up, or we
     # continuously reload the multiplexer.
     start_reloading_multiplexer(multiplexer, path_to_run, reload_interval,
-                                reload_task)
+                                reload_task, reload_on_change)
   return TensorBoardWSGI(plugins, path_prefix)
 
 
@@ -359,13 +475,20 @@ def parse_event_files_spec(logdir):
 
 
 def start_reloading_multiplexer(multiplexer, path_to_run, load_interval,
-                                reload_task):
+                                reload_task, reload_on_change=False,
+                                on_reload=None):
   """Starts automatically reloading the given multiplexer.
 
   If `load_interval` is positive, the thread will reload the multiplexer
   by calling `ReloadMultiplexer` every `load_interval` seconds, starting
   immediately. Otherwise, reloads the multiplexer once and never again.
 
+  With `reload_on_change` (and a positive `load_interval`), the multiplexer
+  is loaded once, and then only the runs whose directories change are
+  reloaded, as soon as they change. Paths that cannot be watched for changes
+  (see `change_watcher.ChangeWatcher`) are still reloaded every
+  `load_interval` seconds.
+
   Args:
     multiplexer: The `EventMultiplexer` to add runs to and reload.
     path_to_run: A dict mapping from paths to run names, where `None` as the run
@@ -374,6 +497,10 @@ def start_reloading_multiplexer(multiplexer, path_to_run, load_interval,
       seconds to wait after one load before starting the next load. Otherwise,
       reloads the multiplexer once and never again (no continuous reloading).
     reload_task: Indicates the type of background task to reload with.
+    reload_on_change: Whether to reload runs as their directories change.
+      Requires a multiplexer whose `Reload` accepts `runs`.
+    on_reload: An optional function that is called without arguments after
+      each reload.
 
   Raises:
     ValueError: If `load_interval` is negative.
@@ -382,6 +509,12 @@ def start_reloading_multiplexer(multiplexer, path_to_run, load_interval,
     raise ValueError('load_interval is negative: %d' % load_interval)
 
   def _reload():
+    if reload_on_change and load_interval > 0:
+      watcher = _create_change_watcher()
+      if watcher is not None:
+        _reload_on_change(multiplexer, path_to_run, load_interval, watcher,
+                          on_reload)
+        return
     while True:
       start = time.time()
       logger.info('TensorBoard reload process beginning')
@@ -391,6 +524,8 @@ def start_reloading_multiplexer(multiplexer, path_to_run, load_interval,
       multiplexer.Reload()
       duration = time.time() - start
       logger.info('TensorBoard done reloading. Load took %0.3f secs', duration)
+      if on_reload is not None:
+        on_reload()
       if load_interval == 0:
         # Only load the multiplexer once. Do not continuously reload.
         break
@@ -418,6 +553,109 @@ def start_reloading_multiplexer(multiplexer, path_to_run, load_interval,
     raise ValueError('unrecognized reload_task: %s' % reload_task)
 
 
+def _create_change_watcher():
+  """Returns a `ChangeWatcher`, or None if changes cannot be watched."""
+  if not change_watcher.IsSupported():
+    logger.warn('Cannot watch for changes on this system, polling instead')
+    return None
+  try:
+    return change_watcher.ChangeWatcher()
+  except OSError as e:
+    logger.warn('Cannot watch for changes, polling instead: %s', e)
+    return None
+
+
+def _reload_on_change(multiplexer, path_to_run, load_interval, watcher,
+                      on_reload=None):
+  """Reloads the runs whose directories change, forever.
+
+  Args:
+    multiplexer: The `EventMultiplexer` to add runs to and reload.
+    path_to_run: A dict mapping from paths to run names, as in
+      `start_reloading_multiplexer`.
+    load_interval: How many seconds to wait between reloads of the paths
+      that are not watched.
+    watcher: A `change_watcher.ChangeWatcher`.
+    on_reload: An optional function to call after each reload.
+  """
+  reload_all = True
+  last_poll_time = 0
+  while True:
+    # Watch before loading, so that no change in between is missed. Paths
+    # that start being watched (e.g., once they exist) are loaded in full.
+    to_load = {path: name for (path, name) in six.iteritems(path_to_run)
+               if not watcher.IsWatching(path) and watcher.Watch(path)}
+    polled = {path: name for (path, name) in six.iteritems(path_to_run)
+              if not watcher.IsWatching(path)}
+    now = time.time()
+    if reload_all or (polled and now - last_poll_time >= load_interval):
+      to_load.update(path_to_run if reload_all else polled)
+      reload_all = False
+      last_poll_time = now
+    if to_load:
+      logger.info('TensorBoard reload process beginning')
+      _reload_paths(multiplexer, to_load)
+      logger.info('TensorBoard done reloading. Load took %0.3f secs',
+                  time.time() - now)
+      if on_reload is not None:
+        on_reload()
+    if polled:
+      timeout = max(0, last_poll_time + load_interval - time.time())
+    else:
+      timeout = None
+    changed = watcher.Wait(timeout)
+    if changed is None:
+      reload_all = True
+    elif changed:
+      _reload_changed_directories(multiplexer, path_to_run, changed)
+      if on_reload is not None:
+        on_reload()
+
+
+def _reload_paths(multiplexer, path_to_run):
+  """Adds and reloads the runs under some of the paths of the logdir."""
+  for path, name in six.iteritems(path_to_run):
+    multiplexer.AddRunsFromDirectory(path, name)
+  runs = [run for (run, run_path) in six.iteritems(dict(multiplexer.RunPaths()))
+          if any(_is_under(run_path, path) for path in path_to_run)]
+  multiplexer.Reload(runs)
+
+
+def _reload_changed_directories(multiplexer, path_to_run, directories):
+  """Reloads the runs in changed directories, adding runs for new ones."""
+  run_by_path = {run_path: run for (run, run_path)
+                 in six.iteritems(dict(multiplexer.RunPaths()))}
+  runs = set()
+  for directory in directories:
+    if directory in run_by_path:
+      runs.add(run_by_path[directory])
+      continue
+    roots = [path for path in path_to_run if _is_under(directory, path)]
+    if not roots or not _has_events_files(directory):
+      continue
+    # Name the run as `AddRunsFromDirectory` would.
+    root = max(roots, key=len)
+    name = path_to_run[root]
+    rpath = os.path.relpath(directory, root)
+    logger.info('Adding run from directory %s', directory)
+    multiplexer.AddRun(directory, os.path.join(name, rpath) if name else rpath)
+  if runs:
+    logger.info('Reloading %d changed runs', len(runs))
+    multiplexer.Reload(runs)
+
+
+def _has_events_files(directory):
+  try:
+    return any(io_wrapper.IsTensorFlowEventsFile(name)
+               for name in os.listdir(directory))
+  except OSError:
+    return False
+
+
+def _is_under(path, directory):
+  return path == directory or path.startswith(os.path.join(directory, ''))
+
+
 def get_database_info(db_uri):
   """Returns TBContext fields relating to SQL database.
 
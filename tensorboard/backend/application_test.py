@@ -27,6 +27,7 @@ import posixpath
 import shutil
 import socket
 import tempfile
+import time
 
 import six
 import tensorflow as tf
@@ -41,8 +42,12 @@ from werkzeug import test as werkzeug_test
 from werkzeug import wrappers
 
 from tensorboard.backend import application
+from tensorboard.backend.event_processing import plugin_event_accumulator as event_accumulator  # pylint: disable=line-too-long
 from tensorboard.backend.event_processing import plugin_event_multiplexer as event_multiplexer  # pylint: disable=line-too-long
+from tensorboard.backend.event_processing import published_multiplexer
 from tensorboard.plugins import base_plugin
+from tensorboard.plugins.scalar import summary as scalar_summary
+from tensorboard.util import test_util
 
 
 class FakeFlags(object):
@@ -53,7 +58,23 @@ class FakeFlags(object):
       reload_interval=60,
       samples_per_plugin='',
       max_reload_threads=1,
+      mmap_event_files=False,
+      decode_processes=0,
+      prefetch_threads=0,
+      prefetch_buffer_mb=256,
+      discovery_threads=1,
+      concurrent_writers=False,
+      snapshot_dir='',
+      reload_workers=0,
+      max_reload_backoff=0,
+      lazy_load=False,
+      warm_runs=10,
+      max_memory_mb=0,
+      ingestion_dir='',
+      load_plugins='',
+      tag_filter='',
       reload_task='auto',
+      reload_on_change=False,
       db='',
       db_import=False,
       db_import_use_op=False,
@@ -64,7 +85,23 @@ class FakeFlags(object):
     self.reload_interval = reload_interval
     self.samples_per_plugin = samples_per_plugin
     self.max_reload_threads = max_reload_threads
+    self.mmap_event_files = mmap_event_files
+    self.decode_processes = decode_processes
+    self.prefetch_threads = prefetch_threads
+    self.prefetch_buffer_mb = prefetch_buffer_mb
+    self.discovery_threads = discovery_threads
+    self.concurrent_writers = concurrent_writers
+    self.snapshot_dir = snapshot_dir
+    self.reload_workers = reload_workers
+    self.max_reload_backoff = max_reload_backoff
+    self.lazy_load = lazy_load
+    self.warm_runs = warm_runs
+    self.max_memory_mb = max_memory_mb
+    self.ingestion_dir = ingestion_dir
+    self.load_plugins = load_plugins
+    self.tag_filter = tag_filter
     self.reload_task = reload_task
+    self.reload_on_change = reload_on_change
     self.db = db
     self.db_import = db_import
     self.db_import_use_op = db_import_use_op
@@ -461,6 +498,91 @@ class ApplicationConstructionTest(tf.test.TestCase):
       application.TensorBoardWSGIApp(logdir, plugins, multiplexer, 0, '')
 
 
+class TensorSizeGuidanceTest(tf.test.TestCase):
+
+  def testSamplesPerPlugin(self):
+    flags = FakeFlags(
+        '', samples_per_plugin='scalars=stratified:2000, images=0')
+    guidance = application.tensor_size_guidance_from_flags(flags)
+    self.assertEqual(guidance['scalars'], event_accumulator.Stratified(2000))
+    self.assertEqual(guidance['images'], 0)
+    self.assertEqual(guidance['audio'],
+                     application.DEFAULT_TENSOR_SIZE_GUIDANCE['audio'])
+    flags = FakeFlags(
+        '', samples_per_plugin='images=200MB,images:input/0=10kb,audio=512B')
+    guidance = application.tensor_size_guidance_from_flags(flags)
+    self.assertEqual(guidance['images'],
+                     event_accumulator.Bytes(200 * 1024 * 1024))
+    self.assertEqual(guidance['images:input/0'],
+                     event_accumulator.Bytes(10 * 1024))
+    self.assertEqual(guidance['audio'], event_accumulator.Bytes(512))
+    with self.assertRaises(ValueError):
+      application.tensor_size_guidance_from_flags(
+          FakeFlags('', samples_per_plugin='scalars=random:10'))
+    with self.assertRaises(ValueError):
+      application.tensor_size_guidance_from_flags(
+          FakeFlags('', samples_per_plugin='images=10TB'))
+
+
+class ReloadOnChangeTest(tf.test.TestCase):
+
+  def setUp(self):
+    super(ReloadOnChangeTest, self).setUp()
+    self.logdir = self.get_temp_dir()
+    self.multiplexer = event_multiplexer.EventMultiplexer()
+
+  def _MakeRun(self, *path_components):
+    path = os.path.join(self.logdir, *path_components)
+    os.makedirs(path)
+    open(os.path.join(path, 'events.out.tfevents.1'), 'w').close()
+    return path
+
+  def testAddsRunsForNewDirectories(self):
+    self.multiplexer.AddRunsFromDirectory(self.logdir, 'logs')
+    self.multiplexer.Reload()
+    run1 = self._MakeRun('run1')
+    train = self._MakeRun('run2', 'train')
+    application._reload_changed_directories(
+        self.multiplexer, {self.logdir: 'logs'},
+        {run1, train, os.path.dirname(train)})
+    self.assertEqual(self.multiplexer.RunPaths(), {
+        os.path.join('logs', 'run1'): run1,
+        os.path.join('logs', 'run2', 'train'): train,
+    })
+
+  def testReloadsOnlyChangedRuns(self):
+    run1 = self._MakeRun('run1')
+    self._MakeRun('run2')
+    self.multiplexer.AddRunsFromDirectory(self.logdir)
+    self.multiplexer.Reload()
+    with mock.patch.object(self.multiplexer, 'Reload') as reload_mock:
+      application._reload_changed_directories(
+          self.multiplexer, {self.logdir: None}, {run1})
+    reload_mock.assert_called_once_with({'run1'})
+
+
+class IngestionTest(tf.test.TestCase):
+
+  def testPublishesLoadedRuns(self):
+    logdir = os.path.join(self.get_temp_dir(), 'logdir')
+    writer = test_util.FileWriter(os.path.join(logdir, 'run1'))
+    for step in range(3):
+      writer.add_summary(scalar_summary.pb('loss', step), global_step=step)
+    writer.close()
+    ingestion_dir = os.path.join(self.get_temp_dir(), 'ingestion')
+    process = application.start_ingestion_daemon(
+        FakeFlags(logdir, reload_interval=0, ingestion_dir=ingestion_dir))
+    self.addCleanup(process.terminate)
+    multiplexer = published_multiplexer.PublishedMultiplexer(ingestion_dir)
+    deadline = time.time() + 60
+    while not multiplexer.Runs() and time.time() < deadline:
+      time.sleep(0.1)
+      multiplexer.Reload()
+    self.assertEqual(
+        [e.step for e in multiplexer.Tensors('run1', 'loss/scalar_summary')],
+        [0, 1, 2])
+
+
 class DbTest(tf.test.TestCase):
 
   def testSqliteDb(self):
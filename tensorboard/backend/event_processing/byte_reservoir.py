@@ -0,0 +1,196 @@
+# Copyright 2019 The TensorFlow Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ==============================================================================
+"""Reservoirs whose size is a number of bytes rather than of items.
+
+A `reservoir.Reservoir` keeps the same number of items for each key,
+whether they are scalars or large images. A `ByteReservoir` keeps as many
+items of each key as fit in a number of bytes, as told by a function of the
+items, and tracks how many bytes the items of all keys take.
+"""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import random
+import threading
+
+from tensorboard.backend.event_processing import reservoir
+
+
+class ByteReservoir(reservoir.Reservoir):
+  """A `reservoir.Reservoir` that keeps the items of each key within a
+  number of bytes.
+
+  Items are sampled at random like in a `reservoir.Reservoir` whose size is
+  the number of items that the key holds: once an item doesn't fit, it
+  replaces a random item with the probability that such a reservoir would
+  keep it, then random items other than the last one are removed until the
+  items fit again. The last item is always kept, even if it alone takes
+  more bytes than the reservoir holds.
+
+  Removing an item takes time proportional to the number of items of its
+  key, like appending it to a list would, which is little as long as the
+  items are large enough for their size to matter.
+
+  Fields:
+    always_keep_last: Whether the latest seen sample is always at the
+      end of the reservoir. Defaults to True.
+    size: An integer of the maximum number of bytes of the items of each
+      key.
+  """
+
+  def __init__(self, size, byte_size, seed=0, always_keep_last=True):
+    """Creates a new reservoir.
+
+    Args:
+      size: The number of bytes that the values of each key may take. If 0,
+        all values will be kept.
+      byte_size: A function that returns the number of bytes of an item.
+      seed: The seed of the random number generator to use when sampling.
+      always_keep_last: Whether to always keep the latest seen item in the
+        end of the reservoir. Defaults to True.
+
+    Raises:
+      ValueError: If size is negative or not an integer.
+    """
+    super(ByteReservoir, self).__init__(
+        size, seed=seed, always_keep_last=always_keep_last,
+        byte_size=byte_size)
+
+  def _NewBucket(self):
+    return _ByteBucket(self.size, self._byte_size, random.Random(self._seed),
+                       self.always_keep_last)
+
+
+class _ByteBucket(object):
+  """The items of a key of a `ByteReservoir`."""
+
+  def __init__(self, max_bytes, byte_size, _random, always_keep_last):
+    if max_bytes < 0 or max_bytes != round(max_bytes):
+      raise ValueError('max_bytes must be nonnegative int, was %s' % max_bytes)
+    self._max_bytes = max_bytes
+    self._byte_size = byte_size
+    self._random = _random
+    self.always_keep_last = always_keep_last
+    self._num_items_seen = 0
+    self._Reset([])
+    # This mutex protects the items, ensuring that calls to Items and
+    # AddItem are thread-safe
+    self._mutex = threading.Lock()
+
+  def AddItem(self, item, f=lambda x: x):
+    """Adds an item, replacing old items if it doesn't fit."""
+    with self._mutex:
+      self._num_items_seen += 1
+      if not self._max_bytes or not self._items:
+        self._Append(f(item))
+        return
+      item = f(item)
+      size = self._byte_size(item)
+      if self._total_bytes + size <= self._max_bytes:
+        self._Append(item, size)
+        return
+      r = self._random.randint(0, self._num_items_seen - 1)
+      if r < len(self._items):
+        self._Remove(r)
+      elif self.always_keep_last:
+        self._Remove(len(self._items) - 1)
+      else:
+        return
+      self._Append(item, size)
+      while self._total_bytes > self._max_bytes and len(self._items) > 1:
+        self._Remove(self._random.randint(0, len(self._items) - 2))
+
+  def FilterItems(self, filterFn):
+    """Keeps the items for which `filterFn` is true.
+
+    The number of items seen is scaled like the number of items, as in
+    `reservoir._ReservoirBucket.FilterItems`.
+
+    Returns:
+      The number of items removed from the bucket.
+    """
+    with self._mutex:
+      size_before = len(self._items)
+      self._Reset(list(filter(filterFn, self._items)))
+      prop_remaining = (len(self._items) / float(size_before)
+                        if size_before > 0 else 0)
+      self._num_items_seen = int(round(self._num_items_seen * prop_remaining))
+      return size_before - len(self._items)
+
+  def UpdateItems(self, removed_indices, items):
+    """Removes the items at some indices, then appends others."""
+    items = list(items)
+    with self._mutex:
+      kept = self._items
+      if removed_indices:
+        removed_indices = set(removed_indices)
+        kept = [item for (i, item) in enumerate(kept)
+                if i not in removed_indices]
+      self._Reset(kept + items)
+      self._num_items_seen += len(items)
+
+  def State(self):
+    """Returns the items, the number of items seen and the random state."""
+    with self._mutex:
+      return (list(self._items), self._num_items_seen,
+              self._random.getstate())
+
+  def Restore(self, state):
+    """Restores the bucket to a state returned by `State`."""
+    (items, num_items_seen, random_state) = state
+    with self._mutex:
+      self._Reset(list(items))
+      self._num_items_seen = num_items_seen
+      self._random.setstate(random_state)
+
+  def Items(self):
+    """Get all the items in the bucket."""
+    return list(self.ItemsView())
+
+  def ItemsView(self):
+    """Get all the items in the bucket, as a tuple that is never modified."""
+    with self._mutex:
+      if self._view is None:
+        self._view = tuple(self._items)
+      return self._view
+
+  def ByteSize(self):
+    """Returns how many bytes the items take, as told by `byte_size`."""
+    with self._mutex:
+      return self._total_bytes
+
+  def _Append(self, item, size=None):
+    if size is None:
+      size = self._byte_size(item)
+    self._items.append(item)
+    self._sizes.append(size)
+    self._total_bytes += size
+    self._view = None
+
+  def _Remove(self, index):
+    del self._items[index]
+    self._total_bytes -= self._sizes.pop(index)
+    self._view = None
+
+  def _Reset(self, items):
+    """Replaces the items with a list of items in order."""
+    self._items = items
+    # The number of bytes of each item, and their sum.
+    self._sizes = [self._byte_size(item) for item in items]
+    self._total_bytes = sum(self._sizes)
+    # A tuple of the items in order, or None if it must be built again.
+    self._view = None
@@ -0,0 +1,110 @@
+# Copyright 2019 The TensorFlow Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ==============================================================================
+"""Tests for byte_reservoir."""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import pickle
+
+from six.moves import xrange  # pylint: disable=redefined-builtin
+import tensorflow as tf
+
+from tensorboard.backend.event_processing import byte_reservoir
+from tensorboard.backend.event_processing import reservoir
+
+
+class ByteReservoirTest(tf.test.TestCase):
+
+  def testKeepsAllItemsThatFit(self):
+    r = byte_reservoir.ByteReservoir(100, len)
+    for _ in xrange(10):
+      r.AddItem('key', b'x' * 10)
+    self.assertEqual(len(r.Items('key')), 10)
+    self.assertEqual(r.ByteSize(), 100)
+
+  def testRespectsSize(self):
+    r = byte_reservoir.ByteReservoir(1000, len)
+    for i in xrange(1000):
+      r.AddItem('small', b'%d' % i)
+      r.AddItem('large', b'%d' % i + b' ' * (i % 100))
+    for key in ('small', 'large'):
+      items = r.Items(key)
+      self.assertLessEqual(sum(len(item) for item in items), 1000)
+      self.assertEqual(items[-1][:3], b'999')
+    self.assertGreater(len(r.Items('small')), 5 * len(r.Items('large')))
+    self.assertEqual(
+        r.ByteSize(),
+        sum(len(item) for key in r.Keys() for item in r.Items(key)))
+
+  def testKeepsLastItemEvenIfTooLarge(self):
+    r = byte_reservoir.ByteReservoir(10, len)
+    r.AddItem('key', b'a')
+    r.AddItem('key', b'b' * 20)
+    self.assertEqual(r.Items('key'), [b'b' * 20])
+
+  def testSamplesUniformly(self):
+    # Like a `reservoir.Reservoir` of as many items, each item is as likely
+    # to be kept.
+    counts = [0] * 10
+    for seed in xrange(200):
+      r = byte_reservoir.ByteReservoir(5, len, seed=seed)
+      for i in xrange(10):
+        r.AddItem('key', b'%d' % i)
+      for item in r.Items('key'):
+        counts[int(item)] += 1
+    self.assertEqual(counts[-1], 200)
+    for count in counts[:-1]:
+      self.assertGreater(count, 50)
+      self.assertLess(count, 170)
+
+  def testFilterItems(self):
+    r = byte_reservoir.ByteReservoir(0, len)
+    for i in xrange(10):
+      r.AddItem('key', b'%d' % i)
+    self.assertEqual(r.FilterItems(lambda item: int(item) < 4, 'key'), 6)
+    self.assertEqual(r.Items('key'), [b'0', b'1', b'2', b'3'])
+    self.assertEqual(r.ByteSize(), 4)
+
+  def testRestoreContinuesSampling(self):
+    r = byte_reservoir.ByteReservoir(20, len)
+    for i in xrange(50):
+      r.AddItem('key', b'%02d' % i)
+    restored = byte_reservoir.ByteReservoir(20, len)
+    restored.Restore(pickle.loads(pickle.dumps(r.State())))
+    self.assertEqual(restored.ByteSize(), r.ByteSize())
+    for i in xrange(50, 100):
+      r.AddItem('key', b'%02d' % i)
+      restored.AddItem('key', b'%02d' % i)
+    self.assertEqual(restored.Items('key'), r.Items('key'))
+
+  def testUpdateItems(self):
+    r = byte_reservoir.ByteReservoir(20, len)
+    mirror = byte_reservoir.ByteReservoir(20, len)
+    sent = ()
+    for start in (0, 5, 50):
+      for i in xrange(start, start + 30):
+        r.AddItem('key', b'%02d' % i)
+      items = r.ItemsView('key')
+      (removed_indices, added) = reservoir.ItemsDelta(sent, items)
+      mirror.UpdateItems('key', removed_indices, added)
+      sent = items
+      self.assertEqual(mirror.Items('key'), r.Items('key'))
+      self.assertEqual(mirror.ByteSize(), r.ByteSize())
+
+
+if __name__ == '__main__':
+  tf.test.main()
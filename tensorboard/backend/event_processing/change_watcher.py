@@ -0,0 +1,369 @@
+# Copyright 2019 The TensorFlow Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ==============================================================================
+"""Watches local logdirs for changes to their events files with inotify.
+
+Polling a logdir lists all of its directories and reads the end of every
+events file each `--reload_interval`, even if nothing has changed. On Linux, a
+`ChangeWatcher` has the kernel report the directories in which events files
+are written to or created, and the directories that are created or deleted,
+so that only the runs in those directories need to be reloaded.
+"""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import ctypes
+import ctypes.util
+import errno
+import os
+import select
+import struct
+import sys
+
+import six
+
+from tensorboard.backend.event_processing import io_wrapper
+from tensorboard.util import tb_logging
+
+
+logger = tb_logging.get_logger()
+
+# Constants from <sys/inotify.h>.
+_IN_MODIFY = 0x00000002
+_IN_CLOSE_WRITE = 0x00000008
+_IN_MOVED_FROM = 0x00000040
+_IN_MOVED_TO = 0x00000080
+_IN_CREATE = 0x00000100
+_IN_DELETE = 0x00000200
+_IN_DELETE_SELF = 0x00000400
+_IN_MOVE_SELF = 0x00000800
+_IN_Q_OVERFLOW = 0x00004000
+_IN_IGNORED = 0x00008000
+_IN_ONLYDIR = 0x01000000
+_IN_ISDIR = 0x40000000
+_IN_NONBLOCK = 0o4000
+_IN_CLOEXEC = 0o2000000
+
+_WATCH_MASK = (_IN_MODIFY | _IN_CLOSE_WRITE | _IN_MOVED_FROM | _IN_MOVED_TO |
+               _IN_CREATE | _IN_DELETE | _IN_DELETE_SELF | _IN_MOVE_SELF |
+               _IN_ONLYDIR)
+
+# The fixed-size part of a `struct inotify_event`: wd, mask, cookie, len.
+_EVENT_HEADER = struct.Struct('iIII')
+
+# File systems on which inotify only sees the changes made by this machine.
+_REMOTE_FILESYSTEMS = frozenset([
+    '9p', 'afs', 'ceph', 'cifs', 'glusterfs', 'gpfs', 'lustre', 'ncpfs',
+    'nfs', 'nfs4', 'smb3', 'smbfs', 'sshfs',
+])
+
+_MOUNTS_PATH = '/proc/self/mounts'
+
+_libc = None
+
+
+def _GetLibc():
+  """Returns the C library with its inotify functions, or None."""
+  global _libc
+  if _libc is None:
+    _libc = False
+    if sys.platform.startswith('linux'):
+      try:
+        libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6',
+                           use_errno=True)
+        libc.inotify_init1.argtypes = [ctypes.c_int]
+        libc.inotify_add_watch.argtypes = [
+            ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+        libc.inotify_rm_watch.argtypes = [ctypes.c_int, ctypes.c_int]
+        _libc = libc
+      except (OSError, AttributeError) as e:
+        logger.info('inotify is not available: %s', e)
+  return _libc or None
+
+
+def IsSupported():
+  """Returns whether change notifications are supported on this system."""
+  return _GetLibc() is not None
+
+
+def _IsLocalPath(path):
+  return '://' not in path and not io_wrapper.IsCnsPath(path)
+
+
+def _FilesystemType(path):
+  """Returns the type of the file system of a local path, or None."""
+  path = os.path.realpath(path)
+  best = (None, None)
+  try:
+    with open(_MOUNTS_PATH) as f:
+      for line in f:
+        fields = line.split()
+        if len(fields) < 3:
+          continue
+        mount_point = fields[1].replace('\\040', ' ')
+        if (path == mount_point or
+            path.startswith(os.path.join(mount_point, ''))):
+          if best[0] is None or len(mount_point) > len(best[0]):
+            best = (mount_point, fields[2])
+  except IOError:
+    return None
+  return best[1]
+
+
+def _HasNotifications(path):
+  """Returns whether inotify sees all changes to a local directory."""
+  fs_type = _FilesystemType(path)
+  return not (fs_type in _REMOTE_FILESYSTEMS or
+              (fs_type is not None and fs_type.startswith('fuse')))
+
+
+class ChangeWatcher(object):
+  """Reports the directories that change under a set of logdirs.
+
+  Each watched logdir (a "root") is watched along with all of its
+  subdirectories, which requires one inotify watch per directory. The number
+  of watches is limited by `/proc/sys/fs/inotify/max_user_watches`; a root
+  whose directories exceed it is not watched at all.
+
+  Roots that are remote, on a network file system, or do not exist cannot be
+  watched, and must be polled instead.
+
+  This class is not thread safe.
+  """
+
+  def __init__(self):
+    """Creates a watcher that does not watch any roots yet.
+
+    Raises:
+      OSError: If inotify is not supported, or its instance limit is reached.
+    """
+    libc = _GetLibc()
+    if libc is None:
+      raise OSError(errno.ENOSYS, 'inotify is not supported')
+    self._libc = libc
+    self._fd = libc.inotify_init1(_IN_NONBLOCK | _IN_CLOEXEC)
+    if self._fd < 0:
+      error = ctypes.get_errno()
+      raise OSError(error, os.strerror(error))
+    # The directory paths that each watch descriptor stands for. Paths to
+    # the same directory (through symbolic links) share a descriptor.
+    self._paths_by_wd = {}
+    self._wds_by_root = {}
+    # Roots that are never watched, but polled.
+    self._unwatchable = set()
+
+  def Watch(self, root):
+    """Starts watching a root directory and all of its subdirectories.
+
+    Args:
+      root: The path to a logdir.
+
+    Returns:
+      Whether the root is being watched. If not, it should be polled, and
+      watching may be retried later if the root did not exist yet.
+    """
+    if root in self._wds_by_root:
+      return True
+    if root in self._unwatchable:
+      return False
+    if not _IsLocalPath(root) or not _HasNotifications(root):
+      logger.info('Not watching %s for changes, polling it instead', root)
+      self._unwatchable.add(root)
+      return False
+    if not os.path.isdir(root):
+      return False
+    self._wds_by_root[root] = set()
+    try:
+      self._WatchTree(root, root)
+    except OSError as e:
+      self._Unwatch(root)
+      if e.errno == errno.ENOSPC:
+        logger.warn('Too many directories to watch %s for changes, polling '
+                    'it instead. Consider raising '
+                    '/proc/sys/fs/inotify/max_user_watches.', root)
+        self._unwatchable.add(root)
+      else:
+        logger.warn('Unable to watch %s for changes: %s', root, e)
+      return False
+    logger.info('Watching %s for changes', root)
+    return True
+
+  def IsWatching(self, root):
+    """Returns whether a root is being watched."""
+    return root in self._wds_by_root
+
+  def Wait(self, timeout=None):
+    """Waits for changes under the watched roots.
+
+    Args:
+      timeout: The number of seconds to wait for a change, or None to wait
+        until there is one.
+
+    Returns:
+      The set of paths of the directories in which an events file was
+      created or written to, that were created (along with all their
+      subdirectories), or that were deleted or moved away. A deleted root
+      stops being watched. If the kernel dropped some notifications, returns
+      None, and all runs should be reloaded.
+    """
+    (readable, _, _) = select.select([self._fd], [], [], timeout)
+    changed = set()
+    if not readable:
+      return changed
+    overflowed = False
+    while True:
+      try:
+        data = os.read(self._fd, 64 * 1024)
+      except OSError as e:
+        if e.errno in (errno.EAGAIN, errno.EWOULDBLOCK):
+          break
+        raise
+      offset = 0
+      while offset < len(data):
+        (wd, mask, _, length) = _EVENT_HEADER.unpack_from(data, offset)
+        offset += _EVENT_HEADER.size
+        name = data[offset:offset + length].rstrip(b'\0')
+        offset += length
+        if mask & _IN_Q_OVERFLOW:
+          logger.warn('Missed notifications of changes to logdirs')
+          overflowed = True
+        else:
+          self._HandleEvent(wd, mask, name, changed)
+    return None if overflowed else changed
+
+  def Close(self):
+    """Stops watching all roots."""
+    os.close(self._fd)
+    self._paths_by_wd = {}
+    self._wds_by_root = {}
+
+  def _HandleEvent(self, wd, mask, name, changed):
+    paths = self._paths_by_wd.get(wd)
+    if not paths:
+      return
+    if mask & _IN_IGNORED:
+      # The directory was deleted, or its file system unmounted.
+      changed.update(paths)
+      self._ForgetPaths(paths)
+      return
+    if mask & _IN_MOVE_SELF:
+      changed.update(paths)
+      self._ForgetPaths(paths)
+      return
+    if mask & _IN_DELETE_SELF:
+      # The watch is removed with an `_IN_IGNORED` event.
+      changed.update(paths)
+      return
+    name = name.decode('utf-8', 'replace')
+    for path in list(paths):
+      child = os.path.join(path, name)
+      if not mask & _IN_ISDIR:
+        if io_wrapper.IsTensorFlowEventsFile(child):
+          changed.add(path)
+      elif mask & (_IN_CREATE | _IN_MOVED_TO):
+        root = self._RootOf(path)
+        if root is None:
+          continue
+        try:
+          changed.update(self._WatchTree(root, child))
+        except OSError as e:
+          logger.warn('Unable to watch %s for changes, polling %s instead: %s',
+                      child, root, e)
+          self._Unwatch(root)
+          if e.errno == errno.ENOSPC:
+            self._unwatchable.add(root)
+      elif mask & _IN_MOVED_FROM:
+        # Its own watch reports moves of the directory itself, but its path
+        # is gone either way.
+        moved = [p for paths in self._paths_by_wd.values() for p in paths
+                 if _IsUnder(p, child)]
+        changed.update(moved)
+        self._ForgetPaths(moved)
+
+  def _WatchTree(self, root, top):
+    """Watches `top` and all of its subdirectories as part of `root`.
+
+    Returns:
+      The paths of the directories that were found.
+
+    Raises:
+      OSError: If a directory cannot be watched.
+    """
+    found = []
+    seen = set()
+    stack = [top]
+    while stack:
+      path = stack.pop()
+      real_path = os.path.realpath(path)
+      if real_path in seen:
+        continue
+      seen.add(real_path)
+      # Watch the directory before listing it, so that no subdirectory that
+      # is created in between is missed.
+      wd = self._libc.inotify_add_watch(
+          self._fd, path.encode(sys.getfilesystemencoding()), _WATCH_MASK)
+      if wd < 0:
+        error = ctypes.get_errno()
+        if error in (errno.ENOENT, errno.ENOTDIR):
+          # The directory has been deleted already.
+          continue
+        raise OSError(error, os.strerror(error), path)
+      self._paths_by_wd.setdefault(wd, set()).add(path)
+      self._wds_by_root[root].add(wd)
+      found.append(path)
+      try:
+        names = os.listdir(path)
+      except OSError:
+        continue
+      for name in names:
+        child = os.path.join(path, name)
+        if os.path.isdir(child):
+          stack.append(child)
+    return found
+
+  def _RootOf(self, path):
+    roots = [root for root in self._wds_by_root if _IsUnder(path, root)]
+    return max(roots, key=len) if roots else None
+
+  def _ForgetPaths(self, paths):
+    """Stops watching directories, and any root among them."""
+    paths = set(paths)
+    for root in paths.intersection(self._wds_by_root):
+      self._Unwatch(root)
+    for (wd, wd_paths) in list(six.iteritems(self._paths_by_wd)):
+      wd_paths.difference_update(paths)
+      if not wd_paths:
+        self._RemoveWatch(wd)
+
+  def _Unwatch(self, root):
+    """Stops watching a root and all of its subdirectories."""
+    for wd in self._wds_by_root.pop(root, ()):
+      wd_paths = self._paths_by_wd.get(wd, set())
+      wd_paths.difference_update(
+          [path for path in wd_paths if _IsUnder(path, root)])
+      if not wd_paths:
+        self._RemoveWatch(wd)
+
+  def _RemoveWatch(self, wd):
+    self._paths_by_wd.pop(wd, None)
+    for wds in six.itervalues(self._wds_by_root):
+      wds.discard(wd)
+    # This fails harmlessly if the kernel has removed the watch already.
+    self._libc.inotify_rm_watch(self._fd, wd)
+
+
+def _IsUnder(path, directory):
+  return path == directory or path.startswith(os.path.join(directory, ''))
@@ -0,0 +1,112 @@
+# Copyright 2019 The TensorFlow Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ==============================================================================
+"""Tests for change_watcher."""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import os
+import shutil
+import unittest
+
+import tensorflow as tf
+
+from tensorboard.backend.event_processing import change_watcher
+
+
+# Long enough for notifications of changes that have been made already.
+_TIMEOUT = 1.0
+
+
+@unittest.skipUnless(change_watcher.IsSupported(), 'requires inotify')
+class ChangeWatcherTest(tf.test.TestCase):
+
+  def setUp(self):
+    super(ChangeWatcherTest, self).setUp()
+    self._root = os.path.join(self.get_temp_dir(), 'logdir')
+    os.makedirs(os.path.join(self._root, 'run1'))
+    self._watcher = change_watcher.ChangeWatcher()
+    self.addCleanup(self._watcher.Close)
+
+  def _WriteFile(self, *path_components):
+    with open(os.path.join(self._root, *path_components), 'a') as f:
+      f.write('x')
+
+  def testReportsDirectoriesOfChangedEventsFiles(self):
+    self.assertTrue(self._watcher.Watch(self._root))
+    self.assertTrue(self._watcher.IsWatching(self._root))
+    self._WriteFile('run1', 'events.out.tfevents.1')
+    self._WriteFile('events.out.tfevents.2')
+    self.assertEqual(self._watcher.Wait(_TIMEOUT),
+                     {self._root, os.path.join(self._root, 'run1')})
+    self._WriteFile('run1', 'events.out.tfevents.1')
+    self.assertEqual(self._watcher.Wait(_TIMEOUT),
+                     {os.path.join(self._root, 'run1')})
+
+  def testIgnoresOtherFiles(self):
+    self._watcher.Watch(self._root)
+    self._WriteFile('run1', 'model.ckpt')
+    self._WriteFile('run1', 'events.out.tfevents.1.tbindex')
+    self.assertEqual(self._watcher.Wait(0.1), set())
+
+  def testReportsAndWatchesNewDirectories(self):
+    self._watcher.Watch(self._root)
+    os.makedirs(os.path.join(self._root, 'run2', 'train'))
+    self.assertEqual(self._watcher.Wait(_TIMEOUT),
+                     {os.path.join(self._root, 'run2'),
+                      os.path.join(self._root, 'run2', 'train')})
+    self._WriteFile('run2', 'train', 'events.out.tfevents.1')
+    self.assertEqual(self._watcher.Wait(_TIMEOUT),
+                     {os.path.join(self._root, 'run2', 'train')})
+
+  def testReportsDeletedDirectories(self):
+    self._watcher.Watch(self._root)
+    run1 = os.path.join(self._root, 'run1')
+    shutil.rmtree(run1)
+    self.assertIn(run1, self._watcher.Wait(_TIMEOUT))
+    self.assertTrue(self._watcher.IsWatching(self._root))
+
+  def testStopsWatchingDeletedRoot(self):
+    self._watcher.Watch(self._root)
+    shutil.rmtree(self._root)
+    changed = set()
+    while self._watcher.IsWatching(self._root):
+      changed.update(self._watcher.Wait(_TIMEOUT))
+    self.assertIn(self._root, changed)
+    self.assertFalse(self._watcher.Watch(self._root))
+    # Watching resumes once the root exists again.
+    os.makedirs(self._root)
+    self.assertTrue(self._watcher.Watch(self._root))
+
+  def testDoesNotWatchRemoteOrNetworkPaths(self):
+    self.assertFalse(self._watcher.Watch('gs://bucket/logdir'))
+    mounts = os.path.join(self.get_temp_dir(), 'mounts')
+    with open(mounts, 'w') as f:
+      f.write('/dev/sda1 / ext4 rw 0 0\n')
+      f.write('server:/export %s nfs4 rw 0 0\n'
+              % os.path.realpath(self._root).replace(' ', '\\040'))
+    with tf.compat.v1.test.mock.patch.object(
+        change_watcher, '_MOUNTS_PATH', mounts):
+      self.assertFalse(self._watcher.Watch(self._root))
+    self.assertFalse(self._watcher.IsWatching(self._root))
+
+  def testWaitTimesOut(self):
+    self._watcher.Watch(self._root)
+    self.assertEqual(self._watcher.Wait(0), set())
+
+
+if __name__ == '__main__':
+  tf.test.main()
@@ -220,16 +220,10 @@ class _RunLoader(object):
 
   def load_batches(self):
     """Returns a batched event iterator over the run directory event files."""
-    event_iterator = self._directory_watcher.Load()
     while True:
-      events = []
-      event_bytes = 0
       start = time.time()
-      for event_proto in event_iterator:
-        events.append(event_proto)
-        event_bytes += len(event_proto)
-        if len(events) >= self._BATCH_COUNT or event_bytes >= self._BATCH_BYTES:
-          break
+      events = self._directory_watcher.LoadBatch(
+          self._BATCH_COUNT, self._BATCH_BYTES)
       elapsed = time.time() - start
       logger.debug('RunLoader.load_batch() yielded in %0.3f sec for %s',
                        elapsed, self._subdir)
@@ -19,6 +19,13 @@ from __future__ import division
 from __future__ import print_function
 
 import bisect
+import collections
+import heapq
+import os
+import re
+import time
+
+import six
 
 from tensorboard.backend.event_processing import io_wrapper
 from tensorboard.compat import tf
@@ -40,9 +47,15 @@ class DirectoryWatcher(object):
   greater and never come back. It uses some heuristics to check whether this is
   true based on tracking changes to the files' sizes, but the check can have
   false negatives. However, it should have no false positives.
+
+  To save file system calls, the listing of a local directory is reused for
+  as long as the modification time of the directory stays the same, and
+  older paths are checked for out-of-order writes only when the listing
+  changes, or at most every `_OOO_WRITE_CHECK_INTERVAL_SECS` otherwise.
   """
 
-  def __init__(self, directory, loader_factory, path_filter=lambda x: True):
+  def __init__(self, directory, loader_factory, path_filter=lambda x: True,
+               open_next_path=False):
     """Constructs a new DirectoryWatcher.
 
     Args:
@@ -51,6 +64,12 @@ class DirectoryWatcher(object):
         path and return an object that has a Load method returning an
         iterator that will yield all events that have not been yielded yet.
       path_filter: If specified, only paths matching this filter are loaded.
+      open_next_path: Whether to create the loader for the path after the
+        current one, if there is one already, as soon as the watcher moves to
+        the current path. This lets loaders that read ahead (such as those
+        of a `record_prefetcher.RecordPrefetcher`) read the next path while
+        the current one is loaded. Loaders must have a `Close()` method,
+        which is called if the next path turns out to be another one.
 
     Raises:
       ValueError: If path_provider or loader_factory are None.
@@ -64,6 +83,18 @@ class DirectoryWatcher(object):
     self._loader_factory = loader_factory
     self._loader = None
     self._path_filter = path_filter
+    self._open_next_path = open_next_path
+    # The sorted paths found by the last call to _GetNextPath().
+    self._listed_paths = []
+    # The modification time of the directory when it was last listed, if
+    # the listing can be reused until it changes, and when it was listed.
+    self._listing_mtime = None
+    self._listing_time = None
+    self._last_ooo_check_time = None
+    # The number of file system calls made so far, by kind.
+    self._filesystem_calls = collections.Counter()
+    # A (path, loader) pair for the path after the current one, if opened.
+    self._next_path_loader = None
     self._ooo_writes_detected = False
     # The file size for each file at the time it was finalized.
     self._finalized_sizes = {}
@@ -105,8 +136,8 @@ class DirectoryWatcher(object):
     """
 
     # If the loader exists, check it for a value.
-    if not self._loader:
-      self._InitializeLoader()
+    if not self._loader and not self._InitializeLoader():
+      return
 
     while True:
       # Yield all the new events in the path we're currently loading from.
@@ -144,9 +175,78 @@ class DirectoryWatcher(object):
       # Advance to the next path and start over.
       self._SetPath(next_path)
 
+  def LoadBatch(self, max_records=None, max_bytes=None):
+    """Loads a batch of new values.
+
+    This is the batched counterpart of `Load()`, with the same guarantees,
+    and requires loaders that have a `LoadBatch(max_records, max_bytes)`
+    method. A batch never spans two paths, so it may be smaller than the
+    limits allow when the watcher advances to a new path.
+
+    Args:
+      max_records: The maximum number of values to return, or None for no
+        limit.
+      max_bytes: Passed on to the loader, which stops adding values to the
+        batch once they total at least this many bytes.
+
+    Returns:
+      A list of the next values that have not been returned yet. The list is
+      empty only if there are no new values.
+
+    Raises:
+      DirectoryDeletedError: If the directory has been permanently deleted
+        (as opposed to being temporarily unavailable).
+    """
+    try:
+      return self._LoadBatchInternal(max_records, max_bytes)
+    except tf.errors.OpError:
+      if not tf.io.gfile.exists(self._directory):
+        raise DirectoryDeletedError(
+            'Directory %s has been permanently deleted' % self._directory)
+      return []
+
+  def _LoadBatchInternal(self, max_records, max_bytes):
+    """Internal implementation of LoadBatch(); see also _LoadInternal()."""
+    if not self._loader and not self._InitializeLoader():
+      return []
+
+    while True:
+      batch = self._loader.LoadBatch(max_records, max_bytes)
+      if batch:
+        return batch
+
+      next_path = self._GetNextPath()
+      if not next_path:
+        logger.info('No path found after %s', self._path)
+        return []
+
+      # Check for events written to the current path before the new path
+      # appeared, as in _LoadInternal(). If there are any, the next call will
+      # come back here once they have been returned.
+      batch = self._loader.LoadBatch(max_records, max_bytes)
+      if batch:
+        return batch
+
+      logger.info('Directory watcher advancing from %s to %s', self._path,
+                  next_path)
+      self._SetPath(next_path)
+
   # The number of paths before the current one to check for out of order writes.
   _OOO_WRITE_CHECK_COUNT = 20
 
+  # How often to check the paths before the current one for out of order
+  # writes when the listing of the directory has not changed.
+  _OOO_WRITE_CHECK_INTERVAL_SECS = 60
+
+  # A listing is only reused if the modification time of the directory was
+  # at least this old when it was listed, since file systems may not record
+  # modification times to the nanosecond.
+  _LISTING_MTIME_MARGIN_SECS = 2
+
+  # A listing is reused for at most this long, in case the clocks of the
+  # file system and of this machine disagree.
+  _MAX_LISTING_AGE_SECS = 60
+
   def OutOfOrderWritesDetected(self):
     """Returns whether any out-of-order writes have been detected.
 
@@ -162,12 +262,85 @@ class DirectoryWatcher(object):
     """
     return self._ooo_writes_detected
 
+  def FilesystemCalls(self):
+    """Returns the number of file system calls made so far, by kind.
+
+    Returns:
+      A `collections.Counter` from 'listdir' and 'stat' to the number of
+      calls of that kind. Calls made by loaders are not included.
+    """
+    return collections.Counter(self._filesystem_calls)
+
+  def State(self):
+    """Returns the position of the watcher, which `Restore` can resume from.
+
+    The position is the current path, the offset in it of the first value
+    that has not been loaded yet, and the sizes of the paths before it.
+
+    Returns:
+      A dict that can be pickled, or None if the loader of the current path
+      has no `Offset()` method.
+    """
+    if self._path is None:
+      return {'path': None}
+    if not hasattr(self._loader, 'Offset'):
+      return None
+    return {
+        'path': self._path,
+        'offset': self._loader.Offset(),
+        'finalized_sizes': dict(self._finalized_sizes),
+        'ooo_writes_detected': self._ooo_writes_detected,
+    }
+
+  def Restore(self, state):
+    """Resumes loading from a position returned by `State`.
+
+    The position is only resumed if the paths that were loaded up to it all
+    still exist and have not shrunk; otherwise, the values loaded before
+    would differ from those that are loaded now. This must be called before
+    anything is loaded, and requires a loader factory that takes the offset
+    at which to start loading as a `start_offset` keyword argument.
+
+    Args:
+      state: A dict returned by `State`.
+
+    Returns:
+      Whether the position was resumed. If not, the watcher is unchanged.
+    """
+    path = state['path']
+    if path is None:
+      return True
+    sizes = dict(state['finalized_sizes'])
+    sizes[path] = state['offset']
+    for (loaded_path, size) in six.iteritems(sizes):
+      self._filesystem_calls['stat'] += 1
+      try:
+        length = tf.io.gfile.stat(loaded_path).length
+      except tf.errors.OpError:
+        logger.info('Not resuming %s, since %s is gone', self._directory,
+                    loaded_path)
+        return False
+      if length < size:
+        logger.info('Not resuming %s, since %s has shrunk', self._directory,
+                    loaded_path)
+        return False
+    self._loader = self._loader_factory(path, start_offset=state['offset'])
+    self._path = path
+    self._finalized_sizes = dict(state['finalized_sizes'])
+    self._ooo_writes_detected = state['ooo_writes_detected']
+    return True
+
   def _InitializeLoader(self):
+    """Starts loading from the first path, if there is one.
+
+    Returns:
+      Whether a path was found.
+    """
     path = self._GetNextPath()
-    if path:
-      self._SetPath(path)
-    else:
-      raise StopIteration
+    if not path:
+      return False
+    self._SetPath(path)
+    return True
 
   def _SetPath(self, path):
     """Sets the current path to watch for new events.
@@ -182,6 +355,7 @@ class DirectoryWatcher(object):
     if old_path and not io_wrapper.IsGCSPath(old_path):
       try:
         # We're done with the path, so store its size.
+        self._filesystem_calls['stat'] += 1
         size = tf.io.gfile.stat(old_path).length
         logger.debug('Setting latest size of %s to %d', old_path, size)
         self._finalized_sizes[old_path] = size
@@ -189,7 +363,24 @@ class DirectoryWatcher(object):
         logger.error('Unable to get size of %s: %s', old_path, e)
 
     self._path = path
-    self._loader = self._loader_factory(path)
+    if self._next_path_loader and self._next_path_loader[0] == path:
+      self._loader = self._next_path_loader[1]
+    else:
+      if self._next_path_loader:
+        self._next_path_loader[1].Close()
+      self._loader = self._loader_factory(path)
+    self._next_path_loader = None
+    if self._open_next_path:
+      next_index = bisect.bisect_right(self._listed_paths, path)
+      if next_index < len(self._listed_paths):
+        next_path = self._listed_paths[next_index]
+        logger.debug('Opening %s ahead of time', next_path)
+        try:
+          self._next_path_loader = (next_path,
+                                    self._loader_factory(next_path))
+        except (tf.errors.OpError, IOError) as e:
+          # It is opened again when the watcher gets there.
+          logger.debug('Unable to open %s ahead of time: %s', next_path, e)
 
   def _GetNextPath(self):
     """Gets the next path to load from.
@@ -200,9 +391,9 @@ class DirectoryWatcher(object):
     Returns:
       The next path to load events from, or None if there are no more paths.
     """
-    paths = sorted(path
-                   for path in io_wrapper.ListDirectoryAbsolute(self._directory)
-                   if self._path_filter(path))
+    now = time.time()
+    (paths, listing_changed) = self._ListPaths(now)
+    self._listed_paths = paths
     if not paths:
       return None
 
@@ -211,7 +402,12 @@ class DirectoryWatcher(object):
 
     # Don't bother checking if the paths are GCS (which we can't check) or if
     # we've already detected an OOO write.
-    if not io_wrapper.IsGCSPath(paths[0]) and not self._ooo_writes_detected:
+    if (not io_wrapper.IsGCSPath(paths[0]) and
+        not self._ooo_writes_detected and
+        (listing_changed or self._last_ooo_check_time is None or
+         now - self._last_ooo_check_time >=
+         self._OOO_WRITE_CHECK_INTERVAL_SECS)):
+      self._last_ooo_check_time = now
       # Check the previous _OOO_WRITE_CHECK_COUNT paths for out of order writes.
       current_path_index = bisect.bisect_left(paths, self._path)
       ooo_check_start = max(0, current_path_index - self._OOO_WRITE_CHECK_COUNT)
@@ -228,9 +424,49 @@ class DirectoryWatcher(object):
     else:
       return None
 
+  def _ListPaths(self, now):
+    """Lists the paths in the directory, or reuses the last listing.
+
+    Args:
+      now: The current time, in seconds since the epoch.
+
+    Returns:
+      A tuple of the sorted paths that pass the path filter, and whether
+      they differ from the paths of the last listing.
+    """
+    mtime = self._DirectoryMtime()
+    if (mtime is not None and mtime == self._listing_mtime and
+        now - self._listing_time < self._MAX_LISTING_AGE_SECS):
+      return (self._listed_paths, False)
+    self._filesystem_calls['listdir'] += 1
+    paths = sorted(path
+                   for path in io_wrapper.ListDirectoryAbsolute(self._directory)
+                   if self._path_filter(path))
+    # The directory is stat'ed before it is listed, so a change in between
+    # shows up as a new modification time next time.
+    if mtime is not None and now - mtime >= self._LISTING_MTIME_MARGIN_SECS:
+      self._listing_mtime = mtime
+      self._listing_time = now
+    else:
+      self._listing_mtime = None
+    return (paths, paths != self._listed_paths)
+
+  def _DirectoryMtime(self):
+    """Returns the modification time of a local directory, or None."""
+    if '://' in self._directory:
+      # Directories in object stores have no modification times.
+      return None
+    self._filesystem_calls['stat'] += 1
+    try:
+      mtime_nsec = tf.io.gfile.stat(self._directory).mtime_nsec
+    except tf.errors.OpError:
+      return None
+    return mtime_nsec / 1e9 if mtime_nsec else None
+
   def _HasOOOWrite(self, path):
     """Returns whether the path has had an out-of-order write."""
     # Check the sizes of each path before the current one.
+    self._filesystem_calls['stat'] += 1
     size = tf.io.gfile.stat(path).length
     old_size = self._finalized_sizes.get(path, None)
     if size != old_size:
@@ -245,6 +481,195 @@ class DirectoryWatcher(object):
       return False
 
 
+class MultiWriterDirectoryWatcher(object):
+  """Loads the paths of several writers in a directory concurrently.
+
+  A `DirectoryWatcher` loads one path at a time, so when several processes
+  (such as the workers of a distributed job) write events files into the same
+  directory at the same time, all but one of them are only loaded once the
+  first one stops being written. This watcher groups paths by their writer
+  (see `WriterKey`), loads the paths of each writer in order with a
+  `DirectoryWatcher`, as before, and loads the writers concurrently.
+
+  The values of each batch are merged in order of their steps, keeping the
+  order of the values of each writer. This only holds within a batch: a
+  writer that lags behind the others can return values in a later batch
+  with lower steps than those already returned for other writers, so steps
+  that go backwards don't tell that a writer restarted.
+
+  Only `LoadBatch()` is supported, and values must have a `step` attribute.
+  """
+
+  def __init__(self, directory, loader_factory, path_filter=lambda x: True,
+               open_next_path=False):
+    """Constructs a new MultiWriterDirectoryWatcher.
+
+    Args:
+      directory: The directory to load files from.
+      loader_factory: A factory for creating loaders, as for a
+        `DirectoryWatcher`. Loaders must have a `LoadBatch` method.
+      path_filter: If specified, only paths matching this filter are loaded.
+      open_next_path: Passed on to the `DirectoryWatcher` of each writer.
+
+    Raises:
+      ValueError: If directory or loader_factory are None.
+    """
+    if directory is None:
+      raise ValueError('A directory is required')
+    if loader_factory is None:
+      raise ValueError('A loader factory is required')
+    self._directory = directory
+    self._loader_factory = loader_factory
+    self._path_filter = path_filter
+    self._open_next_path = open_next_path
+    # Lists the directory to find new writers.
+    self._lister = DirectoryWatcher(directory, loader_factory, path_filter)
+    # The `DirectoryWatcher` of each writer, by key.
+    self._watchers = collections.OrderedDict()
+    # The values that have been loaded but not returned yet, by writer key.
+    self._pending = {}
+
+  def LoadBatch(self, max_records=None, max_bytes=None):
+    """Loads a batch of new values from all writers.
+
+    Args:
+      max_records: The maximum number of values to return, or None for no
+        limit.
+      max_bytes: Passed on to the loaders of the writers.
+
+    Returns:
+      A list of the next values that have not been returned yet. The list is
+      empty only if there are no new values.
+
+    Raises:
+      DirectoryDeletedError: If the directory has been permanently deleted
+        (as opposed to being temporarily unavailable).
+    """
+    self._AddNewWriters()
+    heap = []
+    for (index, key) in enumerate(self._watchers):
+      if self._Fill(key, max_records, max_bytes):
+        heap.append((self._pending[key][0].step, index, key))
+    heapq.heapify(heap)
+    batch = []
+    while heap and (max_records is None or len(batch) < max_records):
+      (_, index, key) = heapq.heappop(heap)
+      pending = self._pending[key]
+      batch.append(pending.popleft())
+      # The values that the writer loads next may have to come before those
+      # of other writers, so it stays in the merge until it has no more.
+      if pending or self._Fill(key, max_records, max_bytes):
+        heapq.heappush(heap, (pending[0].step, index, key))
+    return batch
+
+  def OutOfOrderWritesDetected(self):
+    """Returns whether any writer has had an out-of-order write."""
+    return any(watcher.OutOfOrderWritesDetected()
+               for watcher in six.itervalues(self._watchers))
+
+  def FilesystemCalls(self):
+    """Returns the number of file system calls made so far, by kind."""
+    calls = self._lister.FilesystemCalls()
+    for watcher in six.itervalues(self._watchers):
+      calls.update(watcher.FilesystemCalls())
+    return calls
+
+  def State(self):
+    """Returns the positions of all writers, which `Restore` can resume from.
+
+    Returns:
+      A dict that can be pickled, or None if some writer has values that
+      have been loaded but not returned yet, or cannot tell its position.
+    """
+    if any(six.itervalues(self._pending)):
+      return None
+    writers = {}
+    for (key, watcher) in six.iteritems(self._watchers):
+      writers[key] = watcher.State()
+      if writers[key] is None:
+        return None
+    return {'writers': writers}
+
+  def Restore(self, state):
+    """Resumes loading from positions returned by `State`.
+
+    See `DirectoryWatcher.Restore`. The positions are only resumed if those
+    of all writers can be.
+
+    Args:
+      state: A dict returned by `State`.
+
+    Returns:
+      Whether the positions were resumed. If not, the watcher is unchanged.
+    """
+    watchers = collections.OrderedDict()
+    for (key, writer_state) in sorted(six.iteritems(state['writers'])):
+      watchers[key] = DirectoryWatcher(
+          self._directory,
+          self._loader_factory,
+          self._WriterFilter(key),
+          open_next_path=self._open_next_path)
+      if not watchers[key].Restore(writer_state):
+        return False
+    self._watchers = watchers
+    self._pending = {key: collections.deque() for key in watchers}
+    return True
+
+  def _Fill(self, key, max_records, max_bytes):
+    """Loads the next values of a writer if needed; returns if it has any."""
+    pending = self._pending[key]
+    if not pending:
+      pending.extend(self._watchers[key].LoadBatch(max_records, max_bytes))
+    return bool(pending)
+
+  def _AddNewWriters(self):
+    try:
+      (paths, _) = self._lister._ListPaths(time.time())  # pylint: disable=protected-access
+    except tf.errors.OpError:
+      if not tf.io.gfile.exists(self._directory):
+        raise DirectoryDeletedError(
+            'Directory %s has been permanently deleted' % self._directory)
+      return
+    self._lister._listed_paths = paths  # pylint: disable=protected-access
+    for path in paths:
+      key = WriterKey(path)
+      if key not in self._watchers:
+        logger.info('Found a new writer of %s in %s', self._directory, path)
+        self._watchers[key] = DirectoryWatcher(
+            self._directory,
+            self._loader_factory,
+            self._WriterFilter(key),
+            open_next_path=self._open_next_path)
+        self._pending[key] = collections.deque()
+
+  def _WriterFilter(self, key):
+    path_filter = self._path_filter
+    return lambda path: path_filter(path) and WriterKey(path) == key
+
+
+# Events files are named "events.out.tfevents.<timestamp>.<hostname>", along
+# with ".<pid>.<id>" for writers of TensorFlow 2 and an optional suffix.
+_EVENTS_FILE_NAME_PATTERN = re.compile(r'tfevents\.\d+\.(.*)$')
+
+
+def WriterKey(path):
+  """Returns the part of the name of an events file that names its writer.
+
+  This is the name without its timestamp, which changes for each new file of
+  a writer. A writer that restarts on the same host is the same writer,
+  unless (as with TensorFlow 2) the name includes a process ID.
+
+  Args:
+    path: The path to an events file.
+
+  Returns:
+    A string that is the same for all events files of a writer.
+  """
+  basename = os.path.basename(path)
+  match = _EVENTS_FILE_NAME_PATTERN.search(basename)
+  return match.group(1) if match else basename
+
+
 class DirectoryDeletedError(Exception):
   """Thrown by Load() when the directory is *permanently* gone.
 
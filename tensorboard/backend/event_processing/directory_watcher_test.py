@@ -21,6 +21,7 @@ from __future__ import print_function
 
 import os
 import shutil
+import time
 
 import tensorflow as tf
 
@@ -35,6 +36,9 @@ class _ByteLoader(object):
     self._f = open(path)
     self.bytes_read = 0
 
+  def Close(self):
+    self._f.close()
+
   def Load(self):
     while True:
       self._f.seek(self.bytes_read)
@@ -45,6 +49,13 @@ class _ByteLoader(object):
       else:
         return
 
+  def LoadBatch(self, max_records=None, max_bytes=None):
+    del max_bytes  # Unused.
+    self._f.seek(self.bytes_read)
+    data = self._f.read(-1 if max_records is None else max_records)
+    self.bytes_read += len(data)
+    return list(data)
+
 
 class DirectoryWatcherTest(tf.test.TestCase):
 
@@ -154,13 +165,44 @@ class DirectoryWatcherTest(tf.test.TestCase):
     self.assertFalse(self._watcher.OutOfOrderWritesDetected())
 
   def testDetectsChangingOldFiles(self):
+    self._watcher._OOO_WRITE_CHECK_INTERVAL_SECS = 0
+    self._WriteToFile('a', 'a')
+    self._WriteToFile('b', 'a')
+    self._LoadAllEvents()
+    self._WriteToFile('a', 'c')
+    self._LoadAllEvents()
+    self.assertTrue(self._watcher.OutOfOrderWritesDetected())
+
+  def testChecksOldFilesForChangesPeriodically(self):
     self._WriteToFile('a', 'a')
     self._WriteToFile('b', 'a')
     self._LoadAllEvents()
     self._WriteToFile('a', 'c')
     self._LoadAllEvents()
+    # The listing has not changed since the last check.
+    self.assertFalse(self._watcher.OutOfOrderWritesDetected())
+    later = time.time() + self._watcher._OOO_WRITE_CHECK_INTERVAL_SECS
+    with tf.compat.v1.test.mock.patch.object(
+        directory_watcher.time, 'time', return_value=later):
+      self._LoadAllEvents()
     self.assertTrue(self._watcher.OutOfOrderWritesDetected())
 
+  def testReusesListingWhileDirectoryIsUnchanged(self):
+    self._WriteToFile('a', 'a')
+    old = time.time() - 10
+    os.utime(self._directory, (old, old))
+    self.assertWatcherYields(['a'])
+    calls = self._watcher.FilesystemCalls()
+    self._WriteToFile('a', 'b')
+    self.assertWatcherYields(['b'])
+    # Only the directory is stat'ed.
+    calls['stat'] += 1
+    self.assertEqual(self._watcher.FilesystemCalls(), calls)
+    self._WriteToFile('b', 'c')
+    self.assertWatcherYields(['c'])
+    self.assertGreater(self._watcher.FilesystemCalls()['listdir'],
+                       calls['listdir'])
+
   def testDoesntCrashWhenFileIsDeleted(self):
     self._WriteToFile('a', 'a')
     self._LoadAllEvents()
@@ -209,5 +251,186 @@ class DirectoryWatcherTest(tf.test.TestCase):
       self._LoadAllEvents()
 
 
+class DirectoryWatcherLoadBatchTest(DirectoryWatcherTest):
+  """Runs the same tests through LoadBatch() in batches of two values."""
+
+  def _LoadAllEvents(self):
+    while self._watcher.LoadBatch(2):
+      pass
+
+  def assertWatcherYields(self, values):
+    loaded = []
+    while True:
+      batch = self._watcher.LoadBatch(2)
+      if not batch:
+        break
+      self.assertLessEqual(len(batch), 2)
+      loaded.extend(batch)
+    self.assertEqual(loaded, values)
+
+
+class DirectoryWatcherOpenNextPathTest(DirectoryWatcherTest):
+  """Runs the same tests with the loader for the next path opened early."""
+
+  def setUp(self):
+    super(DirectoryWatcherOpenNextPathTest, self).setUp()
+    self._opened = []
+    self._closed = []
+    self._watcher = directory_watcher.DirectoryWatcher(
+        self._directory, self._LoaderFactory, open_next_path=True)
+
+  def _LoaderFactory(self, path):
+    name = os.path.basename(path)
+    self._opened.append(name)
+    loader = _ByteLoader(path)
+    close = loader.Close
+    def Close():
+      self._closed.append(name)
+      close()
+    loader.Close = Close
+    return loader
+
+  def testOpensEachPathOnce(self):
+    self._WriteToFile('a', 'a')
+    self._WriteToFile('b', 'b')
+    self._WriteToFile('c', 'c')
+    self.assertEqual(self._watcher.LoadBatch(1), ['a'])
+    self.assertEqual(self._opened, ['a', 'b'])
+    self.assertWatcherYields(['b', 'c'])
+    self.assertEqual(self._opened, ['a', 'b', 'c'])
+    self.assertEqual(self._closed, [])
+
+  def testClosesNextPathIfAnotherPathComesFirst(self):
+    self._WriteToFile('a', 'a')
+    self._WriteToFile('c', 'c')
+    self.assertEqual(self._watcher.LoadBatch(1), ['a'])
+    self._WriteToFile('b', 'b')
+    self.assertWatcherYields(['b', 'c'])
+    self.assertEqual(self._opened, ['a', 'c', 'b', 'c'])
+    self.assertEqual(self._closed, ['c'])
+
+
+class _StepLoader(object):
+  """A loader that loads a `_Value` for each line of steps in a file."""
+
+  def __init__(self, path):
+    self._path = path
+    self._f = open(path)
+    self._offset = 0
+
+  def LoadBatch(self, max_records=None, max_bytes=None):
+    del max_bytes  # Unused.
+    values = []
+    self._f.seek(self._offset)
+    while max_records is None or len(values) < max_records:
+      line = self._f.readline()
+      if not line.endswith('\n'):
+        break
+      self._offset += len(line)
+      values.append(_Value(int(line), os.path.basename(self._path)))
+    return values
+
+
+class _Value(object):
+
+  def __init__(self, step, name):
+    self.step = step
+    self.writer = name.split('.')[-1]
+
+  def __eq__(self, other):
+    return (self.step, self.writer) == (other.step, other.writer)
+
+  def __repr__(self):
+    return '%s@%d' % (self.writer, self.step)
+
+
+class MultiWriterDirectoryWatcherTest(tf.test.TestCase):
+
+  def setUp(self):
+    super(MultiWriterDirectoryWatcherTest, self).setUp()
+    self._directory = os.path.join(self.get_temp_dir(), 'monitor_dir')
+    os.mkdir(self._directory)
+    self._watcher = directory_watcher.MultiWriterDirectoryWatcher(
+        self._directory, _StepLoader, io_wrapper.IsTensorFlowEventsFile)
+
+  def _Write(self, timestamp, writer, *steps):
+    path = os.path.join(self._directory,
+                        'events.out.tfevents.%d.%s' % (timestamp, writer))
+    with open(path, 'a') as f:
+      f.write(''.join('%d\n' % step for step in steps))
+
+  def _LoadAll(self, max_records=2):
+    values = []
+    while True:
+      batch = self._watcher.LoadBatch(max_records)
+      if not batch:
+        return values
+      self.assertLessEqual(len(batch), max_records)
+      values.extend(batch)
+
+  def _Values(self, *pairs):
+    return [_Value(step, writer) for (writer, step) in pairs]
+
+  def testRaisesWithBadArguments(self):
+    with self.assertRaises(ValueError):
+      directory_watcher.MultiWriterDirectoryWatcher(None, lambda x: None)
+    with self.assertRaises(ValueError):
+      directory_watcher.MultiWriterDirectoryWatcher('dir', None)
+
+  def testWriterKey(self):
+    self.assertEqual(
+        directory_watcher.WriterKey('/a/events.out.tfevents.123.host.com'),
+        'host.com')
+    self.assertEqual(
+        directory_watcher.WriterKey('/a/events.out.tfevents.9.host.77.1.v2'),
+        'host.77.1.v2')
+    self.assertEqual(directory_watcher.WriterKey('/a/other.tfevents'),
+                     'other.tfevents')
+
+  def testEmptyDirectory(self):
+    self.assertEqual(self._LoadAll(), [])
+
+  def testMergesWritersByStep(self):
+    self._Write(1, 'a', 1, 3, 5)
+    self._Write(2, 'b', 2, 4)
+    self.assertEqual(
+        self._LoadAll(),
+        self._Values(('a', 1), ('b', 2), ('a', 3), ('b', 4), ('a', 5)))
+    self._Write(2, 'b', 6)
+    self._Write(1, 'a', 7)
+    self._Write(3, 'c', 0)
+    self.assertEqual(self._LoadAll(),
+                     self._Values(('c', 0), ('b', 6), ('a', 7)))
+
+  def testKeepsOrderOfEachWriter(self):
+    # Writer "a" restarts at step 2.
+    self._Write(1, 'a', 1, 5, 2, 3)
+    self._Write(1, 'b', 4)
+    self.assertEqual(
+        self._LoadAll(max_records=10),
+        self._Values(('a', 1), ('b', 4), ('a', 5), ('a', 2), ('a', 3)))
+
+  def testLoadsFilesOfEachWriterInOrder(self):
+    self._Write(1, 'a', 1, 2)
+    self._Write(2, 'a', 5)
+    self._Write(1, 'b', 3)
+    self.assertEqual(self._LoadAll(),
+                     self._Values(('a', 1), ('a', 2), ('b', 3), ('a', 5)))
+
+  def testDoesNotWaitForIdleWriters(self):
+    self._Write(1, 'a', 1)
+    self._Write(1, 'b', 2)
+    self.assertEqual(self._LoadAll(), self._Values(('a', 1), ('b', 2)))
+    self._Write(1, 'b', 3)
+    self.assertEqual(self._LoadAll(), self._Values(('b', 3)))
+
+  def testRaisesRightErrorWhenDirectoryIsDeleted(self):
+    self._Write(1, 'a', 1)
+    self._LoadAll()
+    shutil.rmtree(self._directory)
+    with self.assertRaises(directory_watcher.DirectoryDeletedError):
+      self._LoadAll()
+
+
 if __name__ == '__main__':
   tf.test.main()
@@ -0,0 +1,263 @@
+# Copyright 2019 The TensorFlow Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ==============================================================================
+"""Sidecar indexes from steps to record offsets in events files.
+
+An index splits the records of an events file into blocks of a fixed number
+of consecutive records, and stores the byte offset of each block along with
+the smallest and largest step of the events in it. Steps are not required to
+increase through the file; a reader that wants a range of steps reads only
+the blocks whose step range overlaps it, plus the records after the last
+complete block, which are not indexed yet.
+
+Indexes are built lazily the first time they are needed, and extended as
+the events file grows. Only the step of each record is read, straight from
+the wire format. If asked to, an index is also saved next to the events file
+with the suffix `io_wrapper.EVENT_FILE_INDEX_SUFFIX`, so that other readers
+and later processes can reuse it. Failing to save an index (e.g. in a
+read-only logdir) only costs rebuilding it later.
+
+The event file inspector reads step ranges through indexes. Loading runs for
+TensorBoard does not use them.
+"""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import collections
+import struct
+
+from tensorboard.backend.event_processing import event_file_loader
+from tensorboard.backend.event_processing import io_wrapper
+from tensorboard.backend.event_processing import scalar_decoder
+from tensorboard.compat import tf
+from tensorboard.compat.proto import event_pb2
+from tensorboard.util import tb_logging
+
+
+logger = tb_logging.get_logger()
+
+DEFAULT_RECORDS_PER_BLOCK = 1000
+
+# The file starts with a header of a magic string, a format version and the
+# number of records per block, followed by one entry per block.
+_MAGIC = b'TBIX'
+_VERSION = 1
+_HEADER = struct.Struct('<4sII')
+_ENTRY = struct.Struct('<QQqq')
+
+# A block of `records_per_block` consecutive records, which take up the bytes
+# `[start_offset, end_offset)` of the events file.
+_Block = collections.namedtuple(
+    '_Block', ['start_offset', 'end_offset', 'min_step', 'max_step'])
+
+
+def IndexPath(events_path):
+  """Returns the path of the sidecar index for the given events file."""
+  return events_path + io_wrapper.EVENT_FILE_INDEX_SUFFIX
+
+
+class EventFileIndex(object):
+  """An index from record ordinals and steps to offsets in an events file.
+
+  This class is not thread-safe.
+  """
+
+  def __init__(self, events_path, records_per_block=DEFAULT_RECORDS_PER_BLOCK,
+               persist=False):
+    """Constructs an index for the given events file.
+
+    The index is empty until `Update()` is called.
+
+    Args:
+      events_path: Path of the events file to index.
+      records_per_block: The number of records in each block of the index,
+        which trades the size of the index against the number of records
+        read outside of the requested step range. Ignored if an index saved
+        with a different value is loaded.
+      persist: Whether to load and save the sidecar index file, which
+        writes into the directory of the events file.
+    """
+    self._events_path = events_path
+    self._index_path = IndexPath(events_path)
+    self._records_per_block = records_per_block
+    self._persist = persist
+    self._blocks = []
+    self._loaded = not persist
+
+  @property
+  def records_per_block(self):
+    return self._records_per_block
+
+  def NumIndexedRecords(self):
+    """Returns the number of records covered by complete blocks."""
+    return len(self._blocks) * self._records_per_block
+
+  def Update(self):
+    """Indexes the records that have been written since the last update.
+
+    Returns:
+      The `EventFileIndex`.
+    """
+    if not self._loaded:
+      self._loaded = True
+      self._blocks = self._ReadIndexFile()
+    new_blocks = []
+    loader = event_file_loader.RawEventFileLoader(
+        self._events_path, start_offset=self._TailOffset())
+    while True:
+      start_offset = loader.Offset()
+      records = loader.LoadBatch(self._records_per_block)
+      if len(records) < self._records_per_block:
+        break
+      steps = [_Step(record) for record in records]
+      new_blocks.append(
+          _Block(start_offset, loader.Offset(), min(steps), max(steps)))
+    if new_blocks:
+      self._blocks.extend(new_blocks)
+      logger.debug('Indexed %d more records of %s',
+                   len(new_blocks) * self._records_per_block,
+                   self._events_path)
+      if self._persist:
+        self._WriteIndexFile()
+    return self
+
+  def OffsetOfRecord(self, ordinal):
+    """Locates a record by its position in the events file.
+
+    Args:
+      ordinal: The zero-based position of the record.
+
+    Returns:
+      A pair `(offset, skip)`: `ordinal` is the record `skip` records after
+      the one at byte offset `offset`.
+    """
+    block_index = min(ordinal // self._records_per_block, len(self._blocks))
+    skip = ordinal - block_index * self._records_per_block
+    if block_index < len(self._blocks):
+      return (self._blocks[block_index].start_offset, skip)
+    return (self._TailOffset(), skip)
+
+  def RangesForSteps(self, min_step=None, max_step=None):
+    """Returns the parts of the events file that may hold the given steps.
+
+    Args:
+      min_step: The smallest step wanted, or None for no lower bound.
+      max_step: The largest step wanted, or None for no upper bound.
+
+    Returns:
+      A list of `(offset, max_records)` pairs in file order, where each pair
+      means reading at most `max_records` records starting at byte offset
+      `offset`. `max_records` is None for the unindexed end of the file.
+    """
+    ranges = []
+    for block in self._blocks:
+      if min_step is not None and block.max_step < min_step:
+        continue
+      if max_step is not None and block.min_step > max_step:
+        continue
+      if ranges and ranges[-1][2] == block.start_offset:
+        # Coalesce adjacent blocks into a single read.
+        (offset, count, _) = ranges.pop()
+        ranges.append((offset, count + self._records_per_block,
+                       block.end_offset))
+      else:
+        ranges.append(
+            (block.start_offset, self._records_per_block, block.end_offset))
+    ranges = [(offset, count) for (offset, count, _) in ranges]
+    ranges.append((self._TailOffset(), None))
+    return ranges
+
+  def _TailOffset(self):
+    return self._blocks[-1].end_offset if self._blocks else 0
+
+  def _ReadIndexFile(self):
+    """Returns the blocks in the sidecar index, if it is usable."""
+    try:
+      if not tf.io.gfile.exists(self._index_path):
+        return []
+      with tf.io.gfile.GFile(self._index_path, 'rb') as f:
+        data = f.read()
+      events_size = tf.io.gfile.stat(self._events_path).length
+    except (IOError, OSError, tf.errors.OpError) as e:
+      logger.warn('Unable to read index %s: %s', self._index_path, e)
+      return []
+    if len(data) < _HEADER.size:
+      return []
+    (magic, version, records_per_block) = _HEADER.unpack_from(data)
+    if magic != _MAGIC or version != _VERSION:
+      logger.warn('Ignoring index %s with unknown format', self._index_path)
+      return []
+    # Ignore a partially written last entry.
+    count = (len(data) - _HEADER.size) // _ENTRY.size
+    blocks = [_Block(*_ENTRY.unpack_from(data, _HEADER.size + i * _ENTRY.size))
+              for i in range(count)]
+    if blocks and blocks[-1].end_offset > events_size:
+      # The events file has been replaced by a shorter one.
+      logger.warn('Ignoring stale index %s', self._index_path)
+      return []
+    self._records_per_block = records_per_block
+    return blocks
+
+  def _WriteIndexFile(self):
+    data = [_HEADER.pack(_MAGIC, _VERSION, self._records_per_block)]
+    data.extend(_ENTRY.pack(*block) for block in self._blocks)
+    try:
+      with tf.io.gfile.GFile(self._index_path, 'wb') as f:
+        f.write(b''.join(data))
+    except (IOError, OSError, tf.errors.OpError) as e:
+      logger.info('Unable to write index %s: %s', self._index_path, e)
+
+
+def _Step(record):
+  step = scalar_decoder.DecodeStep(record)
+  if step is None:
+    # Let the proto library tell what is wrong with the record.
+    step = event_pb2.Event.FromString(record).step
+  return step
+
+
+def LoadStepRange(events_path, min_step=None, max_step=None, index=None):
+  """Yields the events of an events file within a range of steps.
+
+  Only the parts of the file that the index says may contain such steps are
+  read. The index is built or extended as needed.
+
+  Args:
+    events_path: Path of the events file to read.
+    min_step: The smallest step to yield, or None for no lower bound.
+    max_step: The largest step to yield, or None for no upper bound.
+    index: The `EventFileIndex` of `events_path` to use, or None to build
+      one that is not saved.
+
+  Yields:
+    The `Event` protos with steps in `[min_step, max_step]`, in file order.
+  """
+  if index is None:
+    index = EventFileIndex(events_path)
+  index.Update()
+  for (offset, max_records) in index.RangesForSteps(min_step, max_step):
+    loader = event_file_loader.EventFileLoader(
+        events_path, start_offset=offset)
+    if max_records is None:
+      events = loader.Load()
+    else:
+      events = loader.LoadBatch(max_records)
+    for event in events:
+      if min_step is not None and event.step < min_step:
+        continue
+      if max_step is not None and event.step > max_step:
+        continue
+      yield event
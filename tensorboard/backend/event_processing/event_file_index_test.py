@@ -0,0 +1,136 @@
+# Copyright 2019 The TensorFlow Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ==============================================================================
+"""Tests for event_file_index."""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import os
+
+import tensorflow as tf
+
+from tensorboard.backend.event_processing import event_file_index
+from tensorboard.backend.event_processing import event_file_loader
+from tensorboard.compat.proto import event_pb2
+
+
+class EventFileIndexTest(tf.test.TestCase):
+
+  def setUp(self):
+    super(EventFileIndexTest, self).setUp()
+    self._path = os.path.join(self.get_temp_dir(), 'events.out.tfevents.1')
+    if os.path.exists(self._path):
+      os.remove(self._path)
+    index_path = event_file_index.IndexPath(self._path)
+    if os.path.exists(index_path):
+      os.remove(index_path)
+
+  def _WriteSteps(self, steps):
+    # TFRecordWriter truncates, so rewrite all steps written so far.
+    self._steps = getattr(self, '_steps', []) + list(steps)
+    with tf.io.TFRecordWriter(self._path) as writer:
+      for step in self._steps:
+        writer.write(event_pb2.Event(step=step).SerializeToString())
+
+  def _Steps(self, events):
+    return [event.step for event in events]
+
+  def testEmptyFile(self):
+    self._WriteSteps([])
+    index = event_file_index.EventFileIndex(self._path).Update()
+    self.assertEqual(index.NumIndexedRecords(), 0)
+    self.assertEqual(index.RangesForSteps(), [(0, None)])
+    self.assertEqual(
+        list(event_file_index.LoadStepRange(self._path, 1, 2)), [])
+
+  def testRangesSkipBlocksOutsideStepRange(self):
+    self._WriteSteps(range(25))
+    index = event_file_index.EventFileIndex(
+        self._path, records_per_block=10).Update()
+    self.assertEqual(index.NumIndexedRecords(), 20)
+    ranges = index.RangesForSteps(12, 14)
+    self.assertEqual(len(ranges), 2)
+    self.assertEqual(ranges[0][1], 10)
+    self.assertEqual(ranges[1][1], None)
+    # Adjacent blocks are read together.
+    self.assertEqual(index.RangesForSteps(5, 15)[0], (0, 20))
+
+  def testLoadStepRange(self):
+    self._WriteSteps(list(range(30)) + list(range(10, 20)))
+    index = event_file_index.EventFileIndex(self._path, records_per_block=7)
+    self.assertEqual(
+        self._Steps(event_file_index.LoadStepRange(self._path, 12, 14, index)),
+        [12, 13, 14, 12, 13, 14])
+    self.assertEqual(
+        self._Steps(event_file_index.LoadStepRange(self._path, 28, None,
+                                                   index)),
+        [28, 29])
+
+  def testOffsetOfRecord(self):
+    self._WriteSteps(range(25))
+    index = event_file_index.EventFileIndex(
+        self._path, records_per_block=10).Update()
+    for ordinal in (0, 9, 10, 17, 24):
+      (offset, skip) = index.OffsetOfRecord(ordinal)
+      loader = event_file_loader.EventFileLoader(
+          self._path, start_offset=offset)
+      self.assertEqual(loader.LoadBatch(skip + 1)[-1].step, ordinal)
+
+  def testIndexIsExtendedAsFileGrows(self):
+    self._WriteSteps(range(15))
+    index = event_file_index.EventFileIndex(self._path, records_per_block=10)
+    self.assertEqual(index.Update().NumIndexedRecords(), 10)
+    self._WriteSteps(range(15, 30))
+    self.assertEqual(index.Update().NumIndexedRecords(), 30)
+    self.assertEqual(
+        self._Steps(event_file_index.LoadStepRange(self._path, 18, 21, index)),
+        [18, 19, 20, 21])
+
+  def testIndexIsSavedAndReloaded(self):
+    self._WriteSteps(range(25))
+    event_file_index.EventFileIndex(
+        self._path, records_per_block=10, persist=True).Update()
+    self.assertTrue(os.path.exists(event_file_index.IndexPath(self._path)))
+    # The saved block size wins over the requested one.
+    index = event_file_index.EventFileIndex(
+        self._path, records_per_block=3, persist=True)
+    self.assertEqual(index.Update().NumIndexedRecords(), 20)
+    self.assertEqual(index.records_per_block, 10)
+
+  def testStaleIndexIsRebuilt(self):
+    self._WriteSteps(range(25))
+    event_file_index.EventFileIndex(
+        self._path, records_per_block=10, persist=True).Update()
+    self._steps = []
+    self._WriteSteps(range(100, 105))
+    index = event_file_index.EventFileIndex(
+        self._path, records_per_block=10, persist=True)
+    self.assertEqual(index.Update().NumIndexedRecords(), 0)
+    self.assertEqual(
+        self._Steps(event_file_index.LoadStepRange(self._path, 0, 102, index)),
+        [100, 101, 102])
+
+  def testWithoutPersistence(self):
+    self._WriteSteps(range(25))
+    index = event_file_index.EventFileIndex(self._path, records_per_block=10)
+    self.assertEqual(index.Update().NumIndexedRecords(), 20)
+    self.assertEqual(
+        self._Steps(event_file_index.LoadStepRange(self._path, 3, 4)), [3, 4])
+    self.assertFalse(os.path.exists(event_file_index.IndexPath(self._path)))
+
+
+if __name__ == '__main__':
+  tf.test.main()
@@ -20,6 +20,7 @@ tensorboard --inspect --event_file myevents.out
 tensorboard --inspect --event_file myevents.out --tag loss
 tensorboard --inspect --logdir mylogdir
 tensorboard --inspect --logdir mylogdir --tag loss
+tensorboard --inspect --event_file myevents.out --min_step 100 --max_step 200
 
 
 This script runs over a logdir and creates an InspectionUnit for every
@@ -117,6 +118,7 @@ import itertools
 import os
 
 from tensorboard.backend.event_processing import event_accumulator
+from tensorboard.backend.event_processing import event_file_index
 from tensorboard.backend.event_processing import event_file_loader
 from tensorboard.backend.event_processing import io_wrapper
 from tensorboard.compat import tf
@@ -332,12 +334,20 @@ def generators_from_logdir(logdir):
   return generators
 
 
-def generator_from_event_file(event_file):
-  """Returns a generator that yields events from an event file."""
-  return event_file_loader.EventFileLoader(event_file).Load()
+def generator_from_event_file(event_file, min_step=None, max_step=None):
+  """Returns a generator that yields events from an event file.
+
+  If a step range is given, only events in that range are yielded, and the
+  event file is read through a step index (see `event_file_index`), which is
+  built in memory and not saved into the logdir.
+  """
+  if min_step is None and max_step is None:
+    return event_file_loader.EventFileLoader(event_file).Load()
+  return event_file_index.LoadStepRange(event_file, min_step, max_step)
 
 
-def get_inspection_units(logdir='', event_file='', tag=''):
+def get_inspection_units(logdir='', event_file='', tag='', min_step=None,
+                         max_step=None):
   """Returns a list of InspectionUnit objects given either logdir or event_file.
 
   If logdir is given, the number of InspectionUnits should equal the
@@ -349,6 +359,8 @@ def get_inspection_units(logdir='', event_file='', tag=''):
     logdir: A log directory that contains event files.
     event_file: Or, a particular event file path.
     tag: An optional tag name to query for.
+    min_step: An optional smallest step to query for.
+    max_step: An optional largest step to query for.
 
   Returns:
     A list of InspectionUnit objects.
@@ -358,7 +370,8 @@ def get_inspection_units(logdir='', event_file='', tag=''):
     inspection_units = []
     for subdir in subdirs:
       generator = itertools.chain(*[
-          generator_from_event_file(os.path.join(subdir, f))
+          generator_from_event_file(os.path.join(subdir, f), min_step,
+                                    max_step)
           for f in tf.io.gfile.listdir(subdir)
           if io_wrapper.IsTensorFlowEventsFile(os.path.join(subdir, f))
       ])
@@ -378,7 +391,7 @@ def get_inspection_units(logdir='', event_file='', tag=''):
       print('No event files found within logdir {}'.format(logdir))
     return inspection_units
   elif event_file:
-    generator = generator_from_event_file(event_file)
+    generator = generator_from_event_file(event_file, min_step, max_step)
     return [InspectionUnit(
         name=event_file,
         generator=generator,
@@ -386,13 +399,15 @@ def get_inspection_units(logdir='', event_file='', tag=''):
   return []
 
 
-def inspect(logdir='', event_file='', tag=''):
+def inspect(logdir='', event_file='', tag='', min_step=None, max_step=None):
   """Main function for inspector that prints out a digest of event files.
 
   Args:
     logdir: A log directory that contains event files.
     event_file: Or, a particular event file path.
     tag: An optional tag name to query for.
+    min_step: An optional smallest step to query for.
+    max_step: An optional largest step to query for.
 
   Raises:
     ValueError: If neither logdir and event_file are given, or both are given.
@@ -400,7 +415,8 @@ def inspect(logdir='', event_file='', tag=''):
   print(PRINT_SEPARATOR +
         'Processing event files... (this can take a few minutes)\n' +
         PRINT_SEPARATOR)
-  inspection_units = get_inspection_units(logdir, event_file, tag)
+  inspection_units = get_inspection_units(logdir, event_file, tag, min_step,
+                                          max_step)
 
   for unit in inspection_units:
     if tag:
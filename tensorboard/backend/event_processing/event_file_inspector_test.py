@@ -23,6 +23,7 @@ import shutil
 import tensorflow as tf
 
 from tensorboard.backend.event_processing import event_file_inspector as efi
+from tensorboard.backend.event_processing import io_wrapper
 from tensorboard.compat.proto import event_pb2
 from tensorboard.compat.proto import summary_pb2
 from tensorboard.util import test_util
@@ -125,6 +126,24 @@ class EventFileInspectorTest(tf.test.TestCase):
     self.assertEqual(printable['histograms']['outoforder_steps'], [(11, 9)])
     self.assertEqual(printable['scalars'], None)
 
+  def testInspectStepRange(self):
+    data = [{'tag': 'c', 'histo': 2, 'step': 10},
+            {'tag': 'c', 'histo': 2, 'step': 11},
+            {'tag': 'c', 'histo': 2, 'step': 9},
+            {'tag': 'b', 'simple_value': 2, 'step': 20},
+            {'tag': 'b', 'simple_value': 2, 'step': 15},
+            {'tag': 'a', 'simple_value': 2, 'step': 3}]
+    self._WriteScalarSummaries(data)
+    units = efi.get_inspection_units(self.logdir, min_step=10, max_step=15)
+    printable = efi.get_dict_to_print(units[0].field_to_obs)
+    self.assertEqual(printable['histograms']['num_steps'], 2)
+    self.assertEqual(printable['histograms']['min_step'], 10)
+    self.assertEqual(printable['scalars']['num_steps'], 1)
+    self.assertEqual(printable['scalars']['max_step'], 15)
+    # The read-only inspector writes nothing into the logdir.
+    self.assertFalse([f for f in os.listdir(self.logdir)
+                      if f.endswith(io_wrapper.EVENT_FILE_INDEX_SUFFIX)])
+
   def testSessionLogSummaries(self):
     data = [
         {
@@ -18,8 +18,16 @@ from __future__ import absolute_import
 from __future__ import division
 from __future__ import print_function
 
+import collections
+import functools
 import inspect
+import mmap
+import os
+import struct
 
+from tensorboard import data_compat
+from tensorboard.backend.event_processing import io_wrapper
+from tensorboard.backend.event_processing import scalar_decoder
 from tensorboard.compat import tf
 from tensorboard.compat.proto import event_pb2
 from tensorboard.util import platform_util
@@ -28,22 +36,174 @@ from tensorboard.util import tb_logging
 
 logger = tb_logging.get_logger()
 
+# Each record is framed by a 12-byte header (an 8-byte little-endian length
+# and a 4-byte masked CRC of it) and a 4-byte masked CRC of the payload.
+_RECORD_HEADER_SIZE = 12
+_RECORD_FOOTER_SIZE = 4
+
+# Compression types of events files, keyed by file name suffix.
+_COMPRESSION_TYPE_BY_SUFFIX = (
+    ('.gz', 'GZIP'),
+    ('.zz', 'ZLIB'),
+    ('.zlib', 'ZLIB'),
+)
+
+# The number of records that `ParallelEventFileLoader` sends to a worker
+# process at a time.
+_DECODE_CHUNK_SIZE = 64
+
+# The number of records that `ParallelEventFileLoader.Load` reads at a time.
+_DECODE_BATCH_SIZE = 4096
+
+# A summary event decoded by a worker process of `ParallelEventFileLoader`.
+# `values` is a tuple of `DecodedValue`s, one for each value of the event's
+# summary.
+DecodedEvent = collections.namedtuple(
+    'DecodedEvent', ['wall_time', 'step', 'values'])
+
+# A summary value decoded by a worker process of `ParallelEventFileLoader`,
+# after it was migrated with `data_compat.migrate_value`. `tag` is its tag
+# (or node name, for old-style tensor summaries), `plugin_name` is that of
+# its metadata or None, `metadata` is its serialized `SummaryMetadata` if it
+# has any, and `tensor` is its serialized `TensorProto`, or None if it has no
+# tensor. `scalar` is a `(dtype, value)` pair for a rank-0 float or double
+# tensor, so that scalars can be stored without parsing `tensor`, and None
+# otherwise.
+DecodedValue = collections.namedtuple(
+    'DecodedValue', ['tag', 'plugin_name', 'metadata', 'tensor', 'scalar'])
+
+
+class _MmapRecordReader(object):
+  """Reads records from a local file through a read-only memory map.
+
+  This implements the subset of the `PyRecordReader` interface used by
+  `RawEventFileLoader`, but `record()` returns a `memoryview` into the mapped
+  file rather than a copy of the record bytes. The file is mapped again
+  whenever a record extends past the end of the current mapping, so records
+  appended after the reader was created are picked up. Earlier mappings stay
+  alive for as long as views into them are referenced.
+
+  Checksums are not verified.
+  """
+
+  def __init__(self, path, start_offset=0):
+    self._file = open(path, 'rb')
+    self._offset = start_offset
+    self._view = None
+    self._mapped_size = 0
+    self._record = None
+
+  def GetNext(self):
+    self._record = None
+    header_end = self._offset + _RECORD_HEADER_SIZE
+    if not self._EnsureMapped(header_end):
+      raise tf.errors.OutOfRangeError(None, None, 'No more records to read')
+    (length,) = struct.unpack_from('<Q', self._view, self._offset)
+    record_end = header_end + length + _RECORD_FOOTER_SIZE
+    if not self._EnsureMapped(record_end):
+      raise tf.errors.OutOfRangeError(
+          None, None, 'Truncated record at %d' % self._offset)
+    self._record = self._view[header_end:header_end + length]
+    self._offset = record_end
+
+  def record(self):
+    return self._record
+
+  def offset(self):
+    return self._offset
+
+  def Close(self):
+    self._record = None
+    self._view = None
+    self._file.close()
+
+  def _EnsureMapped(self, end):
+    """Maps the file again if needed so that it covers `[0, end)`.
+
+    Returns:
+      Whether the file is at least `end` bytes long.
+    """
+    if end <= self._mapped_size:
+      return True
+    size = os.fstat(self._file.fileno()).st_size
+    if size < end:
+      return False
+    self._view = memoryview(
+        mmap.mmap(self._file.fileno(), size, access=mmap.ACCESS_READ))
+    self._mapped_size = size
+    return True
+
 
 class RawEventFileLoader(object):
   """An iterator that yields Event protos as serialized bytestrings."""
 
-  def __init__(self, file_path):
+  def __init__(self, file_path, use_mmap=False, start_offset=0,
+               record_filter=None, prefetcher=None):
+    """Constructs a new loader.
+
+    Files whose names end in `.gz` are read as GZIP-compressed and files
+    whose names end in `.zz` or `.zlib` as ZLIB-compressed; they are
+    decompressed as they are read.
+
+    Args:
+      file_path: Path of the events file to read.
+      use_mmap: Whether to read a local file through a memory map and yield
+        each record as a `memoryview` into it, instead of copying each record
+        into a new bytestring. Ignored for remote and compressed files.
+      start_offset: The offset at which to start reading, which must be the
+        offset of a record (in the decompressed stream, for compressed
+        files), such as one returned by `Offset()`.
+      record_filter: An optional predicate on serialized event protos, such
+        as `event_filter.EventFilter.AcceptsRecord`. Records for which it
+        returns false are skipped.
+      prefetcher: An optional `record_prefetcher.RecordPrefetcher` that reads
+        records ahead of the loader on its I/O threads. Ignored with
+        `use_mmap` for files that are memory mapped.
+
+    Raises:
+      ValueError: If `file_path` is None.
+      IOError: If the record reader could not be opened.
+    """
     if file_path is None:
       raise ValueError('A file path is required')
-    file_path = platform_util.readahead_file_path(file_path)
-    logger.debug('Opening a record reader pointing at %s', file_path)
-    with tf.errors.raise_exception_on_not_ok_status() as status:
-      self._reader = tf.compat.v1.pywrap_tensorflow.PyRecordReader_New(
-          tf.compat.as_bytes(file_path), 0, tf.compat.as_bytes(''), status)
+    self._record_filter = record_filter
+    compression_type = _CompressionTypeForPath(file_path)
+    if use_mmap and not compression_type and not _IsRemotePath(file_path):
+      logger.debug('Memory mapping %s', file_path)
+      self._reader = _MmapRecordReader(file_path, start_offset)
+    else:
+      file_path = platform_util.readahead_file_path(file_path)
+      logger.debug('Opening a record reader pointing at %s', file_path)
+      with tf.errors.raise_exception_on_not_ok_status() as status:
+        self._reader = tf.compat.v1.pywrap_tensorflow.PyRecordReader_New(
+            tf.compat.as_bytes(file_path), start_offset,
+            tf.compat.as_bytes(compression_type), status)
     # Store it for logging purposes.
     self._file_path = file_path
     if not self._reader:
       raise IOError('Failed to open a record reader pointing to %s' % file_path)
+    # GetNext() expects a status argument on TF <= 1.7.
+    get_next_args = inspect.getargspec(self._reader.GetNext).args  # pylint: disable=deprecated-method
+    # First argument is self
+    if len(get_next_args) > 1:
+      self._get_next = functools.partial(_LegacyGetNext, self._reader)
+    else:
+      self._get_next = self._reader.GetNext
+    if prefetcher is not None and not isinstance(self._reader,
+                                                 _MmapRecordReader):
+      self._reader = prefetcher.Wrap(self._reader, self._get_next)
+      self._get_next = self._reader.GetNext
+
+  def Offset(self):
+    """Returns the offset of the first record that has not been loaded."""
+    return self._reader.offset()
+
+  def Close(self):
+    """Closes the file, and drops any records that were read ahead.
+
+    The loader must not be used afterwards.
+    """
+    self._reader.Close()
 
   def Load(self):
     """Loads all new events from disk as raw serialized proto bytestrings.
@@ -53,30 +213,62 @@ class RawEventFileLoader(object):
 
     Yields:
       All event proto bytestrings in the file that have not been yielded yet.
+      With `use_mmap`, these are `memoryview`s, which stay valid for as long
+      as they are referenced.
     """
     logger.debug('Loading events from %s', self._file_path)
-
-    # GetNext() expects a status argument on TF <= 1.7.
-    get_next_args = inspect.getargspec(self._reader.GetNext).args  # pylint: disable=deprecated-method
-    # First argument is self
-    legacy_get_next = (len(get_next_args) > 1)
-
     while True:
       try:
-        if legacy_get_next:
-          with tf.errors.raise_exception_on_not_ok_status() as status:
-            self._reader.GetNext(status)
-        else:
-          self._reader.GetNext()
+        self._get_next()
       except (tf.errors.DataLossError, tf.errors.OutOfRangeError) as e:
         logger.debug('Cannot read more events: %s', e)
         # We ignore partial read exceptions, because a record may be truncated.
         # PyRecordReader holds the offset prior to the failed read, so retrying
         # will succeed.
         break
-      yield self._reader.record()
+      record = self._reader.record()
+      if self._record_filter is None or self._record_filter(record):
+        yield record
     logger.debug('No more events in %s', self._file_path)
 
+  def LoadBatch(self, max_records=None, max_bytes=None):
+    """Loads a batch of new events from disk as serialized proto bytestrings.
+
+    This avoids the per-event generator overhead of `Load`, and is meant for
+    callers that process events in chunks anyway.
+
+    Args:
+      max_records: The maximum number of events to return, or None for no
+        limit.
+      max_bytes: If not None, stop adding events to the batch once their
+        total size is at least this many bytes.
+
+    Returns:
+      A list of the next event proto bytestrings in the file, in order. The
+      list is empty if there are no new events.
+    """
+    records = []
+    append = records.append
+    get_next = self._get_next
+    record = self._reader.record
+    record_filter = self._record_filter
+    batch_bytes = 0
+    while max_records is None or len(records) < max_records:
+      try:
+        get_next()
+      except (tf.errors.DataLossError, tf.errors.OutOfRangeError) as e:
+        logger.debug('Cannot read more events: %s', e)
+        break
+      event_proto = record()
+      if record_filter is not None and not record_filter(event_proto):
+        continue
+      append(event_proto)
+      if max_bytes is not None:
+        batch_bytes += len(event_proto)
+        if batch_bytes >= max_bytes:
+          break
+    return records
+
 
 class EventFileLoader(RawEventFileLoader):
   """An iterator that yields parsed Event protos."""
@@ -92,3 +284,187 @@ class EventFileLoader(RawEventFileLoader):
     """
     for record in super(EventFileLoader, self).Load():
       yield event_pb2.Event.FromString(record)
+
+  def LoadBatch(self, max_records=None, max_bytes=None):
+    """Loads a batch of new events from disk.
+
+    Args:
+      max_records: The maximum number of events to return, or None for no
+        limit.
+      max_bytes: If not None, stop adding events to the batch once their
+        total serialized size is at least this many bytes.
+
+    Returns:
+      A list of the next events in the file, in order. The list is empty if
+      there are no new events.
+    """
+    from_string = event_pb2.Event.FromString
+    return [from_string(record) for record in
+            super(EventFileLoader, self).LoadBatch(max_records, max_bytes)]
+
+
+class ScalarEventFileLoader(RawEventFileLoader):
+  """An iterator that decodes events that hold only scalars quickly.
+
+  Such events are decoded by `scalar_decoder.DecodeScalarEvent` into
+  `ScalarEventRecord`s without being parsed; all other events are parsed into
+  `Event` protos.
+  """
+
+  def Load(self):
+    """Loads all new events from disk.
+
+    Yields:
+      All `Event` protos and `ScalarEventRecord`s in the file that have not
+      been yielded yet.
+    """
+    decode = scalar_decoder.DecodeScalarEvent
+    for record in super(ScalarEventFileLoader, self).Load():
+      yield decode(record) or event_pb2.Event.FromString(record)
+
+  def LoadBatch(self, max_records=None, max_bytes=None):
+    """Loads a batch of new events from disk.
+
+    Args:
+      max_records: The maximum number of events to return, or None for no
+        limit.
+      max_bytes: If not None, stop adding events to the batch once their
+        total serialized size is at least this many bytes.
+
+    Returns:
+      A list of the next `Event` protos and `ScalarEventRecord`s in the file,
+      in order. The list is empty if there are no new events.
+    """
+    decode = scalar_decoder.DecodeScalarEvent
+    from_string = event_pb2.Event.FromString
+    return [decode(record) or from_string(record) for record in
+            super(ScalarEventFileLoader, self).LoadBatch(max_records, max_bytes)]
+
+
+class ParallelEventFileLoader(RawEventFileLoader):
+  """An iterator that decodes events in a pool of worker processes.
+
+  Records are read on the calling thread and sent in chunks to the pool,
+  which parses them and migrates their summary values, so that decoding a
+  large events file is not limited by the GIL. Events are yielded in file
+  order. Summary events come back as compact `DecodedEvent` tuples, whose
+  values hold their scalars already decoded, so that only the tensors of
+  other values and new metadata are parsed by the caller; all other events
+  are parsed into `Event` protos.
+  """
+
+  def __init__(self, file_path, pool, **kwargs):
+    """Constructs a new loader.
+
+    Args:
+      file_path: Path of the events file to read.
+      pool: A `multiprocessing.Pool` (or anything with a compatible `map`
+        method) to decode events with. It may be shared between loaders.
+      **kwargs: Passed on to `RawEventFileLoader`.
+    """
+    super(ParallelEventFileLoader, self).__init__(file_path, **kwargs)
+    self._pool = pool
+
+  def Load(self):
+    """Loads all new events from disk.
+
+    Yields:
+      All `Event` protos and `DecodedEvent`s in the file that have not been
+      yielded yet.
+    """
+    while True:
+      events = self.LoadBatch(_DECODE_BATCH_SIZE)
+      if not events:
+        return
+      for event in events:
+        yield event
+
+  def LoadBatch(self, max_records=None, max_bytes=None):
+    """Loads a batch of new events from disk.
+
+    Args:
+      max_records: The maximum number of events to return, or None for no
+        limit.
+      max_bytes: If not None, stop adding events to the batch once their
+        total serialized size is at least this many bytes.
+
+    Returns:
+      A list of the next `Event` protos and `DecodedEvent`s in the file, in
+      order. The list is empty if there are no new events.
+    """
+    records = super(ParallelEventFileLoader, self).LoadBatch(
+        max_records, max_bytes)
+    if not records:
+      return []
+    # Memory-mapped records can't be pickled, so copy them out.
+    records = [bytes(record) for record in records]
+    chunks = [records[i:i + _DECODE_CHUNK_SIZE]
+              for i in range(0, len(records), _DECODE_CHUNK_SIZE)]
+    events = []
+    for decoded_chunk in self._pool.map(_DecodeRecords, chunks):
+      for decoded in decoded_chunk:
+        if isinstance(decoded, DecodedEvent):
+          events.append(decoded)
+        else:
+          events.append(event_pb2.Event.FromString(decoded))
+    return events
+
+
+def _DecodeRecords(records):
+  """Decodes a chunk of records in a worker process.
+
+  Args:
+    records: A list of serialized `Event` protos.
+
+  Returns:
+    A list with one element per record: a `DecodedEvent` for a summary event,
+    or else the record itself, to be parsed by the caller.
+  """
+  decoded = []
+  for record in records:
+    event = event_pb2.Event.FromString(record)
+    if not event.HasField('summary'):
+      decoded.append(record)
+      continue
+    values = []
+    for value in event.summary.value:
+      values.append(_DecodeValue(data_compat.migrate_value(value)))
+    decoded.append(DecodedEvent(
+        wall_time=event.wall_time, step=event.step, values=tuple(values)))
+  return decoded
+
+
+def _DecodeValue(value):
+  """Returns a `DecodedValue` for a migrated `Summary.Value`."""
+  (plugin_name, metadata) = (None, None)
+  if value.HasField('metadata'):
+    plugin_name = value.metadata.plugin_data.plugin_name or None
+    metadata = value.metadata.SerializeToString()
+  (tensor, scalar) = (None, None)
+  if value.HasField('tensor'):
+    tensor = value.tensor.SerializeToString()
+    scalar_value = scalar_decoder.ScalarFromTensorProto(value.tensor)
+    if scalar_value is not None:
+      scalar = (value.tensor.dtype, scalar_value)
+  return DecodedValue(tag=value.tag or value.node_name,
+                      plugin_name=plugin_name, metadata=metadata,
+                      tensor=tensor, scalar=scalar)
+
+
+def _LegacyGetNext(reader):
+  with tf.errors.raise_exception_on_not_ok_status() as status:
+    reader.GetNext(status)
+
+
+def _CompressionTypeForPath(path):
+  """Returns the TFRecord compression type implied by the name of `path`."""
+  path = tf.compat.as_str_any(path)
+  for (suffix, compression_type) in _COMPRESSION_TYPE_BY_SUFFIX:
+    if path.endswith(suffix):
+      return compression_type
+  return ''
+
+
+def _IsRemotePath(path):
+  """Returns whether `path` must be read through a TensorFlow file system."""
+  return io_wrapper.IsGCSPath(path) or '://' in tf.compat.as_str_any(path)
@@ -19,13 +19,22 @@ from __future__ import absolute_import
 from __future__ import division
 from __future__ import print_function
 
+import gzip
+import multiprocessing
 import os
 import tempfile
+import zlib
 
 import tensorflow as tf
 
 
 from tensorboard.backend.event_processing import event_file_loader
+from tensorboard.backend.event_processing import record_prefetcher
+from tensorboard.compat.proto import event_pb2
+from tensorboard.compat.proto import summary_pb2
+from tensorboard.compat.proto import tensor_pb2
+from tensorboard.compat.proto import types_pb2
+from tensorboard.util import tensor_util
 
 
 class EventFileLoaderTest(tf.test.TestCase):
@@ -88,6 +97,40 @@ class EventFileLoaderTest(tf.test.TestCase):
     loader = self._LoaderForTestFile(filename)
     self.assertEqual(len(list(loader.Load())), 2)
 
+  def testLoadBatch(self):
+    filename = tempfile.NamedTemporaryFile(dir=self.get_temp_dir()).name
+    self._WriteToFile(filename, EventFileLoaderTest.RECORD * 5)
+    loader = self._LoaderForTestFile(filename)
+    self.assertEqual(len(loader.LoadBatch(max_records=2)), 2)
+    self.assertEqual(len(loader.LoadBatch(max_records=2)), 2)
+    self.assertEqual(len(loader.LoadBatch(max_records=2)), 1)
+    self.assertEqual(loader.LoadBatch(max_records=2), [])
+    self._WriteToFile(filename, EventFileLoaderTest.RECORD * 3)
+    # The batch ends with the first event that reaches max_bytes.
+    self.assertEqual(len(loader.LoadBatch(max_bytes=30)), 2)
+    self.assertEqual(len(loader.LoadBatch()), 1)
+    self.assertEqual(loader.LoadBatch(), [])
+
+  def testLoadBatchIgnoresPartialWrite(self):
+    filename = tempfile.NamedTemporaryFile(dir=self.get_temp_dir()).name
+    self._WriteToFile(filename, EventFileLoaderTest.RECORD + b'123')
+    loader = self._LoaderForTestFile(filename)
+    self.assertEqual(len(loader.LoadBatch()), 1)
+    self.assertEqual(loader.LoadBatch(), [])
+
+  def testGzipCompressedFile(self):
+    filename = os.path.join(self.get_temp_dir(), 'events.out.tfevents.1.gz')
+    with gzip.open(filename, 'wb') as f:
+      f.write(EventFileLoaderTest.RECORD * 2)
+    loader = self._LoaderForTestFile(filename)
+    self.assertEqual(len(list(loader.Load())), 2)
+
+  def testZlibCompressedFile(self):
+    filename = os.path.join(self.get_temp_dir(), 'events.out.tfevents.1.zz')
+    self._WriteToFile(filename, zlib.compress(EventFileLoaderTest.RECORD))
+    loader = self._LoaderForTestFile(filename)
+    self.assertEqual(len(list(loader.Load())), 1)
+
 
 class RawEventFileLoaderTest(EventFileLoaderTest):
 
@@ -106,5 +149,118 @@ class RawEventFileLoaderTest(EventFileLoaderTest):
     self.assertEqual(event_protos[0], expected_event_proto)
 
 
+class MmapEventFileLoaderTest(EventFileLoaderTest):
+
+  def _LoaderForTestFile(self, filename):
+    return event_file_loader.EventFileLoader(
+        os.path.join(self.get_temp_dir(), filename), use_mmap=True)
+
+
+class MmapRawEventFileLoaderTest(RawEventFileLoaderTest):
+
+  def _LoaderForTestFile(self, filename):
+    return event_file_loader.RawEventFileLoader(
+        os.path.join(self.get_temp_dir(), filename), use_mmap=True)
+
+  def testYieldsMemoryviewsThatOutliveRemapping(self):
+    filename = tempfile.NamedTemporaryFile(dir=self.get_temp_dir()).name
+    self._WriteToFile(filename, EventFileLoaderTest.RECORD)
+    loader = self._LoaderForTestFile(filename)
+    first = list(loader.Load())
+    self._WriteToFile(filename, EventFileLoaderTest.RECORD)
+    second = list(loader.Load())
+    expected_event_proto = EventFileLoaderTest.RECORD[12:-4]
+    self.assertIsInstance(first[0], memoryview)
+    self.assertEqual(first[0].tobytes(), expected_event_proto)
+    self.assertEqual(second[0].tobytes(), expected_event_proto)
+
+
+class PrefetchingEventFileLoaderTest(EventFileLoaderTest):
+
+  def setUp(self):
+    super(PrefetchingEventFileLoaderTest, self).setUp()
+    self._prefetcher = record_prefetcher.RecordPrefetcher(num_threads=2)
+    self.addCleanup(self._prefetcher.Close)
+
+  def _LoaderForTestFile(self, filename):
+    return event_file_loader.EventFileLoader(
+        os.path.join(self.get_temp_dir(), filename),
+        prefetcher=self._prefetcher)
+
+  def testOffsetAndClose(self):
+    filename = tempfile.NamedTemporaryFile(dir=self.get_temp_dir()).name
+    self._WriteToFile(filename, EventFileLoaderTest.RECORD * 3)
+    loader = self._LoaderForTestFile(filename)
+    self.assertEqual(loader.Offset(), 0)
+    self.assertEqual(len(loader.LoadBatch(max_records=2)), 2)
+    self.assertEqual(loader.Offset(), 2 * len(EventFileLoaderTest.RECORD))
+    loader.Close()
+    self.assertEqual(self._prefetcher.BufferedBytes(), 0)
+
+
+class _SerialPool(object):
+  """A stand-in for `multiprocessing.Pool` that decodes in this process."""
+
+  def map(self, fn, iterable):
+    return [fn(x) for x in iterable]
+
+
+class ParallelEventFileLoaderTest(EventFileLoaderTest):
+
+  def _LoaderForTestFile(self, filename):
+    return event_file_loader.ParallelEventFileLoader(
+        os.path.join(self.get_temp_dir(), filename), _SerialPool())
+
+  def _WriteSummaryEvents(self, filename, steps):
+    with tf.io.TFRecordWriter(filename) as writer:
+      for step in steps:
+        event = event_pb2.Event(wall_time=1.5, step=step)
+        event.summary.value.add(tag='loss', simple_value=step * 2.0)
+        writer.write(event.SerializeToString())
+
+  def testSummaryEventsAreDecoded(self):
+    filename = os.path.join(self.get_temp_dir(), 'events.out.tfevents.2')
+    self._WriteSummaryEvents(filename, range(3))
+    events = list(self._LoaderForTestFile(filename).Load())
+    self.assertEqual([event.step for event in events], [0, 1, 2])
+    self.assertIsInstance(events[1], event_file_loader.DecodedEvent)
+    self.assertEqual(events[1].wall_time, 1.5)
+    value = events[1].values[0]
+    self.assertEqual(value.tag, 'loss')
+    # Values are migrated to new-style scalar summaries, whose scalars are
+    # decoded.
+    self.assertEqual(value.plugin_name, 'scalars')
+    metadata = summary_pb2.SummaryMetadata.FromString(value.metadata)
+    self.assertEqual(metadata.plugin_data.plugin_name, 'scalars')
+    self.assertEqual(value.scalar, (types_pb2.DT_FLOAT, 2.0))
+    tensor = tensor_pb2.TensorProto.FromString(value.tensor)
+    self.assertEqual(tensor.float_val, [2.0])
+
+  def testTensorsAreNotDecoded(self):
+    filename = os.path.join(self.get_temp_dir(), 'events.out.tfevents.4')
+    with tf.io.TFRecordWriter(filename) as writer:
+      event = event_pb2.Event(wall_time=1.5, step=1)
+      event.summary.value.add(
+          tag='weights',
+          tensor=tensor_util.make_tensor_proto([1.0, 2.0]))
+      writer.write(event.SerializeToString())
+    (event,) = self._LoaderForTestFile(filename).Load()
+    (value,) = event.values
+    self.assertIsNone(value.plugin_name)
+    self.assertIsNone(value.metadata)
+    self.assertIsNone(value.scalar)
+    tensor = tensor_pb2.TensorProto.FromString(value.tensor)
+    self.assertEqual(tensor_util.make_ndarray(tensor).tolist(), [1.0, 2.0])
+
+  def testMultiprocessingPoolKeepsOrder(self):
+    filename = os.path.join(self.get_temp_dir(), 'events.out.tfevents.3')
+    self._WriteSummaryEvents(filename, range(500))
+    pool = multiprocessing.Pool(2)
+    self.addCleanup(pool.terminate)
+    loader = event_file_loader.ParallelEventFileLoader(filename, pool)
+    self.assertEqual([event.step for event in loader.Load()],
+                     list(range(500)))
+
+
 if __name__ == '__main__':
   tf.test.main()
@@ -0,0 +1,273 @@
+# Copyright 2019 The TensorFlow Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ==============================================================================
+"""Filters that skip unwanted events before they are parsed.
+
+An `EventFilter` decides from a serialized `Event` whether any part of it is
+wanted, by scanning the protobuf wire format for the tags and plugin names of
+its summary values without parsing the rest. This makes skipping an event
+with a large image or graph much cheaper than parsing it.
+"""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import re
+
+import six
+
+from tensorboard.plugins.audio import metadata as audio_metadata
+from tensorboard.plugins.histogram import metadata as histogram_metadata
+from tensorboard.plugins.image import metadata as image_metadata
+from tensorboard.plugins.scalar import metadata as scalar_metadata
+
+
+# The plugin that serves graphs and run metadata. (Not imported from the
+# graphs plugin to keep this module light.)
+GRAPHS_PLUGIN_NAME = 'graphs'
+
+# Wire types of protobuf fields.
+_VARINT = 0
+_FIXED64 = 1
+_LENGTH_DELIMITED = 2
+_FIXED32 = 5
+
+# Field numbers in `Event`.
+_EVENT_GRAPH_DEF = 4
+_EVENT_SUMMARY = 5
+_EVENT_TAGGED_RUN_METADATA = 8
+_EVENT_META_GRAPH_DEF = 9
+
+# Field numbers in `Summary`, `Summary.Value`, `SummaryMetadata` and
+# `SummaryMetadata.PluginData`.
+_SUMMARY_VALUE = 1
+_VALUE_TAG = 1
+_VALUE_NODE_NAME = 7
+_VALUE_METADATA = 9
+_METADATA_PLUGIN_DATA = 1
+_PLUGIN_DATA_PLUGIN_NAME = 1
+
+# Plugins that `data_compat.migrate_value` assigns to old-style values,
+# keyed by the field number of their `Summary.Value` oneof field.
+_PLUGIN_NAME_BY_VALUE_FIELD = {
+    2: scalar_metadata.PLUGIN_NAME,  # simple_value
+    4: image_metadata.PLUGIN_NAME,  # image
+    5: histogram_metadata.PLUGIN_NAME,  # histo
+    6: audio_metadata.PLUGIN_NAME,  # audio
+}
+
+# Views of serialized protos whose items are ints.
+_ByteView = bytearray if six.PY2 else memoryview
+
+
+class EventFilter(object):
+  """Selects the summary values to load by plugin and by tag.
+
+  A filter remembers the plugin of each tag from the first value of the tag
+  that has metadata, since later values usually don't, so the same filter
+  must see all events of a run in order. Values whose plugin isn't known
+  are kept if their tag matches.
+
+  Events without summaries are always kept, except that graphs, metagraphs
+  and run metadata are skipped if the graphs plugin is not loaded.
+  """
+
+  def __init__(self, plugin_names=None, tag_pattern=None):
+    """Constructs a filter.
+
+    Args:
+      plugin_names: A collection of the names of the plugins whose data to
+        load, or None to load the data of all plugins.
+      tag_pattern: A regular expression, as a string, that the tags to load
+        must contain a match for, or None to load all tags.
+    """
+    self._plugin_names = (
+        frozenset(plugin_names) if plugin_names is not None else None)
+    self._tag_regex = re.compile(tag_pattern) if tag_pattern else None
+    # Maps each tag whose plugin is known to whether to keep its values.
+    self._tag_decisions = {}
+
+  def AcceptsValue(self, tag, plugin_name=None):
+    """Returns whether to load a summary value.
+
+    Args:
+      tag: The tag of the value (or its node name, if it has no tag).
+      plugin_name: The name of the plugin in the value's metadata, or None if
+        it has none.
+    """
+    decision = self._tag_decisions.get(tag)
+    if decision is not None:
+      return decision
+    if self._tag_regex is not None and not self._tag_regex.search(tag):
+      decision = False
+    elif plugin_name is None:
+      # Keep values of unknown plugins, but decide again next time.
+      return True
+    else:
+      decision = (self._plugin_names is None or
+                  plugin_name in self._plugin_names)
+    self._tag_decisions[tag] = decision
+    return decision
+
+  def State(self):
+    """Returns what the filter has learned about tags, for `Restore`."""
+    return dict(self._tag_decisions)
+
+  def Restore(self, state):
+    """Resumes filtering a run from a state returned by `State`."""
+    self._tag_decisions = dict(state)
+
+  def AcceptsRecord(self, record):
+    """Returns whether any part of a serialized `Event` is wanted.
+
+    Records that can't be scanned are accepted, so that parsing them reports
+    the problem as usual.
+    """
+    data = _ByteView(record)
+    try:
+      return self._ScanEvent(data)
+    except (IndexError, ValueError):
+      return True
+
+  def _ScanEvent(self, data):
+    pos = 0
+    end = len(data)
+    summary = None
+    while pos < end:
+      (field, wire_type, pos) = _ReadKey(data, pos)
+      if wire_type != _LENGTH_DELIMITED:
+        pos = _SkipField(data, pos, wire_type)
+        continue
+      (length, pos) = _ReadLength(data, pos, end)
+      if field == _EVENT_SUMMARY:
+        summary = (pos, pos + length)
+      elif field in (_EVENT_GRAPH_DEF, _EVENT_META_GRAPH_DEF,
+                     _EVENT_TAGGED_RUN_METADATA):
+        return (self._plugin_names is None or
+                GRAPHS_PLUGIN_NAME in self._plugin_names)
+      pos += length
+    if summary is None:
+      return True
+    (pos, end) = summary
+    if pos == end:
+      return True
+    accepted = False
+    while pos < end:
+      (field, wire_type, pos) = _ReadKey(data, pos)
+      if wire_type != _LENGTH_DELIMITED:
+        pos = _SkipField(data, pos, wire_type)
+        continue
+      (length, pos) = _ReadLength(data, pos, end)
+      if field == _SUMMARY_VALUE:
+        # Scan every value so that the plugins of all tags are learned.
+        if self._ScanValue(data, pos, pos + length):
+          accepted = True
+      pos += length
+    return accepted
+
+  def _ScanValue(self, data, pos, end):
+    tag = None
+    node_name = None
+    metadata_plugin_name = None
+    # Old-style values are migrated to their plugin regardless of metadata.
+    migrated_plugin_name = None
+    while pos < end:
+      (field, wire_type, pos) = _ReadKey(data, pos)
+      if field in _PLUGIN_NAME_BY_VALUE_FIELD:
+        migrated_plugin_name = _PLUGIN_NAME_BY_VALUE_FIELD[field]
+      if wire_type != _LENGTH_DELIMITED:
+        pos = _SkipField(data, pos, wire_type)
+        continue
+      (length, pos) = _ReadLength(data, pos, end)
+      if field == _VALUE_TAG:
+        tag = _DecodeString(data, pos, pos + length)
+      elif field == _VALUE_NODE_NAME:
+        node_name = _DecodeString(data, pos, pos + length)
+      elif field == _VALUE_METADATA:
+        metadata_plugin_name = _ScanMetadata(data, pos, pos + length)
+      pos += length
+    return self.AcceptsValue(tag or node_name or '',
+                             migrated_plugin_name or metadata_plugin_name)
+
+
+def _ScanMetadata(data, pos, end):
+  """Returns the plugin name in a `SummaryMetadata`, if any."""
+  plugin_data = _FindField(data, pos, end, _METADATA_PLUGIN_DATA)
+  if plugin_data is None:
+    return None
+  plugin_name = _FindField(data, plugin_data[0], plugin_data[1],
+                           _PLUGIN_DATA_PLUGIN_NAME)
+  if plugin_name is None:
+    return None
+  return _DecodeString(data, plugin_name[0], plugin_name[1]) or None
+
+
+def _FindField(data, pos, end, wanted_field):
+  """Returns the bounds of the last length-delimited `wanted_field`."""
+  found = None
+  while pos < end:
+    (field, wire_type, pos) = _ReadKey(data, pos)
+    if wire_type != _LENGTH_DELIMITED:
+      pos = _SkipField(data, pos, wire_type)
+      continue
+    (length, pos) = _ReadLength(data, pos, end)
+    if field == wanted_field:
+      found = (pos, pos + length)
+    pos += length
+  return found
+
+
+def _ReadVarint(data, pos):
+  result = 0
+  shift = 0
+  while True:
+    byte = data[pos]
+    pos += 1
+    result |= (byte & 0x7f) << shift
+    if not byte & 0x80:
+      return (result, pos)
+    shift += 7
+    if shift >= 64:
+      raise ValueError('varint too long')
+
+
+def _ReadLength(data, pos, end):
+  """Reads the length of a field that must end by `end`."""
+  (length, pos) = _ReadVarint(data, pos)
+  if pos + length > end:
+    raise IndexError('field extends past the end of its message')
+  return (length, pos)
+
+
+def _ReadKey(data, pos):
+  (key, pos) = _ReadVarint(data, pos)
+  return (key >> 3, key & 7, pos)
+
+
+def _SkipField(data, pos, wire_type):
+  """Returns the position after a field that is not length-delimited."""
+  if wire_type == _VARINT:
+    return _ReadVarint(data, pos)[1]
+  if wire_type == _FIXED64:
+    return pos + 8
+  if wire_type == _FIXED32:
+    return pos + 4
+  raise ValueError('unsupported wire type %d' % wire_type)
+
+
+def _DecodeString(data, start, end):
+  if end > len(data):
+    raise IndexError('field extends past the end of the record')
+  return bytes(data[start:end]).decode('utf-8', 'replace')
@@ -0,0 +1,129 @@
+# Copyright 2019 The TensorFlow Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ==============================================================================
+"""Tests for event_filter."""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import tensorflow as tf
+
+from tensorboard.backend.event_processing import event_filter
+from tensorboard.compat.proto import event_pb2
+from tensorboard.compat.proto import graph_pb2
+from tensorboard.compat.proto import summary_pb2
+from tensorboard.plugins.histogram import metadata as histogram_metadata
+from tensorboard.plugins.scalar import metadata as scalar_metadata
+
+
+def _SummaryRecord(*values):
+  return event_pb2.Event(
+      step=1, summary=summary_pb2.Summary(value=values)).SerializeToString()
+
+
+def _TensorValue(tag, plugin_name=None):
+  value = summary_pb2.Summary.Value(tag=tag)
+  value.tensor.dtype = 1
+  value.tensor.float_val.append(1.0)
+  if plugin_name is not None:
+    value.metadata.plugin_data.plugin_name = plugin_name
+  return value
+
+
+class EventFilterTest(tf.test.TestCase):
+
+  def testAcceptsEverythingByDefault(self):
+    f = event_filter.EventFilter()
+    self.assertTrue(f.AcceptsRecord(_SummaryRecord(
+        summary_pb2.Summary.Value(tag='loss', simple_value=1.0))))
+    self.assertTrue(f.AcceptsRecord(event_pb2.Event(
+        graph_def=graph_pb2.GraphDef().SerializeToString()
+    ).SerializeToString()))
+    self.assertTrue(f.AcceptsValue('loss', scalar_metadata.PLUGIN_NAME))
+
+  def testFiltersByPlugin(self):
+    f = event_filter.EventFilter(plugin_names=[scalar_metadata.PLUGIN_NAME])
+    self.assertTrue(f.AcceptsRecord(_SummaryRecord(
+        summary_pb2.Summary.Value(tag='loss', simple_value=1.0))))
+    self.assertFalse(f.AcceptsRecord(_SummaryRecord(
+        summary_pb2.Summary.Value(
+            tag='image', image=summary_pb2.Summary.Image(height=1)))))
+    self.assertFalse(f.AcceptsRecord(_SummaryRecord(
+        _TensorValue('weights', histogram_metadata.PLUGIN_NAME))))
+    self.assertTrue(f.AcceptsRecord(_SummaryRecord(
+        _TensorValue('accuracy', scalar_metadata.PLUGIN_NAME))))
+
+  def testKeepsRecordWithAnyAcceptedValue(self):
+    f = event_filter.EventFilter(plugin_names=[scalar_metadata.PLUGIN_NAME])
+    self.assertTrue(f.AcceptsRecord(_SummaryRecord(
+        _TensorValue('weights', histogram_metadata.PLUGIN_NAME),
+        summary_pb2.Summary.Value(tag='loss', simple_value=1.0))))
+    # Both tags were learned, even though the record was accepted early.
+    self.assertFalse(f.AcceptsValue('weights'))
+    self.assertTrue(f.AcceptsValue('loss'))
+
+  def testLearnsPluginOfTagsFromMetadata(self):
+    f = event_filter.EventFilter(plugin_names=[scalar_metadata.PLUGIN_NAME])
+    # Values of unknown tags without metadata are kept.
+    self.assertTrue(f.AcceptsRecord(_SummaryRecord(_TensorValue('weights'))))
+    self.assertFalse(f.AcceptsRecord(_SummaryRecord(
+        _TensorValue('weights', histogram_metadata.PLUGIN_NAME))))
+    self.assertFalse(f.AcceptsRecord(_SummaryRecord(_TensorValue('weights'))))
+
+  def testRestoresLearnedPlugins(self):
+    f = event_filter.EventFilter(plugin_names=[scalar_metadata.PLUGIN_NAME])
+    f.AcceptsRecord(_SummaryRecord(
+        _TensorValue('weights', histogram_metadata.PLUGIN_NAME)))
+    restored = event_filter.EventFilter(
+        plugin_names=[scalar_metadata.PLUGIN_NAME])
+    restored.Restore(f.State())
+    self.assertFalse(
+        restored.AcceptsRecord(_SummaryRecord(_TensorValue('weights'))))
+
+  def testFiltersGraphsUnlessGraphsPluginIsLoaded(self):
+    record = event_pb2.Event(
+        graph_def=graph_pb2.GraphDef().SerializeToString()).SerializeToString()
+    self.assertFalse(event_filter.EventFilter(
+        plugin_names=[scalar_metadata.PLUGIN_NAME]).AcceptsRecord(record))
+    self.assertTrue(event_filter.EventFilter(
+        plugin_names=[event_filter.GRAPHS_PLUGIN_NAME]).AcceptsRecord(record))
+
+  def testKeepsEventsWithoutSummaries(self):
+    f = event_filter.EventFilter(plugin_names=[])
+    self.assertTrue(f.AcceptsRecord(
+        event_pb2.Event(file_version='brain.Event:2').SerializeToString()))
+    self.assertTrue(f.AcceptsRecord(event_pb2.Event(
+        session_log=event_pb2.SessionLog(status=event_pb2.SessionLog.START)
+    ).SerializeToString()))
+
+  def testFiltersByTagPattern(self):
+    f = event_filter.EventFilter(tag_pattern=r'^(loss|acc)')
+    self.assertTrue(f.AcceptsRecord(_SummaryRecord(
+        summary_pb2.Summary.Value(tag='loss', simple_value=1.0))))
+    self.assertTrue(f.AcceptsRecord(_SummaryRecord(_TensorValue('accuracy'))))
+    self.assertFalse(f.AcceptsRecord(_SummaryRecord(
+        summary_pb2.Summary.Value(tag='lr', simple_value=1.0))))
+    self.assertFalse(f.AcceptsValue('lr'))
+
+  def testAcceptsRecordsThatCannotBeScanned(self):
+    f = event_filter.EventFilter(plugin_names=[])
+    record = _SummaryRecord(
+        summary_pb2.Summary.Value(tag='loss', simple_value=1.0))
+    self.assertTrue(f.AcceptsRecord(record[:-3]))
+    self.assertTrue(f.AcceptsRecord(b'\xff' * 12))
+
+
+if __name__ == '__main__':
+  tf.test.main()
@@ -31,6 +31,10 @@ logger = tb_logging.get_logger()
 
 _ESCAPE_GLOB_CHARACTERS_REGEX = re.compile('([*?[])')
 
+# Suffix of the sidecar step indexes that `event_file_index` writes next to
+# events files. These are not events files themselves.
+EVENT_FILE_INDEX_SUFFIX = '.tbindex'
+
 
 # TODO(chihuahua): Rename this method to use camel-case for GCS (Gcs).
 def IsGCSPath(path):
@@ -57,7 +61,9 @@ def IsTensorFlowEventsFile(path):
   """
   if not path:
     raise ValueError('Path must be a nonempty string')
-  return 'tfevents' in tf.compat.as_str_any(os.path.basename(path))
+  basename = tf.compat.as_str_any(os.path.basename(path))
+  return ('tfevents' in basename and
+          not basename.endswith(EVENT_FILE_INDEX_SUFFIX))
 
 
 def ListDirectoryAbsolute(directory):
@@ -64,6 +64,11 @@ class IoWrapperTest(tf.test.TestCase):
     self.assertFalse(
         io_wrapper.IsTensorFlowEventsFile('/logdir/model.ckpt'))
 
+  def testIsIsTensorFlowEventsFileFalseForIndex(self):
+    self.assertFalse(
+        io_wrapper.IsTensorFlowEventsFile(
+            '/logdir/events.out.tfevents.1473720042.com.tbindex'))
+
   def testIsIsTensorFlowEventsFileWithEmptyInput(self):
     with six.assertRaisesRegex(self,
                                ValueError,
@@ -0,0 +1,245 @@
+# Copyright 2019 The TensorFlow Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ==============================================================================
+"""Finds the run directories of a local logdir incrementally.
+
+`io_wrapper.GetLogdirSubdirectories` walks the whole logdir each time it is
+called, listing every directory and checking every entry for whether it is a
+directory. A `LogdirDiscoverer` remembers the tree from one pass to the next,
+and only lists the directories whose modification times have changed, which
+takes one stat per directory. Subtrees are scanned on a pool of threads, and
+run directories are reported as soon as they are found.
+"""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import collections
+import os
+import threading
+import time
+
+from six.moves import queue, xrange  # pylint: disable=redefined-builtin
+
+from tensorboard.backend.event_processing import io_wrapper
+from tensorboard.compat import tf
+from tensorboard.util import tb_logging
+
+
+logger = tb_logging.get_logger()
+
+# A listing is only reused if the modification time of its directory was at
+# least this old when it was listed, since file systems may not record
+# modification times to the nanosecond.
+_LISTING_MTIME_MARGIN_SECS = 2
+
+# A listing is reused for at most this long, in case the clocks of the file
+# system and of this machine disagree.
+_MAX_LISTING_AGE_SECS = 600
+
+# What is known about a directory from its last listing: the modification
+# time of the directory if the listing may be reused while it is unchanged
+# (or None), when it was listed, the paths of its subdirectories, and
+# whether it directly contains events files.
+_Listing = collections.namedtuple(
+    '_Listing', ['mtime', 'time', 'subdirs', 'has_events'])
+
+# Put on the queue of results once a pass is done.
+_DONE = object()
+
+
+def IsSupported(path):
+  """Returns whether a logdir can be discovered with a `LogdirDiscoverer`.
+
+  Directories in object stores have no modification times, so their logdirs
+  are better listed with `io_wrapper.GetLogdirSubdirectories`.
+  """
+  return '://' not in path and not io_wrapper.IsCnsPath(path)
+
+
+class LogdirDiscoverer(object):
+  """Finds the subdirectories of a logdir with events files, incrementally.
+
+  Only one pass (call to `Discover`) may run at a time.
+  """
+
+  def __init__(self, top, num_threads=1):
+    """Creates a discoverer that knows nothing about the logdir yet.
+
+    Args:
+      top: The path to a local logdir.
+      num_threads: The number of threads that scan directories.
+
+    Raises:
+      ValueError: If `num_threads` is not positive.
+    """
+    if num_threads <= 0:
+      raise ValueError('num_threads must be positive: %r' % (num_threads,))
+    self._top = top
+    self._num_threads = num_threads
+    self._listings = {}
+    # The modification time of each directory when it was last stat'ed, or
+    # None if the file system has none.
+    self._mtimes = {}
+    self._lock = threading.Lock()
+
+  def Discover(self):
+    """Finds the run directories that are new or changed since the last pass.
+
+    The first pass finds all run directories. Later passes find the run
+    directories that have been created since, or whose listings changed,
+    such as by a new events file. Run directories that were already found
+    may be found again.
+
+    Yields:
+      The paths of the run directories, as they are found and in no
+      particular order.
+
+    Raises:
+      ValueError: If the logdir exists and is not a directory.
+    """
+    if not tf.io.gfile.exists(self._top):
+      with self._lock:
+        self._listings.clear()
+        self._mtimes.clear()
+      return
+    if not tf.io.gfile.isdir(self._top):
+      raise ValueError('LogdirDiscoverer: path exists and is not a '
+                       'directory, %s' % self._top)
+    start = time.time()
+    directories = queue.Queue()
+    results = queue.Queue()
+    # The number of directories that are queued or being scanned.
+    pending = [1]
+    directories.put(self._top)
+    stats = collections.Counter()
+    # Set if the pass is abandoned, so that workers stop scanning.
+    abandoned = threading.Event()
+
+    def Worker():
+      while True:
+        directory = directories.get()
+        if directory is None or abandoned.is_set():
+          return
+        try:
+          (subdirs, has_events, listed) = self._Scan(directory)
+        except Exception as e:  # pylint: disable=broad-except
+          logger.error('Unable to scan %s: %s', directory, e)
+          (subdirs, has_events, listed) = ((), False, False)
+        if has_events and listed:
+          results.put(directory)
+        with self._lock:
+          stats['listed' if listed else 'reused'] += 1
+          pending[0] += len(subdirs) - 1
+          done = not pending[0]
+        for subdir in subdirs:
+          directories.put(subdir)
+        if done:
+          results.put(_DONE)
+
+    threads = []
+    for i in xrange(self._num_threads):
+      thread = threading.Thread(target=Worker, name='Discoverer %d' % i)
+      thread.daemon = True
+      thread.start()
+      threads.append(thread)
+    finished = False
+    try:
+      while True:
+        result = results.get()
+        if result is _DONE:
+          finished = True
+          break
+        yield result
+    finally:
+      if not finished:
+        abandoned.set()
+      for _ in threads:
+        directories.put(None)
+      if not finished:
+        # Some of the listings may not have been reported, so start over,
+        # once no worker can save another one.
+        for thread in threads:
+          thread.join()
+        with self._lock:
+          self._listings.clear()
+          self._mtimes.clear()
+    logger.info('LogdirDiscoverer: Listed %d and reused the listings of %d '
+                'directories under %s in %0.3f secs', stats['listed'],
+                stats['reused'], self._top, time.time() - start)
+
+  def ModificationTime(self, directory):
+    """Returns when a directory was last modified, as of the last pass.
+
+    This takes no file system call, since each pass stats the directories
+    that it scans anyway.
+
+    Returns:
+      The modification time in seconds, or None if the directory was not
+      scanned or the file system records none.
+    """
+    with self._lock:
+      return self._mtimes.get(directory)
+
+  def _Scan(self, directory):
+    """Lists a directory, or reuses its listing if it has not changed.
+
+    Returns:
+      A tuple of the paths of its subdirectories, whether it directly
+      contains events files, and whether it was listed.
+    """
+    now = time.time()
+    try:
+      mtime_nsec = tf.io.gfile.stat(directory).mtime_nsec
+    except tf.errors.NotFoundError:
+      self._Forget(directory)
+      return ((), False, False)
+    mtime = mtime_nsec / 1e9 if mtime_nsec else None
+    with self._lock:
+      self._mtimes[directory] = mtime
+      listing = self._listings.get(directory)
+    if (listing is not None and mtime is not None and
+        listing.mtime == mtime and now - listing.time < _MAX_LISTING_AGE_SECS):
+      return (listing.subdirs, listing.has_events, False)
+    subdirs = []
+    has_events = False
+    for name in tf.io.gfile.listdir(directory):
+      path = os.path.join(directory, name)
+      if tf.io.gfile.isdir(path):
+        subdirs.append(path)
+      elif io_wrapper.IsTensorFlowEventsFile(path):
+        has_events = True
+    # The directory is stat'ed before it is listed, so a change in between
+    # shows up as a new modification time next time.
+    if mtime is not None and now - mtime < _LISTING_MTIME_MARGIN_SECS:
+      mtime = None
+    if listing is not None:
+      for subdir in set(listing.subdirs).difference(subdirs):
+        self._Forget(subdir)
+    with self._lock:
+      self._listings[directory] = _Listing(
+          mtime, now, tuple(subdirs), has_events)
+    return (subdirs, has_events, True)
+
+  def _Forget(self, directory):
+    """Forgets the listings of a directory and all of its subdirectories."""
+    prefix = os.path.join(directory, '')
+    with self._lock:
+      for path in list(self._listings):
+        if path == directory or path.startswith(prefix):
+          del self._listings[path]
+      for path in list(self._mtimes):
+        if path == directory or path.startswith(prefix):
+          del self._mtimes[path]
@@ -0,0 +1,138 @@
+# Copyright 2019 The TensorFlow Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ==============================================================================
+"""Tests for logdir_discovery."""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import os
+import shutil
+import time
+
+import tensorflow as tf
+
+from tensorboard.backend.event_processing import io_wrapper
+from tensorboard.backend.event_processing import logdir_discovery
+
+
+class LogdirDiscovererTest(tf.test.TestCase):
+
+  def setUp(self):
+    super(LogdirDiscovererTest, self).setUp()
+    self._top = os.path.join(self.get_temp_dir(), 'logdir')
+    os.makedirs(self._top)
+
+  def _Path(self, *path_components):
+    return os.path.join(self._top, *path_components)
+
+  def _MakeRun(self, *path_components):
+    if path_components:
+      os.makedirs(self._Path(*path_components))
+    self._Touch(*(path_components + ('events.out.tfevents.1',)))
+
+  def _Touch(self, *path_components):
+    open(self._Path(*path_components), 'w').close()
+
+  def _Age(self):
+    """Makes all directories old enough for their listings to be reused."""
+    old = time.time() - 10
+    for (directory, _, _) in os.walk(self._top):
+      os.utime(directory, (old, old))
+
+  def _Discover(self, discoverer):
+    return sorted(discoverer.Discover())
+
+  def testRaisesWithBadArguments(self):
+    with self.assertRaises(ValueError):
+      logdir_discovery.LogdirDiscoverer(self._top, num_threads=0)
+    self._Touch('file')
+    with self.assertRaises(ValueError):
+      self._Discover(logdir_discovery.LogdirDiscoverer(self._Path('file')))
+
+  def testFindsSameRunsAsWalking(self):
+    self._MakeRun()
+    self._MakeRun('a')
+    self._MakeRun('a', 'b', 'c')
+    self._MakeRun('d', 'e')
+    os.makedirs(self._Path('f', 'g'))
+    self._Touch('f', 'g', 'events.out.tfevents.1.tbindex')
+    self._Touch('f', 'not_events')
+    for num_threads in (1, 4):
+      discoverer = logdir_discovery.LogdirDiscoverer(
+          self._top, num_threads=num_threads)
+      self.assertEqual(self._Discover(discoverer),
+                       sorted(io_wrapper.GetLogdirSubdirectories(self._top)))
+
+  def testNonexistentLogdir(self):
+    discoverer = logdir_discovery.LogdirDiscoverer(self._Path('missing'))
+    self.assertEqual(self._Discover(discoverer), [])
+
+  def testOnlyListsChangedDirectories(self):
+    self._MakeRun('a')
+    self._MakeRun('b', 'c')
+    self._Age()
+    discoverer = logdir_discovery.LogdirDiscoverer(self._top, num_threads=2)
+    self.assertEqual(self._Discover(discoverer),
+                     [self._Path('a'), self._Path('b', 'c')])
+    self.assertEqual(self._Discover(discoverer), [])
+    self._MakeRun('b', 'd')
+    self._Touch('a', 'events.out.tfevents.2')
+    self.assertEqual(self._Discover(discoverer),
+                     [self._Path('a'), self._Path('b', 'd')])
+
+  def testRelistsRecentlyChangedDirectories(self):
+    self._MakeRun('a')
+    discoverer = logdir_discovery.LogdirDiscoverer(self._top)
+    self.assertEqual(self._Discover(discoverer), [self._Path('a')])
+    # The modification time of the directory is too recent to trust.
+    self.assertEqual(self._Discover(discoverer), [self._Path('a')])
+
+  def testFindsRecreatedDirectories(self):
+    self._MakeRun('a', 'b')
+    self._Age()
+    discoverer = logdir_discovery.LogdirDiscoverer(self._top)
+    self.assertEqual(self._Discover(discoverer), [self._Path('a', 'b')])
+    shutil.rmtree(self._Path('a'))
+    self.assertEqual(self._Discover(discoverer), [])
+    self._MakeRun('a', 'b')
+    self._Age()
+    self.assertEqual(self._Discover(discoverer), [self._Path('a', 'b')])
+
+  def testModificationTime(self):
+    self._MakeRun('a')
+    self._Age()
+    discoverer = logdir_discovery.LogdirDiscoverer(self._top)
+    self.assertIsNone(discoverer.ModificationTime(self._Path('a')))
+    self._Discover(discoverer)
+    self.assertAlmostEqual(discoverer.ModificationTime(self._Path('a')),
+                           os.stat(self._Path('a')).st_mtime, delta=1)
+    shutil.rmtree(self._Path('a'))
+    self._Discover(discoverer)
+    self.assertIsNone(discoverer.ModificationTime(self._Path('a')))
+
+  def testStartsOverIfPassIsAbandoned(self):
+    self._MakeRun('a')
+    self._MakeRun('b')
+    self._Age()
+    discoverer = logdir_discovery.LogdirDiscoverer(self._top)
+    for _ in discoverer.Discover():
+      break
+    self.assertEqual(self._Discover(discoverer),
+                     [self._Path('a'), self._Path('b')])
+
+
+if __name__ == '__main__':
+  tf.test.main()
@@ -20,20 +20,32 @@ from __future__ import print_function
 import collections
 import threading
 
+import numpy as np
 import six
 
 from tensorboard import data_compat
+from tensorboard.backend.event_processing import byte_reservoir
 from tensorboard.backend.event_processing import directory_watcher
 from tensorboard.backend.event_processing import event_file_loader
 from tensorboard.backend.event_processing import io_wrapper
 from tensorboard.backend.event_processing import plugin_asset_util
 from tensorboard.backend.event_processing import reservoir
+from tensorboard.backend.event_processing import scalar_decoder
+from tensorboard.backend.event_processing import scalar_pyramid
+from tensorboard.backend.event_processing import scalar_reservoir
+from tensorboard.backend.event_processing import stratified_reservoir
 from tensorboard.compat import tf
 from tensorboard.compat.proto import config_pb2
 from tensorboard.compat.proto import event_pb2
 from tensorboard.compat.proto import graph_pb2
 from tensorboard.compat.proto import meta_graph_pb2
+from tensorboard.compat.proto import summary_pb2
+from tensorboard.compat.proto import tensor_pb2
+from tensorboard.compat.proto import tensor_shape_pb2
+from tensorboard.compat.proto import types_pb2
+from tensorboard.plugins.scalar import metadata as scalar_metadata
 from tensorboard.util import tb_logging
+from tensorboard.util import tensor_util
 
 
 logger = tb_logging.get_logger()
@@ -42,6 +54,12 @@ namedtuple = collections.namedtuple
 
 TensorEvent = namedtuple('TensorEvent', ['wall_time', 'step', 'tensor_proto'])
 
+ScalarEvent = scalar_reservoir.ScalarEvent
+
+ScalarColumns = scalar_reservoir.ScalarColumns
+
+ScalarBuckets = scalar_pyramid.ScalarBuckets
+
 ## Different types of summary events handled by the event_accumulator
 SUMMARY_TYPES = {
     'tensor': '_ProcessTensor',
@@ -62,8 +80,28 @@ STORE_EVERYTHING_SIZE_GUIDANCE = {
     TENSORS: 0,
 }
 
+# A `tensor_size_guidance` value that keeps `size` items of each tag in a
+# `stratified_reservoir.StratifiedReservoir`, rather than sampling them at
+# random.
+Stratified = namedtuple('Stratified', ['size'])
+
+# A `tensor_size_guidance` value that keeps as many items of each tag as fit
+# in `size` bytes, in a `byte_reservoir.ByteReservoir`.
+Bytes = namedtuple('Bytes', ['size'])
+
 _TENSOR_RESERVOIR_KEY = "."  # arbitrary
 
+# Roughly how many bytes the Python objects of a `TensorEvent` take, other
+# than its tensor, for `MemoryUsage`.
+_TENSOR_EVENT_OVERHEAD_BYTES = 200
+
+# Roughly how many bytes a scalar takes in a `scalar_reservoir.ScalarReservoir`,
+# with the room left in its log, to turn `Bytes` into a number of scalars.
+_SCALAR_BYTES = 50
+
+# The plugin that serves graphs and run metadata.
+_GRAPHS_PLUGIN_NAME = 'graphs'
+
 
 class EventAccumulator(object):
   """An `EventAccumulator` takes an event generator, and accumulates the values.
@@ -97,15 +135,30 @@ class EventAccumulator(object):
     tensors_by_tag: A dictionary mapping each tag name to a
       reservoir.Reservoir of tensor summaries. Each such reservoir will
       only use a single key, given by `_TENSOR_RESERVOIR_KEY`.
+    scalars_by_tag: Like `tensors_by_tag`, but for the tags of the scalars
+      plugin, whose values are stored compactly in the arrays of
+      `scalar_reservoir.ScalarReservoir`s rather than as `TensorEvent`s. A
+      tag is in at most one of the two.
 
   @@Tensors
+  @@Scalars
+  @@ScalarColumns
+  @@ScalarBuckets
   """
 
+  # The maximum number of events that `Reload` reads from disk at a time.
+  _RELOAD_BATCH_SIZE = 1000
+
   def __init__(self,
                path,
                size_guidance=None,
                tensor_size_guidance=None,
-               purge_orphaned_data=True):
+               purge_orphaned_data=True,
+               use_mmap=False,
+               decode_pool=None,
+               event_filter=None,
+               prefetcher=None,
+               concurrent_writers=False):
     """Construct the `EventAccumulator`.
 
     Args:
@@ -120,11 +173,33 @@ class EventAccumulator(object):
       tensor_size_guidance: Like `size_guidance`, but allowing finer
         granularity for tensor summaries. Should be a map from the
         `plugin_name` field on the `PluginData` proto to an integer
-        representing the number of items to keep per tag. Plugins for
-        which there is no entry in this map will default to the value of
+        representing the number of items to keep per tag, to a `Stratified`
+        size to keep the items of each step stratum rather than random ones,
+        or to a `Bytes` size to keep as many items as fit in a number of
+        bytes. A key of the form "plugin_name:tag" sets the size of a single
+        tag of the plugin. Plugins for which there is no entry in this map
+        will default to the value of
         `size_guidance[event_accumulator.TENSORS]`. Defaults to `{}`.
       purge_orphaned_data: Whether to discard any events that were "orphaned" by
         a TensorFlow restart.
+      use_mmap: Whether to read local events files through memory maps
+        instead of copying each record. See
+        `event_file_loader.RawEventFileLoader`.
+      decode_pool: An optional `multiprocessing.Pool` in which to decode
+        events. See `event_file_loader.ParallelEventFileLoader`.
+      event_filter: An optional `event_filter.EventFilter` that selects the
+        summary values to load. Events without any selected values are
+        skipped before they are parsed, so they also don't count towards the
+        detection of out-of-order steps.
+      prefetcher: An optional `record_prefetcher.RecordPrefetcher` that reads
+        events files ahead of this accumulator, including the next file in
+        the directory while the current one is loaded.
+      concurrent_writers: Whether to load the events files of different
+        writers in the directory concurrently, rather than one file at a
+        time. See `directory_watcher.MultiWriterDirectoryWatcher`. Since a
+        writer that lags behind the others can then add steps below those
+        already loaded, out-of-order steps are not taken for restarts, and
+        only `SessionLog.START` events purge orphaned data.
     """
     size_guidance = dict(size_guidance or DEFAULT_SIZE_GUIDANCE)
     sizes = {}
@@ -144,6 +219,12 @@ class EventAccumulator(object):
     self._tagged_metadata = {}
     self.summary_metadata = {}
     self.tensors_by_tag = {}
+    self.scalars_by_tag = {}
+    # The `DataType` of the values of each tag in `scalars_by_tag`.
+    self._scalar_dtypes = {}
+    # The `scalar_pyramid.ScalarPyramid` of every scalar of each tag in
+    # `scalars_by_tag`, including those that its reservoir doesn't keep.
+    self._scalar_pyramids = {}
     self._tensors_by_tag_lock = threading.Lock()
 
     # Keep a mapping from plugin name to a dict mapping from tag to plugin data
@@ -156,15 +237,24 @@ class EventAccumulator(object):
     self._plugin_tag_locks = collections.defaultdict(threading.Lock)
 
     self.path = path
-    self._generator = _GeneratorFromPath(path)
+    self._event_filter = event_filter
+    self._generator_kwargs = dict(
+        use_mmap=use_mmap, decode_pool=decode_pool,
+        record_filter=event_filter and event_filter.AcceptsRecord,
+        prefetcher=prefetcher, concurrent_writers=concurrent_writers)
+    self._generator = _GeneratorFromPath(path, **self._generator_kwargs)
     self._generator_mutex = threading.Lock()
 
     self.purge_orphaned_data = purge_orphaned_data
+    self._concurrent_writers = concurrent_writers
 
     self.most_recent_step = -1
     self.most_recent_wall_time = -1
     self.file_version = None
 
+    # What the last call to `TakeDelta` returned, or None.
+    self._delta_base = None
+
   def Reload(self):
     """Loads all events added since the last call to `Reload`.
 
@@ -174,10 +264,396 @@ class EventAccumulator(object):
       The `EventAccumulator`.
     """
     with self._generator_mutex:
-      for event in self._generator.Load():
-        self._ProcessEvent(event)
+      while True:
+        events = self._generator.LoadBatch(self._RELOAD_BATCH_SIZE)
+        if not events:
+          break
+        for event in events:
+          self._ProcessLoadedEvent(event)
     return self
 
+  def FilesystemCalls(self):
+    """Returns the number of file system calls made so far, by kind.
+
+    Returns:
+      A `collections.Counter`, as returned by
+      `DirectoryWatcher.FilesystemCalls`. It is empty if the path of the
+      accumulator is a single file.
+    """
+    if isinstance(self._generator, (
+        directory_watcher.DirectoryWatcher,
+        directory_watcher.MultiWriterDirectoryWatcher)):
+      return self._generator.FilesystemCalls()
+    return collections.Counter()
+
+  def MemoryUsage(self):
+    """Returns roughly how many bytes the loaded data takes, by plugin.
+
+    Tensors are counted by their serialized size plus the Python objects
+    that hold them, toward the plugins of their tags (or '' for tags without
+    a plugin), and scalars by the size of their arrays and of their
+    pyramids. Graphs and run metadata count toward the graphs plugin. The
+    tensor reservoirs keep their totals up to date as tensors are added and
+    removed, so that their tensors aren't counted again on each call.
+
+    Returns:
+      A dict mapping plugin names to numbers of bytes.
+    """
+    usage = collections.Counter()
+    with self._tensors_by_tag_lock:
+      tensors_by_tag = dict(self.tensors_by_tag)
+      scalars_by_tag = dict(self.scalars_by_tag)
+      scalar_pyramids = dict(self._scalar_pyramids)
+    for (tag, tensors) in six.iteritems(tensors_by_tag):
+      metadata = self.summary_metadata.get(tag)
+      plugin_name = metadata.plugin_data.plugin_name if metadata else ''
+      usage[plugin_name] += tensors.ByteSize()
+    for scalars in six.itervalues(scalars_by_tag):
+      usage[scalar_metadata.PLUGIN_NAME] += scalars.ByteSize()
+    for pyramid in six.itervalues(scalar_pyramids):
+      usage[scalar_metadata.PLUGIN_NAME] += pyramid.ByteSize()
+    graph_bytes = (len(self._graph or b'') + len(self._meta_graph or b'') +
+                   sum(len(run_metadata) for run_metadata
+                       in list(self._tagged_metadata.values())))
+    if graph_bytes:
+      usage[_GRAPHS_PLUGIN_NAME] += graph_bytes
+    return dict(usage)
+
+  def Position(self):
+    """Returns how far the events files have been loaded.
+
+    Returns:
+      A dict that can be pickled and that changes whenever more events are
+      loaded, or None if the position cannot be told.
+    """
+    with self._generator_mutex:
+      return self._GeneratorState()
+
+  def Snapshot(self):
+    """Returns a snapshot of the loaded data, which `Restore` can resume from.
+
+    The snapshot holds the contents of all reservoirs, the summary metadata,
+    and the position of the accumulator in its events files (see
+    `Position`), in a form that can be pickled.
+
+    Returns:
+      A dict, or None if the position of the accumulator cannot be told.
+    """
+    with self._generator_mutex:
+      generator_state = self._GeneratorState()
+      if generator_state is None:
+        return None
+      with self._tensors_by_tag_lock:
+        tensors_by_tag = dict(self.tensors_by_tag)
+        scalars_by_tag = dict(self.scalars_by_tag)
+        scalar_dtypes = dict(self._scalar_dtypes)
+        scalar_pyramids = dict(self._scalar_pyramids)
+      tensors = {}
+      for (tag, tag_reservoir) in six.iteritems(tensors_by_tag):
+        tensors[tag] = _MapReservoirState(
+            tag_reservoir.State(),
+            lambda e: (e.wall_time, e.step, e.tensor_proto.SerializeToString()))
+      scalars = {}
+      for (tag, tag_reservoir) in six.iteritems(scalars_by_tag):
+        scalars[tag] = (scalar_dtypes[tag], tag_reservoir.State(),
+                        scalar_pyramids[tag].State())
+      return {
+          'generator': generator_state,
+          'first_event_timestamp': self._first_event_timestamp,
+          'file_version': self.file_version,
+          'most_recent_step': self.most_recent_step,
+          'most_recent_wall_time': self.most_recent_wall_time,
+          'graph': self._graph,
+          'graph_from_metagraph': self._graph_from_metagraph,
+          'meta_graph': self._meta_graph,
+          'tagged_metadata': dict(self._tagged_metadata),
+          'summary_metadata': {
+              tag: metadata.SerializeToString()
+              for (tag, metadata) in six.iteritems(self.summary_metadata)
+          },
+          'tensors': tensors,
+          'scalars': scalars,
+          'event_filter': (self._event_filter.State()
+                           if self._event_filter is not None else None),
+      }
+
+  def Restore(self, snapshot):
+    """Replaces the loaded data with a snapshot, and resumes loading from it.
+
+    The snapshot is only restored if nothing has been loaded yet, and if
+    the events files that it was taken from still exist and have not shrunk
+    (see `directory_watcher.DirectoryWatcher.Restore`). It must have been
+    taken by an accumulator for the same path with the same arguments,
+    including whether it has an event filter.
+
+    Args:
+      snapshot: A dict returned by `Snapshot`.
+
+    Returns:
+      Whether the snapshot was restored. If not, the accumulator is
+      unchanged.
+    """
+    with self._generator_mutex:
+      if self._first_event_timestamp is not None:
+        return False
+      if not self._RestoreGenerator(snapshot['generator']):
+        return False
+      self._first_event_timestamp = snapshot['first_event_timestamp']
+      self.file_version = snapshot['file_version']
+      self.most_recent_step = snapshot['most_recent_step']
+      self.most_recent_wall_time = snapshot['most_recent_wall_time']
+      self._graph = snapshot['graph']
+      self._graph_from_metagraph = snapshot['graph_from_metagraph']
+      self._meta_graph = snapshot['meta_graph']
+      self._tagged_metadata = dict(snapshot['tagged_metadata'])
+      if self._event_filter is not None:
+        self._event_filter.Restore(snapshot['event_filter'])
+      summary_metadata = {}
+      for (tag, serialized) in six.iteritems(snapshot['summary_metadata']):
+        metadata = summary_pb2.SummaryMetadata.FromString(serialized)
+        summary_metadata[tag] = metadata
+        plugin_name = metadata.plugin_data.plugin_name
+        if plugin_name:
+          with self._plugin_tag_locks[plugin_name]:
+            self._plugin_to_tag_to_content[plugin_name][tag] = (
+                metadata.plugin_data.content)
+      self.summary_metadata = summary_metadata
+      tensors_by_tag = {}
+      for (tag, state) in six.iteritems(snapshot['tensors']):
+        tensors_by_tag[tag] = self._NewTensorReservoir(tag)
+        tensors_by_tag[tag].Restore(_MapReservoirState(
+            state,
+            lambda item: TensorEvent(
+                wall_time=item[0], step=item[1],
+                tensor_proto=tensor_pb2.TensorProto.FromString(item[2]))))
+      scalars_by_tag = {}
+      scalar_dtypes = {}
+      scalar_pyramids = {}
+      for (tag, (dtype, state, pyramid_state)) in six.iteritems(
+          snapshot['scalars']):
+        scalars_by_tag[tag] = self._NewScalarReservoir(tag, dtype)
+        scalars_by_tag[tag].Restore(state)
+        scalar_dtypes[tag] = dtype
+        scalar_pyramids[tag] = scalar_pyramid.ScalarPyramid()
+        scalar_pyramids[tag].Restore(pyramid_state)
+      with self._tensors_by_tag_lock:
+        self.tensors_by_tag = tensors_by_tag
+        self.scalars_by_tag = scalars_by_tag
+        self._scalar_dtypes = scalar_dtypes
+        self._scalar_pyramids = scalar_pyramids
+      self._delta_base = None
+    return True
+
+  def TakeDelta(self, full=False):
+    """Returns what has changed since the last call, for `ApplyDelta`.
+
+    The first call returns everything that has been loaded. Later calls
+    return the items that were added to each tag since, and the indices of
+    those that were sampled out or purged, along with any new summary
+    metadata. Tensors are serialized and scalars are sent as
+    `ScalarColumns`, so the delta can be pickled cheaply. The pyramids of
+    scalars only send the buckets that changed.
+
+    Args:
+      full: Whether to return everything that has been loaded again, as the
+        first call does.
+
+    Returns:
+      A dict.
+    """
+    with self._generator_mutex:
+      if full:
+        self._delta_base = None
+      base = self._delta_base
+      full = base is None
+      if full:
+        base = self._delta_base = {
+            'tensors': {},
+            'scalars': {},
+            'scalar_pyramids': {},
+            'summary_metadata': set(),
+            'tagged_metadata': {},
+            'graph': None,
+            'meta_graph': None,
+        }
+      with self._tensors_by_tag_lock:
+        tensors_by_tag = dict(self.tensors_by_tag)
+        scalars_by_tag = dict(self.scalars_by_tag)
+        scalar_dtypes = dict(self._scalar_dtypes)
+        scalar_pyramids = dict(self._scalar_pyramids)
+      tensors = {}
+      for (tag, tag_reservoir) in six.iteritems(tensors_by_tag):
+        items = _ReservoirItems(tag_reservoir)
+        sent = base['tensors'].get(tag)
+        change = reservoir.ItemsDelta(sent or (), items)
+        # New tags are sent even without items, as they are still listed.
+        if change is not None or sent is None:
+          (removed_indices, added) = change or ([], [])
+          tensors[tag] = (removed_indices, [
+              (e.wall_time, e.step, e.tensor_proto.SerializeToString())
+              for e in added
+          ])
+          base['tensors'][tag] = items
+      scalars = {}
+      for (tag, tag_reservoir) in six.iteritems(scalars_by_tag):
+        sent = base['scalars'].get(tag)
+        (removed_indices, added, serials) = tag_reservoir.ColumnsDelta(
+            _TENSOR_RESERVOIR_KEY, sent)
+        # New tags are sent even without items, as they are still listed.
+        if removed_indices or len(added.step) or sent is None:
+          scalars[tag] = (scalar_dtypes[tag], removed_indices, added)
+          base['scalars'][tag] = serials
+      pyramids = {}
+      for (tag, pyramid) in six.iteritems(scalar_pyramids):
+        (change, base['scalar_pyramids'][tag]) = pyramid.Delta(
+            base['scalar_pyramids'].get(tag))
+        if change is not None:
+          pyramids[tag] = change
+      summary_metadata = {}
+      for (tag, metadata) in six.iteritems(dict(self.summary_metadata)):
+        if tag not in base['summary_metadata']:
+          summary_metadata[tag] = metadata.SerializeToString()
+          base['summary_metadata'].add(tag)
+      tagged_metadata = {}
+      for (tag, run_metadata) in six.iteritems(dict(self._tagged_metadata)):
+        if base['tagged_metadata'].get(tag) is not run_metadata:
+          tagged_metadata[tag] = run_metadata
+          base['tagged_metadata'][tag] = run_metadata
+      delta = {
+          'full': full,
+          'position': self._GeneratorState(),
+          'first_event_timestamp': self._first_event_timestamp,
+          'file_version': self.file_version,
+          'most_recent_step': self.most_recent_step,
+          'most_recent_wall_time': self.most_recent_wall_time,
+          'graph_from_metagraph': self._graph_from_metagraph,
+          'summary_metadata': summary_metadata,
+          'tagged_metadata': tagged_metadata,
+          'tensors': tensors,
+          'scalars': scalars,
+          'scalar_pyramids': pyramids,
+      }
+      # The graphs are only sent again when they are replaced.
+      if self._graph is not base['graph']:
+        delta['graph'] = base['graph'] = self._graph
+      if self._meta_graph is not base['meta_graph']:
+        delta['meta_graph'] = base['meta_graph'] = self._meta_graph
+      return delta
+
+  def ApplyDelta(self, delta):
+    """Applies a delta from the `TakeDelta` of another accumulator.
+
+    This accumulator then holds the same data as the other one, as long as
+    it is given every delta of the other one in order, and loads nothing
+    itself. A delta that holds everything replaces all data.
+
+    Args:
+      delta: A dict returned by `TakeDelta`.
+    """
+    with self._generator_mutex:
+      if delta['full']:
+        self._graph = None
+        self._meta_graph = None
+        self._tagged_metadata = {}
+        self.summary_metadata = {}
+        self._plugin_to_tag_to_content = collections.defaultdict(dict)
+        with self._tensors_by_tag_lock:
+          self.tensors_by_tag = {}
+          self.scalars_by_tag = {}
+          self._scalar_dtypes = {}
+          self._scalar_pyramids = {}
+      self._first_event_timestamp = delta['first_event_timestamp']
+      self.file_version = delta['file_version']
+      self.most_recent_step = delta['most_recent_step']
+      self.most_recent_wall_time = delta['most_recent_wall_time']
+      self._graph_from_metagraph = delta['graph_from_metagraph']
+      if 'graph' in delta:
+        self._graph = delta['graph']
+      if 'meta_graph' in delta:
+        self._meta_graph = delta['meta_graph']
+      self._tagged_metadata.update(delta['tagged_metadata'])
+      for (tag, serialized) in six.iteritems(delta['summary_metadata']):
+        metadata = summary_pb2.SummaryMetadata.FromString(serialized)
+        self.summary_metadata[tag] = metadata
+        plugin_name = metadata.plugin_data.plugin_name
+        if plugin_name:
+          with self._plugin_tag_locks[plugin_name]:
+            self._plugin_to_tag_to_content[plugin_name][tag] = (
+                metadata.plugin_data.content)
+      for (tag, (removed_indices, added)) in six.iteritems(delta['tensors']):
+        items = [TensorEvent(wall_time=wall_time, step=step,
+                             tensor_proto=tensor_pb2.TensorProto.FromString(
+                                 serialized))
+                 for (wall_time, step, serialized) in added]
+        self._UpdateReservoir(
+            self.tensors_by_tag, tag,
+            lambda: self._NewTensorReservoir(tag),
+            lambda r: r.UpdateItems(_TENSOR_RESERVOIR_KEY, removed_indices,
+                                    items))
+      for (tag, (dtype, removed_indices, added)) in six.iteritems(
+          delta['scalars']):
+        with self._tensors_by_tag_lock:
+          self._scalar_dtypes[tag] = dtype
+        self._UpdateReservoir(
+            self.scalars_by_tag, tag,
+            lambda: self._NewScalarReservoir(tag, dtype),
+            lambda r: r.UpdateColumns(_TENSOR_RESERVOIR_KEY, removed_indices,
+                                      added))
+      for (tag, change) in six.iteritems(delta['scalar_pyramids']):
+        with self._tensors_by_tag_lock:
+          pyramid = self._scalar_pyramids.get(tag)
+          if pyramid is None:
+            pyramid = self._scalar_pyramids[tag] = (
+                scalar_pyramid.ScalarPyramid())
+        pyramid.ApplyDelta(change)
+
+  def _UpdateReservoir(self, reservoirs, tag, new_reservoir, update):
+    """Updates the reservoir of a tag in `ApplyDelta`, adding it if needed.
+
+    A new reservoir is only added once it holds its items, since readers
+    expect every reservoir to have some.
+
+    Args:
+      reservoirs: `tensors_by_tag` or `scalars_by_tag`.
+      tag: The tag whose reservoir is updated.
+      new_reservoir: A function that returns an empty reservoir for the tag.
+      update: A function that updates a reservoir.
+    """
+    with self._tensors_by_tag_lock:
+      tag_reservoir = reservoirs.get(tag)
+    if tag_reservoir is not None:
+      update(tag_reservoir)
+      return
+    tag_reservoir = new_reservoir()
+    update(tag_reservoir)
+    with self._tensors_by_tag_lock:
+      reservoirs[tag] = tag_reservoir
+
+  def _GeneratorState(self):
+    """Returns the position of the generator, or None."""
+    if isinstance(self._generator, (
+        directory_watcher.DirectoryWatcher,
+        directory_watcher.MultiWriterDirectoryWatcher)):
+      return self._generator.State()
+    return {'offset': self._generator.Offset()}
+
+  def _RestoreGenerator(self, state):
+    """Resumes the generator from a position; returns whether it did."""
+    if isinstance(self._generator, (
+        directory_watcher.DirectoryWatcher,
+        directory_watcher.MultiWriterDirectoryWatcher)):
+      return self._generator.Restore(state)
+    try:
+      length = tf.io.gfile.stat(self.path).length
+    except tf.errors.OpError:
+      return False
+    if length < state['offset']:
+      return False
+    self._generator.Close()
+    self._generator = _GeneratorFromPath(
+        self.path, start_offset=state['offset'], **self._generator_kwargs)
+    return True
+
   def PluginAssets(self, plugin_name):
     """Return a list of all plugin assets for the given plugin.
 
@@ -223,13 +699,12 @@ class EventAccumulator(object):
     if self._first_event_timestamp is not None:
       return self._first_event_timestamp
     with self._generator_mutex:
-      try:
-        event = next(self._generator.Load())
-        self._ProcessEvent(event)
-        return self._first_event_timestamp
-
-      except StopIteration:
+      events = self._generator.LoadBatch(max_records=1)
+      if not events:
         raise ValueError('No event timestamp could be found')
+      for event in events:
+        self._ProcessLoadedEvent(event)
+      return self._first_event_timestamp
 
   def PluginTagToContent(self, plugin_name):
     """Returns a dict mapping tags to content specific to that plugin.
@@ -265,6 +740,15 @@ class EventAccumulator(object):
     """
     return self.summary_metadata[tag]
 
+  def _ProcessLoadedEvent(self, event):
+    """Processes anything that the event generator yields."""
+    if isinstance(event, scalar_decoder.ScalarEventRecord):
+      self._ProcessScalarEventRecord(event)
+    elif isinstance(event, event_file_loader.DecodedEvent):
+      self._ProcessDecodedEvent(event)
+    else:
+      self._ProcessEvent(event)
+
   def _ProcessEvent(self, event):
     """Called whenever an event is loaded."""
     if self._first_event_timestamp is None:
@@ -324,36 +808,136 @@ class EventAccumulator(object):
     elif event.HasField('summary'):
       for value in event.summary.value:
         value = data_compat.migrate_value(value)
+        self._ProcessSummaryValue(event.wall_time, event.step, value)
+
+  def _ProcessDecodedEvent(self, event):
+    """Called whenever an `event_file_loader.DecodedEvent` is loaded.
+
+    This is the counterpart of `_ProcessEvent` for summary events that have
+    been decoded by a `ParallelEventFileLoader`.
+    """
+    if self._first_event_timestamp is None:
+      self._first_event_timestamp = event.wall_time
+    self._MaybePurgeOutOfOrderSummary(
+        event.wall_time, event.step, [value.tag for value in event.values])
+    for value in event.values:
+      self._ProcessDecodedValue(event.wall_time, event.step, value)
+
+  def _ProcessDecodedValue(self, wall_time, step, value):
+    """Like `_ProcessSummaryValue`, for an `event_file_loader.DecodedValue`.
+
+    Only new metadata and the tensors of tags that don't hold scalars are
+    parsed.
+    """
+    tag = value.tag
+    if (self._event_filter is not None and
+        not self._event_filter.AcceptsValue(tag, value.plugin_name)):
+      return
+    if value.metadata is not None and tag not in self.summary_metadata:
+      self._AddSummaryMetadata(
+          tag, summary_pb2.SummaryMetadata.FromString(value.metadata))
+    if value.tensor is None:
+      return
+    if value.scalar is not None and (
+        tag in self.scalars_by_tag or
+        (tag not in self.tensors_by_tag and self._IsScalarsPluginTag(tag))):
+      (dtype, scalar) = value.scalar
+      self._ProcessScalar(tag, dtype, wall_time, step, scalar)
+      return
+    self._ProcessTensor(tag, wall_time, step,
+                        tensor_pb2.TensorProto.FromString(value.tensor))
+
+  def _ProcessScalarEventRecord(self, event):
+    """Called whenever a `scalar_decoder.ScalarEventRecord` is loaded.
+
+    This is the counterpart of `_ProcessEvent` for events that hold only
+    scalars, whose values are added to `scalars_by_tag` directly. Events with
+    a tag that is not in `scalars_by_tag` yet (or whose values have another
+    type) are parsed and processed by `_ProcessEvent` instead, so that the
+    tag's metadata is recorded as usual.
+    """
+    scalar_dtypes = self._scalar_dtypes
+    for (tag, dtype, _) in event.values:
+      if scalar_dtypes.get(tag) != dtype:
+        self._ProcessEvent(event_pb2.Event.FromString(event.record))
+        return
+    if self._first_event_timestamp is None:
+      self._first_event_timestamp = event.wall_time
+    self._MaybePurgeOutOfOrderSummary(
+        event.wall_time, event.step, [tag for (tag, _, _) in event.values])
+    # Every tag has been accepted by the event filter (if any) before.
+    for (tag, _, value) in event.values:
+      self._AddScalar(tag, event.wall_time, event.step, value)
+
+  def _MaybePurgeOutOfOrderSummary(self, wall_time, step, tags):
+    """Like `_MaybePurgeOrphanedData`, for a summary event with these tags.
+
+    Only out-of-order steps can cause a purge here, since restarts are
+    detected with `SessionLog` events, which don't hold summaries.
+    """
+    if not self.purge_orphaned_data:
+      return
+    if ((not self.file_version or self.file_version < 2) and
+        not self._concurrent_writers and step < self.most_recent_step):
+      self._Purge(
+          event_pb2.Event(
+              wall_time=wall_time,
+              step=step,
+              summary=summary_pb2.Summary(value=[
+                  summary_pb2.Summary.Value(tag=tag) for tag in tags
+              ])),
+          by_tags=True)
+    self.most_recent_step = step
+    self.most_recent_wall_time = wall_time
+
+  def _ProcessSummaryValue(self, wall_time, step, value):
+    """Processes a summary value that has been migrated to a new-style value.
 
-        if value.HasField('metadata'):
-          tag = value.tag
-          # We only store the first instance of the metadata. This check
-          # is important: the `FileWriter` does strip metadata from all
-          # values except the first one per each tag, but a new
-          # `FileWriter` is created every time a training job stops and
-          # restarts. Hence, we must also ignore non-initial metadata in
-          # this logic.
-          if tag not in self.summary_metadata:
-            self.summary_metadata[tag] = value.metadata
-            plugin_data = value.metadata.plugin_data
-            if plugin_data.plugin_name:
-              with self._plugin_tag_locks[plugin_data.plugin_name]:
-                self._plugin_to_tag_to_content[plugin_data.plugin_name][tag] = (
-                    plugin_data.content)
-            else:
-              logger.warn(
-                  ('This summary with tag %r is oddly not associated with a '
-                   'plugin.'), tag)
-
-        for summary_type, summary_func in SUMMARY_TYPES.items():
-          if value.HasField(summary_type):
-            datum = getattr(value, summary_type)
-            tag = value.tag
-            if summary_type == 'tensor' and not tag:
-              # This tensor summary was created using the old method that used
-              # plugin assets. We must still continue to support it.
-              tag = value.node_name
-            getattr(self, summary_func)(tag, event.wall_time, event.step, datum)
+    Args:
+      wall_time: The wall time of the event that holds the value.
+      step: The step of the event that holds the value.
+      value: A `Summary.Value` proto returned by `data_compat.migrate_value`.
+    """
+    if self._event_filter is not None:
+      plugin_name = (value.metadata.plugin_data.plugin_name
+                     if value.HasField('metadata') else None)
+      if not self._event_filter.AcceptsValue(
+          value.tag or value.node_name, plugin_name or None):
+        return
+
+    if value.HasField('metadata'):
+      tag = value.tag
+      # We only store the first instance of the metadata. This check
+      # is important: the `FileWriter` does strip metadata from all
+      # values except the first one per each tag, but a new
+      # `FileWriter` is created every time a training job stops and
+      # restarts. Hence, we must also ignore non-initial metadata in
+      # this logic.
+      if tag not in self.summary_metadata:
+        self._AddSummaryMetadata(tag, value.metadata)
+
+    for summary_type, summary_func in SUMMARY_TYPES.items():
+      if value.HasField(summary_type):
+        datum = getattr(value, summary_type)
+        tag = value.tag
+        if summary_type == 'tensor' and not tag:
+          # This tensor summary was created using the old method that used
+          # plugin assets. We must still continue to support it.
+          tag = value.node_name
+        getattr(self, summary_func)(tag, wall_time, step, datum)
+
+  def _AddSummaryMetadata(self, tag, metadata):
+    """Stores the metadata of a tag that has none yet."""
+    self.summary_metadata[tag] = metadata
+    plugin_data = metadata.plugin_data
+    if plugin_data.plugin_name:
+      with self._plugin_tag_locks[plugin_data.plugin_name]:
+        self._plugin_to_tag_to_content[plugin_data.plugin_name][tag] = (
+            plugin_data.content)
+    else:
+      logger.warn(
+          ('This summary with tag %r is oddly not associated with a '
+           'plugin.'), tag)
 
   def Tags(self):
     """Return all tags found in the value stream.
@@ -362,7 +946,8 @@ class EventAccumulator(object):
       A `{tagType: ['list', 'of', 'tags']}` dictionary.
     """
     return {
-        TENSORS: list(self.tensors_by_tag.keys()),
+        TENSORS: (list(self.tensors_by_tag.keys()) +
+                  list(self.scalars_by_tag.keys())),
         # Use a heuristic: if the metagraph is available, but
         # graph is not, then we assume the metagraph contains the graph.
         GRAPH: self._graph is not None,
@@ -434,8 +1019,88 @@ class EventAccumulator(object):
     Returns:
       An array of `TensorEvent`s.
     """
+    if tag in self.scalars_by_tag:
+      dtype = self._scalar_dtypes[tag]
+      columns = self.scalars_by_tag[tag].Columns(_TENSOR_RESERVOIR_KEY)
+      return [TensorEvent(wall_time=wall_time,
+                          step=step,
+                          tensor_proto=_ScalarTensorProto(dtype, value))
+              for (wall_time, step, value) in zip(columns.wall_time.tolist(),
+                                                  columns.step.tolist(),
+                                                  columns.value.tolist())]
     return self.tensors_by_tag[tag].Items(_TENSOR_RESERVOIR_KEY)
 
+  def Scalars(self, tag):
+    """Given a summary tag, return all associated scalars.
+
+    This is faster than `Tensors` for the tags of the scalars plugin, which
+    are stored as scalars already.
+
+    Args:
+      tag: A string tag associated with the events.
+
+    Raises:
+      KeyError: If the tag is not found.
+
+    Returns:
+      An array of `ScalarEvent`s.
+    """
+    if tag in self.scalars_by_tag:
+      return self.scalars_by_tag[tag].Items(_TENSOR_RESERVOIR_KEY)
+    return [ScalarEvent(wall_time=event.wall_time,
+                        step=event.step,
+                        value=tensor_util.make_ndarray(
+                            event.tensor_proto).item())
+            for event in self.Tensors(tag)]
+
+  def ScalarColumns(self, tag):
+    """Given a summary tag, return all associated scalars as arrays.
+
+    This is faster than `Scalars` for the tags of the scalars plugin, whose
+    scalars are read in bulk without building a tuple for each.
+
+    Args:
+      tag: A string tag associated with the events.
+
+    Raises:
+      KeyError: If the tag is not found.
+
+    Returns:
+      A `ScalarColumns` of read-only numpy arrays.
+    """
+    if tag in self.scalars_by_tag:
+      return self.scalars_by_tag[tag].Columns(_TENSOR_RESERVOIR_KEY)
+    events = self.Scalars(tag)
+    return ScalarColumns(
+        wall_time=np.array([event.wall_time for event in events], np.float64),
+        step=np.array([event.step for event in events], np.int64),
+        value=np.array([event.value for event in events], np.float64))
+
+  def ScalarBuckets(self, tag, max_points):
+    """Given a summary tag, return aggregates of its scalars over steps.
+
+    The scalars of the tags of the scalars plugin are aggregated as they are
+    loaded, including those that their reservoir doesn't keep, so this takes
+    time proportional to the number of buckets returned. Those of other tags
+    are aggregated from `ScalarColumns`.
+
+    Args:
+      tag: A string tag associated with the events.
+      max_points: The most buckets to return; at least 1.
+
+    Raises:
+      KeyError: If the tag is not found.
+
+    Returns:
+      A `ScalarBuckets` of numpy arrays, with buckets of steps as narrow as
+      allows at most `max_points` of them when possible. See
+      `scalar_pyramid.ScalarPyramid.Buckets`.
+    """
+    pyramid = self._scalar_pyramids.get(tag)
+    if pyramid is None:
+      pyramid = scalar_pyramid.FromColumns(self.ScalarColumns(tag))
+    return pyramid.Buckets(max_points)
+
   def _MaybePurgeOrphanedData(self, event):
     """Maybe purge orphaned data due to a TensorFlow crash.
 
@@ -456,9 +1121,10 @@ class EventAccumulator(object):
       ## If the file_version is recent enough, use the SessionLog enum
       ## to check for restarts.
       self._CheckForRestartAndMaybePurge(event)
-    else:
+    elif not self._concurrent_writers:
       ## If there is no file version, default to old logic of checking for
-      ## out of order steps.
+      ## out of order steps. The steps of concurrent writers are not in
+      ## order, so they are not checked.
       self._CheckForOutOfOrderStepAndMaybePurge(event)
     # After checking, update the most recent summary step and wall time.
     if event.HasField('summary'):
@@ -499,20 +1165,69 @@ class EventAccumulator(object):
       self._Purge(event, by_tags=True)
 
   def _ProcessTensor(self, tag, wall_time, step, tensor):
+    if tag in self.scalars_by_tag or (
+        tag not in self.tensors_by_tag and self._IsScalarsPluginTag(tag)):
+      value = scalar_decoder.ScalarFromTensorProto(tensor)
+      if value is not None:
+        self._ProcessScalar(tag, tensor.dtype, wall_time, step, value)
+        return
+      if tag in self.scalars_by_tag:
+        logger.warn('Ignoring a non-scalar value of the scalar tag %r', tag)
+        return
     tv = TensorEvent(wall_time=wall_time, step=step, tensor_proto=tensor)
     with self._tensors_by_tag_lock:
       if tag not in self.tensors_by_tag:
-        reservoir_size = self._GetTensorReservoirSize(tag)
-        self.tensors_by_tag[tag] = reservoir.Reservoir(reservoir_size)
+        self.tensors_by_tag[tag] = self._NewTensorReservoir(tag)
     self.tensors_by_tag[tag].AddItem(_TENSOR_RESERVOIR_KEY, tv)
 
+  def _ProcessScalar(self, tag, dtype, wall_time, step, value):
+    with self._tensors_by_tag_lock:
+      if tag not in self.scalars_by_tag:
+        self.scalars_by_tag[tag] = self._NewScalarReservoir(tag, dtype)
+        self._scalar_dtypes[tag] = dtype
+        self._scalar_pyramids[tag] = scalar_pyramid.ScalarPyramid()
+    self._AddScalar(tag, wall_time, step, value)
+
+  def _AddScalar(self, tag, wall_time, step, value):
+    """Adds a scalar to the reservoir and to the pyramid of its tag."""
+    self.scalars_by_tag[tag].AddItem(
+        _TENSOR_RESERVOIR_KEY, ScalarEvent(wall_time, step, value))
+    self._scalar_pyramids[tag].Add(wall_time, step, value)
+
+  def _IsScalarsPluginTag(self, tag):
+    summary_metadata = self.summary_metadata.get(tag)
+    return (summary_metadata is not None and
+            summary_metadata.plugin_data.plugin_name ==
+            scalar_metadata.PLUGIN_NAME)
+
+  def _NewTensorReservoir(self, tag):
+    size = self._GetTensorReservoirSize(tag)
+    if isinstance(size, Stratified):
+      return stratified_reservoir.StratifiedReservoir(
+          size.size, byte_size=_TensorEventBytes)
+    if isinstance(size, Bytes):
+      return byte_reservoir.ByteReservoir(size.size, _TensorEventBytes)
+    return reservoir.Reservoir(size, byte_size=_TensorEventBytes)
+
+  def _NewScalarReservoir(self, tag, dtype):
+    size = self._GetTensorReservoirSize(tag)
+    if isinstance(size, Stratified):
+      return stratified_reservoir.StratifiedScalarReservoir(size.size, dtype)
+    if isinstance(size, Bytes):
+      # Scalars all take the same number of bytes.
+      size = size.size and max(size.size // _SCALAR_BYTES, 1)
+    return scalar_reservoir.ScalarReservoir(size, dtype)
+
   def _GetTensorReservoirSize(self, tag):
     default = self._size_guidance[TENSORS]
     summary_metadata = self.summary_metadata.get(tag)
     if summary_metadata is None:
       return default
-    return self._tensor_size_guidance.get(
-        summary_metadata.plugin_data.plugin_name, default)
+    plugin_name = summary_metadata.plugin_data.plugin_name
+    tag_key = '%s:%s' % (plugin_name, tag)
+    if tag_key in self._tensor_size_guidance:
+      return self._tensor_size_guidance[tag_key]
+    return self._tensor_size_guidance.get(plugin_name, default)
 
   def _Purge(self, event, by_tags):
     """Purge all events that have occurred after the given event.step.
@@ -542,14 +1257,21 @@ class EventAccumulator(object):
     num_expired = 0
     if by_tags:
       for value in event.summary.value:
-        if value.tag in self.tensors_by_tag:
-          tag_reservoir = self.tensors_by_tag[value.tag]
+        tag_reservoir = (self.tensors_by_tag.get(value.tag) or
+                         self.scalars_by_tag.get(value.tag))
+        if tag_reservoir is not None:
           num_expired += tag_reservoir.FilterItems(
               _NotExpired, _TENSOR_RESERVOIR_KEY)
+        pyramid = self._scalar_pyramids.get(value.tag)
+        if pyramid is not None:
+          pyramid.Purge(event.step)
     else:
-      for tag_reservoir in six.itervalues(self.tensors_by_tag):
+      for tag_reservoir in (list(six.itervalues(self.tensors_by_tag)) +
+                            list(six.itervalues(self.scalars_by_tag))):
         num_expired += tag_reservoir.FilterItems(
             _NotExpired, _TENSOR_RESERVOIR_KEY)
+      for pyramid in list(six.itervalues(self._scalar_pyramids)):
+        pyramid.Purge(event.step)
     if num_expired > 0:
       purge_msg = _GetPurgeMessage(self.most_recent_step,
                                    self.most_recent_wall_time, event.step,
@@ -557,6 +1279,53 @@ class EventAccumulator(object):
       logger.warn(purge_msg)
 
 
+class MirrorAccumulator(EventAccumulator):
+  """An accumulator that holds the data of another one, and loads nothing.
+
+  Its data is only changed by `ApplyDelta`, with the deltas of an
+  accumulator that loads events elsewhere, such as in another process.
+  """
+
+  def __init__(self, path, size_guidance=None, tensor_size_guidance=None):
+    super(MirrorAccumulator, self).__init__(
+        path, size_guidance=size_guidance,
+        tensor_size_guidance=tensor_size_guidance)
+    if isinstance(self._generator, event_file_loader.RawEventFileLoader):
+      self._generator.Close()
+    self._generator = None
+    # The position of the other accumulator.
+    self._position = None
+
+  def Reload(self):
+    """Does nothing, since the events are loaded elsewhere."""
+    return self
+
+  def FirstEventTimestamp(self):
+    """Returns the timestamp in seconds of the first event loaded so far.
+
+    Raises:
+      ValueError: If no events have been loaded yet.
+    """
+    if self._first_event_timestamp is None:
+      raise ValueError('No event timestamp could be found')
+    return self._first_event_timestamp
+
+  def Snapshot(self):
+    """Returns None, since snapshots are taken where the events are loaded."""
+    return None
+
+  def Restore(self, snapshot):
+    """Returns False, since snapshots are restored where events are loaded."""
+    return False
+
+  def ApplyDelta(self, delta):
+    super(MirrorAccumulator, self).ApplyDelta(delta)
+    self._position = delta['position']
+
+  def _GeneratorState(self):
+    return self._position
+
+
 def _GetPurgeMessage(most_recent_step, most_recent_wall_time, event_step,
                      event_wall_time, num_expired):
   """Return the string message associated with TensorBoard purges."""
@@ -568,17 +1337,69 @@ def _GetPurgeMessage(most_recent_step, most_recent_wall_time, event_step,
                   event_step, event_wall_time)
 
 
-def _GeneratorFromPath(path):
-  """Create an event generator for file or directory at given path string."""
+def _TensorEventBytes(event):
+  """Returns roughly how many bytes a `TensorEvent` takes."""
+  return event.tensor_proto.ByteSize() + _TENSOR_EVENT_OVERHEAD_BYTES
+
+
+def _ScalarTensorProto(dtype, value):
+  """Returns a rank-0 `TensorProto` like the one `value` was read from."""
+  if dtype == types_pb2.DT_DOUBLE:
+    return tensor_pb2.TensorProto(
+        dtype=dtype, tensor_shape=tensor_shape_pb2.TensorShapeProto(),
+        double_val=[value])
+  return tensor_pb2.TensorProto(
+      dtype=dtype, tensor_shape=tensor_shape_pb2.TensorShapeProto(),
+      float_val=[value])
+
+
+def _MapReservoirState(state, f):
+  """Applies `f` to the items in a state from `reservoir.Reservoir.State`."""
+  return {key: ([f(item) for item in bucket_state[0]],) + bucket_state[1:]
+          for (key, bucket_state) in six.iteritems(state)}
+
+
+def _ReservoirItems(tag_reservoir):
+  """Returns the items of a reservoir of `EventAccumulator`, if it has any."""
+  try:
+    return tag_reservoir.ItemsView(_TENSOR_RESERVOIR_KEY)
+  except KeyError:
+    return ()
+
+
+def _GeneratorFromPath(path, use_mmap=False, decode_pool=None,
+                       record_filter=None, prefetcher=None,
+                       concurrent_writers=False, start_offset=0):
+  """Create an event generator for file or directory at given path string.
+
+  For a single events file, loading starts at `start_offset`.
+  """
   if not path:
     raise ValueError('path must be a valid string')
+  if decode_pool is None:
+    loader_factory = (
+        lambda path, start_offset=0: event_file_loader.ScalarEventFileLoader(
+            path, use_mmap=use_mmap, start_offset=start_offset,
+            record_filter=record_filter, prefetcher=prefetcher))
+  else:
+    loader_factory = (
+        lambda path, start_offset=0: event_file_loader.ParallelEventFileLoader(
+            path, decode_pool, use_mmap=use_mmap, start_offset=start_offset,
+            record_filter=record_filter, prefetcher=prefetcher))
   if io_wrapper.IsTensorFlowEventsFile(path):
-    return event_file_loader.EventFileLoader(path)
+    return loader_factory(path, start_offset=start_offset)
+  elif concurrent_writers:
+    return directory_watcher.MultiWriterDirectoryWatcher(
+        path,
+        loader_factory,
+        io_wrapper.IsTensorFlowEventsFile,
+        open_next_path=prefetcher is not None)
   else:
     return directory_watcher.DirectoryWatcher(
         path,
-        event_file_loader.EventFileLoader,
-        io_wrapper.IsTensorFlowEventsFile)
+        loader_factory,
+        io_wrapper.IsTensorFlowEventsFile,
+        open_next_path=prefetcher is not None)
 
 
 def _ParseFileVersion(file_version):
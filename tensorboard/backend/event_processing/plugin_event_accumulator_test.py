@@ -17,14 +17,20 @@ from __future__ import absolute_import
 from __future__ import division
 from __future__ import print_function
 
+import multiprocessing
 import os
+import pickle
 
 import numpy as np
 import six
 from six.moves import xrange  # pylint: disable=redefined-builtin
 import tensorflow as tf
 
+from tensorboard import data_compat
+from tensorboard.backend.event_processing import event_file_loader
+from tensorboard.backend.event_processing import event_filter
 from tensorboard.backend.event_processing import plugin_event_accumulator as ea
+from tensorboard.backend.event_processing import record_prefetcher
 from tensorboard.compat.proto import config_pb2
 from tensorboard.compat.proto import event_pb2
 from tensorboard.compat.proto import graph_pb2
@@ -59,6 +65,20 @@ class _EventGenerator(object):
     while self.items:
       yield self.items.pop(0)
 
+  def LoadBatch(self, max_records=None, max_bytes=None):
+    del max_bytes  # Unused.
+    batch = self.items[:max_records]
+    del self.items[:len(batch)]
+    if getattr(self._testcase, 'decode_events', False):
+      # Decode events the way a `ParallelEventFileLoader` would.
+      batch = [
+          event_pb2.Event.FromString(decoded)
+          if isinstance(decoded, bytes) else decoded
+          for decoded in event_file_loader._DecodeRecords(
+              [event.SerializeToString() for event in batch])
+      ]
+    return batch
+
   def AddScalarTensor(self, tag, wall_time=0, step=0, value=0):
     """Add a rank-0 tensor event.
 
@@ -131,7 +151,7 @@ class MockingEventAccumulatorTest(EventAccumulatorTest):
     self._real_generator = ea._GeneratorFromPath
 
     def _FakeAccumulatorConstructor(generator, *args, **kwargs):
-      ea._GeneratorFromPath = lambda x: generator
+      ea._GeneratorFromPath = lambda x, **kwargs: generator
       return self._real_constructor(generator, *args, **kwargs)
 
     ea.EventAccumulator = _FakeAccumulatorConstructor
@@ -335,9 +355,10 @@ class MockingEventAccumulatorTest(EventAccumulatorTest):
     acc.Reload()
 
     def _Die(*args, **kwargs):  # pylint: disable=unused-argument
-      raise RuntimeError('Load() should not be called')
+      raise RuntimeError('Nothing should be loaded')
 
     self.stubs.Set(gen, 'Load', _Die)
+    self.stubs.Set(gen, 'LoadBatch', _Die)
     self.assertEqual(acc.FirstEventTimestamp(), 1)
 
   def testFirstEventTimestampLoadsEvent(self):
@@ -546,6 +567,12 @@ class MockingEventAccumulatorTest(EventAccumulatorTest):
         expected_count=size_small)
 
 
+class DecodedEventsMockingEventAccumulatorTest(MockingEventAccumulatorTest):
+  """Runs the same tests on events decoded as by `ParallelEventFileLoader`."""
+
+  decode_events = True
+
+
 class RealisticEventAccumulatorTest(EventAccumulatorTest):
 
   def testTensorsRealistically(self):
@@ -745,6 +772,475 @@ class RealisticEventAccumulatorTest(EventAccumulatorTest):
                      {'you_are_it': b'120v'})
     with six.assertRaisesRegex(self, KeyError, 'plug'):
       acc.PluginTagToContent('plug')
+  def testDecodeInProcessPool(self):
+    logdir = self.get_temp_dir()
+    with test_util.FileWriterCache.get(logdir) as writer:
+      for step in xrange(100):
+        writer.add_summary(
+            scalar_summary.pb('loss', step * 0.5), global_step=step)
+      writer.add_session_log(
+          event_pb2.SessionLog(status=event_pb2.SessionLog.START), 50)
+    serial = ea.EventAccumulator(logdir)
+    serial.Reload()
+    pool = multiprocessing.Pool(2)
+    self.addCleanup(pool.terminate)
+    parallel = ea.EventAccumulator(logdir, decode_pool=pool)
+    parallel.Reload()
+    self.assertEqual(parallel.Tags(), serial.Tags())
+    self.assertNotEqual(serial.Tags()[ea.TENSORS], [])
+    for tag in serial.Tags()[ea.TENSORS]:
+      self.assertEqual(parallel.SummaryMetadata(tag),
+                       serial.SummaryMetadata(tag))
+      self.assertEqual(parallel.Tensors(tag), serial.Tensors(tag))
+
+  def testCountsFilesystemCalls(self):
+    logdir = os.path.join(self.get_temp_dir(), 'filesystem_calls_test')
+    writer = test_util.FileWriter(logdir)
+    writer.add_summary(scalar_summary.pb('loss', 1.0), global_step=1)
+    writer.close()
+    acc = ea.EventAccumulator(logdir)
+    self.assertEqual(acc.FilesystemCalls(), {})
+    acc.Reload()
+    self.assertGreaterEqual(acc.FilesystemCalls()['listdir'], 1)
+    path = tf.io.gfile.glob(os.path.join(logdir, '*tfevents*'))[0]
+    self.assertEqual(ea.EventAccumulator(path).FilesystemCalls(), {})
+
+  def testPrefetchAcrossFiles(self):
+    logdir = os.path.join(self.get_temp_dir(), 'prefetch_test')
+    for i in xrange(3):
+      writer = test_util.FileWriter(logdir, filename_suffix='.%d' % i)
+      for step in xrange(i * 10, (i + 1) * 10):
+        writer.add_summary(
+            scalar_summary.pb('loss', step * 0.5), global_step=step)
+      writer.close()
+    prefetcher = record_prefetcher.RecordPrefetcher(num_threads=2)
+    self.addCleanup(prefetcher.Close)
+    acc = ea.EventAccumulator(logdir, prefetcher=prefetcher)
+    acc.Reload()
+    self.assertEqual(
+        [event.step for event in acc.Scalars('loss/scalar_summary')],
+        list(xrange(30)))
+
+  def testConcurrentWriters(self):
+    logdir = os.path.join(self.get_temp_dir(), 'concurrent_writers_test')
+    writers = [test_util.FileWriter(logdir, filename_suffix='.worker%d' % i)
+               for i in xrange(2)]
+    for step in xrange(20):
+      writers[step % 2].add_summary(
+          scalar_summary.pb('loss', step * 0.5), global_step=step)
+    for writer in writers:
+      writer.close()
+    acc = ea.EventAccumulator(logdir, purge_orphaned_data=True,
+                              concurrent_writers=True)
+    acc.Reload()
+    self.assertEqual(
+        [event.step for event in acc.Scalars('loss/scalar_summary')],
+        list(xrange(20)))
+
+  def _WriteWorkerEvents(self, logdir, worker, events):
+    path = os.path.join(logdir, 'events.out.tfevents.1.worker%d' % worker)
+    with tf.io.TFRecordWriter(path) as writer:
+      for event in events:
+        writer.write(event.SerializeToString())
+
+  def testFirstEventTimestampOfConcurrentWriters(self):
+    logdir = os.path.join(self.get_temp_dir(), 'concurrent_first_event_test')
+    tf.io.gfile.makedirs(logdir)
+    for worker in xrange(2):
+      self._WriteWorkerEvents(logdir, worker, [
+          event_pb2.Event(wall_time=10 + worker, step=worker,
+                          file_version='brain.Event:2')
+      ])
+    acc = ea.EventAccumulator(logdir, concurrent_writers=True)
+    self.assertEqual(acc.FirstEventTimestamp(), 10)
+    acc.Reload()
+    self.assertEqual(acc.FirstEventTimestamp(), 10)
+
+  def testConcurrentWritersAcrossReloads(self):
+    logdir = os.path.join(self.get_temp_dir(), 'concurrent_reloads_test')
+    tf.io.gfile.makedirs(logdir)
+
+    def _Events(steps):
+      # Without a file version, out-of-order steps would purge data.
+      return [event_pb2.Event(wall_time=step, step=step,
+                              summary=summary_pb2.Summary(value=[
+                                  summary_pb2.Summary.Value(
+                                      tag='loss', simple_value=step)]))
+              for step in steps]
+
+    acc = ea.EventAccumulator(logdir, purge_orphaned_data=True,
+                              concurrent_writers=True)
+    self._WriteWorkerEvents(logdir, 0, _Events(xrange(0, 20, 2)))
+    acc.Reload()
+    # The second writer lags behind the first one.
+    self._WriteWorkerEvents(logdir, 1, _Events(xrange(1, 20, 2)))
+    acc.Reload()
+    self.assertEqual(
+        sorted(event.step for event in acc.Scalars('loss')), list(xrange(20)))
+
+  def _AssertSameData(self, acc1, acc2, same_position=True):
+    self.assertEqual(acc1.Tags(), acc2.Tags())
+    for tag in acc1.Tags()[ea.TENSORS]:
+      self.assertEqual(acc1.Tensors(tag), acc2.Tensors(tag))
+      self.assertEqual(acc1.SummaryMetadata(tag), acc2.SummaryMetadata(tag))
+    for tag in acc1.scalars_by_tag:
+      for max_points in (1000, 1):
+        self.assertEqual(
+            [array.tolist() for array in acc1.ScalarBuckets(tag, max_points)],
+            [array.tolist() for array in acc2.ScalarBuckets(tag, max_points)])
+    self.assertEqual(acc1.PluginTagToContent('scalars'),
+                     acc2.PluginTagToContent('scalars'))
+    self.assertEqual(acc1.FirstEventTimestamp(), acc2.FirstEventTimestamp())
+    self.assertEqual(acc1.most_recent_step, acc2.most_recent_step)
+    if same_position:
+      self.assertEqual(acc1.Position(), acc2.Position())
+
+  def testRestoreSnapshot(self):
+    logdir = os.path.join(self.get_temp_dir(), 'snapshot_test')
+    writer = test_util.FileWriter(logdir)
+    writer.add_event(event_pb2.Event(
+        graph_def=graph_pb2.GraphDef().SerializeToString()))
+    for step in xrange(10):
+      writer.add_summary(scalar_summary.pb('loss', step), global_step=step)
+      writer.add_summary(
+          image_summary.pb('images', np.zeros((1, 1, 1, 3), np.uint8)),
+          global_step=step)
+    writer.flush()
+    size_guidance = {ea.TENSORS: 4}
+    acc = ea.EventAccumulator(logdir, size_guidance=size_guidance).Reload()
+    snapshot = pickle.loads(pickle.dumps(acc.Snapshot()))
+    restored = ea.EventAccumulator(logdir, size_guidance=size_guidance)
+    self.assertTrue(restored.Restore(snapshot))
+    self._AssertSameData(acc, restored)
+    self.assertTrue(restored.Tags()[ea.GRAPH])
+    # Loading resumes after the events in the snapshot, and samples the same.
+    for step in xrange(10, 20):
+      writer.add_summary(scalar_summary.pb('loss', step), global_step=step)
+    writer.close()
+    acc.Reload()
+    restored.Reload()
+    self._AssertSameData(acc, restored)
+    # A snapshot can only be restored before anything is loaded.
+    self.assertFalse(restored.Restore(snapshot))
+
+  def testStratifiedSizeGuidance(self):
+    logdir = os.path.join(self.get_temp_dir(), 'stratified_test')
+    writer = test_util.FileWriter(logdir)
+    tensor_size_guidance = {'scalars': ea.Stratified(20),
+                            'images': ea.Stratified(4)}
+    acc = ea.EventAccumulator(
+        logdir, tensor_size_guidance=tensor_size_guidance)
+    mirror = ea.EventAccumulator(
+        logdir, tensor_size_guidance=tensor_size_guidance)
+    for start in xrange(0, 1000, 250):
+      for step in xrange(start, start + 250):
+        writer.add_summary(scalar_summary.pb('loss', step), global_step=step)
+        if step % 100 == 0:
+          writer.add_summary(
+              image_summary.pb('images', np.zeros((1, 1, 1, 3), np.uint8)),
+              global_step=step)
+      writer.flush()
+      acc.Reload()
+      mirror.ApplyDelta(pickle.loads(pickle.dumps(acc.TakeDelta())))
+    writer.close()
+    steps = [event.step for event in acc.Scalars('loss/scalar_summary')]
+    self.assertLessEqual(len(steps), 20)
+    self.assertEqual(steps[0], 0)
+    self.assertEqual(steps[-5:], list(xrange(995, 1000)))
+    self.assertEqual(acc.ScalarColumns('loss/scalar_summary').step.tolist(),
+                     steps)
+    image_steps = [event.step for event in acc.Tensors('images/image_summary')]
+    self.assertLessEqual(len(image_steps), 4)
+    self.assertEqual((image_steps[0], image_steps[-1]), (0, 900))
+    # The items kept don't depend on how they were loaded.
+    reloaded = ea.EventAccumulator(
+        logdir, tensor_size_guidance=tensor_size_guidance).Reload()
+    self._AssertSameData(acc, reloaded)
+    self._AssertSameData(acc, mirror, same_position=False)
+    restored = ea.EventAccumulator(
+        logdir, tensor_size_guidance=tensor_size_guidance)
+    self.assertTrue(restored.Restore(pickle.loads(pickle.dumps(
+        acc.Snapshot()))))
+    self._AssertSameData(acc, restored)
+
+  def testBytesSizeGuidance(self):
+    logdir = os.path.join(self.get_temp_dir(), 'bytes_test')
+    writer = test_util.FileWriter(logdir)
+    for step in xrange(100):
+      writer.add_summary(scalar_summary.pb('loss', step), global_step=step)
+      for (name, size) in (('small', 1), ('large', 16)):
+        writer.add_summary(
+            image_summary.pb(name, np.zeros((1, size, size, 3), np.uint8)),
+            global_step=step)
+    writer.flush()
+    tensor_size_guidance = {
+        'scalars': ea.Bytes(10 * ea._SCALAR_BYTES),
+        'images': ea.Bytes(5000),
+        'images:large/image_summary': ea.Bytes(20000),
+    }
+    acc = ea.EventAccumulator(
+        logdir, tensor_size_guidance=tensor_size_guidance).Reload()
+    self.assertEqual(len(acc.Scalars('loss/scalar_summary')), 10)
+    usage = acc.MemoryUsage()
+    for (tag, max_bytes) in (('small/image_summary', 5000),
+                             ('large/image_summary', 20000)):
+      events = acc.Tensors(tag)
+      self.assertEqual(events[-1].step, 99)
+      tag_bytes = sum(ea._TensorEventBytes(event) for event in events)
+      self.assertLessEqual(tag_bytes, max_bytes)
+      self.assertGreater(tag_bytes, max_bytes // 2)
+    self.assertEqual(
+        usage['images'],
+        sum(ea._TensorEventBytes(event)
+            for tag in ('small/image_summary', 'large/image_summary')
+            for event in acc.Tensors(tag)))
+    restored = ea.EventAccumulator(
+        logdir, tensor_size_guidance=tensor_size_guidance)
+    self.assertTrue(restored.Restore(pickle.loads(pickle.dumps(
+        acc.Snapshot()))))
+    self.assertEqual(restored.MemoryUsage(), usage)
+    for step in xrange(100, 200):
+      writer.add_summary(
+          image_summary.pb('small', np.zeros((1, 1, 1, 3), np.uint8)),
+          global_step=step)
+    writer.close()
+    acc.Reload()
+    restored.Reload()
+    self._AssertSameData(acc, restored)
+
+  def testRestoreSnapshotOfEventsFile(self):
+    logdir = os.path.join(self.get_temp_dir(), 'snapshot_file_test')
+    with test_util.FileWriterCache.get(logdir) as writer:
+      for step in xrange(5):
+        writer.add_summary(scalar_summary.pb('loss', step), global_step=step)
+    path = tf.io.gfile.glob(os.path.join(logdir, '*tfevents*'))[0]
+    acc = ea.EventAccumulator(path).Reload()
+    restored = ea.EventAccumulator(path)
+    self.assertTrue(restored.Restore(acc.Snapshot()))
+    self._AssertSameData(acc, restored)
+    restored.Reload()
+    self._AssertSameData(acc, restored)
+
+  def testRestoreSnapshotWithEventFilter(self):
+    logdir = os.path.join(self.get_temp_dir(), 'snapshot_filter_test')
+    writer = test_util.FileWriter(logdir)
+    image = image_summary.pb('images', np.zeros((1, 1, 1, 3), np.uint8))
+    writer.add_summary(image, global_step=0)
+    writer.add_summary(scalar_summary.pb('loss', 0), global_step=0)
+    writer.flush()
+    make_filter = lambda: event_filter.EventFilter(plugin_names=['scalars'])
+    acc = ea.EventAccumulator(logdir, event_filter=make_filter()).Reload()
+    restored = ea.EventAccumulator(logdir, event_filter=make_filter())
+    self.assertTrue(restored.Restore(acc.Snapshot()))
+    # Later values of the images tag have no metadata, but are still
+    # known to belong to the images plugin.
+    image.value[0].ClearField('metadata')
+    writer.add_summary(image, global_step=1)
+    writer.close()
+    restored.Reload()
+    self.assertEqual(restored.Tags()[ea.TENSORS], ['loss/scalar_summary'])
+
+  def testDiscardsSnapshotOfChangedFiles(self):
+    logdir = os.path.join(self.get_temp_dir(), 'snapshot_invalid_test')
+    with test_util.FileWriterCache.get(logdir) as writer:
+      for step in xrange(5):
+        writer.add_summary(scalar_summary.pb('loss', step), global_step=step)
+    path = tf.io.gfile.glob(os.path.join(logdir, '*tfevents*'))[0]
+    snapshot = ea.EventAccumulator(logdir).Reload().Snapshot()
+    with open(path, 'rb') as f:
+      data = f.read()
+    with open(path, 'wb') as f:
+      f.write(data[:len(data) // 2])
+    restored = ea.EventAccumulator(logdir)
+    self.assertFalse(restored.Restore(snapshot))
+    self.assertEqual(restored.Tags()[ea.TENSORS], [])
+    restored.Reload()
+    self.assertEqual(restored.Tags()[ea.TENSORS], ['loss/scalar_summary'])
+
+  def testMemoryUsage(self):
+    logdir = os.path.join(self.get_temp_dir(), 'memory_usage_test')
+    writer = test_util.FileWriter(logdir)
+    graph = graph_pb2.GraphDef()
+    graph.node.add(name='a', op='b')
+    writer.add_event(event_pb2.Event(graph_def=graph.SerializeToString()))
+    for step in xrange(10):
+      writer.add_summary(scalar_summary.pb('loss', step), global_step=step)
+      writer.add_summary(
+          image_summary.pb('images', np.zeros((1, 1, 1, 3), np.uint8)),
+          global_step=step)
+    writer.close()
+    acc = ea.EventAccumulator(logdir, size_guidance={ea.TENSORS: 4})
+    self.assertEqual(acc.MemoryUsage(), {})
+    usage = acc.Reload().MemoryUsage()
+    # The wall times, steps, float32 values and serial numbers of 4 scalars,
+    # and the room left in their log, then the buckets of their pyramid.
+    pyramid_bytes = acc._scalar_pyramids['loss/scalar_summary'].ByteSize()
+    self.assertGreaterEqual(pyramid_bytes, 10 * 64)
+    self.assertGreaterEqual(usage['scalars'] - pyramid_bytes,
+                            4 * (8 + 8 + 4 + 8))
+    self.assertLess(usage['scalars'] - pyramid_bytes,
+                    2 * 4 * (8 + 8 + 4 + 8))
+    self.assertEqual(usage['graphs'], graph.ByteSize())
+    self.assertGreater(usage['images'], 4 * ea._TENSOR_EVENT_OVERHEAD_BYTES)
+
+  def testApplyDelta(self):
+    logdir = os.path.join(self.get_temp_dir(), 'delta_test')
+    writer = test_util.FileWriter(logdir)
+    writer.add_event(event_pb2.Event(
+        graph_def=graph_pb2.GraphDef().SerializeToString()))
+    for step in xrange(10):
+      writer.add_summary(scalar_summary.pb('loss', step), global_step=step)
+      writer.add_summary(
+          image_summary.pb('images', np.zeros((1, 1, 1, 3), np.uint8)),
+          global_step=step)
+    writer.flush()
+    size_guidance = {ea.TENSORS: 4}
+    acc = ea.EventAccumulator(logdir, size_guidance=size_guidance).Reload()
+    mirror = ea.EventAccumulator(logdir, size_guidance=size_guidance)
+    delta = acc.TakeDelta()
+    self.assertTrue(delta['full'])
+    self.assertEqual(delta['position'], acc.Position())
+    mirror.ApplyDelta(pickle.loads(pickle.dumps(delta)))
+    self._AssertSameData(acc, mirror, same_position=False)
+    self.assertTrue(mirror.Tags()[ea.GRAPH])
+    # Only what changed is sent again.
+    delta = acc.TakeDelta()
+    self.assertFalse(delta['full'])
+    self.assertEqual(delta['tensors'], {})
+    self.assertEqual(delta['scalars'], {})
+    self.assertEqual(delta['summary_metadata'], {})
+    self.assertNotIn('graph', delta)
+    # Sampled out and purged items are removed from the mirror too.
+    for step in xrange(10, 100):
+      writer.add_summary(scalar_summary.pb('loss', step), global_step=step)
+    writer.add_session_log(
+        event_pb2.SessionLog(status=event_pb2.SessionLog.START), 50)
+    writer.add_summary(
+        image_summary.pb('images', np.zeros((1, 1, 1, 3), np.uint8)),
+        global_step=50)
+    writer.close()
+    acc.Reload()
+    delta = acc.TakeDelta()
+    self.assertEqual(len(delta['tensors']['images/image_summary'][1]), 1)
+    mirror.ApplyDelta(pickle.loads(pickle.dumps(delta)))
+    self._AssertSameData(acc, mirror, same_position=False)
+    # A full delta replaces everything.
+    other = ea.EventAccumulator(logdir, size_guidance={ea.TENSORS: 2})
+    mirror.ApplyDelta(other.Reload().TakeDelta())
+    self._AssertSameData(other, mirror, same_position=False)
+
+  def testEventFilter(self):
+    logdir = os.path.join(self.get_temp_dir(), 'event_filter_test')
+    with test_util.FileWriterCache.get(logdir) as writer:
+      writer.add_event(event_pb2.Event(
+          graph_def=graph_pb2.GraphDef().SerializeToString()))
+      for step in xrange(10):
+        writer.add_summary(summary_pb2.Summary(value=[
+            summary_pb2.Summary.Value(tag='loss', simple_value=step),
+            summary_pb2.Summary.Value(tag='lr', simple_value=0.1),
+        ]), global_step=step)
+        writer.add_summary(
+            image_summary.pb('images', np.zeros((1, 1, 1, 3), np.uint8)),
+            global_step=step)
+    acc = ea.EventAccumulator(logdir, event_filter=event_filter.EventFilter(
+        plugin_names=['scalars'], tag_pattern='^loss'))
+    acc.Reload()
+    self.assertTagsEqual(acc.Tags(), {ea.TENSORS: ['loss']})
+    self.assertEqual([event.step for event in acc.Tensors('loss')],
+                     list(xrange(10)))
+
+  def testScalarsAreStoredCompactly(self):
+    logdir = os.path.join(self.get_temp_dir(), 'scalars_test')
+    with test_util.FileWriterCache.get(logdir) as writer:
+      for step in xrange(10):
+        writer.add_summary(summary_pb2.Summary(value=[
+            summary_pb2.Summary.Value(tag='loss', simple_value=step / 4.0),
+        ]), global_step=step)
+        writer.add_summary(scalar_summary.pb('acc', step / 8.0),
+                           global_step=step)
+      # A restart purges the steps from 5 onwards.
+      writer.add_session_log(
+          event_pb2.SessionLog(status=event_pb2.SessionLog.START), 5)
+      for step in xrange(5, 8):
+        writer.add_summary(summary_pb2.Summary(value=[
+            summary_pb2.Summary.Value(tag='loss', simple_value=-1.0),
+        ]), global_step=step)
+    acc = ea.EventAccumulator(logdir)
+    acc.Reload()
+    acc_tag = 'acc/scalar_summary'
+    self.assertItemsEqual(acc.Tags()[ea.TENSORS], ['loss', acc_tag])
+    self.assertItemsEqual(acc.scalars_by_tag.keys(), ['loss', acc_tag])
+    self.assertEqual(acc.tensors_by_tag, {})
+    self.assertEqual(
+        [(event.step, event.value) for event in acc.Scalars('loss')],
+        [(step, step / 4.0) for step in xrange(5)] +
+        [(step, -1.0) for step in xrange(5, 8)])
+    self.assertEqual([event.step for event in acc.Scalars(acc_tag)],
+                     list(xrange(5)))
+    columns = acc.ScalarColumns('loss')
+    self.assertEqual(columns.step.dtype, np.int64)
+    self.assertEqual(columns.value.dtype, np.float32)
+    self.assertEqual(
+        list(zip(columns.wall_time.tolist(), columns.step.tolist(),
+                 columns.value.tolist())),
+        [tuple(event) for event in acc.Scalars('loss')])
+    with self.assertRaises(ValueError):
+      columns.value[0] = 1.0
+    # Tensors are the same as if the values had been migrated.
+    expected = data_compat.migrate_value(
+        summary_pb2.Summary.Value(tag='loss', simple_value=0.25))
+    self.assertProtoEquals(expected.tensor, acc.Tensors('loss')[1].tensor_proto)
+    self.assertEqual(
+        tensor_util.make_ndarray(acc.Tensors(acc_tag)[3].tensor_proto).item(),
+        3 / 8.0)
+    self.assertEqual(acc.SummaryMetadata('loss').plugin_data.plugin_name,
+                     'scalars')
+    self.assertIn('loss', acc.PluginTagToContent('scalars'))
+
+  def testScalarBuckets(self):
+    logdir = os.path.join(self.get_temp_dir(), 'scalar_buckets_test')
+    with test_util.FileWriterCache.get(logdir) as writer:
+      for step in xrange(100):
+        writer.add_summary(scalar_summary.pb('loss', step), global_step=step)
+      writer.add_session_log(
+          event_pb2.SessionLog(status=event_pb2.SessionLog.START), 64)
+      for step in xrange(64, 80):
+        writer.add_summary(scalar_summary.pb('loss', -1), global_step=step)
+    acc = ea.EventAccumulator(logdir, size_guidance={ea.TENSORS: 4})
+    acc.Reload()
+    # Every scalar that wasn't purged is aggregated, not only those kept.
+    buckets = acc.ScalarBuckets('loss/scalar_summary', 3)
+    self.assertEqual(buckets.step.tolist(), [31, 63, 79])
+    self.assertEqual(buckets.count.tolist(), [32, 32, 16])
+    self.assertEqual(buckets.mean.tolist(), [15.5, 47.5, -1.0])
+    self.assertEqual(buckets.min.tolist(), [0.0, 32.0, -1.0])
+    self.assertEqual(buckets.max.tolist(), [31.0, 63.0, -1.0])
+    self.assertEqual(buckets.first.tolist(), [0.0, 32.0, -1.0])
+    self.assertEqual(buckets.last.tolist(), [31.0, 63.0, -1.0])
+    self.assertEqual(
+        acc.ScalarBuckets('loss/scalar_summary', 100).step.tolist(),
+        list(xrange(80)))
+    with self.assertRaises(KeyError):
+      acc.ScalarBuckets('missing', 5)
+
+  def testScalarsOfOtherTensors(self):
+    logdir = os.path.join(self.get_temp_dir(), 'other_tensors_test')
+    with test_util.FileWriterCache.get(logdir) as writer:
+      for step in xrange(3):
+        writer.add_summary(
+            image_summary.pb('images', np.zeros((1, 1, 1, 3), np.uint8)),
+            global_step=step)
+    acc = ea.EventAccumulator(logdir)
+    acc.Reload()
+    self.assertEqual(acc.scalars_by_tag, {})
+    [tag] = acc.Tags()[ea.TENSORS]
+    with self.assertRaises(ValueError):
+      acc.Scalars(tag)
+    with self.assertRaises(KeyError):
+      acc.Scalars('missing')
+    with self.assertRaises(KeyError):
+      acc.ScalarColumns('missing')
+
 
 if __name__ == '__main__':
   tf.test.main()
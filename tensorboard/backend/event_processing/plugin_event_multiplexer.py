@@ -18,6 +18,9 @@ from __future__ import absolute_import
 from __future__ import division
 from __future__ import print_function
 
+import collections
+import itertools
+import multiprocessing
 import os
 import threading
 
@@ -25,13 +28,25 @@ import six
 from six.moves import queue, xrange  # pylint: disable=redefined-builtin
 
 from tensorboard.backend.event_processing import directory_watcher
+from tensorboard.backend.event_processing import event_file_loader
+from tensorboard.backend.event_processing import event_filter
 from tensorboard.backend.event_processing import plugin_event_accumulator as event_accumulator  # pylint: disable=line-too-long
 from tensorboard.backend.event_processing import io_wrapper
+from tensorboard.backend.event_processing import logdir_discovery
+from tensorboard.backend.event_processing import record_prefetcher
+from tensorboard.backend.event_processing import reload_scheduler
+from tensorboard.backend.event_processing import reload_workers as reload_workers_lib  # pylint: disable=line-too-long
+from tensorboard.backend.event_processing import snapshot_store
+from tensorboard.compat.proto import event_pb2
 from tensorboard.util import tb_logging
 
 
 logger = tb_logging.get_logger()
 
+# With `lazy_load`, the default number of runs to load ahead of time.
+DEFAULT_WARM_RUNS = 10
+
+
 class EventMultiplexer(object):
   """An `EventMultiplexer` manages access to multiple `EventAccumulator`s.
 
@@ -75,7 +90,22 @@ class EventMultiplexer(object):
                size_guidance=None,
                tensor_size_guidance=None,
                purge_orphaned_data=True,
-               max_reload_threads=None):
+               max_reload_threads=None,
+               use_mmap=False,
+               decode_processes=0,
+               plugin_names=None,
+               tag_pattern=None,
+               prefetch_threads=0,
+               prefetch_bytes=record_prefetcher.DEFAULT_MAX_BYTES,
+               discovery_threads=1,
+               concurrent_writers=False,
+               snapshot_dir=None,
+               snapshot_interval=snapshot_store.DEFAULT_SAVE_INTERVAL_SECS,
+               reload_workers=0,
+               max_reload_backoff=0,
+               lazy_load=False,
+               warm_runs=DEFAULT_WARM_RUNS,
+               max_memory_bytes=0):
     """Constructor for the `EventMultiplexer`.
 
     Args:
@@ -85,25 +115,142 @@ class EventMultiplexer(object):
       size_guidance: A dictionary mapping from `tagType` to the number of items
         to store for each tag of that type. See
         `event_accumulator.EventAccumulator` for details.
-      tensor_size_guidance: A dictionary mapping from `plugin_name` to
-        the number of items to store for each tag of that type. See
-        `event_accumulator.EventAccumulator` for details.
+      tensor_size_guidance: A dictionary mapping from `plugin_name` (or
+        "plugin_name:tag") to the number of items (or bytes) to store for
+        each tag of that type. See `event_accumulator.EventAccumulator` for
+        details.
       purge_orphaned_data: Whether to discard any events that were "orphaned" by
         a TensorFlow restart.
       max_reload_threads: The max number of threads that TensorBoard can use
         to reload runs. Each thread reloads one run at a time. If not provided,
         reloads runs serially (one after another).
+      use_mmap: Whether to read local events files through memory maps
+        instead of copying each record. See
+        `event_file_loader.RawEventFileLoader`.
+      decode_processes: The number of worker processes in which to decode
+        events, shared by all runs. If 0, events are decoded on the threads
+        that reload runs. See `event_file_loader.ParallelEventFileLoader`.
+      plugin_names: If not None, only load the data of the plugins with
+        these names. See `event_filter.EventFilter`.
+      tag_pattern: If not None, only load the tags that contain a match for
+        this regular expression.
+      prefetch_threads: The number of I/O threads that read events files
+        ahead of the threads that reload runs, shared by all runs. If 0,
+        files are read on the reload threads. See
+        `record_prefetcher.RecordPrefetcher`.
+      prefetch_bytes: The maximum number of bytes that the I/O threads read
+        ahead for all runs together.
+      discovery_threads: The number of threads that `AddRunsFromDirectory`
+        uses to scan local directories for new runs. See
+        `logdir_discovery.LogdirDiscoverer`.
+      concurrent_writers: Whether to load the events files of different
+        writers in a run concurrently. See
+        `directory_watcher.MultiWriterDirectoryWatcher`.
+      snapshot_dir: If not None, a local directory in which to save a
+        snapshot of the data loaded for each run, which is restored when the
+        run is added again (such as after a restart), so that loading resumes
+        where it left off. See `snapshot_store.SnapshotStore`.
+      snapshot_interval: How often to save the snapshot of a run, in
+        seconds, if more of it has been loaded since.
+      reload_workers: The number of worker processes in which to load runs,
+        each of which owns the runs assigned to it and sends what changed
+        after each reload back to this process. If 0, runs are loaded on the
+        reload threads of this process. `decode_processes` is ignored with
+        worker processes, and `prefetch_threads` threads are started in each
+        worker. See `reload_workers.ReloadWorkers`.
+      max_reload_backoff: If positive, `Reload` skips the runs that have had
+        no new data for a while, waiting up to this many seconds between two
+        reloads of a run, unless its local directory changes. If 0, runs are
+        reloaded each time. See `reload_scheduler.ReloadScheduler`.
+      lazy_load: Whether to only load a run once its data is asked for
+        (such as by `Tensors`), or once it is among the `warm_runs` runs
+        whose directories changed last, which `Reload` loads ahead of time.
+        The runs whose tags are listed by `PluginRunToTagToContent` before
+        they are loaded are queued, and `Reload` loads up to `warm_runs` of
+        them (at least one) at a time. Until then, other runs are listed
+        without any tags, and only read to tell `FirstEventTimestamp`.
+      warm_runs: With `lazy_load`, the number of runs to load ahead of time.
+      max_memory_bytes: If positive, roughly how many bytes the data of all
+        runs may take (see `EventAccumulator.MemoryUsage`). After each
+        `Reload`, the runs whose data was asked for least recently are
+        unloaded until their data fits. Unloaded runs are still listed with
+        their tags, summary metadata and plugin content, and are only loaded
+        again once the data of one of their tags is asked for.
     """
     logger.info('Event Multiplexer initializing.')
     self._accumulators_mutex = threading.Lock()
     self._accumulators = {}
     self._paths = {}
     self._reload_called = False
+    self._discovery_threads = discovery_threads
+    self._concurrent_writers = concurrent_writers
+    # A `LogdirDiscoverer` for each local path given to AddRunsFromDirectory.
+    self._discoverers = {}
     self._size_guidance = (size_guidance or
                            event_accumulator.DEFAULT_SIZE_GUIDANCE)
     self._tensor_size_guidance = tensor_size_guidance
     self.purge_orphaned_data = purge_orphaned_data
     self._max_reload_threads = max_reload_threads or 1
+    self._use_mmap = use_mmap
+    self._plugin_names = plugin_names
+    self._tag_pattern = tag_pattern
+    self._lazy_load = lazy_load
+    self._warm_runs = warm_runs
+    # With `lazy_load`, the names of the runs loaded ahead of time, and of
+    # the runs whose tags were listed before they were ever loaded.
+    self._warmed = set()
+    self._listed = set()
+    self._max_memory_bytes = max_memory_bytes
+    # With `max_memory_bytes`, the memory usage of each loaded run after its
+    # last reload, and when its data was last asked for, as a count of uses.
+    self._memory_usage = {}
+    self._last_used = {}
+    self._uses = itertools.count()
+    if reload_workers > 0:
+      if decode_processes > 0:
+        logger.warn('Not decoding events in separate processes, since runs '
+                    'are loaded by reload worker processes')
+      self._reload_workers = reload_workers_lib.ReloadWorkers(
+          reload_workers,
+          size_guidance=self._size_guidance,
+          tensor_size_guidance=self._tensor_size_guidance,
+          purge_orphaned_data=self.purge_orphaned_data,
+          use_mmap=self._use_mmap,
+          plugin_names=self._plugin_names,
+          tag_pattern=self._tag_pattern,
+          prefetch_threads=prefetch_threads,
+          prefetch_bytes=prefetch_bytes,
+          concurrent_writers=self._concurrent_writers,
+          snapshot_dir=snapshot_dir,
+          snapshot_config=self._SnapshotConfig(),
+          snapshot_interval=snapshot_interval)
+      decode_processes = 0
+      prefetch_threads = 0
+      snapshot_dir = None
+    else:
+      self._reload_workers = None
+    if decode_processes > 0:
+      logger.info('Starting %d processes to decode events', decode_processes)
+      self._decode_pool = multiprocessing.Pool(decode_processes)
+    else:
+      self._decode_pool = None
+    if prefetch_threads > 0:
+      logger.info('Starting %d threads to prefetch events', prefetch_threads)
+      self._prefetcher = record_prefetcher.RecordPrefetcher(
+          max_bytes=prefetch_bytes, num_threads=prefetch_threads)
+    else:
+      self._prefetcher = None
+    if snapshot_dir:
+      self._snapshot_store = snapshot_store.SnapshotStore(
+          snapshot_dir, config=self._SnapshotConfig(),
+          save_interval=snapshot_interval)
+    else:
+      self._snapshot_store = None
+    if max_reload_backoff > 0:
+      self._reload_scheduler = reload_scheduler.ReloadScheduler(
+          max_reload_backoff)
+    else:
+      self._reload_scheduler = None
     if run_path_map is not None:
       logger.info('Event Multplexer doing initialization load for %s',
                       run_path_map)
@@ -121,7 +268,8 @@ class EventMultiplexer(object):
       accumulator.
 
     If `Reload` has been called, it will `Reload` the newly created
-    accumulators.
+    accumulators. With `lazy_load`, the run is only loaded once its data is
+    asked for.
 
     Args:
       path: Path to the event files (or event directory) for given run.
@@ -131,6 +279,10 @@ class EventMultiplexer(object):
       The `EventMultiplexer`.
     """
     name = name or path
+    if self._lazy_load:
+      return self._AddUnloadedRun(path, name)
+    if self._reload_workers is not None:
+      return self._AddRemoteRun(path, name)
     accumulator = None
     with self._accumulators_mutex:
       if name not in self._accumulators or self._paths[name] != path:
@@ -139,19 +291,123 @@ class EventMultiplexer(object):
           # with a new path (just give the new path a distinct name)
           logger.warn('Conflict for name %s: old path %s, new path %s',
                              name, self._paths[name], path)
-        logger.info('Constructing EventAccumulator for %s', path)
-        accumulator = event_accumulator.EventAccumulator(
-            path,
-            size_guidance=self._size_guidance,
-            tensor_size_guidance=self._tensor_size_guidance,
-            purge_orphaned_data=self.purge_orphaned_data)
+        accumulator = self._CreateAccumulator(path)
         self._accumulators[name] = accumulator
         self._paths[name] = path
     if accumulator:
+      if self._snapshot_store is not None:
+        self._snapshot_store.RestoreAccumulator(accumulator)
       if self._reload_called:
         accumulator.Reload()
     return self
 
+  def _CreateAccumulator(self, path):
+    """Returns a new `EventAccumulator` for a run that is loaded here."""
+    logger.info('Constructing EventAccumulator for %s', path)
+    return event_accumulator.EventAccumulator(
+        path,
+        size_guidance=self._size_guidance,
+        tensor_size_guidance=self._tensor_size_guidance,
+        purge_orphaned_data=self.purge_orphaned_data,
+        use_mmap=self._use_mmap,
+        decode_pool=self._decode_pool,
+        event_filter=self._CreateEventFilter(),
+        prefetcher=self._prefetcher,
+        concurrent_writers=self._concurrent_writers)
+
+  def _AddRemoteRun(self, path, name):
+    """Like `AddRun`, for a run that is loaded by a reload worker.
+
+    Adding the run to a worker may wait for the worker to finish a reload,
+    so it is done without holding the lock on the accumulators.
+    """
+    with self._accumulators_mutex:
+      if name in self._accumulators and self._paths[name] == path:
+        return self
+    logger.info('Adding %s to a reload worker', path)
+    accumulator = self._reload_workers.AddRun(path)
+    with self._accumulators_mutex:
+      replaced = self._accumulators.get(name)
+      if replaced is not None and self._paths[name] == path:
+        # Another thread added the same run in the meantime.
+        replaced, accumulator = accumulator, None
+      else:
+        if replaced is not None:
+          logger.warn('Conflict for name %s: old path %s, new path %s',
+                      name, self._paths[name], path)
+        self._accumulators[name] = accumulator
+        self._paths[name] = path
+    if replaced is not None:
+      self._reload_workers.RemoveRun(replaced)
+    if accumulator is not None and self._reload_called:
+      self._reload_workers.Reload([accumulator])
+    return self
+
+  def _AddUnloadedRun(self, path, name):
+    """Like `AddRun`, for a run that is not loaded until it is asked for."""
+    with self._accumulators_mutex:
+      if name in self._accumulators and self._paths[name] == path:
+        return self
+    unloaded = _UnloadedAccumulator(path)
+    with self._accumulators_mutex:
+      replaced = self._accumulators.get(name)
+      if replaced is not None and self._paths[name] == path:
+        return self
+      if replaced is not None:
+        logger.warn('Conflict for name %s: old path %s, new path %s',
+                    name, self._paths[name], path)
+      self._accumulators[name] = unloaded
+      self._paths[name] = path
+    if (self._reload_workers is not None and replaced is not None and
+        not isinstance(replaced, _UnloadedAccumulator)):
+      self._reload_workers.RemoveRun(replaced)
+    return self
+
+  def _LoadRun(self, name):
+    """Starts loading a run that is not loaded, with `lazy_load`.
+
+    The placeholder of the run is replaced with an accumulator (restored
+    from its snapshot, if any), which the caller must then reload.
+
+    Returns:
+      Whether the run was replaced, rather than already loaded or removed.
+    """
+    with self._accumulators_mutex:
+      unloaded = self._accumulators.get(name)
+      if not isinstance(unloaded, _UnloadedAccumulator):
+        return False
+      path = self._paths[name]
+    if self._reload_workers is not None:
+      accumulator = self._reload_workers.AddRun(path)
+    else:
+      accumulator = self._CreateAccumulator(path)
+      if self._snapshot_store is not None:
+        self._snapshot_store.RestoreAccumulator(accumulator)
+    with self._accumulators_mutex:
+      replaced = self._accumulators.get(name) is unloaded
+      if replaced:
+        self._accumulators[name] = accumulator
+    if not replaced and self._reload_workers is not None:
+      self._reload_workers.RemoveRun(accumulator)
+    return replaced
+
+  def _CreateEventFilter(self):
+    """Returns an `EventFilter` for a new run, or None to load everything."""
+    if self._plugin_names is None and not self._tag_pattern:
+      return None
+    return event_filter.EventFilter(self._plugin_names, self._tag_pattern)
+
+  def _SnapshotConfig(self):
+    """Returns what snapshots of runs depend on, other than their files."""
+    return (
+        sorted(six.iteritems(self._size_guidance)),
+        sorted(six.iteritems(self._tensor_size_guidance or {})),
+        self.purge_orphaned_data,
+        None if self._plugin_names is None else sorted(self._plugin_names),
+        self._tag_pattern or None,
+        self._concurrent_writers,
+    )
+
   def AddRunsFromDirectory(self, path, name=None):
     """Load runs from a directory; recursively walks subdirectories.
 
@@ -165,6 +421,12 @@ class EventMultiplexer(object):
 
     If the `EventMultiplexer` is already loaded this will cause
     the newly created accumulators to `Reload()`.
+
+    For local paths, the tree of directories is remembered from one call to
+    the next, and only the directories that have changed are listed again.
+    Runs are added (and reloaded) as soon as they are found, while the rest
+    of the tree is scanned in the background.
+
     Args:
       path: A string path to a directory to load runs from.
       name: Optionally, what name to apply to the runs. If name is provided
@@ -180,7 +442,16 @@ class EventMultiplexer(object):
       The `EventMultiplexer`.
     """
     logger.info('Starting AddRunsFromDirectory: %s', path)
-    for subdir in io_wrapper.GetLogdirSubdirectories(path):
+    if logdir_discovery.IsSupported(path):
+      with self._accumulators_mutex:
+        if path not in self._discoverers:
+          self._discoverers[path] = logdir_discovery.LogdirDiscoverer(
+              path, num_threads=self._discovery_threads)
+        discoverer = self._discoverers[path]
+      subdirs = discoverer.Discover()
+    else:
+      subdirs = io_wrapper.GetLogdirSubdirectories(path)
+    for subdir in subdirs:
       logger.info('Adding run from directory %s', subdir)
       rpath = os.path.relpath(subdir, path)
       subname = os.path.join(name, rpath) if name else rpath
@@ -188,22 +459,52 @@ class EventMultiplexer(object):
     logger.info('Done with AddRunsFromDirectory: %s', path)
     return self
 
-  def Reload(self):
-    """Call `Reload` on every `EventAccumulator`."""
+  def Reload(self, runs=None):
+    """Call `Reload` on every `EventAccumulator`.
+
+    With `max_reload_backoff`, only the runs that are due are reloaded,
+    unless `runs` is given. With `lazy_load`, only the runs that are loaded
+    are reloaded, and some of the others are loaded: the `warm_runs` runs
+    whose directories changed last, and the runs whose tags were listed.
+
+    Args:
+      runs: If not None, only reload the runs with these names.
+
+    Returns:
+      The `EventMultiplexer`.
+    """
     logger.info('Beginning EventMultiplexer.Reload()')
     self._reload_called = True
+    if self._lazy_load and runs is None:
+      self._WarmRuns()
     # Build a list so we're safe even if the list of accumulators is modified
     # even while we're reloading.
     with self._accumulators_mutex:
-      items = list(self._accumulators.items())
+      items = [(name, accumulator)
+               for (name, accumulator) in self._accumulators.items()
+               if (runs is None or name in runs) and
+               not isinstance(accumulator, _UnloadedAccumulator)]
+    if self._reload_scheduler is not None:
+      num_runs = len(items)
+      items = self._reload_scheduler.Select(items, wake=runs is not None)
+      logger.info('Reloading %d of %d runs', len(items), num_runs)
     items_queue = queue.Queue()
     for item in items:
       items_queue.put(item)
 
+    if self._reload_workers is not None:
+      (deleted, filesystem_calls) = self._reload_workers.Reload(
+          [accumulator for (_, accumulator) in items])
+      names_to_delete = set(
+          name for (name, accumulator) in items if accumulator in deleted)
+      return self._FinishReload(items, names_to_delete, filesystem_calls)
+
     # Methods of built-in python containers are thread-safe so long as the GIL
     # for the thread exists, but we might as well be careful.
     names_to_delete = set()
     names_to_delete_mutex = threading.Lock()
+    # The file system calls of the watchers of all runs in this reload.
+    filesystem_calls = collections.Counter()
 
     def Worker():
       """Keeps reloading accumulators til none are left."""
@@ -214,6 +515,7 @@ class EventMultiplexer(object):
           # No more runs to reload.
           break
 
+        calls_before = accumulator.FilesystemCalls()
         try:
           accumulator.Reload()
         except (OSError, IOError) as e:
@@ -221,7 +523,14 @@ class EventMultiplexer(object):
         except directory_watcher.DirectoryDeletedError:
           with names_to_delete_mutex:
             names_to_delete.add(name)
+        else:
+          if self._snapshot_store is not None:
+            self._snapshot_store.MaybeSaveAccumulator(accumulator)
         finally:
+          calls = accumulator.FilesystemCalls()
+          calls.subtract(calls_before)
+          with names_to_delete_mutex:
+            filesystem_calls.update(calls)
           items_queue.task_done()
 
     if self._max_reload_threads > 1:
@@ -238,14 +547,133 @@ class EventMultiplexer(object):
           'Reloading runs serially (one after another) on the main '
           'thread.')
       Worker()
+    return self._FinishReload(items, names_to_delete, filesystem_calls)
+
+  def _WarmRuns(self):
+    """Starts loading some of the runs that have never been loaded.
 
+    The runs whose directories changed last are loaded until `warm_runs` of
+    the runs loaded ahead of time are loaded, then up to `warm_runs` (at
+    least one) of the runs whose tags were listed. Only the runs that are
+    not loaded are ranked, by the modification times that the discoverers
+    of their logdirs saw, so nothing is stat'ed. Other runs, such as remote
+    ones, are ranked by name.
+    """
+    with self._accumulators_mutex:
+      # Runs that were unloaded to save memory are only loaded on demand.
+      unloaded = [name for (name, accumulator)
+                  in six.iteritems(self._accumulators)
+                  if isinstance(accumulator, _UnloadedAccumulator) and
+                  not accumulator.evicted]
+      self._warmed = set(
+          name for name in self._warmed
+          if name in self._accumulators and
+          not isinstance(self._accumulators[name], _UnloadedAccumulator))
+      self._listed.intersection_update(unloaded)
+      queued = set(self._listed)
+      paths = {name: self._paths[name] for name in unloaded}
+      discoverers = list(self._discoverers.values())
+      num_warm = max(self._warm_runs - len(self._warmed), 0)
+    mtimes = {}
+    for (name, path) in six.iteritems(paths):
+      mtimes[name] = max([discoverer.ModificationTime(path) or 0
+                          for discoverer in discoverers] or [0])
+    ranked = sorted(unloaded, key=lambda name: (mtimes[name], name),
+                    reverse=True)
+    warm = [name for name in ranked[:num_warm] if self._LoadRun(name)]
+    if warm:
+      logger.info('Loading %d more runs ahead of time', len(warm))
+    listed = [name for name in ranked[num_warm:]
+              if name in queued][:max(self._warm_runs, 1)]
+    num_listed = sum(self._LoadRun(name) for name in listed)
+    if num_listed:
+      logger.info('Loading %d runs whose tags were listed', num_listed)
+    with self._accumulators_mutex:
+      self._warmed.update(warm)
+      self._listed.difference_update(listed)
+
+  def _GetLoadedAccumulator(self, run):
+    """Like `GetAccumulator`, but loads the run first if it is not loaded."""
+    accumulator = self.GetAccumulator(run)
+    if self._max_memory_bytes > 0:
+      with self._accumulators_mutex:
+        self._last_used[run] = next(self._uses)
+    if isinstance(accumulator, _UnloadedAccumulator):
+      logger.info('Loading run %r on demand', run)
+      self._LoadRun(run)
+      self.Reload({run})
+      accumulator = self.GetAccumulator(run)
+    return accumulator
+
+  def _FinishReload(self, items, names_to_delete, filesystem_calls):
+    """Removes the runs whose directories were deleted during `Reload`."""
+    if self._reload_scheduler is not None:
+      self._reload_scheduler.Update(items)
+      self._reload_scheduler.Forget(names_to_delete)
+    deleted_paths = []
     with self._accumulators_mutex:
       for name in names_to_delete:
         logger.warn('Deleting accumulator %r', name)
-        del self._accumulators[name]
-    logger.info('Finished with EventMultiplexer.Reload()')
+        deleted_paths.append(self._accumulators.pop(name).path)
+    if self._snapshot_store is not None:
+      for path in deleted_paths:
+        self._snapshot_store.Forget(path)
+    if self._max_memory_bytes > 0:
+      self._UpdateMemoryUsage(items)
+    logger.info('Finished with EventMultiplexer.Reload(), with %d file system '
+                'calls to list directories and %d to stat paths',
+                filesystem_calls['listdir'], filesystem_calls['stat'])
     return self
 
+  def _UpdateMemoryUsage(self, items):
+    """Unloads the least recently used runs if their data is too big.
+
+    Args:
+      items: The `(name, accumulator)` pairs of the runs just reloaded.
+    """
+    usages = [(name, accumulator, accumulator.MemoryUsage())
+              for (name, accumulator) in items]
+    with self._accumulators_mutex:
+      for (name, accumulator, usage) in usages:
+        if self._accumulators.get(name) is accumulator:
+          self._memory_usage[name] = usage
+      for name in list(self._memory_usage):
+        accumulator = self._accumulators.get(name)
+        if accumulator is None or isinstance(accumulator,
+                                             _UnloadedAccumulator):
+          del self._memory_usage[name]
+      for name in set(self._last_used) - set(self._accumulators):
+        del self._last_used[name]
+      total = sum(sum(six.itervalues(usage))
+                  for usage in six.itervalues(self._memory_usage))
+      if total <= self._max_memory_bytes:
+        return
+      # The run used last is kept, even if its data alone is too big.
+      names = sorted(self._memory_usage,
+                     key=lambda name: self._last_used.get(name, -1))[:-1]
+      evicted = []
+      for name in names:
+        if total <= self._max_memory_bytes:
+          break
+        total -= sum(six.itervalues(self._memory_usage.pop(name)))
+        evicted.append((name, self._accumulators[name]))
+    logger.info('Unloading %d runs to keep their data under %d bytes',
+                len(evicted), self._max_memory_bytes)
+    for (name, accumulator) in evicted:
+      self._UnloadRun(name, accumulator)
+
+  def _UnloadRun(self, name, accumulator):
+    """Replaces the accumulator of a run with a placeholder of its tags."""
+    unloaded = _UnloadedAccumulator(accumulator.path, evicted=accumulator)
+    with self._accumulators_mutex:
+      if self._accumulators.get(name) is not accumulator:
+        return
+      self._accumulators[name] = unloaded
+    if self._reload_workers is not None:
+      self._reload_workers.RemoveRun(accumulator)
+    elif self._snapshot_store is not None:
+      self._snapshot_store.MaybeSaveAccumulator(accumulator)
+
   def PluginAssets(self, plugin_name):
     """Get index of runs and assets for a given plugin.
 
@@ -276,7 +704,7 @@ class EventMultiplexer(object):
     Raises:
       KeyError: If the asset is not available.
     """
-    accumulator = self.GetAccumulator(run)
+    accumulator = self._GetLoadedAccumulator(run)
     return accumulator.RetrievePluginAsset(plugin_name, asset_name)
 
   def FirstEventTimestamp(self, run):
@@ -313,9 +741,44 @@ class EventMultiplexer(object):
     Returns:
       An array of `event_accumulator.ScalarEvents`.
     """
-    accumulator = self.GetAccumulator(run)
+    accumulator = self._GetLoadedAccumulator(run)
     return accumulator.Scalars(tag)
 
+  def ScalarColumns(self, run, tag):
+    """Retrieve the scalars associated with a run and tag, as arrays.
+
+    Args:
+      run: A string name of the run for which values are retrieved.
+      tag: A string name of the tag for which values are retrieved.
+
+    Raises:
+      KeyError: If the run is not found, or the tag is not available for
+        the given run.
+
+    Returns:
+      An `event_accumulator.ScalarColumns` of numpy arrays.
+    """
+    accumulator = self._GetLoadedAccumulator(run)
+    return accumulator.ScalarColumns(tag)
+
+  def ScalarBuckets(self, run, tag, max_points):
+    """Retrieve aggregates of the scalars of a run and tag over steps.
+
+    Args:
+      run: A string name of the run for which values are retrieved.
+      tag: A string name of the tag for which values are retrieved.
+      max_points: The most buckets to return; at least 1.
+
+    Raises:
+      KeyError: If the run is not found, or the tag is not available for
+        the given run.
+
+    Returns:
+      An `event_accumulator.ScalarBuckets` of numpy arrays.
+    """
+    accumulator = self._GetLoadedAccumulator(run)
+    return accumulator.ScalarBuckets(tag, max_points)
+
   def Graph(self, run):
     """Retrieve the graph associated with the provided run.
 
@@ -329,7 +792,7 @@ class EventMultiplexer(object):
     Returns:
       The `GraphDef` protobuf data structure.
     """
-    accumulator = self.GetAccumulator(run)
+    accumulator = self._GetLoadedAccumulator(run)
     return accumulator.Graph()
 
   def MetaGraph(self, run):
@@ -345,7 +808,7 @@ class EventMultiplexer(object):
     Returns:
       The `MetaGraphDef` protobuf data structure.
     """
-    accumulator = self.GetAccumulator(run)
+    accumulator = self._GetLoadedAccumulator(run)
     return accumulator.MetaGraph()
 
   def RunMetadata(self, run, tag):
@@ -362,7 +825,7 @@ class EventMultiplexer(object):
     Returns:
       The metadata in the form of `RunMetadata` protobuf data structure.
     """
-    accumulator = self.GetAccumulator(run)
+    accumulator = self._GetLoadedAccumulator(run)
     return accumulator.RunMetadata(tag)
 
   def Audio(self, run, tag):
@@ -379,7 +842,7 @@ class EventMultiplexer(object):
     Returns:
       An array of `event_accumulator.AudioEvents`.
     """
-    accumulator = self.GetAccumulator(run)
+    accumulator = self._GetLoadedAccumulator(run)
     return accumulator.Audio(tag)
 
   def Tensors(self, run, tag):
@@ -396,7 +859,7 @@ class EventMultiplexer(object):
     Returns:
       An array of `event_accumulator.TensorEvent`s.
     """
-    accumulator = self.GetAccumulator(run)
+    accumulator = self._GetLoadedAccumulator(run)
     return accumulator.Tensors(tag)
 
   def PluginRunToTagToContent(self, plugin_name):
@@ -405,12 +868,20 @@ class EventMultiplexer(object):
     The `content` referred above is the content field of the PluginData proto
     for the specified plugin within a Summary.Value proto.
 
+    With `lazy_load`, the runs that have never been loaded are listed
+    without any tags, and queued to be loaded by the next calls to `Reload`.
+
     Args:
       plugin_name: The name of the plugin for which to fetch content.
 
     Returns:
       A dictionary of the form {run: {tag: content}}.
     """
+    with self._accumulators_mutex:
+      self._listed.update(
+          name for (name, accumulator) in six.iteritems(self._accumulators)
+          if isinstance(accumulator, _UnloadedAccumulator) and
+          not accumulator.evicted)
     mapping = {}
     for run in self.Runs():
       try:
@@ -439,6 +910,11 @@ class EventMultiplexer(object):
       A `SummaryMetadata` protobuf.
     """
     accumulator = self.GetAccumulator(run)
+    if (isinstance(accumulator, _UnloadedAccumulator) and
+        tag in accumulator.summary_metadata):
+      # The metadata of a run that was unloaded is kept.
+      return accumulator.SummaryMetadata(tag)
+    accumulator = self._GetLoadedAccumulator(run)
     return accumulator.SummaryMetadata(tag)
 
   def Runs(self):
@@ -459,6 +935,33 @@ class EventMultiplexer(object):
     """Returns a dict mapping run names to event file paths."""
     return self._paths
 
+  def ReloadSchedule(self):
+    """Returns when each run is reloaded, for debugging.
+
+    Returns:
+      A dict mapping each run name to its schedule, as returned by
+      `reload_scheduler.ReloadScheduler.Schedule`. It is empty unless
+      `max_reload_backoff` is positive.
+    """
+    if self._reload_scheduler is None:
+      return {}
+    return self._reload_scheduler.Schedule()
+
+  def MemoryUsage(self):
+    """Returns roughly how many bytes the data of each loaded run takes.
+
+    Returns:
+      A dict mapping each run name to a dict mapping plugin names to
+      numbers of bytes, as returned by `EventAccumulator.MemoryUsage`.
+    """
+    with self._accumulators_mutex:
+      if self._max_memory_bytes > 0:
+        return dict(self._memory_usage)
+      items = [(name, accumulator)
+               for (name, accumulator) in six.iteritems(self._accumulators)
+               if not isinstance(accumulator, _UnloadedAccumulator)]
+    return {name: accumulator.MemoryUsage() for (name, accumulator) in items}
+
   def GetAccumulator(self, run):
     """Returns EventAccumulator for a given run.
 
@@ -473,3 +976,79 @@ class EventMultiplexer(object):
     """
     with self._accumulators_mutex:
       return self._accumulators[run]
+
+
+class _UnloadedAccumulator(event_accumulator.MirrorAccumulator):
+  """Stands for a run that is not loaded, with `lazy_load`, or was unloaded.
+
+  It holds no data, and tells the timestamp of the first event of the run
+  without loading it. A run that was unloaded to save memory keeps its tags,
+  summary metadata and plugin content, so that it is still listed with
+  them.
+
+  Attributes:
+    evicted: Whether the run was unloaded to save memory.
+  """
+
+  def __init__(self, path, evicted=None):
+    """Creates the placeholder of a run.
+
+    Args:
+      path: The path of the events of the run.
+      evicted: If not None, the accumulator of the run, which is unloaded to
+        save memory.
+    """
+    super(_UnloadedAccumulator, self).__init__(path)
+    self._first_event_timestamp_lock = threading.Lock()
+    self.evicted = evicted is not None
+    # The tags of the run when it was unloaded, or None.
+    self._tags = None
+    if evicted is not None:
+      try:
+        self._first_event_timestamp = evicted.FirstEventTimestamp()
+      except ValueError:
+        pass
+      self._tags = evicted.Tags()
+      for (tag, metadata) in six.iteritems(dict(evicted.summary_metadata)):
+        self.summary_metadata[tag] = metadata
+        plugin_name = metadata.plugin_data.plugin_name
+        if plugin_name:
+          self._plugin_to_tag_to_content[plugin_name][tag] = (
+              metadata.plugin_data.content)
+
+  def Tags(self):
+    """Returns the tags of the run when it was unloaded, if it was."""
+    if self._tags is not None:
+      return self._tags
+    return super(_UnloadedAccumulator, self).Tags()
+
+  def FirstEventTimestamp(self):
+    """Returns the timestamp in seconds of the first event of the run.
+
+    Only the first record of the first events file that has one is read, and
+    the file is closed right away. The timestamp is then cached.
+
+    Raises:
+      ValueError: If there are no events on disk.
+    """
+    with self._first_event_timestamp_lock:
+      if self._first_event_timestamp is None:
+        self._first_event_timestamp = self._ReadFirstEventTimestamp()
+      return self._first_event_timestamp
+
+  def _ReadFirstEventTimestamp(self):
+    if io_wrapper.IsTensorFlowEventsFile(self.path):
+      paths = [self.path]
+    else:
+      paths = sorted(path
+                     for path in io_wrapper.ListDirectoryAbsolute(self.path)
+                     if io_wrapper.IsTensorFlowEventsFile(path))
+    for path in paths:
+      loader = event_file_loader.RawEventFileLoader(path)
+      try:
+        records = loader.LoadBatch(max_records=1)
+      finally:
+        loader.Close()
+      if records:
+        return event_pb2.Event.FromString(records[0]).wall_time
+    raise ValueError('No event timestamp could be found')
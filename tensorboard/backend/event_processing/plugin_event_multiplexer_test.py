@@ -17,14 +17,20 @@ from __future__ import absolute_import
 from __future__ import division
 from __future__ import print_function
 
+import collections
 import os
 import os.path
 import shutil
+import time
 
 import tensorflow as tf
 
+from tensorboard.backend.event_processing import event_file_loader
 from tensorboard.backend.event_processing import plugin_event_accumulator as event_accumulator  # pylint: disable=line-too-long
 from tensorboard.backend.event_processing import plugin_event_multiplexer as event_multiplexer  # pylint: disable=line-too-long
+from tensorboard.backend.event_processing import reload_scheduler
+from tensorboard.plugins.scalar import summary as scalar_summary
+from tensorboard.util import test_util
 
 
 def _AddEvents(path):
@@ -85,12 +91,22 @@ class _FakeAccumulator(object):
   def Reload(self):
     self.reload_called = True
 
+  def FilesystemCalls(self):
+    return collections.Counter()
+
 
 def _GetFakeAccumulator(path,
                         size_guidance=None,
                         tensor_size_guidance=None,
-                        purge_orphaned_data=None):
+                        purge_orphaned_data=None,
+                        use_mmap=None,
+                        decode_pool=None,
+                        event_filter=None,
+                        prefetcher=None,
+                        concurrent_writers=False):
   del size_guidance, tensor_size_guidance, purge_orphaned_data  # Unused.
+  del use_mmap, decode_pool, event_filter, prefetcher  # Unused.
+  del concurrent_writers  # Unused.
   return _FakeAccumulator(path)
 
 
@@ -126,6 +142,15 @@ class EventMultiplexerTest(tf.test.TestCase):
     self.assertTrue(x.GetAccumulator('run1').reload_called)
     self.assertTrue(x.GetAccumulator('run2').reload_called)
 
+  def testReloadSomeRuns(self):
+    x = event_multiplexer.EventMultiplexer(
+        {'run1': 'path1', 'run2': 'path2', 'run3': 'path3'},
+        max_reload_threads=2)
+    x.Reload(runs=['run1', 'run3'])
+    self.assertTrue(x.GetAccumulator('run1').reload_called)
+    self.assertFalse(x.GetAccumulator('run2').reload_called)
+    self.assertTrue(x.GetAccumulator('run3').reload_called)
+
   def testPluginRunToTagToContent(self):
     """Tests the method that produces the run to tag to content mapping."""
     x = event_multiplexer.EventMultiplexer({'run1': 'path1', 'run2': 'path2'})
@@ -377,6 +402,301 @@ class EventMultiplexerWithRealAccumulatorTest(tf.test.TestCase):
     x.Reload()
     self.assertNotIn('run2', x.Runs().keys())
 
+  def testRestoresSnapshots(self):
+    logdir = os.path.join(self.get_temp_dir(), 'logdir')
+    snapshot_dir = os.path.join(self.get_temp_dir(), 'snapshots')
+    writer = test_util.FileWriter(os.path.join(logdir, 'run1'))
+    for step in range(5):
+      writer.add_summary(scalar_summary.pb('loss', step), global_step=step)
+    writer.flush()
+    x = event_multiplexer.EventMultiplexer(snapshot_dir=snapshot_dir)
+    x.AddRunsFromDirectory(logdir)
+    x.Reload()
+    self.assertEqual(len(os.listdir(snapshot_dir)), 1)
+
+    # A new multiplexer has the data of the run before reloading it.
+    for step in range(5, 10):
+      writer.add_summary(scalar_summary.pb('loss', step), global_step=step)
+    writer.close()
+    x = event_multiplexer.EventMultiplexer(snapshot_dir=snapshot_dir)
+    x.AddRunsFromDirectory(logdir)
+    self.assertEqual([e.step for e in x.Scalars('run1', 'loss/scalar_summary')],
+                     list(range(5)))
+    x.Reload()
+    self.assertEqual([e.step for e in x.Scalars('run1', 'loss/scalar_summary')],
+                     list(range(10)))
+
+    # Snapshots of other configurations are ignored.
+    x = event_multiplexer.EventMultiplexer(
+        snapshot_dir=snapshot_dir, purge_orphaned_data=False)
+    x.AddRunsFromDirectory(logdir)
+    self.assertEqual(x.Runs()['run1'][event_accumulator.TENSORS], [])
+
+  def testReloadWorkers(self):
+    logdir = os.path.join(self.get_temp_dir(), 'logdir')
+    writers = [test_util.FileWriter(os.path.join(logdir, run))
+               for run in ('run1', 'run2', 'run3')]
+    for writer in writers:
+      for step in range(5):
+        writer.add_summary(scalar_summary.pb('loss', step), global_step=step)
+      writer.flush()
+    x = event_multiplexer.EventMultiplexer(reload_workers=2)
+    x.AddRunsFromDirectory(logdir)
+    x.Reload()
+    self.assertItemsEqual(x.Runs().keys(), ['run1', 'run2', 'run3'])
+    self.assertEqual([e.step for e in x.Scalars('run2', 'loss/scalar_summary')],
+                     list(range(5)))
+    for step in range(5, 10):
+      writers[1].add_summary(scalar_summary.pb('loss', step), global_step=step)
+    writers[1].flush()
+    x.Reload()
+    self.assertEqual([e.step for e in x.Scalars('run2', 'loss/scalar_summary')],
+                     list(range(10)))
+    self.assertItemsEqual(x.PluginRunToTagToContent('scalars')['run3'],
+                          ['loss/scalar_summary'])
+    self.assertGreater(x.FirstEventTimestamp('run3'), 0)
+
+  def testReloadBackoff(self):
+    logdir = os.path.join(self.get_temp_dir(), 'logdir')
+    writers = [test_util.FileWriter(os.path.join(logdir, run))
+               for run in ('run1', 'run2')]
+    for writer in writers:
+      writer.add_summary(scalar_summary.pb('loss', 0), global_step=0)
+      writer.flush()
+    now = [time.time()]
+    for run in ('run1', 'run2'):
+      os.utime(os.path.join(logdir, run), (now[0] - 10, now[0] - 10))
+    x = event_multiplexer.EventMultiplexer(max_reload_backoff=60)
+    x.AddRunsFromDirectory(logdir)
+    with tf.compat.v1.test.mock.patch.object(
+        reload_scheduler.time, 'time', side_effect=lambda: now[0]):
+      for step in range(1, 10):
+        writers[0].add_summary(scalar_summary.pb('loss', step),
+                               global_step=step)
+        writers[0].flush()
+        writers[1].add_summary(scalar_summary.pb('loss', step),
+                               global_step=step)
+        x.Reload()
+        now[0] += 5
+      schedule = x.ReloadSchedule()
+      self.assertEqual(schedule['run1']['skipped_reloads'], 0)
+      self.assertGreater(schedule['run2']['skipped_reloads'], 0)
+      self.assertEqual(
+          [e.step for e in x.Scalars('run1', 'loss/scalar_summary')],
+          list(range(10)))
+      # Runs are always reloaded when asked for.
+      writers[1].flush()
+      x.Reload({'run2'})
+      self.assertEqual(
+          [e.step for e in x.Scalars('run2', 'loss/scalar_summary')],
+          list(range(10)))
+
+  def testLazyLoad(self):
+    logdir = os.path.join(self.get_temp_dir(), 'logdir')
+    writers = {}
+    for (i, run) in enumerate(('run1', 'run2', 'run3')):
+      writers[run] = test_util.FileWriter(os.path.join(logdir, run))
+      for step in range(5):
+        writers[run].add_summary(scalar_summary.pb('loss', step),
+                                 global_step=step)
+      writers[run].flush()
+      old = time.time() - 100 + i
+      os.utime(os.path.join(logdir, run), (old, old))
+    x = event_multiplexer.EventMultiplexer(lazy_load=True, warm_runs=1)
+    x.AddRunsFromDirectory(logdir)
+    x.Reload()
+    # Only the run that changed last is loaded ahead of time.
+    runs = x.Runs()
+    self.assertItemsEqual(runs.keys(), ['run1', 'run2', 'run3'])
+    self.assertEqual(runs['run1'][event_accumulator.TENSORS], [])
+    self.assertEqual(runs['run3'][event_accumulator.TENSORS],
+                     ['loss/scalar_summary'])
+    self.assertGreater(x.FirstEventTimestamp('run1'), 0)
+    self.assertEqual(x.Runs()['run1'][event_accumulator.TENSORS], [])
+
+    # Other runs are loaded when asked for, and reloaded from then on.
+    self.assertEqual(
+        [e.step for e in x.Tensors('run1', 'loss/scalar_summary')],
+        list(range(5)))
+    for run in ('run1', 'run2'):
+      writers[run].add_summary(scalar_summary.pb('loss', 5), global_step=5)
+      writers[run].flush()
+    x.Reload()
+    self.assertEqual(
+        [e.step for e in x.Tensors('run1', 'loss/scalar_summary')],
+        list(range(6)))
+    self.assertEqual(x.Runs()['run2'][event_accumulator.TENSORS], [])
+
+    # Listing the tags of the plugins loads nothing, but queues the runs
+    # that are not loaded for the next reload.
+    self.assertItemsEqual(x.PluginRunToTagToContent('scalars'),
+                          ['run1', 'run3'])
+    self.assertEqual(x.Runs()['run2'][event_accumulator.TENSORS], [])
+    x.Reload()
+    self.assertItemsEqual(x.PluginRunToTagToContent('scalars'),
+                          ['run1', 'run2', 'run3'])
+    self.assertEqual(
+        [e.step for e in x.Tensors('run2', 'loss/scalar_summary')],
+        list(range(6)))
+
+  def testLazyLoadQueuesListedRuns(self):
+    logdir = os.path.join(self.get_temp_dir(), 'logdir')
+    for (i, run) in enumerate(('run1', 'run2', 'run3', 'run4')):
+      writer = test_util.FileWriter(os.path.join(logdir, run))
+      writer.add_summary(scalar_summary.pb('loss', 0), global_step=0)
+      writer.close()
+      old = time.time() - 100 + i
+      os.utime(os.path.join(logdir, run), (old, old))
+    x = event_multiplexer.EventMultiplexer(lazy_load=True, warm_runs=1)
+    x.AddRunsFromDirectory(logdir)
+    x.Reload()
+    self.assertItemsEqual(x.PluginRunToTagToContent('scalars'), ['run4'])
+    # Each reload loads up to `warm_runs` of the listed runs, the newest
+    # first.
+    x.Reload()
+    self.assertItemsEqual(x.PluginRunToTagToContent('scalars'),
+                          ['run3', 'run4'])
+    x.Reload()
+    x.Reload()
+    self.assertItemsEqual(x.PluginRunToTagToContent('scalars'),
+                          ['run1', 'run2', 'run3', 'run4'])
+
+  def testLazyLoadRestoresSnapshots(self):
+    logdir = os.path.join(self.get_temp_dir(), 'logdir')
+    snapshot_dir = os.path.join(self.get_temp_dir(), 'snapshots')
+    writer = test_util.FileWriter(os.path.join(logdir, 'run1'))
+    for step in range(5):
+      writer.add_summary(scalar_summary.pb('loss', step), global_step=step)
+    writer.flush()
+    x = event_multiplexer.EventMultiplexer(
+        lazy_load=True, warm_runs=0, snapshot_dir=snapshot_dir)
+    x.AddRunsFromDirectory(logdir).Reload()
+    x.Tensors('run1', 'loss/scalar_summary')
+    self.assertEqual(len(os.listdir(snapshot_dir)), 1)
+
+    for step in range(5, 10):
+      writer.add_summary(scalar_summary.pb('loss', step), global_step=step)
+    writer.flush()
+    restored = []
+    restore = event_accumulator.EventAccumulator.Restore
+    def Restore(accumulator, snapshot):
+      restored.append(restore(accumulator, snapshot))
+      return restored[-1]
+    with tf.compat.v1.test.mock.patch.object(
+        event_accumulator.EventAccumulator, 'Restore', autospec=True,
+        side_effect=Restore):
+      x = event_multiplexer.EventMultiplexer(
+          lazy_load=True, warm_runs=0, snapshot_dir=snapshot_dir)
+      x.AddRunsFromDirectory(logdir).Reload()
+      # Telling the first timestamp of the run does not load it.
+      self.assertGreater(x.FirstEventTimestamp('run1'), 0)
+      self.assertEqual(restored, [])
+      self.assertEqual(
+          [e.step for e in x.Tensors('run1', 'loss/scalar_summary')],
+          list(range(10)))
+      self.assertEqual(restored, [True])
+
+  def testFirstEventTimestampOfUnloadedRun(self):
+    logdir = os.path.join(self.get_temp_dir(), 'logdir')
+    writer = test_util.FileWriter(os.path.join(logdir, 'run1'))
+    writer.add_summary(scalar_summary.pb('loss', 0), global_step=0)
+    writer.close()
+    expected = event_accumulator.EventAccumulator(
+        os.path.join(logdir, 'run1')).FirstEventTimestamp()
+    x = event_multiplexer.EventMultiplexer(lazy_load=True, warm_runs=0)
+    x.AddRunsFromDirectory(logdir).Reload()
+    closed = []
+    close = event_file_loader.RawEventFileLoader.Close
+    def Close(loader):
+      closed.append(loader)
+      close(loader)
+    with tf.compat.v1.test.mock.patch.object(
+        event_file_loader.RawEventFileLoader, 'Close', autospec=True,
+        side_effect=Close):
+      # The first record is read once, and its file is closed right away.
+      self.assertEqual(x.FirstEventTimestamp('run1'), expected)
+      self.assertEqual(len(closed), 1)
+      self.assertEqual(x.FirstEventTimestamp('run1'), expected)
+      self.assertEqual(len(closed), 1)
+    self.assertEqual(x.Runs()['run1'][event_accumulator.TENSORS], [])
+
+  def testMaxMemory(self):
+    logdir = os.path.join(self.get_temp_dir(), 'logdir')
+    for run in ('run1', 'run2', 'run3'):
+      writer = test_util.FileWriter(os.path.join(logdir, run))
+      for step in range(5):
+        writer.add_summary(scalar_summary.pb('loss', step), global_step=step)
+      writer.close()
+    run_bytes = event_accumulator.EventAccumulator(
+        os.path.join(logdir, 'run1')).Reload().MemoryUsage()['scalars']
+    x = event_multiplexer.EventMultiplexer(max_memory_bytes=2 * run_bytes)
+    x.AddRunsFromDirectory(logdir)
+    x.Reload()
+    self.assertEqual(len(x.MemoryUsage()), 2)
+    # The runs that were used least recently are unloaded, and loaded again
+    # when they are used.
+    for run in ('run1', 'run2', 'run3'):
+      self.assertEqual(x.Scalars(run, 'loss/scalar_summary')[-1].step, 4)
+    self.assertEqual(x.MemoryUsage(), {
+        'run2': {'scalars': run_bytes},
+        'run3': {'scalars': run_bytes},
+    })
+    self.assertEqual(x.Runs()['run1'][event_accumulator.TENSORS],
+                     ['loss/scalar_summary'])
+    self.assertGreater(x.FirstEventTimestamp('run1'), 0)
+    x.Reload()
+    self.assertEqual(set(x.MemoryUsage()), {'run2', 'run3'})
+    self.assertEqual(x.Scalars('run1', 'loss/scalar_summary')[-1].step, 4)
+    self.assertEqual(set(x.MemoryUsage()), {'run1', 'run3'})
+
+  def testMaxMemoryKeepsTagsOfUnloadedRuns(self):
+    logdir = os.path.join(self.get_temp_dir(), 'logdir')
+    for run in ('run1', 'run2'):
+      writer = test_util.FileWriter(os.path.join(logdir, run))
+      for step in range(5):
+        writer.add_summary(scalar_summary.pb('loss', step), global_step=step)
+      writer.close()
+    run_bytes = event_accumulator.EventAccumulator(
+        os.path.join(logdir, 'run1')).Reload().MemoryUsage()['scalars']
+    x = event_multiplexer.EventMultiplexer(max_memory_bytes=run_bytes)
+    x.AddRunsFromDirectory(logdir)
+    x.Reload()
+    self.assertEqual(set(x.MemoryUsage()), {'run2'})
+    # The unloaded run is still listed with its tags, without loading it.
+    self.assertEqual(x.Runs()['run1'][event_accumulator.TENSORS],
+                     ['loss/scalar_summary'])
+    self.assertEqual(
+        x.PluginRunToTagToContent('scalars'),
+        {run: {'loss/scalar_summary': b''} for run in ('run1', 'run2')})
+    self.assertEqual(
+        x.SummaryMetadata('run1', 'loss/scalar_summary').plugin_data
+        .plugin_name, 'scalars')
+    self.assertEqual(set(x.MemoryUsage()), {'run2'})
+    # It is loaded again once the data of one of its tags is asked for.
+    self.assertEqual(
+        [e.step for e in x.Scalars('run1', 'loss/scalar_summary')],
+        list(range(5)))
+    self.assertEqual(set(x.MemoryUsage()), {'run1'})
+
+  def testLazyLoadWithReloadWorkers(self):
+    logdir = os.path.join(self.get_temp_dir(), 'logdir')
+    for run in ('run1', 'run2'):
+      writer = test_util.FileWriter(os.path.join(logdir, run))
+      writer.add_summary(scalar_summary.pb('loss', 0), global_step=0)
+      writer.close()
+    x = event_multiplexer.EventMultiplexer(
+        lazy_load=True, warm_runs=0, reload_workers=1)
+    x.AddRunsFromDirectory(logdir)
+    x.Reload()
+    self.assertEqual(x.Runs()['run1'][event_accumulator.TENSORS], [])
+    self.assertEqual([e.step for e in x.Scalars('run1', 'loss/scalar_summary')],
+                     [0])
+    self.assertEqual(x.Runs()['run2'][event_accumulator.TENSORS], [])
+    self.assertItemsEqual(x.PluginRunToTagToContent('scalars'), ['run1'])
+    x.Reload()
+    self.assertItemsEqual(x.PluginRunToTagToContent('scalars'),
+                          ['run1', 'run2'])
+
   def add3RunsToMultiplexer(self, logdir, multiplexer):
     """Creates and adds 3 runs to the multiplexer."""
     run1_dir = os.path.join(logdir, 'run1')
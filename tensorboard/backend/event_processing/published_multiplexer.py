@@ -0,0 +1,317 @@
+# Copyright 2019 The TensorFlow Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ==============================================================================
+"""Publishes the data loaded by a multiplexer for other processes to serve.
+
+This decouples loading events from serving them: an ingestion process owns
+an `EventMultiplexer` that loads the logdir, and after each reload a
+`Publisher` writes what changed to a local directory. The serving process
+reads the directory with a `PublishedMultiplexer`, so that its requests are
+not slowed down by heavy reloads, and so that it serves what was published
+as soon as it starts.
+
+The directory holds:
+
+  MANIFEST: The version of the latest publication and, for each run, its
+    path and the names of its delta files. It is replaced atomically.
+  *.delta: The pickled deltas of a run (see
+    `plugin_event_accumulator.EventAccumulator.TakeDelta`). The first delta
+    of a run holds all of its data, and each later one what changed since.
+    Files are never modified once published.
+
+Files are pickled, so the directory must only be writable by the user that
+runs TensorBoard.
+"""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import hashlib
+import os
+import pickle
+import tempfile
+import threading
+
+import six
+
+from tensorboard.backend.event_processing import plugin_event_accumulator as event_accumulator  # pylint: disable=line-too-long
+from tensorboard.backend.event_processing import plugin_event_multiplexer as event_multiplexer  # pylint: disable=line-too-long
+from tensorboard.compat import tf
+from tensorboard.util import tb_logging
+
+
+logger = tb_logging.get_logger()
+
+# How often a serving process looks for a new publication, in seconds.
+POLL_INTERVAL_SECS = 2
+
+# Publications written with another version of this format are ignored.
+_FORMAT = 3
+
+_MANIFEST = 'MANIFEST'
+
+_SUFFIX = '.delta'
+
+# Once a run has this many delta files, all of its data is published again
+# in a single file, so that new readers don't read too many files.
+_MAX_DELTAS_PER_RUN = 20
+
+
+class Publisher(object):
+  """Publishes the data of the runs of a multiplexer in a directory.
+
+  Only one publisher may write to a directory at a time.
+  """
+
+  def __init__(self, directory):
+    """Creates a publisher, and its directory if needed.
+
+    Publications continue from the version of the latest one in the
+    directory, if any, but hold all data of each run again.
+
+    Args:
+      directory: The path to a local directory.
+    """
+    self._directory = directory
+    if not os.path.isdir(directory):
+      os.makedirs(directory)
+    manifest = _ReadManifest(directory)
+    self._version = manifest['version'] if manifest else 0
+    # The files of the previous publication, which readers may still read.
+    self._previous_files = _ManifestFiles(manifest)
+    # The accumulator, the delta files and the first event timestamp of each
+    # published run, by name.
+    self._runs = {}
+    self._lock = threading.Lock()
+
+  def Publish(self, multiplexer):
+    """Publishes what changed in the runs of a multiplexer since last time.
+
+    Args:
+      multiplexer: A `plugin_event_multiplexer.EventMultiplexer`.
+
+    Returns:
+      The version of the new publication, or None if nothing changed.
+
+    Raises:
+      IOError: If the directory could not be written.
+    """
+    with self._lock:
+      accumulators = {}
+      for name in list(multiplexer.RunPaths()):
+        try:
+          accumulators[name] = multiplexer.GetAccumulator(name)
+        except KeyError:
+          continue
+      version = self._version + 1
+      changed = set(self._runs) - set(accumulators)
+      runs = {}
+      try:
+        for (name, accumulator) in six.iteritems(accumulators):
+          (published, files, first_event_timestamp) = self._runs.get(
+              name, (None, [], None))
+          full = (published is not accumulator or
+                  len(files) >= _MAX_DELTAS_PER_RUN)
+          delta = accumulator.TakeDelta(full=full)
+          if (full or
+              delta['first_event_timestamp'] != first_event_timestamp or
+              not _IsEmptyDelta(delta)):
+            file_name = '%s.%d%s' % (
+                hashlib.sha1(tf.compat.as_bytes(name)).hexdigest(), version,
+                _SUFFIX)
+            _WriteAtomically(self._directory, file_name,
+                             pickle.dumps(delta, protocol=2))
+            files = [file_name] if full else files + [file_name]
+            changed.add(name)
+          runs[name] = (accumulator, files, delta['first_event_timestamp'])
+        if not changed:
+          self._runs = runs
+          return None
+        manifest = {
+            'format': _FORMAT,
+            'version': version,
+            'runs': {
+                name: (accumulator.path, files)
+                for (name, (accumulator, files, _)) in six.iteritems(runs)
+            },
+        }
+        _WriteAtomically(self._directory, _MANIFEST,
+                         pickle.dumps(manifest, protocol=2))
+      except (IOError, OSError):
+        # The deltas taken so far are lost, so all runs start over.
+        self._runs = {}
+        raise
+      self._runs = runs
+      self._version = version
+      self._DeleteUnusedFiles(_ManifestFiles(manifest))
+      return version
+
+  def _DeleteUnusedFiles(self, files):
+    """Deletes the files of neither this publication nor the previous one."""
+    keep = files | self._previous_files
+    self._previous_files = files
+    for file_name in os.listdir(self._directory):
+      if file_name.endswith(_SUFFIX) and file_name not in keep:
+        try:
+          os.remove(os.path.join(self._directory, file_name))
+        except OSError:
+          pass
+
+
+class PublishedMultiplexer(event_multiplexer.EventMultiplexer):
+  """An `EventMultiplexer` that serves the data published in a directory.
+
+  Its runs are only changed by `Reload`, which reads the latest publication
+  of a `Publisher`.
+  """
+
+  def __init__(self, directory):
+    """Creates a multiplexer without any runs.
+
+    Args:
+      directory: The directory of a `Publisher`.
+    """
+    super(PublishedMultiplexer, self).__init__()
+    self._directory = directory
+    self._manifest_stat = None
+    self._version = None
+    # The delta files applied to each run, by name.
+    self._applied_files = {}
+
+  def AddRun(self, path, name=None):
+    """Does nothing, since runs are added by the publisher."""
+    return self
+
+  def AddRunsFromDirectory(self, path, name=None):
+    """Does nothing, since runs are added by the publisher."""
+    return self
+
+  def Reload(self, runs=None):
+    """Reads the latest publication, if there is a new one.
+
+    Args:
+      runs: Ignored, since all runs are published together.
+
+    Returns:
+      The `PublishedMultiplexer`.
+    """
+    manifest_path = os.path.join(self._directory, _MANIFEST)
+    try:
+      stat = os.stat(manifest_path)
+    except OSError:
+      return self
+    manifest_stat = (stat.st_ino, stat.st_mtime, stat.st_size)
+    if manifest_stat == self._manifest_stat:
+      return self
+    manifest = _ReadManifest(self._directory)
+    if manifest is None or manifest['version'] == self._version:
+      return self
+    logger.info('Reading version %d of the published runs',
+                manifest['version'])
+    complete = True
+    for (name, (path, files)) in six.iteritems(manifest['runs']):
+      if not self._ReadRun(name, path, files):
+        complete = False
+    with self._accumulators_mutex:
+      for name in set(self._accumulators) - set(manifest['runs']):
+        del self._accumulators[name]
+        del self._paths[name]
+        self._applied_files.pop(name, None)
+    if complete:
+      self._manifest_stat = manifest_stat
+      self._version = manifest['version']
+    return self
+
+  def _ReadRun(self, name, path, files):
+    """Applies the new delta files of a run; returns whether all were read.
+
+    When the files of the run start over, a new accumulator is built from
+    them, and only replaces the current one once they are all read.
+    """
+    applied = self._applied_files.get(name, [])
+    with self._accumulators_mutex:
+      accumulator = self._accumulators.get(name)
+    in_place = (accumulator is not None and self._paths[name] == path and
+                files[:len(applied)] == applied)
+    if in_place:
+      new_files = files[len(applied):]
+    else:
+      accumulator = event_accumulator.MirrorAccumulator(path)
+      applied = []
+      new_files = files
+    for file_name in new_files:
+      try:
+        with open(os.path.join(self._directory, file_name), 'rb') as f:
+          delta = pickle.load(f)
+      except IOError as e:
+        # The file was deleted by a newer publication.
+        logger.info('Unable to read published run %r: %s', name, e)
+        return False
+      accumulator.ApplyDelta(delta)
+      applied = applied + [file_name]
+      if in_place:
+        self._applied_files[name] = applied
+    if not in_place:
+      with self._accumulators_mutex:
+        self._accumulators[name] = accumulator
+        self._paths[name] = path
+      self._applied_files[name] = applied
+    return True
+
+
+def _IsEmptyDelta(delta):
+  """Returns whether a delta holds no new data."""
+  return not (delta['tensors'] or delta['scalars'] or
+              delta['summary_metadata'] or delta['tagged_metadata'] or
+              'graph' in delta or 'meta_graph' in delta)
+
+
+def _ReadManifest(directory):
+  """Returns the manifest of the latest publication in a directory, or None."""
+  try:
+    with open(os.path.join(directory, _MANIFEST), 'rb') as f:
+      manifest = pickle.load(f)
+  except IOError:
+    return None
+  except Exception as e:  # pylint: disable=broad-except
+    logger.warn('Ignoring unreadable manifest in %s: %s', directory, e)
+    return None
+  if not isinstance(manifest, dict) or manifest.get('format') != _FORMAT:
+    logger.info('Ignoring outdated manifest in %s', directory)
+    return None
+  return manifest
+
+
+def _ManifestFiles(manifest):
+  """Returns the set of the delta files of a manifest."""
+  if manifest is None:
+    return set()
+  return set(file_name
+             for (_, files) in six.itervalues(manifest['runs'])
+             for file_name in files)
+
+
+def _WriteAtomically(directory, file_name, data):
+  """Writes a file in a directory through a temporary file."""
+  (fd, temp_path) = tempfile.mkstemp(dir=directory, suffix='.tmp')
+  try:
+    with os.fdopen(fd, 'wb') as f:
+      f.write(data)
+    # `os.rename` does not replace existing files on Windows.
+    getattr(os, 'replace', os.rename)(temp_path,
+                                      os.path.join(directory, file_name))
+  finally:
+    if os.path.exists(temp_path):
+      os.remove(temp_path)
@@ -0,0 +1,141 @@
+# Copyright 2019 The TensorFlow Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ==============================================================================
+"""Tests for published_multiplexer."""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import os
+
+import numpy as np
+import tensorflow as tf
+
+from tensorboard.backend.event_processing import plugin_event_accumulator as event_accumulator  # pylint: disable=line-too-long
+from tensorboard.backend.event_processing import plugin_event_multiplexer as event_multiplexer  # pylint: disable=line-too-long
+from tensorboard.backend.event_processing import published_multiplexer
+from tensorboard.compat.proto import event_pb2
+from tensorboard.compat.proto import graph_pb2
+from tensorboard.plugins.image import summary as image_summary
+from tensorboard.plugins.scalar import summary as scalar_summary
+from tensorboard.util import test_util
+
+
+class PublishedMultiplexerTest(tf.test.TestCase):
+
+  def setUp(self):
+    super(PublishedMultiplexerTest, self).setUp()
+    self._logdir = os.path.join(self.get_temp_dir(), 'logdir')
+    self._directory = os.path.join(self.get_temp_dir(), 'published')
+    self._writers = {}
+
+  def _Write(self, run, steps):
+    if run not in self._writers:
+      self._writers[run] = test_util.FileWriter(
+          os.path.join(self._logdir, run))
+      self._writers[run].add_event(event_pb2.Event(
+          graph_def=graph_pb2.GraphDef().SerializeToString()))
+    writer = self._writers[run]
+    for step in steps:
+      writer.add_summary(scalar_summary.pb('loss', step), global_step=step)
+      writer.add_summary(
+          image_summary.pb('images', np.zeros((1, 1, 1, 3), np.uint8)),
+          global_step=step)
+    writer.flush()
+
+  def _Load(self):
+    return event_multiplexer.EventMultiplexer(
+        size_guidance={event_accumulator.TENSORS: 10}).AddRunsFromDirectory(
+            self._logdir).Reload()
+
+  def _AssertSameRuns(self, multiplexer, published):
+    self.assertEqual(published.Runs(), multiplexer.Runs())
+    self.assertEqual(published.RunPaths(), multiplexer.RunPaths())
+    for (run, tags) in multiplexer.Runs().items():
+      for tag in tags[event_accumulator.TENSORS]:
+        self.assertEqual(published.Tensors(run, tag),
+                         multiplexer.Tensors(run, tag))
+        self.assertEqual(published.SummaryMetadata(run, tag),
+                         multiplexer.SummaryMetadata(run, tag))
+      self.assertEqual(published.Graph(run), multiplexer.Graph(run))
+      self.assertEqual(published.FirstEventTimestamp(run),
+                       multiplexer.FirstEventTimestamp(run))
+    self.assertEqual(published.PluginRunToTagToContent('scalars'),
+                     multiplexer.PluginRunToTagToContent('scalars'))
+
+  def testPublishesRuns(self):
+    self._Write('run1', range(5))
+    self._Write('run2', range(5))
+    multiplexer = self._Load()
+    publisher = published_multiplexer.Publisher(self._directory)
+    published = published_multiplexer.PublishedMultiplexer(self._directory)
+    self.assertEqual(published.Reload().Runs(), {})
+    self.assertEqual(publisher.Publish(multiplexer), 1)
+    self.assertIsNone(publisher.Publish(multiplexer))
+    published.Reload()
+    self._AssertSameRuns(multiplexer, published)
+    # Runs are added with the publisher only.
+    published.AddRunsFromDirectory(self._logdir, 'other')
+    self.assertItemsEqual(published.Runs().keys(), ['run1', 'run2'])
+
+    # Only the deltas of changed runs are published.
+    accumulator = published.GetAccumulator('run1')
+    self._Write('run1', range(5, 50))
+    multiplexer.Reload()
+    self.assertEqual(publisher.Publish(multiplexer), 2)
+    self.assertEqual(len(os.listdir(self._directory)), 4)
+    published.Reload()
+    self.assertIs(published.GetAccumulator('run1'), accumulator)
+    self._AssertSameRuns(multiplexer, published)
+
+  def testStartsOverAfterManyDeltas(self):
+    self._Write('run1', range(1))
+    multiplexer = self._Load()
+    publisher = published_multiplexer.Publisher(self._directory)
+    published = published_multiplexer.PublishedMultiplexer(self._directory)
+    for step in range(1, 50):
+      self._Write('run1', [step])
+      multiplexer.Reload()
+      publisher.Publish(multiplexer)
+      published.Reload()
+    self._AssertSameRuns(multiplexer, published)
+    self.assertLessEqual(len(os.listdir(self._directory)),
+                         2 * published_multiplexer._MAX_DELTAS_PER_RUN + 1)
+    # A new reader reads the latest files only.
+    published = published_multiplexer.PublishedMultiplexer(self._directory)
+    self._AssertSameRuns(multiplexer, published.Reload())
+
+  def testRestartedPublisher(self):
+    self._Write('run1', range(5))
+    self._Write('run2', range(5))
+    published_multiplexer.Publisher(self._directory).Publish(self._Load())
+    published = published_multiplexer.PublishedMultiplexer(self._directory)
+    published.Reload()
+
+    # A new publisher publishes all runs again, with a later version.
+    self._Write('run1', range(5, 10))
+    os.remove(os.path.join(self._logdir, 'run2',
+                           os.listdir(os.path.join(self._logdir, 'run2'))[0]))
+    os.rmdir(os.path.join(self._logdir, 'run2'))
+    multiplexer = self._Load()
+    self.assertEqual(
+        published_multiplexer.Publisher(self._directory).Publish(multiplexer),
+        2)
+    published.Reload()
+    self._AssertSameRuns(multiplexer, published)
+
+
+if __name__ == '__main__':
+  tf.test.main()
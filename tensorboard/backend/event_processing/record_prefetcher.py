@@ -0,0 +1,295 @@
+# Copyright 2019 The TensorFlow Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ==============================================================================
+"""Reads records of events files ahead of their loaders on I/O threads.
+
+Without prefetching, a `RawEventFileLoader` reads its file on the thread that
+reloads the run, so every slow read (as on a network file system) stalls the
+parsing of the events that have already been read. A `RecordPrefetcher` owns
+a pool of I/O threads that read records into memory ahead of the loaders,
+within a budget of buffered bytes that all files share.
+"""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import collections
+import sys
+import threading
+
+import six
+from six.moves import queue, xrange  # pylint: disable=redefined-builtin
+
+from tensorboard.compat import tf
+from tensorboard.util import tb_logging
+
+
+logger = tb_logging.get_logger()
+
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+DEFAULT_NUM_THREADS = 4
+
+# The number of record bytes that are read from a file at a time, before an
+# I/O thread moves on to the next file that wants reading.
+_CHUNK_BYTES = 1024 * 1024
+
+# The maximum number of record bytes to read ahead for a single file, so that
+# one large file doesn't take the whole budget.
+_MAX_BYTES_PER_READER = 16 * 1024 * 1024
+
+
+class RecordPrefetcher(object):
+  """A pool of I/O threads that read records ahead of their consumers.
+
+  Each file is read in chunks of about a megabyte, and the I/O threads take
+  turns between the files that want reading. A file is read ahead until 16 MB
+  of its records are buffered or there are no more records, and no file is
+  read ahead while `max_bytes` are buffered for all files together.
+
+  A consumer that finds no buffered records reads the next chunk on its own
+  thread, so that it never waits for I/O threads that are busy with other
+  files. This is also how files that have run out of records are polled for
+  new ones. As a result, the budget may be exceeded by one chunk for each
+  consuming thread.
+
+  This class is thread safe.
+  """
+
+  def __init__(self, max_bytes=DEFAULT_MAX_BYTES,
+               num_threads=DEFAULT_NUM_THREADS):
+    """Creates a prefetcher and starts its I/O threads.
+
+    Args:
+      max_bytes: The maximum number of record bytes that the I/O threads
+        buffer for all files together.
+      num_threads: The number of I/O threads.
+
+    Raises:
+      ValueError: If `max_bytes` or `num_threads` is not positive.
+    """
+    if max_bytes <= 0:
+      raise ValueError('max_bytes must be positive: %r' % (max_bytes,))
+    if num_threads <= 0:
+      raise ValueError('num_threads must be positive: %r' % (num_threads,))
+    self._max_bytes = max_bytes
+    self._buffered_bytes = 0
+    self._lock = threading.Lock()
+    self._readers = queue.Queue()
+    self._threads = []
+    for i in xrange(num_threads):
+      thread = threading.Thread(target=self._Run, name='Prefetcher %d' % i)
+      thread.daemon = True
+      thread.start()
+      self._threads.append(thread)
+
+  def Wrap(self, reader, get_next=None):
+    """Returns a reader whose records are read ahead by this prefetcher.
+
+    Reading ahead starts right away.
+
+    Args:
+      reader: A `PyRecordReader`, which must not be used directly anymore.
+      get_next: A function that advances `reader` to its next record, if
+        not `reader.GetNext`.
+
+    Returns:
+      An object with the `GetNext()`, `record()` and `offset()` methods of a
+      `PyRecordReader`, and a `Close()` method that drops the records that
+      have been read ahead.
+    """
+    prefetching_reader = _PrefetchingRecordReader(
+        self, reader, get_next or reader.GetNext)
+    prefetching_reader._reading = True  # pylint: disable=protected-access
+    self._readers.put(prefetching_reader)
+    return prefetching_reader
+
+  def BufferedBytes(self):
+    """Returns the number of record bytes that are currently read ahead."""
+    with self._lock:
+      return self._buffered_bytes
+
+  def Close(self):
+    """Stops the I/O threads once they have finished their current reads."""
+    for _ in self._threads:
+      self._readers.put(None)
+    for thread in self._threads:
+      thread.join()
+    self._threads = []
+
+  def _HasRoom(self):
+    # An unlocked read is fine, since the budget is approximate anyway.
+    return self._buffered_bytes < self._max_bytes
+
+  def _AddBytes(self, size):
+    with self._lock:
+      self._buffered_bytes += size
+
+  def _Run(self):
+    while True:
+      reader = self._readers.get()
+      if reader is None:
+        return
+      reader._ReadAhead()  # pylint: disable=protected-access
+
+
+class _PrefetchingRecordReader(object):
+  """A `PyRecordReader` whose records are read ahead by a `RecordPrefetcher`.
+
+  At most one thread at a time reads from the wrapped reader: an I/O thread,
+  or else a consumer that has run out of buffered records.
+  """
+
+  def __init__(self, prefetcher, reader, get_next):
+    self._prefetcher = prefetcher
+    self._reader = reader
+    self._get_next = get_next
+    # This lock may be held while taking the lock of the prefetcher.
+    self._lock = threading.Lock()
+    self._read_done = threading.Condition(self._lock)
+    # Pairs of a record that has been read ahead and the offset after it.
+    self._records = collections.deque()
+    self._buffered_bytes = 0
+    # Whether a read of the wrapped reader is running or scheduled.
+    self._reading = False
+    # Whether the last read ran out of records.
+    self._at_end = False
+    # The `sys.exc_info()` of a read that failed, until it is raised.
+    self._exc_info = None
+    self._closed = False
+    self._record = None
+    self._offset = reader.offset()
+
+  def GetNext(self):
+    """Advances to the next record.
+
+    Raises:
+      OutOfRangeError: If no complete record is available yet.
+      Exception: Any other error that reading the wrapped reader raised. It
+        is raised once, after all records read before it have been returned.
+    """
+    self._record = None
+    with self._lock:
+      while self._reading and not self._records:
+        self._read_done.wait()
+      read_here = not self._records
+      if read_here:
+        self._RaisePendingError()
+        self._reading = True
+    if read_here:
+      self._Read()
+      with self._lock:
+        if not self._records:
+          self._RaisePendingError()
+          raise tf.errors.OutOfRangeError(
+              None, None, 'No more records to read')
+    with self._lock:
+      (self._record, self._offset) = self._records.popleft()
+      size = len(self._record)
+      self._buffered_bytes -= size
+      # Wait for half of the buffer to be consumed before reading ahead
+      # again, rather than scheduling a read for every record.
+      read_ahead = self._ShouldReadAhead(_MAX_BYTES_PER_READER // 2)
+      if read_ahead:
+        self._reading = True
+    self._prefetcher._AddBytes(-size)  # pylint: disable=protected-access
+    if read_ahead:
+      self._prefetcher._readers.put(self)  # pylint: disable=protected-access
+
+  def record(self):
+    return self._record
+
+  def offset(self):
+    return self._offset
+
+  def Close(self):
+    """Drops the records that have been read ahead and closes the reader.
+
+    If a read is running, the wrapped reader is closed when it finishes.
+    """
+    with self._lock:
+      self._closed = True
+      size = self._buffered_bytes
+      self._records.clear()
+      self._buffered_bytes = 0
+      close_now = not self._reading
+    self._prefetcher._AddBytes(-size)  # pylint: disable=protected-access
+    if close_now:
+      self._reader.Close()
+
+  def _ReadAhead(self):
+    """Reads a chunk of records on an I/O thread, if there is room."""
+    if not self._prefetcher._HasRoom():  # pylint: disable=protected-access
+      # The budget filled up after this read was scheduled. The consumer
+      # schedules another read as it takes records, or reads itself.
+      with self._lock:
+        self._reading = False
+        self._read_done.notify_all()
+      return
+    self._Read()
+
+  def _Read(self):
+    """Reads a chunk of records; the caller must have set `_reading`."""
+    records = []
+    size = 0
+    at_end = False
+    exc_info = None
+    if not self._closed:
+      try:
+        while size < _CHUNK_BYTES:
+          try:
+            self._get_next()
+          except (tf.errors.DataLossError, tf.errors.OutOfRangeError):
+            # The reader stays at the last complete record, so a later read
+            # picks up where this one stopped.
+            at_end = True
+            break
+          record = self._reader.record()
+          records.append((record, self._reader.offset()))
+          size += len(record)
+      except Exception as e:  # pylint: disable=broad-except
+        logger.debug('Prefetching failed: %s', e)
+        exc_info = sys.exc_info()
+    with self._lock:
+      self._reading = False
+      self._read_done.notify_all()
+      closed = self._closed
+      if not closed:
+        self._records.extend(records)
+        self._buffered_bytes += size
+        self._prefetcher._AddBytes(size)  # pylint: disable=protected-access
+        self._at_end = at_end
+        self._exc_info = exc_info
+        read_ahead = self._ShouldReadAhead(_MAX_BYTES_PER_READER)
+        if read_ahead:
+          self._reading = True
+    if closed:
+      self._reader.Close()
+      return
+    if read_ahead:
+      self._prefetcher._readers.put(self)  # pylint: disable=protected-access
+
+  def _ShouldReadAhead(self, max_buffered_bytes):
+    return (not self._reading and
+            not self._at_end and
+            not self._closed and
+            self._exc_info is None and
+            self._buffered_bytes < max_buffered_bytes and
+            self._prefetcher._HasRoom())  # pylint: disable=protected-access
+
+  def _RaisePendingError(self):
+    exc_info = self._exc_info
+    if exc_info is not None:
+      self._exc_info = None
+      six.reraise(*exc_info)
@@ -0,0 +1,159 @@
+# Copyright 2019 The TensorFlow Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ==============================================================================
+"""Tests for record_prefetcher."""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import tensorflow as tf
+
+from tensorboard.backend.event_processing import record_prefetcher
+
+
+class _FakeReader(object):
+  """A `PyRecordReader` over a list of records that may be appended to."""
+
+  def __init__(self, records):
+    self.records = list(records)
+    # Exceptions to raise instead of reading the record at an index, once.
+    self.errors = {}
+    self.closed = False
+    self._index = 0
+    self._offset = 0
+    self._record = None
+
+  def GetNext(self):
+    self._record = None
+    if self._index in self.errors:
+      raise self.errors.pop(self._index)
+    if self._index >= len(self.records):
+      raise tf.errors.OutOfRangeError(None, None, 'No more records')
+    self._record = self.records[self._index]
+    self._index += 1
+    self._offset += len(self._record)
+
+  def record(self):
+    return self._record
+
+  def offset(self):
+    return self._offset
+
+  def Close(self):
+    self.closed = True
+
+
+def _WaitUntilIdle(reader):
+  """Waits until the prefetcher has stopped reading ahead for `reader`."""
+  # pylint: disable=protected-access
+  with reader._lock:
+    while reader._reading:
+      reader._read_done.wait()
+
+
+class RecordPrefetcherTest(tf.test.TestCase):
+
+  def setUp(self):
+    super(RecordPrefetcherTest, self).setUp()
+    # Read 100 bytes at a time and at most 1000 bytes ahead per file.
+    for (name, value) in (('_CHUNK_BYTES', 100),
+                          ('_MAX_BYTES_PER_READER', 1000)):
+      patcher = tf.compat.v1.test.mock.patch.object(
+          record_prefetcher, name, value)
+      patcher.start()
+      self.addCleanup(patcher.stop)
+
+  def _Prefetcher(self, **kwargs):
+    prefetcher = record_prefetcher.RecordPrefetcher(**kwargs)
+    self.addCleanup(prefetcher.Close)
+    return prefetcher
+
+  def _ReadAll(self, reader):
+    records = []
+    while True:
+      try:
+        reader.GetNext()
+      except tf.errors.OutOfRangeError:
+        return records
+      records.append((reader.record(), reader.offset()))
+
+  def testRaisesWithBadArguments(self):
+    with self.assertRaises(ValueError):
+      record_prefetcher.RecordPrefetcher(max_bytes=0)
+    with self.assertRaises(ValueError):
+      record_prefetcher.RecordPrefetcher(num_threads=0)
+
+  def testReadsRecordsInOrder(self):
+    records = [b'%03d' % i * 10 for i in range(200)]
+    reader = self._Prefetcher(num_threads=3).Wrap(_FakeReader(records))
+    self.assertEqual(reader.offset(), 0)
+    self.assertEqual(self._ReadAll(reader),
+                     [(record, 30 * (i + 1)) for (i, record) in
+                      enumerate(records)])
+    self.assertIsNone(reader.record())
+
+  def testPicksUpAppendedRecords(self):
+    fake_reader = _FakeReader([b'a'])
+    reader = self._Prefetcher().Wrap(fake_reader)
+    self.assertEqual(self._ReadAll(reader), [(b'a', 1)])
+    fake_reader.records.extend([b'bb', b'c'])
+    self.assertEqual(self._ReadAll(reader), [(b'bb', 3), (b'c', 4)])
+    self.assertEqual(self._ReadAll(reader), [])
+
+  def testLimitsBytesPerReader(self):
+    prefetcher = self._Prefetcher()
+    reader = prefetcher.Wrap(_FakeReader([b'x' * 50] * 100))
+    _WaitUntilIdle(reader)
+    self.assertEqual(prefetcher.BufferedBytes(), 1000)
+    self.assertEqual(len(self._ReadAll(reader)), 100)
+    self.assertEqual(prefetcher.BufferedBytes(), 0)
+
+  def testLimitsBytesForAllReaders(self):
+    prefetcher = self._Prefetcher(max_bytes=1500, num_threads=1)
+    readers = [prefetcher.Wrap(_FakeReader([b'x' * 50] * 100))
+               for _ in range(3)]
+    for reader in readers:
+      _WaitUntilIdle(reader)
+    # Reading stops after the chunk that exceeds the budget.
+    self.assertGreaterEqual(prefetcher.BufferedBytes(), 1500)
+    self.assertLess(prefetcher.BufferedBytes(), 1600)
+    for reader in readers:
+      self.assertEqual(len(self._ReadAll(reader)), 100)
+    self.assertEqual(prefetcher.BufferedBytes(), 0)
+
+  def testRaisesReadErrorsOnceInOrder(self):
+    fake_reader = _FakeReader([b'a', b'b', b'c'])
+    fake_reader.errors[2] = IOError('lp0 on fire')
+    reader = self._Prefetcher().Wrap(fake_reader)
+    for expected in (b'a', b'b'):
+      reader.GetNext()
+      self.assertEqual(reader.record(), expected)
+    with self.assertRaises(IOError):
+      reader.GetNext()
+    self.assertEqual(self._ReadAll(reader), [(b'c', 3)])
+
+  def testCloseDropsRecordsAndClosesReader(self):
+    prefetcher = self._Prefetcher()
+    fake_reader = _FakeReader([b'x' * 50] * 10)
+    reader = prefetcher.Wrap(fake_reader)
+    _WaitUntilIdle(reader)
+    self.assertEqual(prefetcher.BufferedBytes(), 500)
+    reader.Close()
+    self.assertEqual(prefetcher.BufferedBytes(), 0)
+    self.assertTrue(fake_reader.closed)
+
+
+if __name__ == '__main__':
+  tf.test.main()
@@ -0,0 +1,186 @@
+# Copyright 2019 The TensorFlow Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ==============================================================================
+"""Schedules the reloads of runs, backing off from the runs that are idle.
+
+Reloading a run lists its directory and stats its events files even when
+nothing was written to them, so when most runs are finished, most of the
+time of `EventMultiplexer.Reload` is wasted on them. A `ReloadScheduler`
+remembers when new data was last loaded for each run: runs with new data are
+reloaded each time, and a run that has been idle for some time is only
+reloaded again after waiting as long, so that the waits double, up to a
+maximum. A waiting run is woken up as soon as the modification time of its
+local directory changes (as when a new events file is created in it), or
+when it is reloaded on purpose.
+"""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import os
+import threading
+import time
+
+import six
+
+from tensorboard.backend.event_processing import logdir_discovery
+
+
+# A run is not left waiting if the modification time of its directory is
+# this recent, since file systems may not record modification times to the
+# nanosecond, and files may have been created since it was last reloaded.
+_MTIME_MARGIN_SECS = 2
+
+
+class _RunState(object):
+  """What a `ReloadScheduler` knows about a run."""
+
+  def __init__(self, accumulator, now):
+    self.accumulator = accumulator
+    # What `_Progress` returned after the last reload, or None.
+    self.progress = None
+    # The modification time of the path when the last reload started.
+    self.mtime = None
+    # When the last reload that loaded new data ended, or when the run was
+    # first scheduled.
+    self.last_change = now
+    self.interval = 0
+    self.next_reload = now
+    self.reloads = 0
+    self.skipped_reloads = 0
+
+
+class ReloadScheduler(object):
+  """Decides which runs to reload, backing off from the runs that are idle.
+
+  This class is thread-safe.
+  """
+
+  def __init__(self, max_backoff_secs):
+    """Creates a scheduler.
+
+    Args:
+      max_backoff_secs: The longest time to wait between two reloads of an
+        idle run, in seconds.
+    """
+    self._max_backoff_secs = max_backoff_secs
+    self._runs = {}
+    self._lock = threading.Lock()
+
+  def Select(self, items, wake=False):
+    """Returns the runs that are due to be reloaded.
+
+    Args:
+      items: A list of `(name, accumulator)` pairs.
+      wake: Whether all of the runs are due, such as when they are known to
+        have changed.
+
+    Returns:
+      The list of the `(name, accumulator)` pairs of the runs to reload now,
+      which must be passed to `Update` once they are reloaded.
+    """
+    now = time.time()
+    due = []
+    for (name, accumulator) in items:
+      mtime = _ModificationTime(accumulator.path)
+      with self._lock:
+        state = self._runs.get(name)
+        if state is None or state.accumulator is not accumulator:
+          state = self._runs[name] = _RunState(accumulator, now)
+        elif not (wake or now >= state.next_reload or
+                  _Touched(mtime, state.mtime, now)):
+          state.skipped_reloads += 1
+          continue
+        state.mtime = mtime
+      due.append((name, accumulator))
+    return due
+
+  def Update(self, items):
+    """Schedules the next reloads of runs that were just reloaded.
+
+    Args:
+      items: A list of `(name, accumulator)` pairs returned by `Select`.
+    """
+    now = time.time()
+    for (name, accumulator) in items:
+      progress = _Progress(accumulator)
+      with self._lock:
+        state = self._runs.get(name)
+        if state is None or state.accumulator is not accumulator:
+          continue
+        state.reloads += 1
+        if progress != state.progress:
+          state.progress = progress
+          state.last_change = now
+          state.interval = 0
+        else:
+          state.interval = min(self._max_backoff_secs, now - state.last_change)
+        state.next_reload = now + state.interval
+
+  def Forget(self, names):
+    """Forgets about runs that were removed."""
+    with self._lock:
+      for name in names:
+        self._runs.pop(name, None)
+
+  def Schedule(self):
+    """Returns the schedule of each run, for debugging.
+
+    Returns:
+      A dict mapping each run name to a dict with the seconds to wait between
+      reloads (`interval_secs`), the seconds left until the next reload
+      (`next_reload_secs`), the seconds since new data was last loaded
+      (`idle_secs`), and the numbers of reloads done (`reloads`) and skipped
+      (`skipped_reloads`).
+    """
+    now = time.time()
+    with self._lock:
+      return {
+          name: {
+              'interval_secs': state.interval,
+              'next_reload_secs': max(0, state.next_reload - now),
+              'idle_secs': now - state.last_change,
+              'reloads': state.reloads,
+              'skipped_reloads': state.skipped_reloads,
+          } for (name, state) in six.iteritems(self._runs)
+      }
+
+
+def _Progress(accumulator):
+  """Returns a value that changes whenever a run loads new events."""
+  return (accumulator.Position(), accumulator.most_recent_step,
+          accumulator.most_recent_wall_time)
+
+
+def _ModificationTime(path):
+  """Returns the modification time of a local path, or None.
+
+  Returns 0 if the path cannot be stat'd, such as when it was deleted, and
+  None if it is not local, since stat'ing remote paths is about as slow as
+  listing them.
+  """
+  if not logdir_discovery.IsSupported(path):
+    return None
+  try:
+    return os.stat(path).st_mtime
+  except OSError:
+    return 0
+
+
+def _Touched(mtime, last_mtime, now):
+  """Returns whether a path may have changed since its last reload."""
+  if mtime is None:
+    return False
+  return mtime != last_mtime or now - mtime < _MTIME_MARGIN_SECS
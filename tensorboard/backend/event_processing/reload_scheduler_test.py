@@ -0,0 +1,122 @@
+# Copyright 2019 The TensorFlow Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ==============================================================================
+"""Tests for reload_scheduler."""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import os
+import time
+
+import tensorflow as tf
+
+from tensorboard.backend.event_processing import reload_scheduler
+
+
+class _FakeAccumulator(object):
+  """An accumulator that loads a new event whenever it is told to."""
+
+  def __init__(self, path):
+    self.path = path
+    self.most_recent_step = -1
+    self.most_recent_wall_time = -1
+
+  def Position(self):
+    return None
+
+  def AddEvent(self):
+    self.most_recent_step += 1
+
+
+class ReloadSchedulerTest(tf.test.TestCase):
+
+  def setUp(self):
+    super(ReloadSchedulerTest, self).setUp()
+    self._now = time.time()
+    patcher = tf.compat.v1.test.mock.patch.object(
+        reload_scheduler.time, 'time', side_effect=lambda: self._now)
+    patcher.start()
+    self.addCleanup(patcher.stop)
+    self._scheduler = reload_scheduler.ReloadScheduler(max_backoff_secs=40)
+    self._accumulators = {}
+
+  def _MakeRun(self, name):
+    path = os.path.join(self.get_temp_dir(), name)
+    os.mkdir(path)
+    old = self._now - 10
+    os.utime(path, (old, old))
+    self._accumulators[name] = _FakeAccumulator(path)
+
+  def _Reload(self, wake=False):
+    """Reloads the due runs 5 seconds from now; returns their names."""
+    self._now += 5
+    due = self._scheduler.Select(sorted(self._accumulators.items()), wake=wake)
+    self._scheduler.Update(due)
+    return [name for (name, _) in due]
+
+  def testBacksOffFromIdleRuns(self):
+    self._MakeRun('active')
+    self._MakeRun('idle')
+    self.assertEqual(self._Reload(), ['active', 'idle'])
+    reloads = []
+    for _ in range(20):
+      self._accumulators['active'].AddEvent()
+      reloads.append(self._Reload())
+    # The idle run waits as long as it has been idle, up to 40 seconds.
+    self.assertEqual(
+        [i + 1 for (i, names) in enumerate(reloads) if 'idle' in names],
+        [1, 2, 4, 8, 16])
+    self.assertTrue(all('active' in names for names in reloads))
+    schedule = self._scheduler.Schedule()
+    self.assertEqual(schedule['active']['interval_secs'], 0)
+    self.assertEqual(schedule['idle']['interval_secs'], 40)
+    self.assertEqual(schedule['idle']['reloads'], 6)
+    self.assertEqual(schedule['idle']['skipped_reloads'], 15)
+
+    # The run is reloaded each time again once it has new data.
+    self._accumulators['idle'].AddEvent()
+    reloads = [self._Reload() for _ in range(12)]
+    index = min(i for (i, names) in enumerate(reloads) if 'idle' in names)
+    self.assertEqual(['idle' in names for names in reloads[index:index + 4]],
+                     [True, True, True, False])
+
+  def testWakesUpChangedRuns(self):
+    self._MakeRun('run')
+    for _ in range(5):
+      self._Reload()
+    self.assertEqual(self._Reload(), [])
+    self.assertEqual(self._Reload(wake=True), ['run'])
+    self.assertEqual(self._Reload(), [])
+
+    # The directory changes.
+    os.utime(self._accumulators['run'].path, (self._now, self._now))
+    self.assertEqual(self._Reload(), ['run'])
+    self.assertEqual(self._Reload(), [])
+
+  def testForgetsRemovedRuns(self):
+    self._MakeRun('run')
+    for _ in range(5):
+      self._Reload()
+    self._scheduler.Forget(['run'])
+    self.assertEqual(self._scheduler.Schedule(), {})
+    self.assertEqual(self._Reload(), ['run'])
+    # A new accumulator for the run is scheduled anew.
+    self._accumulators['run'] = _FakeAccumulator(self._accumulators['run'].path)
+    self.assertEqual(self._Reload(), ['run'])
+
+
+if __name__ == '__main__':
+  tf.test.main()
@@ -0,0 +1,407 @@
+# Copyright 2019 The TensorFlow Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ==============================================================================
+"""Reloads runs in worker processes.
+
+Reading and parsing events is bound by the GIL, so reloading runs on more
+threads barely helps. `ReloadWorkers` shards runs across worker processes
+instead. Each worker owns a `plugin_event_accumulator.EventAccumulator` for
+each of its runs, and after each reload sends what changed (see
+`EventAccumulator.TakeDelta`) back to the serving process over a pipe, where
+it is applied to a mirror of the accumulator that plugins read from.
+"""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import collections
+import itertools
+import multiprocessing
+import threading
+
+from tensorboard.backend.event_processing import directory_watcher
+from tensorboard.backend.event_processing import event_filter
+from tensorboard.backend.event_processing import plugin_event_accumulator as event_accumulator  # pylint: disable=line-too-long
+from tensorboard.backend.event_processing import record_prefetcher
+from tensorboard.backend.event_processing import snapshot_store
+from tensorboard.util import tb_logging
+
+
+logger = tb_logging.get_logger()
+
+
+class ReloadWorkers(object):
+  """Loads runs in a fixed number of worker processes.
+
+  Each run is assigned to the worker with the fewest runs when it is added.
+  A worker that dies is started again, and its runs are loaded again from
+  scratch (or from their snapshots).
+
+  This class is thread-safe.
+  """
+
+  def __init__(self,
+               num_workers,
+               size_guidance=None,
+               tensor_size_guidance=None,
+               purge_orphaned_data=True,
+               use_mmap=False,
+               plugin_names=None,
+               tag_pattern=None,
+               prefetch_threads=0,
+               prefetch_bytes=record_prefetcher.DEFAULT_MAX_BYTES,
+               concurrent_writers=False,
+               snapshot_dir=None,
+               snapshot_config=None,
+               snapshot_interval=snapshot_store.DEFAULT_SAVE_INTERVAL_SECS):
+    """Starts the worker processes.
+
+    Args:
+      num_workers: The number of worker processes.
+      size_guidance: See `plugin_event_accumulator.EventAccumulator`.
+      tensor_size_guidance: See `plugin_event_accumulator.EventAccumulator`.
+      purge_orphaned_data: See `plugin_event_accumulator.EventAccumulator`.
+      use_mmap: See `plugin_event_accumulator.EventAccumulator`.
+      plugin_names: If not None, only load the data of the plugins with
+        these names. See `event_filter.EventFilter`.
+      tag_pattern: If not None, only load the tags that contain a match for
+        this regular expression.
+      prefetch_threads: The number of I/O threads that each worker uses to
+        read events files ahead. See `record_prefetcher.RecordPrefetcher`.
+      prefetch_bytes: The maximum number of bytes that the I/O threads of
+        each worker read ahead.
+      concurrent_writers: See `plugin_event_accumulator.EventAccumulator`.
+      snapshot_dir: If not None, the directory in which the workers save the
+        snapshots of their runs. See `snapshot_store.SnapshotStore`.
+      snapshot_config: The config of the snapshots.
+      snapshot_interval: How often to save the snapshot of a run, in seconds.
+    """
+    self._options = {
+        'size_guidance': size_guidance,
+        'tensor_size_guidance': tensor_size_guidance,
+        'purge_orphaned_data': purge_orphaned_data,
+        'use_mmap': use_mmap,
+        'plugin_names': plugin_names,
+        'tag_pattern': tag_pattern,
+        'prefetch_threads': prefetch_threads,
+        'prefetch_bytes': prefetch_bytes,
+        'concurrent_writers': concurrent_writers,
+        'snapshot_dir': snapshot_dir,
+        'snapshot_config': snapshot_config,
+        'snapshot_interval': snapshot_interval,
+    }
+    self._run_ids = itertools.count()
+    # Guards `_accumulators` and the runs of the workers.
+    self._lock = threading.Lock()
+    # The mirror of each run, by ID.
+    self._accumulators = {}
+    logger.info('Starting %d processes to reload runs', num_workers)
+    self._workers = [_Worker(i, self._options) for i in range(num_workers)]
+
+  def AddRun(self, path):
+    """Starts loading a run in the worker with the fewest runs.
+
+    If the worker has a snapshot of the run, it is restored before this
+    returns.
+
+    Args:
+      path: The path of the run, as for
+        `plugin_event_accumulator.EventAccumulator`.
+
+    Returns:
+      A `plugin_event_accumulator.EventAccumulator` that holds the data
+      loaded for the run so far, and that is updated by `Reload`.
+    """
+    accumulator = _RemoteAccumulator(
+        path, next(self._run_ids),
+        size_guidance=self._options['size_guidance'],
+        tensor_size_guidance=self._options['tensor_size_guidance'])
+    with self._lock:
+      worker = min(self._workers, key=lambda worker: len(worker.run_ids))
+      worker.run_ids.add(accumulator.run_id)
+      self._accumulators[accumulator.run_id] = accumulator
+    with worker.lock:
+      try:
+        worker.Send(('add', accumulator.run_id, path))
+        accumulator.ApplyDelta(worker.Receive())
+      except _WorkerDiedError as e:
+        self._Restart(worker, e)
+    return accumulator
+
+  def RemoveRun(self, accumulator):
+    """Stops loading a run returned by `AddRun`."""
+    with self._lock:
+      self._accumulators.pop(accumulator.run_id, None)
+      for worker in self._workers:
+        if accumulator.run_id in worker.run_ids:
+          worker.run_ids.remove(accumulator.run_id)
+          break
+      else:
+        return
+    with worker.lock:
+      try:
+        worker.Send(('remove', accumulator.run_id))
+      except _WorkerDiedError as e:
+        self._Restart(worker, e)
+
+  def Reload(self, accumulators):
+    """Reloads some runs returned by `AddRun`, in their workers in parallel.
+
+    Errors other than the deletion of the directory of a run are logged.
+
+    Args:
+      accumulators: The runs to reload.
+
+    Returns:
+      A tuple of the set of the runs whose directories were deleted, which
+      are removed, and of a `collections.Counter` of the file system calls
+      that the workers made, by kind (see
+      `directory_watcher.DirectoryWatcher.FilesystemCalls`).
+    """
+    run_ids = set(accumulator.run_id for accumulator in accumulators)
+    with self._lock:
+      work = [(worker, [run_id for run_id in worker.run_ids
+                        if run_id in run_ids])
+              for worker in self._workers]
+    deleted = set()
+    filesystem_calls = collections.Counter()
+    results_lock = threading.Lock()
+
+    def Reload(worker, worker_run_ids):
+      """Reloads the runs of one worker, and applies their deltas."""
+      with worker.lock:
+        try:
+          worker.Send(('reload', worker_run_ids))
+          while True:
+            reply = worker.Receive()
+            if reply is None:
+              break
+            (run_id, delta, error, calls) = reply
+            with self._lock:
+              accumulator = self._accumulators.get(run_id)
+            if error is not None:
+              logger.error('Unable to reload accumulator %r: %s',
+                           accumulator and accumulator.path, error)
+            if accumulator is None:
+              pass
+            elif delta is None:
+              with self._lock:
+                self._accumulators.pop(run_id, None)
+                worker.run_ids.discard(run_id)
+              with results_lock:
+                deleted.add(accumulator)
+            else:
+              accumulator.ApplyDelta(delta)
+            with results_lock:
+              filesystem_calls.update(calls)
+        except _WorkerDiedError as e:
+          self._Restart(worker, e)
+
+    threads = []
+    for (worker, worker_run_ids) in work:
+      if not worker_run_ids:
+        continue
+      thread = threading.Thread(
+          target=Reload, args=(worker, worker_run_ids),
+          name='Reload worker %d' % worker.index)
+      thread.daemon = True
+      thread.start()
+      threads.append(thread)
+    for thread in threads:
+      thread.join()
+    return (deleted, filesystem_calls)
+
+  def Close(self):
+    """Stops the worker processes."""
+    for worker in self._workers:
+      with worker.lock:
+        worker.Stop()
+
+  def _Restart(self, worker, error):
+    """Restarts a worker that died, and adds its runs again.
+
+    Must be called with the lock of the worker held.
+    """
+    logger.error('Reload worker %d died (%s); restarting it', worker.index,
+                 error)
+    worker.Stop()
+    worker.Start()
+    with self._lock:
+      accumulators = [self._accumulators[run_id] for run_id in worker.run_ids]
+    for accumulator in accumulators:
+      try:
+        worker.Send(('add', accumulator.run_id, accumulator.path))
+        accumulator.ApplyDelta(worker.Receive())
+      except _WorkerDiedError as e:
+        logger.error('Reload worker %d died again: %s', worker.index, e)
+        return
+
+
+class _RemoteAccumulator(event_accumulator.MirrorAccumulator):
+  """The mirror of an accumulator in a worker process."""
+
+  def __init__(self, path, run_id, size_guidance=None,
+               tensor_size_guidance=None):
+    super(_RemoteAccumulator, self).__init__(
+        path, size_guidance=size_guidance,
+        tensor_size_guidance=tensor_size_guidance)
+    self.run_id = run_id
+
+
+class _WorkerDiedError(Exception):
+  """Raised when a worker process cannot be reached."""
+
+
+class _Worker(object):
+  """A worker process, and the pipe to it."""
+
+  def __init__(self, index, options):
+    self.index = index
+    # Held while talking to the process, so that each reply goes to the
+    # thread that sent the request.
+    self.lock = threading.Lock()
+    # The IDs of the runs of the worker.
+    self.run_ids = set()
+    self._options = options
+    self._process = None
+    self._connection = None
+    self.Start()
+
+  def Start(self):
+    (self._connection, child_connection) = multiprocessing.Pipe()
+    self._process = multiprocessing.Process(
+        target=_WorkerMain, args=(child_connection, self._options),
+        name='Reload worker %d' % self.index)
+    self._process.daemon = True
+    self._process.start()
+    # Only the worker holds its end of the pipe, so that its death is seen
+    # as the end of the pipe.
+    child_connection.close()
+
+  def Stop(self):
+    try:
+      self._connection.send(None)
+    except (IOError, OSError):
+      pass
+    self._process.join(1)
+    if self._process.is_alive():
+      self._process.terminate()
+      self._process.join()
+    self._connection.close()
+
+  def Send(self, message):
+    try:
+      self._connection.send(message)
+    except (IOError, OSError) as e:
+      raise _WorkerDiedError(e)
+
+  def Receive(self):
+    try:
+      return self._connection.recv()
+    except (EOFError, IOError, OSError) as e:
+      raise _WorkerDiedError(str(e) or 'end of pipe')
+
+
+def _WorkerMain(connection, options):
+  """Serves the requests of `ReloadWorkers` in a worker process.
+
+  Requests are tuples that start with a command:
+
+    ('add', run_id, path): Adds a run, restores its snapshot if there is one,
+      and replies with its first delta.
+    ('remove', run_id): Removes a run. There is no reply.
+    ('reload', run_ids): Reloads some runs. For each run, replies with a
+      tuple of its ID, its delta (or None if its directory was deleted), an
+      error message or None, and the file system calls made to reload it.
+      Then replies with None.
+
+  The worker exits when it is sent None or when the pipe is closed.
+  """
+  if options['prefetch_threads'] > 0:
+    prefetcher = record_prefetcher.RecordPrefetcher(
+        max_bytes=options['prefetch_bytes'],
+        num_threads=options['prefetch_threads'])
+  else:
+    prefetcher = None
+  if options['snapshot_dir']:
+    store = snapshot_store.SnapshotStore(
+        options['snapshot_dir'], config=options['snapshot_config'],
+        save_interval=options['snapshot_interval'])
+  else:
+    store = None
+  accumulators = {}
+  while True:
+    try:
+      request = connection.recv()
+    except EOFError:
+      break
+    if request is None:
+      break
+    command = request[0]
+    if command == 'add':
+      (_, run_id, path) = request
+      accumulator = _CreateAccumulator(path, options, prefetcher)
+      if store is not None:
+        store.RestoreAccumulator(accumulator)
+      accumulators[run_id] = accumulator
+      connection.send(accumulator.TakeDelta())
+    elif command == 'remove':
+      accumulators.pop(request[1], None)
+    elif command == 'reload':
+      for run_id in request[1]:
+        accumulator = accumulators.get(run_id)
+        if accumulator is None:
+          continue
+        calls_before = accumulator.FilesystemCalls()
+        delta = None
+        error = None
+        try:
+          accumulator.Reload()
+        except directory_watcher.DirectoryDeletedError:
+          del accumulators[run_id]
+          if store is not None:
+            store.Forget(accumulator.path)
+        except Exception as e:  # pylint: disable=broad-except
+          # Reported rather than raised, since the worker would otherwise
+          # die and fail again on the same run once restarted.
+          error = str(e)
+        else:
+          if store is not None:
+            store.MaybeSaveAccumulator(accumulator)
+        if run_id in accumulators:
+          delta = accumulator.TakeDelta()
+        calls = accumulator.FilesystemCalls()
+        calls.subtract(calls_before)
+        connection.send((run_id, delta, error, calls))
+      connection.send(None)
+  connection.close()
+
+
+def _CreateAccumulator(path, options, prefetcher):
+  """Creates the accumulator of a run in a worker process."""
+  if options['plugin_names'] is None and not options['tag_pattern']:
+    run_event_filter = None
+  else:
+    run_event_filter = event_filter.EventFilter(
+        options['plugin_names'], options['tag_pattern'])
+  return event_accumulator.EventAccumulator(
+      path,
+      size_guidance=options['size_guidance'],
+      tensor_size_guidance=options['tensor_size_guidance'],
+      purge_orphaned_data=options['purge_orphaned_data'],
+      use_mmap=options['use_mmap'],
+      event_filter=run_event_filter,
+      prefetcher=prefetcher,
+      concurrent_writers=options['concurrent_writers'])
@@ -0,0 +1,144 @@
+# Copyright 2019 The TensorFlow Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ==============================================================================
+"""Tests for reload_workers."""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import os
+import shutil
+
+import numpy as np
+import tensorflow as tf
+
+from tensorboard.backend.event_processing import plugin_event_accumulator as ea  # pylint: disable=line-too-long
+from tensorboard.backend.event_processing import reload_workers
+from tensorboard.compat.proto import event_pb2
+from tensorboard.compat.proto import graph_pb2
+from tensorboard.plugins.image import summary as image_summary
+from tensorboard.plugins.scalar import summary as scalar_summary
+from tensorboard.util import test_util
+
+
+class ReloadWorkersTest(tf.test.TestCase):
+
+  def setUp(self):
+    super(ReloadWorkersTest, self).setUp()
+    self._logdir = self.get_temp_dir()
+    self._writers = {}
+
+  def _Write(self, run, steps):
+    if run not in self._writers:
+      self._writers[run] = test_util.FileWriter(
+          os.path.join(self._logdir, run))
+      self._writers[run].add_event(event_pb2.Event(
+          graph_def=graph_pb2.GraphDef().SerializeToString()))
+    writer = self._writers[run]
+    for step in steps:
+      writer.add_summary(scalar_summary.pb('loss', step), global_step=step)
+      writer.add_summary(
+          image_summary.pb('images', np.zeros((1, 1, 1, 3), np.uint8)),
+          global_step=step)
+    writer.flush()
+    return os.path.join(self._logdir, run)
+
+  def _CreateWorkers(self, num_workers, **kwargs):
+    workers = reload_workers.ReloadWorkers(
+        num_workers, size_guidance={ea.TENSORS: 10}, **kwargs)
+    self.addCleanup(workers.Close)
+    return workers
+
+  def _AssertLoaded(self, accumulator):
+    """Asserts that a run has the same data as if it were loaded here."""
+    expected = ea.EventAccumulator(
+        accumulator.path, size_guidance={ea.TENSORS: 10}).Reload()
+    self.assertEqual(accumulator.Tags(), expected.Tags())
+    for tag in expected.Tags()[ea.TENSORS]:
+      self.assertEqual(accumulator.Tensors(tag), expected.Tensors(tag))
+      self.assertEqual(accumulator.SummaryMetadata(tag),
+                       expected.SummaryMetadata(tag))
+    self.assertEqual(accumulator.PluginTagToContent('scalars'),
+                     expected.PluginTagToContent('scalars'))
+    self.assertEqual(accumulator.FirstEventTimestamp(),
+                     expected.FirstEventTimestamp())
+    self.assertEqual(accumulator.Position(), expected.Position())
+
+  def testReload(self):
+    workers = self._CreateWorkers(2)
+    accumulators = [workers.AddRun(self._Write(run, range(5)))
+                    for run in ('run1', 'run2', 'run3')]
+    self.assertEqual(accumulators[0].Tags()[ea.TENSORS], [])
+    (deleted, filesystem_calls) = workers.Reload(accumulators)
+    self.assertEqual(deleted, set())
+    self.assertGreater(filesystem_calls['listdir'], 0)
+    for accumulator in accumulators:
+      self._AssertLoaded(accumulator)
+
+    # Only the new data is sent, and items that were sampled out are removed.
+    self._Write('run1', range(5, 50))
+    workers.Reload(accumulators[:1])
+    self._AssertLoaded(accumulators[0])
+    self.assertEqual(
+        [e.step for e in accumulators[1].Scalars('loss/scalar_summary')],
+        list(range(5)))
+
+  def testRemoveRun(self):
+    workers = self._CreateWorkers(1)
+    accumulator = workers.AddRun(self._Write('run1', range(5)))
+    workers.RemoveRun(accumulator)
+    self._Write('run1', range(5, 10))
+    workers.Reload([accumulator])
+    self.assertEqual(accumulator.Tags()[ea.TENSORS], [])
+
+  def testDeletedRunsAreRemoved(self):
+    workers = self._CreateWorkers(1)
+    accumulators = [workers.AddRun(self._Write(run, range(5)))
+                    for run in ('run1', 'run2')]
+    workers.Reload(accumulators)
+    shutil.rmtree(os.path.join(self._logdir, 'run2'))
+    (deleted, _) = workers.Reload(accumulators)
+    self.assertEqual(deleted, set(accumulators[1:]))
+
+  def testRestartsWorkersThatDie(self):
+    workers = self._CreateWorkers(1)
+    accumulator = workers.AddRun(self._Write('run1', range(5)))
+    workers.Reload([accumulator])
+    workers._workers[0]._process.terminate()
+    workers._workers[0]._process.join()
+    self._Write('run1', range(5, 10))
+    # The run is loaded again from scratch by the new worker.
+    workers.Reload([accumulator])
+    workers.Reload([accumulator])
+    self._AssertLoaded(accumulator)
+
+  def testRestoresSnapshots(self):
+    snapshot_dir = os.path.join(self.get_temp_dir(), 'snapshots')
+    workers = self._CreateWorkers(1, snapshot_dir=snapshot_dir)
+    path = self._Write('run1', range(5))
+    workers.Reload([workers.AddRun(path)])
+    self.assertEqual(len(os.listdir(snapshot_dir)), 1)
+    self._Write('run1', range(5, 10))
+    workers = self._CreateWorkers(1, snapshot_dir=snapshot_dir)
+    accumulator = workers.AddRun(path)
+    self.assertEqual(
+        [e.step for e in accumulator.Scalars('loss/scalar_summary')],
+        list(range(5)))
+    workers.Reload([accumulator])
+    self._AssertLoaded(accumulator)
+
+
+if __name__ == '__main__':
+  tf.test.main()
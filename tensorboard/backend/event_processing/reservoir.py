@@ -19,10 +19,14 @@ from __future__ import absolute_import
 from __future__ import division
 from __future__ import print_function
 
+import array
 import collections
+import itertools
 import random
 import threading
 
+from six.moves import xrange  # pylint: disable=redefined-builtin
+
 
 class Reservoir(object):
   """A map-to-arrays container, with deterministic Reservoir Sampling.
@@ -51,7 +55,10 @@ class Reservoir(object):
 
   See: https://en.wikipedia.org/wiki/Reservoir_sampling
 
-  Adding items has amortized O(1) runtime.
+  Adding items has amortized O(1) runtime. Reading the items of a key after
+  they changed takes O(n) time, and O(1) time until they change again. Given
+  a `byte_size` function, the reservoir also keeps a running total of the
+  bytes of the items it holds, which `ByteSize` reads in O(keys) time.
 
   Fields:
     always_keep_last: Whether the latest seen sample is always at the
@@ -59,7 +66,7 @@ class Reservoir(object):
     size: An integer of the maximum number of samples.
   """
 
-  def __init__(self, size, seed=0, always_keep_last=True):
+  def __init__(self, size, seed=0, always_keep_last=True, byte_size=None):
     """Creates a new reservoir.
 
     Args:
@@ -70,20 +77,28 @@ class Reservoir(object):
         input items.
       always_keep_last: Whether to always keep the latest seen item in the
         end of the reservoir. Defaults to True.
+      byte_size: An optional function that returns the number of bytes of an
+        item, for `ByteSize`.
 
     Raises:
       ValueError: If size is negative or not an integer.
     """
     if size < 0 or size != round(size):
       raise ValueError('size must be nonnegative integer, was %s' % size)
-    self._buckets = collections.defaultdict(
-        lambda: _ReservoirBucket(size, random.Random(seed), always_keep_last))
+    self._seed = seed
+    self._byte_size = byte_size
+    self._buckets = collections.defaultdict(self._NewBucket)
     # _mutex guards the keys - creating new keys, retrieving by key, etc
     # the internal items are guarded by the ReservoirBuckets' internal mutexes
     self._mutex = threading.Lock()
     self.size = size
     self.always_keep_last = always_keep_last
 
+  def _NewBucket(self):
+    """Returns an empty bucket for a new key."""
+    return _ReservoirBucket(self.size, random.Random(self._seed),
+                            self.always_keep_last, self._byte_size)
+
   def Keys(self):
     """Return all the keys in the reservoir.
 
@@ -111,6 +126,27 @@ class Reservoir(object):
       bucket = self._buckets[key]
     return bucket.Items()
 
+  def ItemsView(self, key):
+    """Like `Items`, but returns a tuple that is shared by all callers.
+
+    The tuple is not copied, and is never modified: items added later are
+    in the tuples returned by later calls.
+
+    Args:
+      key: The key for which we are finding associated items.
+
+    Raises:
+      KeyError: If the key is not found in the reservoir.
+
+    Returns:
+      (tuple, of, items) associated with that key.
+    """
+    with self._mutex:
+      if key not in self._buckets:
+        raise KeyError('Key %s was not found in Reservoir' % key)
+      bucket = self._buckets[key]
+    return bucket.ItemsView()
+
   def AddItem(self, key, item, f=lambda x: x):
     """Add a new item to the Reservoir with the given tag.
 
@@ -137,6 +173,59 @@ class Reservoir(object):
       bucket = self._buckets[key]
     bucket.AddItem(item, f)
 
+  def State(self):
+    """Returns the state of the reservoir, which `Restore` can resume from.
+
+    Returns:
+      A dict from each key to the state of its bucket, which holds the items
+      themselves, so it can be pickled if they can.
+    """
+    with self._mutex:
+      buckets = list(self._buckets.items())
+    return {key: bucket.State() for (key, bucket) in buckets}
+
+  def Restore(self, state):
+    """Replaces the contents of the reservoir with a state from `State`.
+
+    Sampling continues as if the items that the state was taken from had
+    been added to this reservoir. The reservoir should have the same size
+    and seed as the one that the state was taken from.
+
+    Args:
+      state: A dict returned by `State`.
+    """
+    with self._mutex:
+      self._buckets.clear()
+      for (key, bucket_state) in state.items():
+        self._buckets[key].Restore(bucket_state)
+
+  def UpdateItems(self, key, removed_indices, items):
+    """Removes the items of a key at some indices, then appends others.
+
+    This replays the changes made to the items of another reservoir, without
+    sampling: the items are appended even if the reservoir is full.
+
+    Args:
+      key: The key whose items are updated. It is added if needed.
+      removed_indices: The indices of the items to remove, before the new
+        items are appended.
+      items: The items to append.
+    """
+    with self._mutex:
+      bucket = self._buckets[key]
+    bucket.UpdateItems(removed_indices, items)
+
+  def ByteSize(self):
+    """Returns how many bytes the items of all keys take.
+
+    Returns:
+      The sum of `byte_size` over the items that the reservoir holds, or 0
+      if the reservoir has no `byte_size` function.
+    """
+    with self._mutex:
+      buckets = list(self._buckets.values())
+    return sum(bucket.ByteSize() for bucket in buckets)
+
   def FilterItems(self, filterFn, key=None):
     """Filter items within a Reservoir, using a filtering function.
 
@@ -163,9 +252,17 @@ class _ReservoirBucket(object):
   """A container for items from a stream, that implements reservoir sampling.
 
   It always stores the most recent item as its final item.
+
+  Items are kept in a log, in the order in which they were added, and each
+  slot of the bucket holds the position of an item in the log. Replacing the
+  item of a slot only marks it as removed from the log, so that it takes
+  constant time, and the log is compacted once more than a quarter of its
+  items were removed. The items are read through an immutable view, which
+  is built lazily and shared by all readers until the items change.
   """
 
-  def __init__(self, _max_size, _random=None, always_keep_last=True):
+  def __init__(self, _max_size, _random=None, always_keep_last=True,
+               byte_size=None):
     """Create the _ReservoirBucket.
 
     Args:
@@ -175,13 +272,16 @@ class _ReservoirBucket(object):
         random.Random(0).
       always_keep_last: Whether the latest seen item should always be included
         in the end of the bucket.
+      byte_size: An optional function that returns the number of bytes of an
+        item, whose sum over the items is kept up to date.
 
     Raises:
       ValueError: if the size is not a nonnegative integer.
     """
     if _max_size < 0 or _max_size != round(_max_size):
       raise ValueError('_max_size must be nonnegative int, was %s' % _max_size)
-    self.items = []
+    self._byte_size = byte_size
+    self._Reset([])
     # This mutex protects the internal items, ensuring that calls to Items and
     # AddItem are thread-safe
     self._mutex = threading.Lock()
@@ -199,12 +299,11 @@ class _ReservoirBucket(object):
     The new item is guaranteed to be added to the bucket, and to be the last
     element in the bucket. If the bucket has reached capacity, then an old item
     will be replaced. With probability (_max_size/_num_items_seen) a random item
-    in the bucket will be popped out and the new item will be appended
+    in the bucket will be removed and the new item will be appended
     to the end. With probability (1 - _max_size/_num_items_seen)
     the last item in the bucket will be replaced.
 
-    Since the O(n) replacements occur with O(1/_num_items_seen) likelihood,
-    the amortized runtime is O(1).
+    Either replacement takes amortized constant time.
 
     Args:
       item: The item to add to the bucket.
@@ -212,16 +311,32 @@ class _ReservoirBucket(object):
         the reservoir.
     """
     with self._mutex:
-      if len(self.items) < self._max_size or self._max_size == 0:
-        self.items.append(f(item))
+      size = len(self._positions)
+      if size < self._max_size or self._max_size == 0:
+        self._Append(size, f(item))
       else:
         r = self._random.randint(0, self._num_items_seen)
         if r < self._max_size:
-          self.items.pop(r)
-          self.items.append(f(item))
+          position = self._positions[r]
+          if self._byte_size is not None:
+            self._total_bytes -= self._byte_size(self._log[position])
+          self._log[position] = None
+          self._alive[position] = 0
+          self._num_removed += 1
+          self._Append(r, f(item))
+          if self._num_removed > size // 4:
+            self._Compact()
         elif self.always_keep_last:
-          self.items[-1] = f(item)
+          item = f(item)
+          if self._byte_size is not None:
+            self._total_bytes += (
+                self._byte_size(item) - self._byte_size(self._log[-1]))
+          self._log[-1] = item
+        else:
+          self._num_items_seen += 1
+          return
       self._num_items_seen += 1
+      self._view = None
 
   def FilterItems(self, filterFn):
     """Filter items in a ReservoirBucket, using a filtering function.
@@ -243,17 +358,141 @@ class _ReservoirBucket(object):
       The number of items removed from the bucket.
     """
     with self._mutex:
-      size_before = len(self.items)
-      self.items = list(filter(filterFn, self.items))
-      size_diff = size_before - len(self.items)
+      size_before = len(self._positions)
+      self._Reset(list(filter(filterFn, self._View())))
+      size_diff = size_before - len(self._positions)
 
       # Estimate a correction the number of items seen
-      prop_remaining = len(self.items) / float(
+      prop_remaining = len(self._positions) / float(
           size_before) if size_before > 0 else 0
       self._num_items_seen = int(round(self._num_items_seen * prop_remaining))
       return size_diff
 
+  def UpdateItems(self, removed_indices, items):
+    """Removes the items at some indices, then appends others."""
+    items = list(items)
+    with self._mutex:
+      if removed_indices:
+        removed_indices = set(removed_indices)
+        self._Reset([item for (i, item) in enumerate(self._View())
+                     if i not in removed_indices])
+      start = len(self._positions)
+      position = len(self._log)
+      if self._byte_size is not None:
+        self._total_bytes += sum(self._byte_size(item) for item in items)
+      self._log.extend(items)
+      self._alive.extend(b'\x01' * len(items))
+      self._log_slots.extend(xrange(start, start + len(items)))
+      self._positions.extend(xrange(position, position + len(items)))
+      self._num_items_seen += len(items)
+      self._view = None
+
+  def State(self):
+    """Returns the items, the number of items seen, the random state, and
+    the slot of each item."""
+    with self._mutex:
+      return (list(self._View()), self._num_items_seen,
+              self._random.getstate(),
+              list(itertools.compress(self._log_slots, self._alive)))
+
+  def Restore(self, state):
+    """Restores the bucket to a state returned by `State`."""
+    (items, num_items_seen, random_state, slots) = state
+    with self._mutex:
+      self._Reset(list(items))
+      self._log_slots = array.array('l', slots)
+      for (position, slot) in enumerate(slots):
+        self._positions[slot] = position
+      self._num_items_seen = num_items_seen
+      self._random.setstate(random_state)
+
   def Items(self):
     """Get all the items in the bucket."""
+    return list(self.ItemsView())
+
+  def ItemsView(self):
+    """Get all the items in the bucket, as a tuple that is never modified."""
+    with self._mutex:
+      return self._View()
+
+  def ByteSize(self):
+    """Returns how many bytes the items take, as told by `byte_size`."""
     with self._mutex:
-      return list(self.items)
+      return self._total_bytes
+
+  def _View(self):
+    if self._view is None:
+      if self._num_removed:
+        self._view = tuple(itertools.compress(self._log, self._alive))
+      else:
+        self._view = tuple(self._log)
+    return self._view
+
+  def _Append(self, slot, item):
+    """Appends an item to the log, as the item of a slot."""
+    if slot == len(self._positions):
+      self._positions.append(len(self._log))
+    else:
+      self._positions[slot] = len(self._log)
+    self._log.append(item)
+    self._alive.append(1)
+    self._log_slots.append(slot)
+    if self._byte_size is not None:
+      self._total_bytes += self._byte_size(item)
+
+  def _Compact(self):
+    """Drops the removed items from the log."""
+    self._log = list(itertools.compress(self._log, self._alive))
+    self._log_slots = array.array(
+        'l', itertools.compress(self._log_slots, self._alive))
+    for (position, slot) in enumerate(self._log_slots):
+      self._positions[slot] = position
+    self._alive = bytearray(b'\x01') * len(self._log)
+    self._num_removed = 0
+
+  def _Reset(self, items):
+    """Replaces the items with a list of items in order."""
+    # The items in the order in which they were added, with None for those
+    # that were removed (as told by `_alive`).
+    self._log = items
+    self._alive = bytearray(b'\x01') * len(items)
+    self._num_removed = 0
+    # The slot of each item of the log.
+    self._log_slots = array.array('l', xrange(len(items)))
+    # The position in the log of the item of each slot.
+    self._positions = array.array('l', xrange(len(items)))
+    # A tuple of the items in order, or None if it must be built again.
+    self._view = None
+    # The number of bytes of the items, if there is a `byte_size` function.
+    self._total_bytes = (0 if self._byte_size is None else
+                         sum(self._byte_size(item) for item in items))
+
+
+def ItemsDelta(old, new):
+  """Returns how the items of a key changed into others.
+
+  Like the items of a reservoir, `new` must hold the items of `old` that were
+  kept, in the same order, followed by any new items. Items are compared by
+  identity. The change can be replayed with `Reservoir.UpdateItems`.
+
+  Args:
+    old: A list of items.
+    new: A list of items.
+
+  Returns:
+    A tuple of the indices of the items of `old` that were removed and of the
+    items that were added, or None if `new` holds the same items as `old`.
+  """
+  # Most of the time, items are only added.
+  if len(new) >= len(old) and (not old or new[len(old) - 1] is old[-1]):
+    if len(new) == len(old):
+      return None
+    return ([], new[len(old):])
+  removed_indices = []
+  i = 0
+  for (j, item) in enumerate(old):
+    if i < len(new) and new[i] is item:
+      i += 1
+    else:
+      removed_indices.append(j)
+  return (removed_indices, new[i:])
@@ -0,0 +1,194 @@
+# Copyright 2019 The TensorFlow Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ==============================================================================
+"""Benchmarks for adding and reading the items of reservoirs.
+
+Here are the results of running this benchmark with Python 3.7 and numpy
+1.18 on a single core of a Linux machine:
+
+    RESERVOIR    SIZE    ITEMS     ITEMS/S  US/READ CHANGED  US/READ SAME
+       legacy     500  1000000    451545.0              4.4           2.9
+         list     500  1000000    430071.3             12.2           0.7
+      columns     500  1000000    222765.7             10.8           0.9
+       legacy   10000  1000000    449940.0             23.0          19.5
+         list   10000  1000000    434083.3            179.4           0.7
+      columns   10000  1000000    227444.3             39.2           0.9
+       legacy  100000  1000000    249980.2            277.1         214.0
+         list  100000  1000000    382638.1           1611.7           0.8
+      columns  100000  1000000    238483.9            586.8           1.5
+
+Each reservoir samples 10^6 items for a single key, then reads its items
+after each of 100 batches of 1000 more items ("changed"), and 100 more times
+without adding any ("same"). "legacy" is the bucket that popped a random
+item out of a list, and copied the list on each read; "list" reads the
+`reservoir.Reservoir.ItemsView` tuple, and "columns" the
+`scalar_reservoir.ScalarReservoir.Columns` arrays.
+
+Adding no longer slows down as the reservoir grows, since replacing an item
+doesn't move the ones after it. Reads of unchanged items no longer copy
+anything. Building a view after a change costs more than copying a list did,
+because it skips the removed items of the log: this is paid once per change,
+by the first reader, rather than by every reader. Setting items of numpy
+arrays one at a time is what bounds the rate at which "columns" adds items.
+"""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import random
+import threading
+import time
+
+from six.moves import xrange  # pylint: disable=redefined-builtin
+
+from absl import app
+from absl import logging
+
+from tensorboard.backend.event_processing import reservoir
+from tensorboard.backend.event_processing import scalar_reservoir
+from tensorboard.compat.proto import types_pb2
+from tensorboard.util import tb_logging
+
+
+logger = tb_logging.get_logger()
+
+_ITEM_COUNT = 1000000
+
+_KEY = 'key'
+
+# The number of items added between two reads after a change.
+_ITEMS_PER_RELOAD = 1000
+
+
+class _LegacyReservoir(reservoir.Reservoir):
+  """A `reservoir.Reservoir` whose buckets work like they used to."""
+
+  def _NewBucket(self):
+    return _LegacyBucket(self.size, random.Random(self._seed),
+                         self.always_keep_last)
+
+
+class _LegacyBucket(object):
+  """Adds and reads items like `reservoir._ReservoirBucket` used to."""
+
+  def __init__(self, max_size, _random, always_keep_last):
+    self._max_size = max_size
+    self._random = _random
+    self.always_keep_last = always_keep_last
+    self._num_items_seen = 0
+    self.items = []
+    self._mutex = threading.Lock()
+
+  def AddItem(self, item, f=lambda x: x):
+    with self._mutex:
+      if len(self.items) < self._max_size or self._max_size == 0:
+        self.items.append(f(item))
+      else:
+        r = self._random.randint(0, self._num_items_seen)
+        if r < self._max_size:
+          self.items.pop(r)
+          self.items.append(f(item))
+        elif self.always_keep_last:
+          self.items[-1] = f(item)
+      self._num_items_seen += 1
+
+  def Items(self):
+    with self._mutex:
+      return list(self.items)
+
+
+def _read_legacy(r):
+  return r.Items(_KEY)
+
+
+def _read_view(r):
+  return r.ItemsView(_KEY)
+
+
+def _read_columns(r):
+  return r.Columns(_KEY)
+
+
+_IMPLEMENTATIONS = (
+    ('legacy', _LegacyReservoir, _read_legacy),
+    ('list', reservoir.Reservoir, _read_view),
+    ('columns',
+     lambda size: scalar_reservoir.ScalarReservoir(size, types_pb2.DT_FLOAT),
+     _read_columns),
+)
+
+
+def bench(new_reservoir, read, size, reads=100):
+  """Returns items added per second, and the cost of reads in microseconds.
+
+  The first cost is that of reading the items after `_ITEMS_PER_RELOAD`
+  items were added, and the second that of reading them again.
+  """
+  r = new_reservoir(size)
+  item = scalar_reservoir.ScalarEvent(wall_time=1e9, step=0, value=0.5)
+  start_time = time.time()
+  for _ in xrange(_ITEM_COUNT):
+    r.AddItem(_KEY, item)
+  add_rate = _ITEM_COUNT / (time.time() - start_time)
+  read(r)
+  changed_secs = 0
+  for _ in xrange(reads):
+    for _ in xrange(_ITEMS_PER_RELOAD):
+      r.AddItem(_KEY, item)
+    start_time = time.time()
+    read(r)
+    changed_secs += time.time() - start_time
+  start_time = time.time()
+  for _ in xrange(reads):
+    read(r)
+  unchanged_secs = time.time() - start_time
+  return (add_rate, changed_secs / reads * 1e6, unchanged_secs / reads * 1e6)
+
+
+def _format_line(headers, fields):
+  """Format a line of a table.
+
+  Arguments:
+    headers: A list of strings that are used as the table headers.
+    fields: A list of the same length as `headers` where `fields[i]` is
+      the entry for `headers[i]` in this row. Elements can be of
+      arbitrary types. Pass `headers` to print the header row.
+
+  Returns:
+    A pretty string.
+  """
+  assert len(fields) == len(headers), (fields, headers)
+  fields = ["%2.1f" % field if isinstance(field, float) else str(field)
+            for field in fields]
+  return '  '.join(' ' * max(0, len(header) - len(field)) + field
+                   for (header, field) in zip(headers, fields))
+
+
+def main(unused_argv):
+  logging.set_verbosity(logging.INFO)
+  logger.info("Running...")
+  headers = ('RESERVOIR', '  SIZE', '  ITEMS', '   ITEMS/S',
+             'US/READ CHANGED', 'US/READ SAME')
+  logger.info(_format_line(headers, headers))
+  for size in (500, 10000, 100000):
+    for (name, new_reservoir, read) in _IMPLEMENTATIONS:
+      (add_rate, changed_us, unchanged_us) = bench(new_reservoir, read, size)
+      logger.info(_format_line(
+          headers, (name, size, _ITEM_COUNT, add_rate, changed_us,
+                    unchanged_us)))
+
+
+if __name__ == '__main__':
+  app.run(main)
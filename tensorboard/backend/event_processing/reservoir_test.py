@@ -17,6 +17,8 @@ from __future__ import absolute_import
 from __future__ import division
 from __future__ import print_function
 
+import pickle
+
 from six.moves import xrange  # pylint: disable=redefined-builtin
 import tensorflow as tf
 
@@ -109,6 +111,79 @@ class ReservoirTest(tf.test.TestCase):
     self.assertEqual(len(r.Items('key1')), 4)
     self.assertEqual(len(r.Items('key2')), 8)
 
+  def testRestoreContinuesSampling(self):
+    """Tests that a restored reservoir samples like the original one."""
+    original = reservoir.Reservoir(10)
+    for i in xrange(100):
+      original.AddItem('key1', i)
+      original.AddItem('key2', -i)
+    restored = reservoir.Reservoir(10)
+    restored.AddItem('stale', 0)
+    restored.Restore(pickle.loads(pickle.dumps(original.State())))
+    self.assertItemsEqual(restored.Keys(), ['key1', 'key2'])
+    for i in xrange(100, 200):
+      original.AddItem('key1', i)
+      restored.AddItem('key1', i)
+    self.assertEqual(restored.Items('key1'), original.Items('key1'))
+    self.assertEqual(restored.Items('key2'), original.Items('key2'))
+
+  def testUpdateItems(self):
+    r = reservoir.Reservoir(3)
+    r.UpdateItems('key', [], [0, 1, 2, 3])
+    self.assertEqual(r.Items('key'), [0, 1, 2, 3])
+    r.UpdateItems('key', [0, 2], [4])
+    self.assertEqual(r.Items('key'), [1, 3, 4])
+    r.UpdateItems('key', [1], [])
+    self.assertEqual(r.Items('key'), [1, 4])
+
+  def testItemsView(self):
+    r = reservoir.Reservoir(10)
+    for i in xrange(100):
+      r.AddItem('key', i)
+    view = r.ItemsView('key')
+    self.assertIsInstance(view, tuple)
+    self.assertEqual(list(view), r.Items('key'))
+    self.assertIs(r.ItemsView('key'), view)
+    # Later items are in later views only.
+    items = list(view)
+    for i in xrange(100, 200):
+      r.AddItem('key', i)
+    self.assertEqual(list(view), items)
+    self.assertIsNot(r.ItemsView('key'), view)
+    self.assertEqual(r.ItemsView('key')[-1], 199)
+    with self.assertRaises(KeyError):
+      r.ItemsView('missing key')
+
+  def testItemsDelta(self):
+    r = reservoir.Reservoir(10)
+    mirror = reservoir.Reservoir(10)
+    old = ()
+    for i in xrange(100):
+      r.AddItem('key', [i])
+      new = r.ItemsView('key')
+      (removed_indices, added) = reservoir.ItemsDelta(old, new)
+      mirror.UpdateItems('key', removed_indices, added)
+      self.assertEqual(mirror.Items('key'), r.Items('key'))
+      old = new
+    self.assertIsNone(reservoir.ItemsDelta(old, r.ItemsView('key')))
+
+  def testByteSize(self):
+    """Tests that the running byte total matches the items kept."""
+    r = reservoir.Reservoir(10, byte_size=len)
+    for i in xrange(1000):
+      r.AddItem('key1', 'x' * (i % 7))
+      r.AddItem('key2', 'y' * (i % 5), f=lambda s: s + '!')
+      self.assertEqual(r.ByteSize(), sum(
+          len(item) for key in r.Keys() for item in r.ItemsView(key)))
+    r.FilterItems(lambda s: len(s) > 2, 'key1')
+    r.UpdateItems('key2', [0, 1], ['zzz'])
+    self.assertEqual(r.ByteSize(), sum(
+        len(item) for key in r.Keys() for item in r.ItemsView(key)))
+    restored = reservoir.Reservoir(10, byte_size=len)
+    restored.Restore(r.State())
+    self.assertEqual(restored.ByteSize(), r.ByteSize())
+    self.assertEqual(reservoir.Reservoir(10).ByteSize(), 0)
+
 
 class ReservoirBucketTest(tf.test.TestCase):
 
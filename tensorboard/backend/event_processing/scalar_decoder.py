@@ -0,0 +1,326 @@
+# Copyright 2019 The TensorFlow Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ==============================================================================
+"""A fast decoder for events that hold only scalar summaries.
+
+Most events written during training hold a few scalars. Decoding them in the
+general way parses the whole `Event`, migrates each old-style `simple_value`
+to a new-style value with a tensor and metadata, and later converts the
+tensor back into a number. `DecodeScalarEvent` instead reads the wall time,
+step, tags and values straight from the protobuf wire format, and gives up
+on any event that holds anything else, leaving it to the general path.
+"""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import collections
+import struct
+
+import six
+
+from tensorboard.compat.proto import types_pb2
+
+
+# An event whose summary holds only scalars. `values` is a tuple of
+# `(tag, dtype, value)` triples, where `dtype` is the `DataType` enum value
+# of the scalar (`DT_FLOAT` for an old-style `simple_value`) and `value` is
+# a Python float. `record` is the serialized `Event`, for callers that need
+# to fall back to parsing it.
+ScalarEventRecord = collections.namedtuple(
+    'ScalarEventRecord', ['wall_time', 'step', 'values', 'record'])
+
+_DT_FLOAT = types_pb2.DT_FLOAT
+_DT_DOUBLE = types_pb2.DT_DOUBLE
+
+_unpack_double = struct.Struct('<d').unpack_from
+_unpack_float = struct.Struct('<f').unpack_from
+
+# Views of serialized protos whose items are ints.
+_ByteView = bytearray if six.PY2 else memoryview
+
+# Keys (field number and wire type) of the fields that the decoder
+# understands. Any other field makes it give up.
+_EVENT_WALL_TIME = 0x09  # 1: double
+_EVENT_STEP = 0x10  # 2: int64
+_EVENT_SUMMARY = 0x2a  # 5: Summary
+_SUMMARY_VALUE = 0x0a  # 1: Summary.Value
+_VALUE_TAG = 0x0a  # 1: string
+_VALUE_SIMPLE_VALUE = 0x15  # 2: float
+_VALUE_TENSOR = 0x42  # 8: TensorProto
+_TENSOR_DTYPE = 0x08  # 1: DataType
+_TENSOR_SHAPE = 0x12  # 2: TensorShapeProto
+_TENSOR_VERSION_NUMBER = 0x18  # 3: int32
+_TENSOR_CONTENT = 0x22  # 4: bytes
+_TENSOR_FLOAT_VAL_PACKED = 0x2a  # 5: repeated float, packed
+_TENSOR_FLOAT_VAL = 0x2d  # 5: repeated float, unpacked
+_TENSOR_DOUBLE_VAL_PACKED = 0x32  # 6: repeated double, packed
+_TENSOR_DOUBLE_VAL = 0x31  # 6: repeated double, unpacked
+_SHAPE_UNKNOWN_RANK = 0x18  # 3: bool
+
+# Wire types of protobuf fields, for skipping the fields of an `Event` other
+# than its step.
+_VARINT = 0
+_FIXED64 = 1
+_LENGTH_DELIMITED = 2
+_FIXED32 = 5
+
+
+def DecodeScalarEvent(record):
+  """Decodes an event that holds only scalar summary values.
+
+  A scalar is either an old-style `simple_value` or a rank-0 `DT_FLOAT` or
+  `DT_DOUBLE` tensor. Values with metadata or a `node_name` are not decoded,
+  since the caller must see the metadata.
+
+  Args:
+    record: A serialized `Event` proto, as `bytes` or a buffer.
+
+  Returns:
+    A `ScalarEventRecord`, or None if the event holds anything but a summary
+    of scalars (or is malformed), and must be parsed in the general way.
+  """
+  data = _ByteView(record)
+  try:
+    return _Decode(data, record)
+  except (IndexError, ValueError, struct.error):
+    return None
+
+
+def DecodeStep(record):
+  """Reads the step of an event without parsing the rest of it.
+
+  The other fields of the `Event`, such as summaries of images or graphs,
+  are skipped over by their lengths.
+
+  Args:
+    record: A serialized `Event` proto, as `bytes` or a buffer.
+
+  Returns:
+    The step (0 if the event has none), or None if the event is malformed.
+  """
+  data = _ByteView(record)
+  try:
+    return _DecodeStep(data)
+  except (IndexError, ValueError):
+    return None
+
+
+def ScalarFromTensorProto(tensor):
+  """Returns the value of a rank-0 float or double `TensorProto`.
+
+  Args:
+    tensor: A `TensorProto`.
+
+  Returns:
+    The value as a Python float, or None if the tensor is not a rank-0
+    `DT_FLOAT` or `DT_DOUBLE` tensor with exactly one value.
+  """
+  if tensor.dtype == _DT_FLOAT:
+    (values, unpack, size) = (tensor.float_val, _unpack_float, 4)
+  elif tensor.dtype == _DT_DOUBLE:
+    (values, unpack, size) = (tensor.double_val, _unpack_double, 8)
+  else:
+    return None
+  if tensor.tensor_shape.dim or tensor.tensor_shape.unknown_rank:
+    return None
+  if tensor.tensor_content:
+    if len(tensor.tensor_content) != size:
+      return None
+    return unpack(tensor.tensor_content)[0]
+  if len(values) != 1:
+    return None
+  return values[0]
+
+
+def _Decode(data, record):
+  pos = 0
+  end = len(data)
+  wall_time = 0.0
+  step = 0
+  values = None
+  while pos < end:
+    key = data[pos]
+    pos += 1
+    if key == _EVENT_WALL_TIME:
+      wall_time = _unpack_double(data, pos)[0]
+      pos += 8
+    elif key == _EVENT_STEP:
+      (step, pos) = _ReadVarint(data, pos)
+      if step >= 1 << 63:
+        step -= 1 << 64
+    elif key == _EVENT_SUMMARY:
+      (length, pos) = _ReadVarint(data, pos)
+      summary_end = pos + length
+      if summary_end > end:
+        return None
+      values = _DecodeSummary(data, pos, summary_end, values or [])
+      if values is None:
+        return None
+      pos = summary_end
+    else:
+      return None
+  if not values:
+    return None
+  return ScalarEventRecord(wall_time, step, tuple(values), record)
+
+
+def _DecodeStep(data):
+  pos = 0
+  end = len(data)
+  step = 0
+  while pos < end:
+    (key, pos) = _ReadVarint(data, pos)
+    wire_type = key & 7
+    if key == _EVENT_STEP:
+      (step, pos) = _ReadVarint(data, pos)
+      if step >= 1 << 63:
+        step -= 1 << 64
+    elif wire_type == _VARINT:
+      pos = _ReadVarint(data, pos)[1]
+    elif wire_type == _FIXED64:
+      pos += 8
+    elif wire_type == _LENGTH_DELIMITED:
+      (length, pos) = _ReadVarint(data, pos)
+      pos += length
+    elif wire_type == _FIXED32:
+      pos += 4
+    else:
+      raise ValueError('unsupported wire type %d' % wire_type)
+  if pos > end:
+    raise IndexError('field extends past the end of the record')
+  return step
+
+
+def _DecodeSummary(data, pos, end, values):
+  while pos < end:
+    if data[pos] != _SUMMARY_VALUE:
+      return None
+    (length, pos) = _ReadVarint(data, pos + 1)
+    value_end = pos + length
+    if value_end > end:
+      return None
+    tag = None
+    dtype = None
+    value = None
+    while pos < value_end:
+      key = data[pos]
+      pos += 1
+      if key == _VALUE_TAG:
+        (length, pos) = _ReadVarint(data, pos)
+        tag = bytes(data[pos:pos + length]).decode('utf-8')
+        pos += length
+      elif key == _VALUE_SIMPLE_VALUE:
+        if value is not None:
+          return None
+        dtype = _DT_FLOAT
+        value = _unpack_float(data, pos)[0]
+        pos += 4
+      elif key == _VALUE_TENSOR:
+        if value is not None:
+          return None
+        (length, pos) = _ReadVarint(data, pos)
+        tensor = _DecodeTensor(data, pos, pos + length)
+        if tensor is None:
+          return None
+        (dtype, value) = tensor
+        pos += length
+      else:
+        return None
+    if pos != value_end or not tag or value is None:
+      return None
+    values.append((tag, dtype, value))
+  return values
+
+
+def _DecodeTensor(data, pos, end):
+  """Returns the `(dtype, value)` of a rank-0 float or double tensor."""
+  dtype = None
+  float_values = []
+  double_values = []
+  content = None
+  while pos < end:
+    key = data[pos]
+    pos += 1
+    if key == _TENSOR_DTYPE:
+      (dtype, pos) = _ReadVarint(data, pos)
+    elif key == _TENSOR_SHAPE:
+      (length, pos) = _ReadVarint(data, pos)
+      # A rank-0 shape has no dimensions; allow only `unknown_rank: false`.
+      shape_end = pos + length
+      while pos < shape_end:
+        if data[pos] != _SHAPE_UNKNOWN_RANK or data[pos + 1] != 0:
+          return None
+        pos += 2
+    elif key == _TENSOR_VERSION_NUMBER:
+      pos = _ReadVarint(data, pos)[1]
+    elif key == _TENSOR_FLOAT_VAL:
+      float_values.append(_unpack_float(data, pos)[0])
+      pos += 4
+    elif key == _TENSOR_DOUBLE_VAL:
+      double_values.append(_unpack_double(data, pos)[0])
+      pos += 8
+    elif key == _TENSOR_FLOAT_VAL_PACKED:
+      (length, pos) = _ReadVarint(data, pos)
+      float_values.extend(_UnpackAll(_unpack_float, 4, data, pos, length))
+      pos += length
+    elif key == _TENSOR_DOUBLE_VAL_PACKED:
+      (length, pos) = _ReadVarint(data, pos)
+      double_values.extend(_UnpackAll(_unpack_double, 8, data, pos, length))
+      pos += length
+    elif key == _TENSOR_CONTENT:
+      (length, pos) = _ReadVarint(data, pos)
+      content = (pos, length)
+      pos += length
+    else:
+      return None
+  if pos != end:
+    return None
+  if dtype == _DT_FLOAT and not double_values:
+    (values, unpack, size) = (float_values, _unpack_float, 4)
+  elif dtype == _DT_DOUBLE and not float_values:
+    (values, unpack, size) = (double_values, _unpack_double, 8)
+  else:
+    return None
+  if content is not None:
+    if values or content[1] != size:
+      return None
+    return (dtype, unpack(data, content[0])[0])
+  if len(values) != 1:
+    return None
+  return (dtype, values[0])
+
+
+def _UnpackAll(unpack, size, data, pos, length):
+  if length % size:
+    raise ValueError('packed field has a partial element')
+  return [unpack(data, pos + offset)[0] for offset in range(0, length, size)]
+
+
+def _ReadVarint(data, pos):
+  byte = data[pos]
+  if byte < 0x80:
+    return (byte, pos + 1)
+  result = byte & 0x7f
+  shift = 7
+  while True:
+    pos += 1
+    byte = data[pos]
+    result |= (byte & 0x7f) << shift
+    if byte < 0x80:
+      return (result, pos + 1)
+    shift += 7
+    if shift >= 70:
+      raise ValueError('varint too long')
@@ -0,0 +1,149 @@
+# Copyright 2019 The TensorFlow Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ==============================================================================
+"""Tests for scalar_decoder."""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import struct
+
+import numpy as np
+import tensorflow as tf
+
+from tensorboard.backend.event_processing import scalar_decoder
+from tensorboard.compat.proto import event_pb2
+from tensorboard.compat.proto import summary_pb2
+from tensorboard.compat.proto import tensor_pb2
+from tensorboard.compat.proto import tensor_shape_pb2
+from tensorboard.compat.proto import types_pb2
+
+
+def _Record(*values, **kwargs):
+  event = event_pb2.Event(
+      wall_time=kwargs.get('wall_time', 1234.5),
+      step=kwargs.get('step', 7),
+      summary=summary_pb2.Summary(value=values))
+  return event.SerializeToString()
+
+
+def _Tensor(dtype, **kwargs):
+  return tensor_pb2.TensorProto(
+      dtype=dtype, tensor_shape=tensor_shape_pb2.TensorShapeProto(), **kwargs)
+
+
+class DecodeScalarEventTest(tf.test.TestCase):
+
+  def testSimpleValues(self):
+    decoded = scalar_decoder.DecodeScalarEvent(_Record(
+        summary_pb2.Summary.Value(tag='loss', simple_value=0.25),
+        summary_pb2.Summary.Value(tag='acc', simple_value=-3.0),
+        step=-5))
+    self.assertEqual(decoded.wall_time, 1234.5)
+    self.assertEqual(decoded.step, -5)
+    self.assertEqual(decoded.values, (
+        ('loss', types_pb2.DT_FLOAT, 0.25),
+        ('acc', types_pb2.DT_FLOAT, -3.0),
+    ))
+
+  def testScalarTensors(self):
+    decoded = scalar_decoder.DecodeScalarEvent(_Record(
+        summary_pb2.Summary.Value(
+            tag='a', tensor=_Tensor(types_pb2.DT_FLOAT, float_val=[1.5])),
+        summary_pb2.Summary.Value(
+            tag='b', tensor=_Tensor(types_pb2.DT_DOUBLE, double_val=[0.1])),
+        summary_pb2.Summary.Value(
+            tag='c', tensor=_Tensor(
+                types_pb2.DT_FLOAT,
+                tensor_content=np.float32(2.5).tobytes())),
+        summary_pb2.Summary.Value(
+            tag='d', tensor=_Tensor(
+                types_pb2.DT_DOUBLE,
+                tensor_content=struct.pack('<d', 1e100)))))
+    self.assertEqual(decoded.values, (
+        ('a', types_pb2.DT_FLOAT, 1.5),
+        ('b', types_pb2.DT_DOUBLE, 0.1),
+        ('c', types_pb2.DT_FLOAT, 2.5),
+        ('d', types_pb2.DT_DOUBLE, 1e100),
+    ))
+
+  def testFallsBackForOtherEvents(self):
+    records = [
+        event_pb2.Event(wall_time=1.0, step=1).SerializeToString(),
+        event_pb2.Event(file_version='brain.Event:2').SerializeToString(),
+        _Record(),
+        # Metadata must be seen by the caller.
+        _Record(summary_pb2.Summary.Value(
+            tag='loss', simple_value=1.0,
+            metadata=summary_pb2.SummaryMetadata(display_name='Loss'))),
+        # Any non-scalar value spoils the whole event.
+        _Record(
+            summary_pb2.Summary.Value(tag='loss', simple_value=1.0),
+            summary_pb2.Summary.Value(
+                tag='image', image=summary_pb2.Summary.Image(height=1))),
+        _Record(summary_pb2.Summary.Value(
+            tag='ints', tensor=_Tensor(types_pb2.DT_INT32, int_val=[1]))),
+        _Record(summary_pb2.Summary.Value(
+            tag='vector',
+            tensor=tensor_pb2.TensorProto(
+                dtype=types_pb2.DT_FLOAT, float_val=[1.0, 2.0],
+                tensor_shape=tensor_shape_pb2.TensorShapeProto(
+                    dim=[tensor_shape_pb2.TensorShapeProto.Dim(size=2)])))),
+        _Record(summary_pb2.Summary.Value(
+            tag='empty', tensor=_Tensor(types_pb2.DT_FLOAT))),
+        _Record(summary_pb2.Summary.Value(
+            node_name='old', tensor=_Tensor(types_pb2.DT_FLOAT,
+                                            float_val=[1.0]))),
+    ]
+    for record in records:
+      self.assertIsNone(scalar_decoder.DecodeScalarEvent(record),
+                        event_pb2.Event.FromString(record))
+
+  def testMalformedRecords(self):
+    record = _Record(summary_pb2.Summary.Value(tag='loss', simple_value=1.0))
+    for end in range(len(record)):
+      self.assertIsNone(scalar_decoder.DecodeScalarEvent(record[:end]))
+    self.assertIsNone(scalar_decoder.DecodeScalarEvent(b'\xff' * 16))
+
+  def testDecodeStep(self):
+    records = [
+        event_pb2.Event(step=-5, wall_time=1.0,
+                        graph_def=b'graph').SerializeToString(),
+        event_pb2.Event(wall_time=2.0, file_version='brain.Event:2')
+        .SerializeToString(),
+        _Record(summary_pb2.Summary.Value(
+            tag='image', image=summary_pb2.Summary.Image(
+                encoded_image_string=b'\x00' * 1000)), step=1 << 40),
+    ]
+    for record in records:
+      self.assertEqual(scalar_decoder.DecodeStep(record),
+                       event_pb2.Event.FromString(record).step)
+    self.assertIsNone(scalar_decoder.DecodeStep(records[2][:-1]))
+    self.assertIsNone(scalar_decoder.DecodeStep(b'\x0f'))
+
+  def testScalarFromTensorProto(self):
+    self.assertEqual(scalar_decoder.ScalarFromTensorProto(
+        _Tensor(types_pb2.DT_FLOAT, float_val=[0.5])), 0.5)
+    self.assertEqual(scalar_decoder.ScalarFromTensorProto(
+        _Tensor(types_pb2.DT_DOUBLE,
+                tensor_content=struct.pack('<d', 0.1))), 0.1)
+    self.assertIsNone(scalar_decoder.ScalarFromTensorProto(
+        _Tensor(types_pb2.DT_STRING, string_val=[b'x'])))
+    self.assertIsNone(scalar_decoder.ScalarFromTensorProto(
+        _Tensor(types_pb2.DT_FLOAT, float_val=[0.5, 1.5])))
+
+
+if __name__ == '__main__':
+  tf.test.main()
@@ -0,0 +1,398 @@
+# Copyright 2019 The TensorFlow Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ==============================================================================
+"""Aggregates of scalars over buckets of steps, at several resolutions.
+
+A reservoir keeps a sample of the scalars of a tag, and a chart of a long
+run either gets all of them or gets nothing. A `ScalarPyramid` sees every
+scalar of a tag, and keeps their minimum, maximum, mean, first and last
+values and their count over buckets of `2**k` steps, for each `k` from
+that of its finest level up to one that holds a single bucket. `Buckets`
+then answers a request for at most some number of points from the finest
+level that fits, in time proportional to the number of points returned.
+
+The finest level is dropped once it holds more than `_MAX_BUCKETS`
+buckets, so that a pyramid takes at most about `2 * _MAX_BUCKETS` buckets
+(of 64 bytes each), however many scalars it saw.
+"""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import collections
+import threading
+
+import numpy as np
+from six.moves import xrange  # pylint: disable=redefined-builtin
+
+
+# The aggregates of the scalars in each bucket of steps, as parallel numpy
+# arrays. `wall_time` and `step` are those of the last scalar of the bucket.
+ScalarBuckets = collections.namedtuple(
+    'ScalarBuckets',
+    ['wall_time', 'step', 'mean', 'min', 'max', 'first', 'last', 'count'])
+
+# The arrays that a level holds for its buckets: like `ScalarBuckets`, with
+# the sum of the values rather than their mean.
+_FIELDS = ('wall_time', 'step', 'sum', 'min', 'max', 'first', 'last', 'count')
+_DTYPES = (np.float64, np.int64, np.float64, np.float64, np.float64,
+           np.float64, np.float64, np.int64)
+_WALL_TIME, _STEP, _SUM, _MIN, _MAX, _FIRST, _LAST, _COUNT = xrange(
+    len(_FIELDS))
+
+# The most buckets that the finest level holds before it is dropped.
+_MAX_BUCKETS = 1024
+
+# How many scalars are added before they are aggregated, in bulk.
+_BATCH_SIZE = 1024
+
+# Steps are int64s, so buckets of `2**_MAX_SHIFT` steps hold all of them.
+_MAX_SHIFT = 64
+
+
+class ScalarPyramid(object):
+  """Aggregates of the scalars of a tag, over buckets of steps.
+
+  Each level has buckets of `2**shift` steps, for shifts that grow by one
+  from the finest level. A bucket holds the aggregates of the scalars whose
+  steps are in the same range `[i * 2**shift, (i + 1) * 2**shift)`, and the
+  buckets of a level are sorted by their steps. Steps usually only grow, but
+  they go back when out-of-order steps are not purged (as with recent file
+  versions, or with concurrent writers), in which case the scalars are
+  merged into the buckets that hold their steps.
+  """
+
+  def __init__(self):
+    self._levels = [_Level(0)]
+    # Scalars that were added but not aggregated yet.
+    self._pending = ([], [], [])
+    # Counts the changes to the levels other than the addition of scalars,
+    # which make `Delta` return everything.
+    self._generation = 0
+    # This mutex protects the levels, ensuring that calls to Buckets and
+    # Add are thread-safe
+    self._mutex = threading.Lock()
+
+  def Add(self, wall_time, step, value):
+    """Adds a scalar, after the ones added before."""
+    with self._mutex:
+      (wall_times, steps, values) = self._pending
+      wall_times.append(wall_time)
+      steps.append(step)
+      values.append(value)
+      if len(steps) >= _BATCH_SIZE:
+        self._Flush()
+
+  def AddArrays(self, wall_time, step, value):
+    """Adds scalars in bulk, after the ones added before.
+
+    The scalars are aggregated with numpy, without a Python call for each.
+
+    Args:
+      wall_time: A sequence or array of the wall times of the scalars.
+      step: A sequence or array of their steps, of the same length.
+      value: A sequence or array of their values, of the same length.
+    """
+    with self._mutex:
+      self._Flush()
+      self._Extend(np.array(wall_time, np.float64),
+                   np.array(step, np.int64), np.array(value, np.float64))
+
+  def Purge(self, step):
+    """Removes the scalars at `step` and later steps.
+
+    The scalars of the bucket of the finest level that holds `step` are
+    kept, since a bucket can't be split; those of coarser levels are
+    aggregated again from the finer level.
+    """
+    with self._mutex:
+      self._Flush()
+      finer = None
+      for level in self._levels:
+        level.Purge(step, finer)
+        finer = level
+      self._generation += 1
+
+  def Buckets(self, max_points):
+    """Returns the buckets of the finest level that has few enough.
+
+    Args:
+      max_points: The most buckets to return; at least 1.
+
+    Returns:
+      A `ScalarBuckets` of new arrays, from the finest level with at most
+      `max_points` buckets, or from the coarsest level if none has.
+    """
+    with self._mutex:
+      self._Flush()
+      for level in self._levels:
+        if level.length <= max_points:
+          break
+      arrays = level.Arrays()
+    count = arrays[_COUNT]
+    return ScalarBuckets(
+        wall_time=arrays[_WALL_TIME],
+        step=arrays[_STEP],
+        mean=arrays[_SUM] / np.maximum(count, 1),
+        min=arrays[_MIN],
+        max=arrays[_MAX],
+        first=arrays[_FIRST],
+        last=arrays[_LAST],
+        count=count)
+
+  def State(self):
+    """Returns the state of the pyramid, which `Restore` can resume from."""
+    with self._mutex:
+      self._Flush()
+      return (self._levels[0].shift,
+              [level.Arrays() for level in self._levels])
+
+  def Restore(self, state):
+    """Replaces the contents of the pyramid with a state from `State`."""
+    (shift, levels) = state
+    with self._mutex:
+      self._levels = [_Level(shift + i, arrays)
+                      for (i, arrays) in enumerate(levels)]
+      self._pending = ([], [], [])
+      self._generation += 1
+
+  def Delta(self, mark):
+    """Returns how the pyramid changed since an earlier call.
+
+    Args:
+      mark: What an earlier call returned as its mark, or None to return
+        everything.
+
+    Returns:
+      A tuple of the change, which `ApplyDelta` takes, or None if nothing
+      changed, and of the mark to pass next time.
+    """
+    with self._mutex:
+      self._Flush()
+      lengths = [level.length for level in self._levels]
+      new_mark = (self._generation, self._levels[0].shift, lengths)
+      if mark == new_mark:
+        return (None, mark)
+      if mark is None or mark[:2] != new_mark[:2]:
+        change = (True, self._levels[0].shift,
+                  [level.Arrays() for level in self._levels])
+      else:
+        # Only the last bucket of each level can have changed, then more
+        # buckets were added.
+        starts = [max(length - 1, 0) for length in mark[2]]
+        starts += [0] * (len(lengths) - len(starts))
+        change = (False, self._levels[0].shift,
+                  [(start, level.Arrays(start))
+                   for (start, level) in zip(starts, self._levels)])
+      return (change, new_mark)
+
+  def ApplyDelta(self, change):
+    """Applies a change from the `Delta` of another pyramid.
+
+    This pyramid then holds the same buckets as the other one, as long as it
+    is given every change of the other one in order, and is not added
+    scalars itself.
+    """
+    (full, shift, levels) = change
+    if full:
+      self.Restore((shift, levels))
+      return
+    with self._mutex:
+      for (i, (start, arrays)) in enumerate(levels):
+        if i == len(self._levels):
+          self._levels.append(_Level(shift + i))
+        self._levels[i].Truncate(start)
+        self._levels[i].Append(arrays)
+
+  def ByteSize(self):
+    """Returns how many bytes the arrays of the levels take."""
+    with self._mutex:
+      self._Flush()
+      return sum(level.ByteSize() for level in self._levels)
+
+  def _Flush(self):
+    """Aggregates the pending scalars into every level."""
+    (wall_times, steps, values) = self._pending
+    if not steps:
+      return
+    self._pending = ([], [], [])
+    self._Extend(np.array(wall_times, np.float64), np.array(steps, np.int64),
+                 np.array(values, np.float64))
+
+  def _Extend(self, wall_times, steps, values):
+    """Aggregates scalars, given as arrays, into every level."""
+    if not len(steps):
+      return
+    buckets = (wall_times, steps, values, values, values, values, values,
+               np.ones(len(values), np.int64))
+    for level in self._levels:
+      if not level.Extend(buckets):
+        # Buckets other than the last one changed.
+        self._generation += 1
+    # Each level holds a single bucket at the top, and few enough at the
+    # bottom.
+    while (self._levels[-1].length > 1 and
+           self._levels[-1].shift < _MAX_SHIFT):
+      coarsest = self._levels[-1]
+      level = _Level(coarsest.shift + 1)
+      level.Extend(coarsest.Arrays())
+      self._levels.append(level)
+    while self._levels[0].length > _MAX_BUCKETS and len(self._levels) > 1:
+      del self._levels[0]
+      self._generation += 1
+
+
+class _Level(object):
+  """The buckets of a `ScalarPyramid` that are `2**shift` steps wide."""
+
+  def __init__(self, shift, arrays=None):
+    self.shift = shift
+    self.length = 0
+    self._arrays = [np.empty(0, dtype) for dtype in _DTYPES]
+    if arrays is not None:
+      self.Append(arrays)
+
+  def Arrays(self, start=0):
+    """Returns copies of the arrays of the buckets from `start` on."""
+    return tuple(array[start:self.length].copy() for array in self._arrays)
+
+  def Extend(self, buckets):
+    """Aggregates buckets (or scalars) into those of the level.
+
+    Args:
+      buckets: A tuple of arrays of `_FIELDS`, of buckets of any finer level,
+        in the order they were added.
+
+    Returns:
+      Whether the buckets came after those of the level, so that only the
+      last bucket of the level changed before more were appended. If not,
+      they were merged into the buckets that hold their steps.
+    """
+    ids = buckets[_STEP] >> self.shift
+    if (np.any(ids[1:] < ids[:-1]) or
+        (self.length and ids[0] < self._Id(self.length - 1))):
+      self._Merge(buckets)
+      return False
+    (aggregates, ids) = _Aggregate(buckets, self.shift)
+    if self.length and ids[0] == self._Id(self.length - 1):
+      last = self.length - 1
+      arrays = self._arrays
+      arrays[_WALL_TIME][last] = aggregates[_WALL_TIME][0]
+      arrays[_STEP][last] = aggregates[_STEP][0]
+      arrays[_SUM][last] += aggregates[_SUM][0]
+      arrays[_MIN][last] = np.fmin(arrays[_MIN][last], aggregates[_MIN][0])
+      arrays[_MAX][last] = np.fmax(arrays[_MAX][last], aggregates[_MAX][0])
+      arrays[_LAST][last] = aggregates[_LAST][0]
+      arrays[_COUNT][last] += aggregates[_COUNT][0]
+      aggregates = tuple(array[1:] for array in aggregates)
+    self.Append(aggregates)
+    return True
+
+  def _Merge(self, buckets):
+    """Aggregates buckets whose steps go back into those of the level."""
+    arrays = tuple(np.concatenate([array[:self.length], new])
+                   for (array, new) in zip(self._arrays, buckets))
+    # A stable sort keeps the buckets of each id in the order they were added.
+    order = np.argsort(arrays[_STEP] >> self.shift, kind='mergesort')
+    (aggregates, _) = _Aggregate(
+        tuple(array[order] for array in arrays), self.shift)
+    self.length = 0
+    self.Append(aggregates)
+
+  def Append(self, arrays):
+    """Appends buckets, given as a tuple of arrays of `_FIELDS`."""
+    count = len(arrays[_STEP])
+    end = self.length + count
+    if end > len(self._arrays[_STEP]):
+      capacity = max(end, 2 * len(self._arrays[_STEP]))
+      for (i, array) in enumerate(self._arrays):
+        resized = np.empty(capacity, array.dtype)
+        resized[:self.length] = array[:self.length]
+        self._arrays[i] = resized
+    for (array, new) in zip(self._arrays, arrays):
+      array[self.length:end] = new
+    self.length = end
+
+  def Truncate(self, length):
+    """Removes the buckets after the first `length` ones."""
+    self.length = min(self.length, length)
+
+  def Purge(self, step, finer):
+    """Removes the scalars at `step` and later steps.
+
+    Args:
+      step: The first step to remove.
+      finer: The level before this one, which was already purged, or None
+        if this is the finest level.
+    """
+    # The buckets that only hold earlier steps are kept.
+    first_id = -(-step >> self.shift)
+    if finer is None:
+      self.Truncate(_FirstIndex(self._Ids() >= first_id, self.length))
+      return
+    self.Truncate(_FirstIndex(self._Ids() >= first_id - 1, self.length))
+    finer_arrays = finer.Arrays()
+    start = _FirstIndex(
+        finer_arrays[_STEP] >> self.shift >= first_id - 1, finer.length)
+    if start < finer.length:
+      self.Extend(tuple(array[start:] for array in finer_arrays))
+
+  def ByteSize(self):
+    return sum(array.nbytes for array in self._arrays)
+
+  def _Ids(self):
+    return self._arrays[_STEP][:self.length] >> self.shift
+
+  def _Id(self, index):
+    return self._arrays[_STEP][index] >> self.shift
+
+
+def _Aggregate(buckets, shift):
+  """Aggregates the consecutive buckets of a tuple that share a bucket id.
+
+  Args:
+    buckets: A tuple of arrays of `_FIELDS`, of at least one bucket.
+    shift: The log2 of the width of the buckets to aggregate into.
+
+  Returns:
+    A tuple of the aggregated arrays of `_FIELDS`, and of their bucket ids.
+  """
+  ids = buckets[_STEP] >> shift
+  starts = np.flatnonzero(ids[1:] != ids[:-1]) + 1
+  starts = np.concatenate([[0], starts])
+  ends = np.concatenate([starts[1:], [len(ids)]]) - 1
+  aggregates = [None] * len(_FIELDS)
+  aggregates[_WALL_TIME] = buckets[_WALL_TIME][ends]
+  aggregates[_STEP] = buckets[_STEP][ends]
+  aggregates[_SUM] = np.add.reduceat(buckets[_SUM], starts)
+  aggregates[_MIN] = np.fmin.reduceat(buckets[_MIN], starts)
+  aggregates[_MAX] = np.fmax.reduceat(buckets[_MAX], starts)
+  aggregates[_FIRST] = buckets[_FIRST][starts]
+  aggregates[_LAST] = buckets[_LAST][ends]
+  aggregates[_COUNT] = np.add.reduceat(buckets[_COUNT], starts)
+  return (tuple(aggregates), ids[starts])
+
+
+def _FirstIndex(condition, default):
+  """Returns the index of the first true item of an array, or `default`."""
+  indices = np.flatnonzero(condition)
+  return int(indices[0]) if len(indices) else default
+
+
+def FromColumns(columns):
+  """Returns a `ScalarPyramid` of the scalars of a `ScalarColumns`."""
+  pyramid = ScalarPyramid()
+  pyramid.AddArrays(columns.wall_time, columns.step, columns.value)
+  return pyramid
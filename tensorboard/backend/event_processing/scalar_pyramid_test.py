@@ -0,0 +1,191 @@
+# Copyright 2019 The TensorFlow Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ==============================================================================
+"""Tests for scalar_pyramid."""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import pickle
+
+from six.moves import xrange  # pylint: disable=redefined-builtin
+import tensorflow as tf
+
+from tensorboard.backend.event_processing import scalar_pyramid
+from tensorboard.backend.event_processing import scalar_reservoir
+
+
+def _Value(step):
+  return float((step * 7919) % 101)
+
+
+def _Add(pyramid, steps):
+  for step in steps:
+    pyramid.Add(1e9 + step, step, _Value(step))
+
+
+def _Pyramid(steps):
+  pyramid = scalar_pyramid.ScalarPyramid()
+  _Add(pyramid, steps)
+  return pyramid
+
+
+def _Expected(steps, shift):
+  """Returns the rows of the buckets of `2**shift` steps, computed naively."""
+  rows_by_id = {}
+  for step in steps:
+    value = _Value(step)
+    row = rows_by_id.get(step >> shift)
+    if row is not None:
+      (_, _, total, low, high, first, _, count) = row
+      rows_by_id[step >> shift] = [
+          1e9 + step, step, total + value, min(low, value), max(high, value),
+          first, value, count + 1]
+    else:
+      rows_by_id[step >> shift] = [
+          1e9 + step, step, value, value, value, value, value, 1]
+  rows = [rows_by_id[bucket_id] for bucket_id in sorted(rows_by_id)]
+  for row in rows:
+    row[2] /= row[7]
+  return rows
+
+
+def _Rows(buckets):
+  return [list(row) for row in zip(*(array.tolist() for array in buckets))]
+
+
+class ScalarPyramidTest(tf.test.TestCase):
+
+  def testBuckets(self):
+    pyramid = scalar_pyramid.ScalarPyramid()
+    steps = list(xrange(0, 3000, 3))
+    _Add(pyramid, steps)
+    self.assertEqual(_Rows(pyramid.Buckets(1000)), _Expected(steps, 0))
+    self.assertEqual(_Rows(pyramid.Buckets(999)), _Expected(steps, 2))
+    self.assertEqual(_Rows(pyramid.Buckets(100)), _Expected(steps, 5))
+    self.assertEqual(_Rows(pyramid.Buckets(1)), _Expected(steps, 12))
+    buckets = pyramid.Buckets(50)
+    self.assertEqual(sum(buckets.count.tolist()), len(steps))
+    self.assertEqual(buckets.step.tolist()[-1], steps[-1])
+
+  def testBucketsDontDependOnBatches(self):
+    steps = list(xrange(5000))
+    pyramid = scalar_pyramid.ScalarPyramid()
+    _Add(pyramid, steps)
+    batched = scalar_pyramid.ScalarPyramid()
+    for start in xrange(0, 5000, 700):
+      _Add(batched, steps[start:start + 700])
+      batched.Buckets(1)
+    for max_points in (2000, 700, 30, 1):
+      self.assertEqual(_Rows(batched.Buckets(max_points)),
+                       _Rows(pyramid.Buckets(max_points)))
+
+  def testFinestLevelsAreDropped(self):
+    pyramid = scalar_pyramid.ScalarPyramid()
+    steps = list(xrange(100000))
+    _Add(pyramid, steps)
+    buckets = pyramid.Buckets(100000)
+    self.assertLessEqual(len(buckets.step), scalar_pyramid._MAX_BUCKETS)
+    self.assertEqual(_Rows(buckets), _Expected(steps, 7))
+    self.assertLess(pyramid.ByteSize(),
+                    4 * 64 * scalar_pyramid._MAX_BUCKETS)
+
+  def testPurge(self):
+    pyramid = _Pyramid(xrange(2000))
+    pyramid.Purge(1200)
+    _Add(pyramid, xrange(1200, 1500))
+    steps = list(xrange(1500))
+    for max_points in (1500, 200, 1):
+      self.assertEqual(_Rows(pyramid.Buckets(max_points)),
+                       _Rows(_Pyramid(steps).Buckets(max_points)))
+
+  def testPurgeKeepsTheBucketThatHoldsTheStep(self):
+    pyramid = scalar_pyramid.ScalarPyramid()
+    steps = list(xrange(0, 20000, 2))
+    _Add(pyramid, steps)
+    # The finest buckets are 32 steps wide, so steps 1000 to 1022 are kept.
+    pyramid.Purge(1000)
+    kept = [step for step in steps if step < 1024]
+    self.assertEqual(_Rows(pyramid.Buckets(10000)), _Expected(kept, 5))
+    self.assertEqual(_Rows(pyramid.Buckets(1)), _Expected(kept, 14))
+
+  def testStepsThatGoBack(self):
+    pyramid = scalar_pyramid.ScalarPyramid()
+    mirror = scalar_pyramid.ScalarPyramid()
+    mark = None
+    steps = []
+    for more_steps in (xrange(2000), xrange(500, 1500),
+                       xrange(1800, 1700, -1)):
+      _Add(pyramid, more_steps)
+      steps.extend(more_steps)
+      (change, mark) = pyramid.Delta(mark)
+      mirror.ApplyDelta(pickle.loads(pickle.dumps(change)))
+    for (max_points, shift) in ((1000, 1), (10, 8), (4, 9), (1, 11)):
+      self.assertEqual(_Rows(pyramid.Buckets(max_points)),
+                       _Expected(steps, shift))
+      self.assertEqual(_Rows(mirror.Buckets(max_points)),
+                       _Expected(steps, shift))
+
+  def testRestore(self):
+    pyramid = scalar_pyramid.ScalarPyramid()
+    _Add(pyramid, xrange(3000))
+    restored = scalar_pyramid.ScalarPyramid()
+    restored.Restore(pickle.loads(pickle.dumps(pyramid.State())))
+    _Add(pyramid, xrange(3000, 4000))
+    _Add(restored, xrange(3000, 4000))
+    for max_points in (1000, 10, 1):
+      self.assertEqual(_Rows(restored.Buckets(max_points)),
+                       _Rows(pyramid.Buckets(max_points)))
+
+  def testDelta(self):
+    pyramid = scalar_pyramid.ScalarPyramid()
+    mirror = scalar_pyramid.ScalarPyramid()
+    mark = None
+    for (steps, purge) in ((xrange(100), None), (xrange(100, 1500), None),
+                           ((), None), (xrange(1500, 1600), 1400),
+                           (xrange(1400, 3000), None)):
+      if purge is not None:
+        pyramid.Purge(purge)
+      _Add(pyramid, steps)
+      (change, mark) = pyramid.Delta(mark)
+      if not steps:
+        self.assertIsNone(change)
+      else:
+        mirror.ApplyDelta(pickle.loads(pickle.dumps(change)))
+      for max_points in (5000, 100, 1):
+        self.assertEqual(_Rows(mirror.Buckets(max_points)),
+                         _Rows(pyramid.Buckets(max_points)))
+
+  def testAddArrays(self):
+    steps = list(xrange(0, 9000, 3))
+    pyramid = _Pyramid(steps[:100])
+    pyramid.AddArrays([1e9 + step for step in steps[100:]], steps[100:],
+                      [_Value(step) for step in steps[100:]])
+    pyramid.AddArrays([], [], [])
+    for max_points in (5000, 100, 1):
+      self.assertEqual(_Rows(pyramid.Buckets(max_points)),
+                       _Rows(_Pyramid(steps).Buckets(max_points)))
+
+  def testFromColumns(self):
+    pyramid = _Pyramid(xrange(10))
+    buckets = pyramid.Buckets(10)
+    columns = scalar_reservoir.ScalarColumns(
+        wall_time=buckets.wall_time, step=buckets.step, value=buckets.mean)
+    self.assertEqual(_Rows(scalar_pyramid.FromColumns(columns).Buckets(3)),
+                     _Rows(pyramid.Buckets(3)))
+
+
+if __name__ == '__main__':
+  tf.test.main()
@@ -0,0 +1,433 @@
+# Copyright 2019 The TensorFlow Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ==============================================================================
+"""A reservoir of scalars that stores them in numpy arrays.
+
+A `reservoir.Reservoir` holds a Python list of items, and a scalar item
+takes about 150 bytes: a tuple, a float for the wall time, an int for the
+step and a float for the value. A `ScalarReservoir` keeps the wall times,
+steps and values of each key in parallel numpy arrays instead, which take
+about 40 bytes per scalar (with a serial number that tells the order in
+which items were added, and the bookkeeping of their log), and can be read
+in bulk with `Columns`.
+
+Items are sampled exactly as a `reservoir.Reservoir` with the same size and
+seed would sample them.
+"""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import collections
+import random
+import threading
+
+import numpy as np
+
+from tensorboard.backend.event_processing import reservoir
+from tensorboard.compat.proto import types_pb2
+
+
+# The scalars of a key, as parallel numpy arrays of the same length.
+ScalarColumns = collections.namedtuple(
+    'ScalarColumns', ['wall_time', 'step', 'value'])
+
+# An item of a `ScalarReservoir`. This is also
+# `plugin_event_accumulator.ScalarEvent`.
+ScalarEvent = collections.namedtuple('ScalarEvent',
+                                     ['wall_time', 'step', 'value'])
+
+# The number of items that the arrays of a bucket first have room for.
+_INITIAL_CAPACITY = 16
+
+
+def ValueType(dtype):
+  """Returns the numpy type that holds the values of a `DataType`.
+
+  Scalars are either `DT_FLOAT` or `DT_DOUBLE` (see
+  `scalar_decoder.ScalarFromTensorProto`), so their values are kept exactly.
+  """
+  return np.float64 if dtype == types_pb2.DT_DOUBLE else np.float32
+
+
+def ItemsToColumns(items, value_type):
+  """Returns a `ScalarColumns` of the `wall_time`, `step` and `value` fields
+  of items, with values of a type from `ValueType`."""
+  items = list(items)
+  return ScalarColumns(
+      wall_time=np.array([item.wall_time for item in items], np.float64),
+      step=np.array([item.step for item in items], np.int64),
+      value=np.array([item.value for item in items], value_type))
+
+
+def ColumnsToItems(columns):
+  """Returns a list of `ScalarEvent`s with the items of a `ScalarColumns`."""
+  return [ScalarEvent(*item) for item in zip(columns.wall_time.tolist(),
+                                             columns.step.tolist(),
+                                             columns.value.tolist())]
+
+
+class ScalarReservoir(reservoir.Reservoir):
+  """A `reservoir.Reservoir` of scalars, stored in columns.
+
+  Items are added as tuples with `wall_time`, `step` and `value` fields, and
+  returned as new `ScalarEvent`s each time. `Columns` returns the items
+  of a key as arrays without building any tuple, and `ColumnsDelta` tells
+  how they changed since an earlier call.
+  """
+
+  def __init__(self, size, dtype, seed=0, always_keep_last=True):
+    """Creates a new reservoir.
+
+    Args:
+      size: The number of values to keep in the reservoir for each key. If
+        0, all values will be kept.
+      dtype: The `DataType` enum value of the scalars, which tells the type
+        of the array of their values.
+      seed: The seed of the random number generator to use when sampling.
+      always_keep_last: Whether to always keep the latest seen item in the
+        end of the reservoir.
+
+    Raises:
+      ValueError: If size is negative or not an integer.
+    """
+    self._value_type = ValueType(dtype)
+    super(ScalarReservoir, self).__init__(
+        size, seed=seed, always_keep_last=always_keep_last)
+
+  def _NewBucket(self):
+    return _ScalarBucket(self.size, self._value_type,
+                         random.Random(self._seed), self.always_keep_last)
+
+  def Columns(self, key):
+    """Returns the items associated with a key as arrays.
+
+    Args:
+      key: The key for which we are finding associated items.
+
+    Raises:
+      KeyError: If the key is not found in the reservoir.
+
+    Returns:
+      A `ScalarColumns` of read-only arrays, which are shared by all callers
+      until the items change, and are not changed by later additions.
+    """
+    return self._Bucket(key).Columns()
+
+  def ColumnsDelta(self, key, serials):
+    """Returns how the items of a key changed since an earlier call.
+
+    Args:
+      key: The key whose items are compared. It is added if needed.
+      serials: What an earlier call returned for the key, or None to return
+        all items as added.
+
+    Returns:
+      A tuple of the indices of the earlier items that were removed since
+      (which `UpdateColumns` takes), of a `ScalarColumns` of the items added
+      since, and of the value to pass as `serials` next time.
+    """
+    with self._mutex:
+      bucket = self._buckets[key]
+    return bucket.ColumnsDelta(serials)
+
+  def UpdateColumns(self, key, removed_indices, columns):
+    """Like `UpdateItems`, with the items to append as a `ScalarColumns`."""
+    with self._mutex:
+      bucket = self._buckets[key]
+    bucket.UpdateColumns(removed_indices, columns)
+
+  def ByteSize(self):
+    """Returns how many bytes the arrays of all keys take."""
+    with self._mutex:
+      buckets = list(self._buckets.values())
+    return sum(bucket.ByteSize() for bucket in buckets)
+
+  def _Bucket(self, key):
+    with self._mutex:
+      if key not in self._buckets:
+        raise KeyError('Key %s was not found in Reservoir' % key)
+      return self._buckets[key]
+
+
+class _ScalarBucket(object):
+  """A `reservoir._ReservoirBucket` that stores its items in arrays.
+
+  Like a `_ReservoirBucket`, it keeps items in a log, in the order in which
+  they were added, and replacing the item of a slot only marks it as removed
+  from the log. The log is compacted into new arrays once more than a
+  quarter of its items were removed. Besides its wall time, step and value,
+  each item has a serial number, which is larger than those of all items
+  added before.
+
+  The items are read through read-only arrays that are shared by all
+  readers until the items change. While no item of the log is removed,
+  they are slices of the arrays of the log, which are only ever appended to.
+  """
+
+  def __init__(self, max_size, value_type, _random, always_keep_last):
+    self._max_size = max_size
+    self._value_type = value_type
+    self._random = _random
+    self.always_keep_last = always_keep_last
+    self._num_items_seen = 0
+    self._next_serial = 0
+    self._SetLog(ScalarColumns(np.empty(0, np.float64), np.empty(0, np.int64),
+                               np.empty(0, value_type)))
+    # This mutex protects the arrays, ensuring that calls to Items and
+    # AddItem are thread-safe
+    self._mutex = threading.Lock()
+
+  def AddItem(self, item, f=lambda x: x):
+    """Adds an item, replacing an old one if needed, like a `_ReservoirBucket`.
+
+    Either replacement takes amortized constant time.
+    """
+    with self._mutex:
+      if self._length < self._max_size or self._max_size == 0:
+        slot = self._length
+      else:
+        r = self._random.randint(0, self._num_items_seen)
+        if r < self._max_size:
+          slot = r
+        elif self.always_keep_last:
+          slot = self._last_slot
+        else:
+          self._num_items_seen += 1
+          return
+        self._alive[self._positions[slot]] = False
+        self._num_removed += 1
+      item = f(item)
+      self._Reserve(self._log_length + 1, slot + 1)
+      position = self._log_length
+      self._wall_times[position] = item.wall_time
+      self._steps[position] = item.step
+      self._values[position] = item.value
+      self._serials[position] = self._next_serial
+      self._alive[position] = True
+      self._positions[slot] = position
+      self._next_serial += 1
+      self._log_length += 1
+      self._length = max(self._length, slot + 1)
+      self._last_slot = slot
+      self._num_items_seen += 1
+      self._view = None
+      if self._num_removed > self._length // 4:
+        self._Compact()
+
+  def FilterItems(self, filterFn):
+    """Filters the items, like `_ReservoirBucket.FilterItems`."""
+    with self._mutex:
+      size_before = self._length
+      (columns, _) = self._View()
+      keep = np.array(
+          [bool(filterFn(item)) for item in ColumnsToItems(columns)],
+          dtype=bool)
+      self._Keep(keep)
+      size_diff = size_before - self._length
+
+      # Estimate a correction the number of items seen
+      prop_remaining = self._length / float(
+          size_before) if size_before > 0 else 0
+      self._num_items_seen = int(round(self._num_items_seen * prop_remaining))
+      return size_diff
+
+  def UpdateItems(self, removed_indices, items):
+    """Removes the items at some indices, then appends others."""
+    self.UpdateColumns(removed_indices,
+                       ItemsToColumns(items, self._value_type))
+
+  def UpdateColumns(self, removed_indices, columns):
+    """Removes the items at some indices, then appends the columns."""
+    with self._mutex:
+      if len(removed_indices):
+        keep = np.ones(self._length, dtype=bool)
+        keep[np.asarray(removed_indices, np.int64)] = False
+        self._Keep(keep)
+      count = len(columns.step)
+      self._Reserve(self._log_length + count, self._length + count)
+      start = self._log_length
+      end = start + count
+      self._wall_times[start:end] = columns.wall_time
+      self._steps[start:end] = columns.step
+      self._values[start:end] = columns.value
+      self._serials[start:end] = np.arange(
+          self._next_serial, self._next_serial + count)
+      self._alive[start:end] = True
+      self._positions[self._length:self._length + count] = np.arange(start, end)
+      self._next_serial += count
+      self._log_length = end
+      self._length += count
+      if count:
+        self._last_slot = self._length - 1
+        self._view = None
+      self._num_items_seen += count
+
+  def State(self):
+    """Returns the columns, the number of items seen, the random state, and
+    the slot of each item."""
+    with self._mutex:
+      return (self._View()[0], self._num_items_seen, self._random.getstate(),
+              np.argsort(self._positions[:self._length]))
+
+  def Restore(self, state):
+    """Restores the bucket to a state returned by `State`."""
+    (columns, num_items_seen, random_state, slots) = state
+    with self._mutex:
+      self._SetLog(columns)
+      self._positions[slots] = np.arange(len(slots))
+      self._last_slot = int(slots[-1]) if len(slots) else None
+      self._num_items_seen = num_items_seen
+      self._random.setstate(random_state)
+
+  def Items(self):
+    """Returns all the items in the bucket, as new tuples."""
+    with self._mutex:
+      (columns, _) = self._View()
+    return ColumnsToItems(columns)
+
+  def Columns(self):
+    with self._mutex:
+      return self._View()[0]
+
+  def ColumnsDelta(self, serials):
+    with self._mutex:
+      (columns, new_serials) = self._View()
+    if serials is None:
+      serials = new_serials[:0]
+    # Serial numbers only grow, so the items kept are the first ones
+    # unless one of the earlier items was removed.
+    old_length = len(serials)
+    if (len(new_serials) >= old_length and
+        (not old_length or new_serials[old_length - 1] == serials[-1])):
+      removed_indices = []
+      kept = old_length
+    else:
+      found = np.isin(serials, new_serials, assume_unique=True)
+      removed_indices = np.flatnonzero(~found).tolist()
+      kept = int(np.count_nonzero(found))
+    added = ScalarColumns(*(array[kept:] for array in columns))
+    return (removed_indices, added, new_serials)
+
+  def ByteSize(self):
+    """Returns the size of the arrays of the log and of the view."""
+    with self._mutex:
+      size = sum(array.nbytes for array in self._LogArrays())
+      size += self._alive.nbytes + self._positions.nbytes
+      if self._view is not None and self._num_removed:
+        size += sum(array.nbytes for array in self._view[0])
+        size += self._view[1].nbytes
+      return size
+
+  def _LogArrays(self):
+    return (self._wall_times, self._steps, self._values, self._serials)
+
+  def _View(self):
+    """Returns the `ScalarColumns` of the items in order, and their serials."""
+    if self._view is None:
+      end = self._log_length
+      if self._num_removed:
+        alive = self._alive[:end]
+        arrays = [array[:end][alive] for array in self._LogArrays()]
+      else:
+        arrays = [array[:end] for array in self._LogArrays()]
+      for array in arrays:
+        array.flags.writeable = False
+      self._view = (ScalarColumns(*arrays[:3]), arrays[3])
+    return self._view
+
+  def _Reserve(self, log_length, length):
+    """Grows the arrays, if needed, for a log and a number of slots."""
+    capacity = len(self._steps)
+    if log_length > capacity:
+      capacity = max(log_length, 2 * capacity, _INITIAL_CAPACITY)
+      if self._max_size:
+        capacity = min(capacity, max(log_length, _LogCapacity(self._max_size)))
+      (self._wall_times, self._steps, self._values, self._serials,
+       self._alive) = (
+           _Resized(array, capacity, self._log_length)
+           for array in self._LogArrays() + (self._alive,))
+    slot_capacity = len(self._positions)
+    if length > slot_capacity:
+      slot_capacity = max(length, 2 * slot_capacity, _INITIAL_CAPACITY)
+      if self._max_size:
+        slot_capacity = min(slot_capacity, max(length, self._max_size))
+      self._positions = _Resized(self._positions, slot_capacity, self._length)
+
+  def _Compact(self):
+    """Copies the items that were not removed into new arrays."""
+    end = self._log_length
+    alive = self._alive[:end]
+    new_positions = np.cumsum(alive) - 1
+    positions = new_positions[self._positions[:self._length]]
+    last_slot = self._last_slot
+    self._SetLog(ScalarColumns(*(array[:end][alive]
+                                 for array in self._LogArrays()[:3])),
+                 serials=self._serials[:end][alive])
+    self._positions[:len(positions)] = positions
+    self._last_slot = last_slot
+
+  def _Keep(self, keep):
+    """Keeps the items whose index in the view is where `keep` is true.
+
+    The items keep their serial numbers, and are put in slots in order.
+    """
+    (columns, serials) = self._View()
+    self._SetLog(ScalarColumns(*(array[keep] for array in columns)),
+                 serials=serials[keep])
+
+  def _SetLog(self, columns, serials=None):
+    """Replaces the log with new arrays, which hold items in order.
+
+    Args:
+      columns: A `ScalarColumns` of the items.
+      serials: The serial numbers of the items, or None to give them new
+        ones.
+    """
+    length = len(columns.step)
+    capacity = _LogCapacity(length)
+    if serials is None:
+      serials = np.arange(self._next_serial, self._next_serial + length)
+      self._next_serial += length
+    self._wall_times = np.empty(capacity, np.float64)
+    self._steps = np.empty(capacity, np.int64)
+    self._values = np.empty(capacity, self._value_type)
+    self._serials = np.empty(capacity, np.int64)
+    self._alive = np.zeros(capacity, bool)
+    for (array, column) in zip(self._LogArrays(), columns + (serials,)):
+      array[:length] = column
+    self._alive[:length] = True
+    # The position in the log of the item of each slot.
+    self._positions = np.arange(length, dtype=np.int64)
+    self._length = length
+    self._log_length = length
+    self._last_slot = length - 1 if length else None
+    self._num_removed = 0
+    # A tuple of the `ScalarColumns` of the items in order and of their
+    # serial numbers, or None if it must be built again.
+    self._view = None
+
+
+def _LogCapacity(length):
+  """Returns how many items the log of `length` items may grow to before it
+  is compacted."""
+  return length + length // 4 + 1
+
+
+def _Resized(array, capacity, length):
+  """Returns an array of another capacity with the first items of `array`."""
+  resized = np.empty(capacity, array.dtype)
+  resized[:length] = array[:length]
+  return resized
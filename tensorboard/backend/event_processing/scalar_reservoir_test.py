@@ -0,0 +1,134 @@
+# Copyright 2019 The TensorFlow Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ==============================================================================
+"""Tests for scalar_reservoir."""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import pickle
+
+import numpy as np
+from six.moves import xrange  # pylint: disable=redefined-builtin
+import tensorflow as tf
+
+from tensorboard.backend.event_processing import reservoir
+from tensorboard.backend.event_processing import scalar_reservoir
+from tensorboard.compat.proto import types_pb2
+
+
+def _Event(step):
+  return scalar_reservoir.ScalarEvent(
+      wall_time=1e9 + step, step=step, value=step / 4.0)
+
+
+class ScalarReservoirTest(tf.test.TestCase):
+
+  def _Reservoirs(self, size, dtype=types_pb2.DT_FLOAT):
+    return (reservoir.Reservoir(size),
+            scalar_reservoir.ScalarReservoir(size, dtype))
+
+  def testSamplesLikeReservoir(self):
+    for size in (0, 1, 10):
+      (r, scalars) = self._Reservoirs(size)
+      for step in xrange(1000):
+        r.AddItem('key', _Event(step))
+        scalars.AddItem('key', _Event(step))
+      self.assertEqual(scalars.Items('key'), r.Items('key'))
+    (r, scalars) = self._Reservoirs(10)
+    with self.assertRaises(KeyError):
+      scalars.Items('missing')
+    with self.assertRaises(KeyError):
+      scalars.Columns('missing')
+
+  def testColumns(self):
+    scalars = scalar_reservoir.ScalarReservoir(0, types_pb2.DT_DOUBLE)
+    for step in xrange(3):
+      scalars.AddItem('key', _Event(step))
+    columns = scalars.Columns('key')
+    self.assertEqual(columns.wall_time.dtype, np.float64)
+    self.assertEqual(columns.step.dtype, np.int64)
+    self.assertEqual(columns.value.dtype, np.float64)
+    self.assertEqual(columns.step.tolist(), [0, 1, 2])
+    self.assertEqual(columns.value.tolist(), [0.0, 0.25, 0.5])
+    # Later additions don't change the columns returned before.
+    scalars.AddItem('key', _Event(3))
+    self.assertEqual(columns.step.tolist(), [0, 1, 2])
+    with self.assertRaises(ValueError):
+      columns.step[0] = 5
+    self.assertEqual(scalars.ByteSize(),
+                     scalar_reservoir._INITIAL_CAPACITY * (8 + 8 + 8 + 8 + 1 + 8))
+
+  def testColumnsAreShared(self):
+    scalars = scalar_reservoir.ScalarReservoir(10, types_pb2.DT_FLOAT)
+    for step in xrange(5):
+      scalars.AddItem('key', _Event(step))
+    columns = scalars.Columns('key')
+    self.assertIs(scalars.Columns('key'), columns)
+    # Replacing items doesn't change the columns returned before.
+    for step in xrange(5, 100):
+      scalars.AddItem('key', _Event(step))
+    self.assertEqual(columns.step.tolist(), list(xrange(5)))
+    steps = scalars.Columns('key').step.tolist()
+    self.assertEqual(steps, sorted(steps))
+    self.assertEqual(steps[-1], 99)
+
+  def testFilterItems(self):
+    (r, scalars) = self._Reservoirs(10)
+    for step in xrange(100):
+      r.AddItem('key', _Event(step))
+      scalars.AddItem('key', _Event(step))
+    self.assertEqual(scalars.FilterItems(lambda e: e.step < 50, 'key'),
+                     r.FilterItems(lambda e: e.step < 50, 'key'))
+    for step in xrange(50, 100):
+      r.AddItem('key', _Event(step))
+      scalars.AddItem('key', _Event(step))
+    self.assertEqual(scalars.Items('key'), r.Items('key'))
+
+  def testRestoreContinuesSampling(self):
+    (r, scalars) = self._Reservoirs(10)
+    for step in xrange(50):
+      r.AddItem('key', _Event(step))
+      scalars.AddItem('key', _Event(step))
+    restored = scalar_reservoir.ScalarReservoir(10, types_pb2.DT_FLOAT)
+    restored.Restore(pickle.loads(pickle.dumps(scalars.State())))
+    for step in xrange(50, 100):
+      r.AddItem('key', _Event(step))
+      restored.AddItem('key', _Event(step))
+    self.assertEqual(restored.Items('key'), r.Items('key'))
+
+  def testColumnsDelta(self):
+    scalars = scalar_reservoir.ScalarReservoir(10, types_pb2.DT_FLOAT)
+    mirror = scalar_reservoir.ScalarReservoir(10, types_pb2.DT_FLOAT)
+    serials = None
+    for steps in (xrange(5), xrange(5, 8), (), xrange(8, 100)):
+      for step in steps:
+        scalars.AddItem('key', _Event(step))
+      (removed_indices, added, serials) = scalars.ColumnsDelta('key', serials)
+      if not steps:
+        self.assertEqual((removed_indices, len(added.step)), ([], 0))
+      mirror.UpdateColumns('key', removed_indices,
+                           pickle.loads(pickle.dumps(added)))
+      self.assertEqual(mirror.Items('key'), scalars.Items('key'))
+    # Purged items are removed.
+    scalars.FilterItems(lambda e: e.step % 2, 'key')
+    (removed_indices, added, serials) = scalars.ColumnsDelta('key', serials)
+    self.assertEqual(len(added.step), 0)
+    mirror.UpdateColumns('key', removed_indices, added)
+    self.assertEqual(mirror.Items('key'), scalars.Items('key'))
+
+
+if __name__ == '__main__':
+  tf.test.main()
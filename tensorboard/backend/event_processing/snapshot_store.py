@@ -0,0 +1,201 @@
+# Copyright 2019 The TensorFlow Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ==============================================================================
+"""Saves snapshots of the data loaded for runs in a local directory.
+
+Loading a large logdir from scratch reads every byte of every events file.
+With a `SnapshotStore`, the data that has been loaded for each run (see
+`plugin_event_accumulator.EventAccumulator.Snapshot`) is saved from time to
+time, and restored when the run is added again after a restart, so that only
+the events written since are read.
+
+Each run is saved in its own file, named after a hash of the path of the run.
+Snapshots are pickled, so the directory must only be writable by the user
+that runs TensorBoard.
+"""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import hashlib
+import os
+import pickle
+import tempfile
+import threading
+import time
+
+from tensorboard.compat import tf
+from tensorboard.util import tb_logging
+
+
+logger = tb_logging.get_logger()
+
+# How often the snapshot of a run is saved, if more of it has been loaded.
+DEFAULT_SAVE_INTERVAL_SECS = 600
+
+# Snapshots saved with another version of this format are ignored.
+_VERSION = 4
+
+_SUFFIX = '.snapshot'
+
+
+class SnapshotStore(object):
+  """Saves and loads the snapshots of runs in a local directory.
+
+  This class is thread-safe, as long as no two threads save the snapshot of
+  the same run at once.
+  """
+
+  def __init__(self, directory, config=None,
+               save_interval=DEFAULT_SAVE_INTERVAL_SECS):
+    """Creates a store, and its directory if needed.
+
+    Args:
+      directory: The path to a local directory.
+      config: A value that describes how runs are loaded (such as their size
+        guidance), which can be pickled and compared. Snapshots that were
+        saved with another config are ignored.
+      save_interval: How often `MaybeSaveAccumulator` saves the snapshot of
+        a run, in seconds.
+    """
+    self._directory = directory
+    self._config = config
+    self._save_interval = save_interval
+    # The position (see `EventAccumulator.Position`) and time of the last
+    # snapshot of each path that was saved or restored.
+    self._positions = {}
+    self._times = {}
+    self._lock = threading.Lock()
+    if not os.path.isdir(directory):
+      os.makedirs(directory)
+
+  def RestoreAccumulator(self, accumulator):
+    """Restores the saved snapshot of a new accumulator, if there is one.
+
+    A snapshot that cannot be restored is deleted.
+
+    Args:
+      accumulator: A `plugin_event_accumulator.EventAccumulator`.
+
+    Returns:
+      Whether a snapshot was restored.
+    """
+    path = accumulator.path
+    snapshot = self.Load(path)
+    if snapshot is None:
+      return False
+    if not accumulator.Restore(snapshot):
+      logger.info('Discarding the snapshot of %s', path)
+      self.Delete(path)
+      return False
+    logger.info('Restored the snapshot of %s', path)
+    with self._lock:
+      self._positions[path] = snapshot['generator']
+      self._times[path] = time.time()
+    return True
+
+  def MaybeSaveAccumulator(self, accumulator):
+    """Saves the snapshot of an accumulator if it is due and has changed.
+
+    The snapshot of a run is due if none has been saved or restored in the
+    last `save_interval` seconds.
+
+    Args:
+      accumulator: A `plugin_event_accumulator.EventAccumulator` that is
+        not being reloaded.
+    """
+    path = accumulator.path
+    start = time.time()
+    with self._lock:
+      last_time = self._times.get(path)
+      last_position = self._positions.get(path)
+    if last_time is not None and start - last_time < self._save_interval:
+      return
+    if accumulator.Position() in (None, last_position):
+      return
+    snapshot = accumulator.Snapshot()
+    if snapshot is None:
+      return
+    try:
+      size = self.Save(path, snapshot)
+    except (IOError, OSError) as e:
+      logger.error('Unable to save the snapshot of %s: %s', path, e)
+      return
+    logger.info('Saved a snapshot of %s (%d bytes) in %0.3f secs', path, size,
+                time.time() - start)
+    with self._lock:
+      self._positions[path] = snapshot['generator']
+      self._times[path] = start
+
+  def Forget(self, path):
+    """Deletes the snapshot of a run that has been removed."""
+    self.Delete(path)
+    with self._lock:
+      self._positions.pop(path, None)
+      self._times.pop(path, None)
+
+  def Load(self, path):
+    """Returns the snapshot saved for the run at a path, or None."""
+    file_path = self._FilePath(path)
+    try:
+      with open(file_path, 'rb') as f:
+        saved = pickle.load(f)
+    except IOError:
+      return None
+    except Exception as e:  # pylint: disable=broad-except
+      logger.warn('Ignoring unreadable snapshot %s: %s', file_path, e)
+      return None
+    if (not isinstance(saved, dict) or saved.get('version') != _VERSION or
+        saved.get('path') != path or saved.get('config') != self._config):
+      logger.info('Ignoring outdated snapshot of %s', path)
+      return None
+    return saved['snapshot']
+
+  def Save(self, path, snapshot):
+    """Saves the snapshot of the run at a path, replacing any older one.
+
+    The snapshot is written to a temporary file first, so that a crash
+    while saving leaves the old snapshot in place.
+
+    Returns:
+      The number of bytes written.
+    """
+    data = pickle.dumps({
+        'version': _VERSION,
+        'path': path,
+        'config': self._config,
+        'snapshot': snapshot,
+    }, protocol=2)
+    (fd, temp_path) = tempfile.mkstemp(dir=self._directory, suffix='.tmp')
+    try:
+      with os.fdopen(fd, 'wb') as f:
+        f.write(data)
+      # `os.rename` does not replace existing files on Windows.
+      getattr(os, 'replace', os.rename)(temp_path, self._FilePath(path))
+    finally:
+      if os.path.exists(temp_path):
+        os.remove(temp_path)
+    return len(data)
+
+  def Delete(self, path):
+    """Deletes the snapshot of the run at a path, if there is one."""
+    try:
+      os.remove(self._FilePath(path))
+    except OSError:
+      pass
+
+  def _FilePath(self, path):
+    digest = hashlib.sha1(tf.compat.as_bytes(path)).hexdigest()
+    return os.path.join(self._directory, digest + _SUFFIX)
@@ -0,0 +1,75 @@
+# Copyright 2019 The TensorFlow Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ==============================================================================
+"""Tests for snapshot_store."""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import os
+
+import tensorflow as tf
+
+from tensorboard.backend.event_processing import snapshot_store
+
+
+class SnapshotStoreTest(tf.test.TestCase):
+
+  def setUp(self):
+    super(SnapshotStoreTest, self).setUp()
+    self._directory = os.path.join(self.get_temp_dir(), 'snapshots')
+
+  def testSavesAndLoadsSnapshots(self):
+    store = snapshot_store.SnapshotStore(self._directory)
+    self.assertIsNone(store.Load('/logdir/run1'))
+    self.assertGreater(store.Save('/logdir/run1', {'offset': 1}), 0)
+    store.Save('/logdir/run2', {'offset': 2})
+    store.Save('/logdir/run1', {'offset': 3})
+    self.assertEqual(store.Load('/logdir/run1'), {'offset': 3})
+    # Snapshots outlive the store.
+    store = snapshot_store.SnapshotStore(self._directory)
+    self.assertEqual(store.Load('/logdir/run2'), {'offset': 2})
+    self.assertEqual(len(os.listdir(self._directory)), 2)
+
+  def testIgnoresSnapshotsWithOtherConfig(self):
+    snapshot_store.SnapshotStore(self._directory, config=[1]).Save(
+        '/logdir/run1', {'offset': 1})
+    self.assertEqual(
+        snapshot_store.SnapshotStore(self._directory, config=[1]).Load(
+            '/logdir/run1'),
+        {'offset': 1})
+    self.assertIsNone(
+        snapshot_store.SnapshotStore(self._directory, config=[2]).Load(
+            '/logdir/run1'))
+
+  def testIgnoresUnreadableSnapshots(self):
+    store = snapshot_store.SnapshotStore(self._directory)
+    store.Save('/logdir/run1', {'offset': 1})
+    (name,) = os.listdir(self._directory)
+    with open(os.path.join(self._directory, name), 'r+b') as f:
+      f.truncate(10)
+    self.assertIsNone(store.Load('/logdir/run1'))
+
+  def testDelete(self):
+    store = snapshot_store.SnapshotStore(self._directory)
+    store.Save('/logdir/run1', {'offset': 1})
+    store.Delete('/logdir/run1')
+    self.assertIsNone(store.Load('/logdir/run1'))
+    store.Delete('/logdir/run1')
+    self.assertEqual(os.listdir(self._directory), [])
+
+
+if __name__ == '__main__':
+  tf.test.main()
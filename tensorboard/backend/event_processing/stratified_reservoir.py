@@ -0,0 +1,345 @@
+# Copyright 2019 The TensorFlow Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ==============================================================================
+"""Reservoirs that keep items at a resolution of steps that falls with age.
+
+A `reservoir.Reservoir` samples items at random: which items it keeps
+changes with every addition, leaving uneven gaps, so the items read after
+a reload share little with those read before. A `StratifiedReservoir`
+keeps the newest items of each key, then older ones more and more sparsely:
+each level of older items keeps the first item of each stratum of `2**k`
+steps, with a `k` that grows with age.
+
+The items that are kept only depend on the items that were added, in order,
+and not on how the additions were batched. Once an item is dropped, it is
+never added back, and the items of the older levels change less and less
+often.
+"""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import collections
+import itertools
+import threading
+
+from six.moves import xrange  # pylint: disable=redefined-builtin
+
+from tensorboard.backend.event_processing import reservoir
+from tensorboard.backend.event_processing import scalar_reservoir
+
+
+# The number of levels of the buckets, from that of the newest items, which
+# are all kept, to that of the oldest ones.
+_LEVELS = 4
+
+# Steps are int64s, so strata of `2**_MAX_SHIFT` steps can't split them
+# any further.
+_MAX_SHIFT = 64
+
+# Roughly how many bytes a `ScalarEvent` takes, with its fields.
+_SCALAR_EVENT_BYTES = 160
+
+
+class StratifiedReservoir(reservoir.Reservoir):
+  """A `reservoir.Reservoir` that keeps items by their step, not at random.
+
+  Items must have a `step` field, and are kept in the order in which they
+  were added, like in a `reservoir.Reservoir`: the last item is always the
+  latest one. The items of a key are split in levels, from the newest to the
+  oldest, which each hold up to a share of the size of the reservoir. When a
+  level is full, its oldest item moves to the next one, which only keeps it
+  if the newest item that it holds is in another stratum of steps. Each
+  level has strata twice as wide as those of the one before, and those of
+  the last level widen whenever it is full, so that it keeps a coarser and
+  coarser sample of the oldest steps.
+
+  The strata of the second level are the smallest power of two steps that
+  is wider than the mean gap between the steps of the first level, when it
+  first gets full.
+  """
+
+  def __init__(self, size, byte_size=None):
+    """Creates a new reservoir.
+
+    Args:
+      size: The number of values to keep in the reservoir for each key. If
+        0, all values will be kept.
+      byte_size: An optional function that returns the number of bytes of an
+        item, for `ByteSize`.
+
+    Raises:
+      ValueError: If size is negative or not an integer.
+    """
+    super(StratifiedReservoir, self).__init__(size, byte_size=byte_size)
+
+  def _NewBucket(self):
+    return _StratifiedBucket(self.size, self._byte_size)
+
+
+class StratifiedScalarReservoir(StratifiedReservoir):
+  """A `StratifiedReservoir` of scalars, read like a
+  `scalar_reservoir.ScalarReservoir`."""
+
+  def __init__(self, size, dtype):
+    """Creates a new reservoir.
+
+    Args:
+      size: The number of values to keep in the reservoir for each key. If
+        0, all values will be kept.
+      dtype: The `DataType` enum value of the scalars, which tells the type
+        of the array of their values.
+
+    Raises:
+      ValueError: If size is negative or not an integer.
+    """
+    self._value_type = scalar_reservoir.ValueType(dtype)
+    super(StratifiedScalarReservoir, self).__init__(size)
+
+  def _NewBucket(self):
+    return _StratifiedScalarBucket(self.size, self._value_type)
+
+  def Columns(self, key):
+    """Like `scalar_reservoir.ScalarReservoir.Columns`."""
+    with self._mutex:
+      if key not in self._buckets:
+        raise KeyError('Key %s was not found in Reservoir' % key)
+      bucket = self._buckets[key]
+    return bucket.Columns()
+
+  def ColumnsDelta(self, key, serials):
+    """Like `scalar_reservoir.ScalarReservoir.ColumnsDelta`."""
+    with self._mutex:
+      bucket = self._buckets[key]
+    items = bucket.ItemsView()
+    (removed_indices, added) = (
+        reservoir.ItemsDelta(serials or (), items) or ([], ()))
+    return (removed_indices,
+            scalar_reservoir.ItemsToColumns(added, self._value_type), items)
+
+  def UpdateColumns(self, key, removed_indices, columns):
+    """Like `UpdateItems`, with the items to append as a `ScalarColumns`."""
+    self.UpdateItems(key, removed_indices,
+                     scalar_reservoir.ColumnsToItems(columns))
+
+  def ByteSize(self):
+    """Returns roughly how many bytes the items of all keys take."""
+    with self._mutex:
+      buckets = list(self._buckets.values())
+    return sum(bucket.ByteSize() for bucket in buckets)
+
+
+class _StratifiedBucket(object):
+  """The items of a key of a `StratifiedReservoir`."""
+
+  def __init__(self, max_size, byte_size=None):
+    if max_size < 0 or max_size != round(max_size):
+      raise ValueError('max_size must be nonnegative int, was %s' % max_size)
+    self._byte_size = byte_size
+    num_levels = min(_LEVELS, max_size) if max_size else 1
+    share = max_size // num_levels
+    # The number of items that each level holds at most, from the newest.
+    # The first level holds what the others don't.
+    self._capacities = ([max_size - share * (num_levels - 1)] +
+                         [share] * (num_levels - 1))
+    self._max_size = max_size
+    self._Fill([], [0] * num_levels)
+    # The log2 of the width of the strata of each level after the first, or
+    # None until the first level gets full.
+    self._shifts = None
+    # This mutex protects the levels, ensuring that calls to Items and
+    # AddItem are thread-safe
+    self._mutex = threading.Lock()
+
+  def AddItem(self, item, f=lambda x: x):
+    """Adds an item, then moves or drops older items as the levels fill."""
+    with self._mutex:
+      item = f(item)
+      self._levels[0].append(item)
+      self._view = None
+      if self._byte_size is not None:
+        self._total_bytes += self._byte_size(item)
+      if self._max_size:
+        self._Settle()
+
+  def FilterItems(self, filterFn):
+    """Keeps the items for which `filterFn` is true.
+
+    Returns:
+      The number of items removed from the bucket.
+    """
+    with self._mutex:
+      size_before = sum(len(level) for level in self._levels)
+      self._levels = [collections.deque(filter(filterFn, level))
+                      for level in self._levels]
+      self._view = None
+      self._total_bytes = self._SumBytes(self._View())
+      return size_before - sum(len(level) for level in self._levels)
+
+  def UpdateItems(self, removed_indices, items):
+    """Removes the items at some indices, then appends others.
+
+    The items are then spread over the levels from the newest, filling each
+    in turn, so that the bucket holds the items of the bucket that it
+    mirrors in the same order.
+    """
+    with self._mutex:
+      kept = self._View()
+      if removed_indices:
+        removed_indices = set(removed_indices)
+        kept = [item for (i, item) in enumerate(kept)
+                if i not in removed_indices]
+      items = list(kept) + list(items)
+      sizes = []
+      remaining = len(items)
+      for capacity in self._capacities[:-1]:
+        sizes.append(min(capacity, remaining))
+        remaining -= sizes[-1]
+      self._Fill(items, sizes + [remaining])
+
+  def State(self):
+    """Returns the items, the number of items in each level, and the
+    strata of the levels."""
+    with self._mutex:
+      return (list(self._View()), [len(level) for level in self._levels],
+              self._shifts)
+
+  def Restore(self, state):
+    """Restores the bucket to a state returned by `State`."""
+    (items, sizes, shifts) = state
+    with self._mutex:
+      self._Fill(list(items), sizes)
+      self._shifts = None if shifts is None else list(shifts)
+
+  def Items(self):
+    """Get all the items in the bucket."""
+    return list(self.ItemsView())
+
+  def ItemsView(self):
+    """Get all the items in the bucket, as a tuple that is never modified."""
+    with self._mutex:
+      return self._View()
+
+  def ByteSize(self):
+    """Returns how many bytes the items take, as told by `byte_size`."""
+    with self._mutex:
+      return self._total_bytes
+
+  def _View(self):
+    if self._view is None:
+      self._view = tuple(
+          itertools.chain.from_iterable(reversed(self._levels)))
+    return self._view
+
+  def _Settle(self):
+    """Moves the oldest items of full levels down, until none is over full."""
+    levels = self._levels
+    for i in xrange(len(levels) - 1):
+      if len(levels[i]) <= self._capacities[i]:
+        return
+      if self._shifts is None:
+        self._shifts = _Shifts(levels[0], len(levels) - 1)
+      item = levels[i].popleft()
+      shift = self._shifts[i]
+      if not levels[i + 1] or _Stratum(levels[i + 1][-1], shift) != _Stratum(
+          item, shift):
+        levels[i + 1].append(item)
+      else:
+        self._Drop(item)
+    last = levels[-1]
+    while len(last) > self._capacities[-1]:
+      if len(levels) == 1 or self._shifts[-1] >= _MAX_SHIFT:
+        self._Drop(last.popleft())
+        continue
+      self._shifts[-1] += 1
+      shift = self._shifts[-1]
+      kept = collections.deque()
+      for item in last:
+        if not kept or _Stratum(kept[-1], shift) != _Stratum(item, shift):
+          kept.append(item)
+        else:
+          self._Drop(item)
+      levels[-1] = last = kept
+
+  def _Drop(self, item):
+    """Takes the bytes of an item that is no longer held off the total."""
+    if self._byte_size is not None:
+      self._total_bytes -= self._byte_size(item)
+
+  def _SumBytes(self, items):
+    if self._byte_size is None:
+      return 0
+    return sum(self._byte_size(item) for item in items)
+
+  def _Fill(self, items, sizes):
+    """Replaces the items with a list of items in order.
+
+    Args:
+      items: The items, from the oldest.
+      sizes: The number of items of each level, from the newest.
+    """
+    levels = []
+    end = len(items)
+    for size in sizes:
+      levels.append(collections.deque(items[end - size:end]))
+      end -= size
+    # The items of each level in order, from the level of the newest items.
+    self._levels = levels
+    # A tuple of the items in order, or None if it must be built again.
+    self._view = None
+    # The number of bytes of the items, if there is a `byte_size` function.
+    self._total_bytes = self._SumBytes(itertools.chain.from_iterable(levels))
+
+
+class _StratifiedScalarBucket(_StratifiedBucket):
+  """A `_StratifiedBucket` that also returns its items as columns."""
+
+  def __init__(self, max_size, value_type):
+    super(_StratifiedScalarBucket, self).__init__(max_size)
+    self._value_type = value_type
+    # The view that `_columns` holds the items of, and the `ScalarColumns`.
+    self._columns = (None, None)
+
+  def Columns(self):
+    with self._mutex:
+      view = self._View()
+      if self._columns[0] is not view:
+        columns = scalar_reservoir.ItemsToColumns(view, self._value_type)
+        for array in columns:
+          array.flags.writeable = False
+        self._columns = (view, columns)
+      return self._columns[1]
+
+  def ByteSize(self):
+    with self._mutex:
+      size = sum(len(level) for level in self._levels) * _SCALAR_EVENT_BYTES
+      (view, columns) = self._columns
+      if columns is not None and view is self._view:
+        size += sum(array.nbytes for array in columns)
+      return size
+
+
+def _Shifts(items, num_levels):
+  """Returns the log2 of the width of the strata of the levels after the
+  first, from the items of the first level."""
+  first = items[0].step
+  last = items[-1].step
+  gap = max(last - first, 0) // max(len(items) - 1, 1)
+  base = int(gap).bit_length()
+  return [base + i for i in xrange(num_levels)]
+
+
+def _Stratum(item, shift):
+  return item.step >> shift
@@ -0,0 +1,189 @@
+# Copyright 2019 The TensorFlow Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ==============================================================================
+"""Tests for stratified_reservoir."""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import pickle
+
+import numpy as np
+from six.moves import xrange  # pylint: disable=redefined-builtin
+import tensorflow as tf
+
+from tensorboard.backend.event_processing import scalar_reservoir
+from tensorboard.backend.event_processing import stratified_reservoir
+from tensorboard.compat.proto import types_pb2
+
+
+def _Event(step):
+  return scalar_reservoir.ScalarEvent(
+      wall_time=1e9 + step, step=step, value=step / 4.0)
+
+
+def _EventBytes(event):
+  return 1 + event.step % 10
+
+
+def _Steps(items):
+  return [item.step for item in items]
+
+
+class StratifiedReservoirTest(tf.test.TestCase):
+
+  def testKeepsNewestItemsAndCoarserOlderOnes(self):
+    r = stratified_reservoir.StratifiedReservoir(20)
+    for step in xrange(10000):
+      r.AddItem('key', _Event(step))
+    steps = _Steps(r.Items('key'))
+    self.assertEqual(steps, [
+        0, 2048, 4096, 6144, 8192,
+        9968, 9972, 9976, 9980, 9984,
+        9986, 9988, 9990, 9992, 9994,
+        9995, 9996, 9997, 9998, 9999,
+    ])
+
+  def testRespectsSize(self):
+    for size in (1, 2, 3, 4, 5, 100):
+      r = stratified_reservoir.StratifiedReservoir(size)
+      for step in xrange(0, 100000, 7):
+        r.AddItem('key', _Event(step))
+      steps = _Steps(r.Items('key'))
+      self.assertLessEqual(len(steps), size)
+      self.assertEqual(steps, sorted(steps))
+      self.assertEqual(steps[-1], 99995)
+      if size > 1:
+        self.assertEqual(steps[0], 0)
+
+  def testSizeZeroKeepsEverything(self):
+    r = stratified_reservoir.StratifiedReservoir(0)
+    for step in xrange(1000):
+      r.AddItem('key', _Event(step))
+    self.assertEqual(_Steps(r.Items('key')), list(xrange(1000)))
+
+  def testRepeatedSteps(self):
+    r = stratified_reservoir.StratifiedReservoir(10)
+    for _ in xrange(1000):
+      r.AddItem('key', _Event(5))
+    self.assertLessEqual(len(r.Items('key')), 10)
+
+  def testSampleDoesNotDependOnReloads(self):
+    r = stratified_reservoir.StratifiedReservoir(50)
+    for step in xrange(5000):
+      r.AddItem('key', _Event(step))
+    restored = stratified_reservoir.StratifiedReservoir(50)
+    for start in xrange(0, 5000, 1000):
+      state = pickle.loads(pickle.dumps(restored.State()))
+      restored = stratified_reservoir.StratifiedReservoir(50)
+      restored.Restore(state)
+      for step in xrange(start, start + 1000):
+        restored.AddItem('key', _Event(step))
+    self.assertEqual(restored.Items('key'), r.Items('key'))
+    # The older items that are kept don't change with newer ones.
+    old_steps = _Steps(r.Items('key'))[:10]
+    for step in xrange(5000, 5100):
+      r.AddItem('key', _Event(step))
+    self.assertEqual(_Steps(r.Items('key'))[:10], old_steps)
+
+  def testFilterItems(self):
+    r = stratified_reservoir.StratifiedReservoir(20)
+    for step in xrange(100):
+      r.AddItem('key', _Event(step))
+    steps = _Steps(r.Items('key'))
+    removed = r.FilterItems(lambda e: e.step < 50, 'key')
+    self.assertEqual(removed, len([step for step in steps if step >= 50]))
+    self.assertEqual(_Steps(r.Items('key')),
+                     [step for step in steps if step < 50])
+    for step in xrange(50, 60):
+      r.AddItem('key', _Event(step))
+    # The first level, a quarter of the size, holds the newest items.
+    self.assertEqual(_Steps(r.Items('key'))[-5:], list(xrange(55, 60)))
+
+  def testUpdateItems(self):
+    r = stratified_reservoir.StratifiedReservoir(3)
+    r.UpdateItems('key', [], [_Event(0), _Event(1), _Event(2), _Event(3)])
+    self.assertEqual(_Steps(r.Items('key')), [0, 1, 2, 3])
+    r.UpdateItems('key', [0, 2], [_Event(4)])
+    self.assertEqual(_Steps(r.Items('key')), [1, 3, 4])
+
+  def testItemsView(self):
+    r = stratified_reservoir.StratifiedReservoir(10)
+    for step in xrange(100):
+      r.AddItem('key', _Event(step))
+    view = r.ItemsView('key')
+    self.assertIsInstance(view, tuple)
+    self.assertIs(r.ItemsView('key'), view)
+    r.AddItem('key', _Event(100))
+    self.assertIsNot(r.ItemsView('key'), view)
+    with self.assertRaises(KeyError):
+      r.ItemsView('missing')
+
+  def testByteSize(self):
+    r = stratified_reservoir.StratifiedReservoir(20, byte_size=_EventBytes)
+    for step in xrange(10000):
+      r.AddItem('key', _Event(step))
+      self.assertEqual(
+          r.ByteSize(), sum(_EventBytes(e) for e in r.ItemsView('key')))
+    r.FilterItems(lambda e: e.step % 3, 'key')
+    r.UpdateItems('key', [0], [_Event(10000)])
+    self.assertEqual(
+        r.ByteSize(), sum(_EventBytes(e) for e in r.ItemsView('key')))
+    restored = stratified_reservoir.StratifiedReservoir(
+        20, byte_size=_EventBytes)
+    restored.Restore(r.State())
+    self.assertEqual(restored.ByteSize(), r.ByteSize())
+
+
+class StratifiedScalarReservoirTest(tf.test.TestCase):
+
+  def testColumns(self):
+    scalars = stratified_reservoir.StratifiedScalarReservoir(
+        10, types_pb2.DT_DOUBLE)
+    r = stratified_reservoir.StratifiedReservoir(10)
+    for step in xrange(100):
+      scalars.AddItem('key', _Event(step))
+      r.AddItem('key', _Event(step))
+    columns = scalars.Columns('key')
+    self.assertIs(scalars.Columns('key'), columns)
+    self.assertEqual(columns.value.dtype, np.float64)
+    self.assertEqual(columns.step.tolist(), _Steps(r.Items('key')))
+    self.assertEqual(scalar_reservoir.ColumnsToItems(columns),
+                     r.Items('key'))
+    with self.assertRaises(ValueError):
+      columns.step[0] = 5
+    with self.assertRaises(KeyError):
+      scalars.Columns('missing')
+    self.assertGreater(scalars.ByteSize(), 0)
+
+  def testColumnsDelta(self):
+    scalars = stratified_reservoir.StratifiedScalarReservoir(
+        10, types_pb2.DT_FLOAT)
+    mirror = stratified_reservoir.StratifiedScalarReservoir(
+        10, types_pb2.DT_FLOAT)
+    serials = None
+    for steps in (xrange(5), xrange(5, 8), (), xrange(8, 100)):
+      for step in steps:
+        scalars.AddItem('key', _Event(step))
+      (removed_indices, added, serials) = scalars.ColumnsDelta('key', serials)
+      if not steps:
+        self.assertEqual((removed_indices, len(added.step)), ([], 0))
+      mirror.UpdateColumns('key', removed_indices,
+                           pickle.loads(pickle.dumps(added)))
+      self.assertEqual(mirror.Items('key'), scalars.Items('key'))
+
+
+if __name__ == '__main__':
+  tf.test.main()
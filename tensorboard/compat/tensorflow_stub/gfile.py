@@ -367,7 +367,7 @@ def Walk(top, in_order=True):
 
 
 # Data returned from the Stat call.
-StatData = collections.namedtuple('StatData', ['length'])
+StatData = collections.namedtuple('StatData', ['length', 'mtime_nsec'])
 
 
 # @tf_export("gfile.Stat")
@@ -387,8 +387,8 @@ def Stat(filename):
     try:
         # Size of the file is given by .st_size as returned from
         # os.stat() but TB uses .length so we set length.
-        len = os.stat(compat.as_bytes(filename)).st_size
-        result = StatData(len)
+        stat = os.stat(compat.as_bytes(filename))
+        result = StatData(stat.st_size, int(stat.st_mtime * 1e9))
     except Exception:
         pass
 
@@ -18,9 +18,11 @@ from __future__ import absolute_import
 from __future__ import division
 from __future__ import print_function
 
-import array
 import os
 import struct
+import zlib
+
+import numpy as np
 
 from . import errors
 
@@ -121,25 +123,176 @@ CRC_INIT = 0
 _MASK = 0xFFFFFFFF
 
 
+def _make_slicing_tables(table, count):
+    """Derives the tables for slicing-by-`count` from the byte-wise table."""
+    tables = [list(table)]
+    for _ in range(count - 1):
+        previous = tables[-1]
+        tables.append(
+            [(previous[i] >> 8) ^ table[previous[i] & 0xff] for i in range(256)])
+    return tables
+
+
+_SLICING_TABLES = _make_slicing_tables(CRC_TABLE, 8)
+_NUMPY_SLICING_TABLES = [
+    np.array(table, dtype=np.uint32) for table in _SLICING_TABLES]
+
+# Inputs at least this large are checksummed with numpy, by splitting them
+# into equally sized lanes whose CRCs are computed side by side and then
+# combined. Smaller inputs are faster to handle in pure Python.
+_NUMPY_MIN_SIZE = 4 * 1024
+
+# Lazily computed tables, keyed by lane size, that advance a CRC register
+# past one lane of zero bytes; see `_lane_shift_tables`.
+_lane_shift_tables_cache = {}
+
+
+def _update_register_bytewise(crc, data):
+    """Advances the (non-inverted) CRC register over `data` one byte a time."""
+    table = CRC_TABLE
+    for b in bytearray(data):
+        crc = table[(crc ^ b) & 0xff] ^ (crc >> 8)
+    return crc
+
+
+def _update_register_slicing(crc, data):
+    """Advances the (non-inverted) CRC register eight bytes at a time."""
+    words = len(data) // 8
+    if words:
+        t0, t1, t2, t3, t4, t5, t6, t7 = _SLICING_TABLES
+        values = iter(struct.unpack('<%dI' % (2 * words), data[:8 * words]))
+        for one, two in zip(values, values):
+            one ^= crc
+            crc = (t7[one & 0xff] ^ t6[(one >> 8) & 0xff] ^
+                   t5[(one >> 16) & 0xff] ^ t4[one >> 24] ^
+                   t3[two & 0xff] ^ t2[(two >> 8) & 0xff] ^
+                   t1[(two >> 16) & 0xff] ^ t0[two >> 24])
+    return _update_register_bytewise(crc, data[8 * words:])
+
+
+def _lane_shift_tables(lane_size):
+    """Returns tables that advance a CRC register past one lane of zeros.
+
+    Feeding zero bytes into a CRC register is a linear map over GF(2), so it
+    is fully described by its action on each of the 32 register bits. Those
+    images are tabulated per register byte, which makes applying the map four
+    table lookups.
+    """
+    shift_tables = _lane_shift_tables_cache.get(lane_size)
+    if shift_tables is None:
+        table = _NUMPY_SLICING_TABLES[0]
+        images = np.left_shift(
+            np.uint32(1), np.arange(32, dtype=np.uint32)).astype(np.uint32)
+        for _ in range(lane_size):
+            images = table[images & 0xff] ^ (images >> 8)
+        images = images.tolist()
+        shift_tables = []
+        for byte_index in range(4):
+            shift_table = []
+            for value in range(256):
+                image = 0
+                for bit in range(8):
+                    if value & (1 << bit):
+                        image ^= images[8 * byte_index + bit]
+                shift_table.append(image)
+            shift_tables.append(shift_table)
+        _lane_shift_tables_cache[lane_size] = shift_tables
+    return shift_tables
+
+
+def _numpy_lane_size(size):
+    """Picks the lane size that balances numpy steps against folding.
+
+    Advancing all lanes costs a fixed numpy overhead per 8 bytes of lane, and
+    folding costs a Python step per lane, so the total is smallest when the
+    lane size is around `sqrt(size / 4)`. It is rounded to a power of two
+    between 32 bytes and 4 KiB.
+    """
+    return 1 << max(5, min(12, size.bit_length() // 2 - 1))
+
+
+def _update_register_numpy(crc, data):
+    """Advances the (non-inverted) CRC register using numpy.
+
+    The input is cut into equally sized lanes. The registers of all lanes are
+    advanced together by slicing-by-8, with the first lane starting from `crc`
+    and all others from zero. Since the CRC register is linear in its input,
+    the lanes are then folded together by shifting the running register past
+    one lane of zeros and XORing in the next lane's register.
+    """
+    lane_size = _numpy_lane_size(len(data))
+    lanes = len(data) // lane_size
+    if not lanes:
+        return _update_register_slicing(crc, data)
+    size = lanes * lane_size
+    words = np.frombuffer(data, dtype='<u4', count=size // 4).reshape(
+        lanes, lane_size // 4).T.copy()
+    t0, t1, t2, t3, t4, t5, t6, t7 = _NUMPY_SLICING_TABLES
+    registers = np.zeros(lanes, dtype=np.uint32)
+    registers[0] = crc
+    for i in range(0, len(words), 2):
+        one = registers ^ words[i]
+        two = words[i + 1]
+        registers = (t7[one & 0xff] ^ t6[(one >> 8) & 0xff] ^
+                     t5[(one >> 16) & 0xff] ^ t4[one >> 24] ^
+                     t3[two & 0xff] ^ t2[(two >> 8) & 0xff] ^
+                     t1[(two >> 16) & 0xff] ^ t0[two >> 24])
+    s0, s1, s2, s3 = _lane_shift_tables(lane_size)
+    registers = registers.tolist()
+    crc = registers[0]
+    for register in registers[1:]:
+        crc = (s0[crc & 0xff] ^ s1[(crc >> 8) & 0xff] ^
+               s2[(crc >> 16) & 0xff] ^ s3[crc >> 24] ^ register)
+    return _update_register_slicing(crc, data[size:])
+
+
+def _load_native_crc_update():
+    """Returns an accelerated `crc_update` from an installed package, if any."""
+    try:
+        import google_crc32c  # pylint: disable=g-import-not-at-top
+        return lambda crc, data: google_crc32c.extend(crc, bytes(data))
+    except ImportError:
+        pass
+    try:
+        import crc32c  # pylint: disable=g-import-not-at-top
+    except ImportError:
+        return None
+    if hasattr(crc32c, 'crc32c'):
+        return lambda crc, data: crc32c.crc32c(data, crc)
+    return lambda crc, data: crc32c.crc32(data, crc)
+
+
+_native_crc_update = _load_native_crc_update()
+
+
+def _as_buffer(data):
+    if isinstance(data, (bytes, bytearray, memoryview)):
+        return data
+    return bytes(bytearray(data))
+
+
 def crc_update(crc, data):
     """Update CRC-32C checksum with data.
+
+    Uses the `google_crc32c` or `crc32c` package when one is installed, and
+    otherwise a slicing-by-8 implementation that switches to numpy for large
+    inputs.
+
     Args:
       crc: 32-bit checksum to update as long.
       data: byte array, string or iterable over bytes.
     Returns:
       32-bit updated CRC-32C as long.
     """
-
-    if type(data) != array.array or data.itemsize != 1:
-        buf = array.array("B", data)
+    data = _as_buffer(data)
+    if _native_crc_update is not None:
+        return _native_crc_update(crc, data)
+    register = crc ^ _MASK
+    if len(data) >= _NUMPY_MIN_SIZE:
+        register = _update_register_numpy(register, data)
     else:
-        buf = data
-
-    crc ^= _MASK
-    for b in buf:
-        table_index = (crc ^ b) & 0xff
-        crc = (CRC_TABLE[table_index] ^ (crc >> 8)) & _MASK
-    return crc ^ _MASK
+        register = _update_register_slicing(register, data)
+    return register ^ _MASK
 
 
 def crc_finalize(crc):
@@ -163,74 +316,205 @@ def crc32c(data):
     return crc_finalize(crc_update(CRC_INIT, data))
 
 
-class PyRecordReader_New:
-    def __init__(self, filename=None, start_offset=0, compression_type=None, status=None):
-        self.event_strs = []
-        self.filename = filename
-        self.start_offset = start_offset
-        self.compression_type = compression_type
-        self.status = status
-        self.done_reading = False
-        self.index = -1
+# Each record is framed by a 12-byte header (an 8-byte little-endian length
+# followed by a 4-byte masked CRC of the length) and a 4-byte footer (the
+# masked CRC of the payload).
+_HEADER_SIZE = 12
+_FOOTER_SIZE = 4
+
+# The minimum number of bytes to request from the file per read. Records larger
+# than this are read in a single request sized to fit them.
+_READ_BUFFER_SIZE = 64 * 1024
+
+# `zlib` window bits for each supported `compression_type`.
+_COMPRESSION_WBITS = {
+    'ZLIB': zlib.MAX_WBITS,
+    'GZIP': 16 + zlib.MAX_WBITS,
+}
+
+
+class PyRecordReader_New(object):
+    """Incremental reader for TFRecord-formatted files.
+
+    The reader remembers the byte offset of the next unread record, so
+    repeated calls to `GetNext()` pick up records that have been appended
+    to the file since the last call. Only the bytes after that offset are
+    ever read from disk, and at most one small read buffer (or one record,
+    if larger) is held in memory at a time.
+
+    A record that has only been partially written is not consumed: the
+    reader stays at the offset of the last complete record and raises
+    `OutOfRangeError`, so a later call will read the whole record once the
+    writer has finished it.
+
+    Checksums are not verified by default, since doing so in Python is much
+    slower than reading. Pass `verify_checksums=True` to check the header and
+    payload CRCs of every record and raise `DataLossError` on a mismatch.
 
-    def read(self):
-        if self.filename is None:
+    With a `compression_type` of `'ZLIB'` or `'GZIP'`, the file is
+    decompressed incrementally as records are read, and offsets (including
+    `start_offset`) refer to the decompressed stream, as in TensorFlow. A
+    GZIP file may consist of several concatenated members.
+    """
+
+    def __init__(self, filename=None, start_offset=0, compression_type=None,
+                 status=None, verify_checksums=False):
+        if filename is None:
             raise errors.NotFoundError(
                 None, None, 'No filename provided, cannot read Events')
-        if not os.path.exists(self.filename):
+        if not os.path.exists(filename):
             raise errors.NotFoundError(
                 None, None,
-                '{} does not point to valid Events file'.format(self.filename))
-
-        # TODO: Handle gzip and zlib compressed files
-        with open(self.filename, "rb") as f:
-            buf = f.read()
-            n = self.start_offset
-
-            while n < len(buf):
-                # Read the header
-                header_str = buf[n:n+8]
-                header = struct.unpack('Q', header_str)
-                n += 12
-
-                # Read the crc32, which is 4 bytes, and check it against the
-                # crc32 of the header
-                # crc_header_str = buf[n:n+4]
-                # crc_header = struct.unpack('I', crc_header_str)
-                # n += 4
-                # header_crc_calc = masked_crc32c(header_str)
-                # assert header_crc_calc == crc_header[0], \
-                #     'Header crc\'s dont match'
-
-                # The length of the header tells us how many bytes the Event
-                # string takes
-                header_len = int(header[0])
-                event_str = buf[n:n+header_len]
-                # event_crc_calc = masked_crc32c(event_str)
-
-                n += header_len + 4
-
-                # The next 4 bytes contain the crc32 of the Event string,
-                # which we check for integrity. Sometimes, the last Event
-                # has no crc32, in which case we skip.
-                # if len(buf[n:]) > 0:
-                #     crc_event_str = struct.unpack('I', buf[n:n+4])
-                #     assert event_crc_calc == crc_event_str[0], \
-                #         'Header crc\'s dont match'
-
-                # n += 4
-                self.event_strs += [event_str]
-
-            self.done_reading = True
+                '{} does not point to valid Events file'.format(filename))
+        self.filename = filename
+        self.start_offset = start_offset
+        self.compression_type = compression_type
+        self.status = status
+        self.verify_checksums = verify_checksums
+        if isinstance(compression_type, bytes):
+            compression_type = compression_type.decode('utf-8')
+        compression_type = (compression_type or '').upper()
+        if compression_type and compression_type not in _COMPRESSION_WBITS:
+            raise errors.InvalidArgumentError(
+                None, None,
+                'Unsupported compression type: {}'.format(compression_type))
+        self._wbits = _COMPRESSION_WBITS.get(compression_type)
+        self._decompressor = None
+        # Decompressed bytes that still have to be discarded to reach
+        # `start_offset` in a compressed file.
+        self._skip = 0
+        self._file = None
+        # Byte offset of the first record that has not been returned yet.
+        self._offset = start_offset
+        # Bytes read from disk but not yet consumed. The unconsumed data
+        # starts at `self._buffer[self._buffer_pos]`, which corresponds to
+        # `self._offset` in the file.
+        self._buffer = b''
+        self._buffer_pos = 0
+        self._record = None
 
     def GetNext(self):
-        if not self.done_reading:
-            self.read()
-
-        if self.index >= len(self.event_strs) - 1:
-            raise errors.OutOfRangeError(None, None, 'No more events to read')
-        else:
-            self.index += 1
+        """Advances to the next record in the file.
+
+        Raises:
+          OutOfRangeError: If no complete record is available yet.
+          DataLossError: If checksums are verified and one does not match.
+        """
+        self._record = None
+        if not self._fill(_HEADER_SIZE):
+            raise errors.OutOfRangeError(None, None, self._eof_message())
+        header_start = self._buffer_pos
+        (length, length_crc) = struct.unpack_from(
+            '<QI', self._buffer, header_start)
+        if self.verify_checksums:
+            length_bytes = self._buffer[header_start:header_start + 8]
+            if masked_crc32c(length_bytes) != length_crc:
+                raise errors.DataLossError(
+                    None, None,
+                    'corrupted record header at {}'.format(self._offset))
+        record_size = _HEADER_SIZE + length + _FOOTER_SIZE
+        if not self._fill(record_size):
+            raise errors.OutOfRangeError(None, None, self._eof_message())
+        data_start = self._buffer_pos + _HEADER_SIZE
+        data_end = data_start + length
+        record = self._buffer[data_start:data_end]
+        if self.verify_checksums:
+            (data_crc,) = struct.unpack_from('<I', self._buffer, data_end)
+            if masked_crc32c(record) != data_crc:
+                raise errors.DataLossError(
+                    None, None, 'corrupted record at {}'.format(self._offset))
+        self._record = record
+        self._buffer_pos += record_size
+        self._offset += record_size
 
     def record(self):
-        return self.event_strs[self.index]
+        return self._record
+
+    def offset(self):
+        return self._offset
+
+    def Close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        self._decompressor = None
+        self._buffer = b''
+        self._buffer_pos = 0
+
+    def _fill(self, size):
+        """Tries to buffer at least `size` unconsumed bytes.
+
+        Args:
+          size: The number of unconsumed bytes needed.
+
+        Returns:
+          Whether `size` bytes are available in the buffer.
+        """
+        available = len(self._buffer) - self._buffer_pos
+        if available >= size:
+            return True
+        if self._file is None:
+            self._file = open(self.filename, 'rb', buffering=0)
+            if self._wbits is None:
+                self._file.seek(self._offset)
+            else:
+                self._decompressor = zlib.decompressobj(self._wbits)
+                self._skip = self._offset
+        # Drop consumed bytes so that memory stays bounded by the read size
+        # (or by the size of the largest record).
+        chunks = [self._buffer[self._buffer_pos:]]
+        want = max(size - available, _READ_BUFFER_SIZE)
+        while available < size:
+            chunk = self._read(want)
+            if not chunk:
+                break
+            chunks.append(chunk)
+            available += len(chunk)
+            want = max(size - available, _READ_BUFFER_SIZE)
+        self._buffer = b''.join(chunks)
+        self._buffer_pos = 0
+        return available >= size
+
+    def _read(self, size):
+        """Reads up to `size` bytes of the (decompressed) record stream.
+
+        Returns:
+          The bytes read, which are empty only if no more data is available
+          yet.
+
+        Raises:
+          DataLossError: If the compressed data is corrupt.
+        """
+        if self._decompressor is None:
+            return self._file.read(size)
+        chunks = []
+        while size > 0:
+            if self._decompressor.eof:
+                # The next GZIP member, if any, starts right after this one.
+                data = self._decompressor.unused_data
+                self._decompressor = zlib.decompressobj(self._wbits)
+            else:
+                data = self._decompressor.unconsumed_tail
+            if not data:
+                data = self._file.read(_READ_BUFFER_SIZE)
+            try:
+                # Even without new input, this may return output that zlib
+                # held back because of the previous `max_length`.
+                chunk = self._decompressor.decompress(data, self._skip or size)
+            except zlib.error as e:
+                raise errors.DataLossError(
+                    None, None, 'corrupted compressed data in {}: {}'.format(
+                        self.filename, e))
+            if not data and not chunk:
+                break
+            if self._skip:
+                self._skip -= len(chunk)
+                continue
+            chunks.append(chunk)
+            size -= len(chunk)
+        return b''.join(chunks)
+
+    def _eof_message(self):
+        if len(self._buffer) > self._buffer_pos:
+            return 'truncated record at {}'.format(self._offset)
+        return 'No more events to read'
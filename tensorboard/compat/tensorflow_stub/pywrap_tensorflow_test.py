@@ -0,0 +1,244 @@
+# Copyright 2019 The TensorFlow Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ==============================================================================
+"""Tests for the stub `pywrap_tensorflow` record reader."""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import os
+import shutil
+import struct
+import tempfile
+import unittest
+import zlib
+
+from tensorboard.compat.tensorflow_stub import errors
+from tensorboard.compat.tensorflow_stub import pywrap_tensorflow
+
+
+# A record containing a simple event.
+RECORD = (b'\x18\x00\x00\x00\x00\x00\x00\x00\xa3\x7fK"\t\x00\x00\xc0%\xddu'
+          b'\xd5A\x1a\rbrain.Event:1\xec\xf32\x8d')
+PAYLOAD = RECORD[12:-4]
+
+
+class Crc32cTest(unittest.TestCase):
+
+  def testKnownValue(self):
+    self.assertEqual(pywrap_tensorflow.crc32c(b'123456789'), 0xe3069283)
+    self.assertEqual(pywrap_tensorflow.crc32c(b''), 0)
+
+  def testImplementationsAgree(self):
+    mask = 0xffffffff
+    for size in (1, 7, 8, 9, 4096, 5000, 70001):
+      data = os.urandom(size)
+      expected = pywrap_tensorflow._update_register_bytewise(mask, data) ^ mask
+      self.assertEqual(
+          pywrap_tensorflow._update_register_slicing(mask, data) ^ mask,
+          expected)
+      self.assertEqual(
+          pywrap_tensorflow._update_register_numpy(mask, data) ^ mask,
+          expected)
+      self.assertEqual(pywrap_tensorflow.crc32c(data), expected)
+
+  def testIncrementalUpdate(self):
+    data = os.urandom(10000)
+    crc = pywrap_tensorflow.crc_update(pywrap_tensorflow.CRC_INIT, data[:123])
+    crc = pywrap_tensorflow.crc_update(crc, data[123:])
+    self.assertEqual(crc, pywrap_tensorflow.crc32c(data))
+
+  def testAcceptsBufferTypes(self):
+    data = b'brain.Event:2'
+    expected = pywrap_tensorflow.crc32c(data)
+    self.assertEqual(pywrap_tensorflow.crc32c(bytearray(data)), expected)
+    self.assertEqual(pywrap_tensorflow.crc32c(memoryview(data)), expected)
+    self.assertEqual(pywrap_tensorflow.crc32c(list(bytearray(data))), expected)
+
+  def testMaskedCrcOfRecord(self):
+    (length_crc,) = struct.unpack('<I', RECORD[8:12])
+    (data_crc,) = struct.unpack('<I', RECORD[-4:])
+    self.assertEqual(pywrap_tensorflow.masked_crc32c(RECORD[:8]), length_crc)
+    self.assertEqual(pywrap_tensorflow.masked_crc32c(PAYLOAD), data_crc)
+
+
+class PyRecordReaderTest(unittest.TestCase):
+
+  def setUp(self):
+    self._directory = tempfile.mkdtemp()
+    self._path = os.path.join(self._directory, 'events.out.tfevents.1')
+    open(self._path, 'wb').close()
+
+  def tearDown(self):
+    shutil.rmtree(self._directory)
+
+  def _Append(self, data):
+    with open(self._path, 'ab') as f:
+      f.write(data)
+
+  def _Reader(self, start_offset=0, **kwargs):
+    reader = pywrap_tensorflow.PyRecordReader_New(
+        self._path, start_offset, b'', None, **kwargs)
+    self.addCleanup(reader.Close)
+    return reader
+
+  def _ReadAll(self, reader):
+    records = []
+    while True:
+      try:
+        reader.GetNext()
+      except errors.OutOfRangeError:
+        return records
+      records.append(reader.record())
+
+  def testMissingFile(self):
+    with self.assertRaises(errors.NotFoundError):
+      pywrap_tensorflow.PyRecordReader_New(
+          os.path.join(self._directory, 'nonexistent'), 0, b'', None)
+
+  def testEmptyFile(self):
+    reader = self._Reader()
+    self.assertEqual(self._ReadAll(reader), [])
+    self.assertEqual(reader.offset(), 0)
+
+  def testReadsAppendedRecords(self):
+    self._Append(RECORD)
+    reader = self._Reader()
+    self.assertEqual(self._ReadAll(reader), [PAYLOAD])
+    self.assertEqual(reader.offset(), len(RECORD))
+    self._Append(RECORD + RECORD)
+    self.assertEqual(self._ReadAll(reader), [PAYLOAD, PAYLOAD])
+    self.assertEqual(reader.offset(), 3 * len(RECORD))
+
+  def testTruncatedRecordIsReadOnceComplete(self):
+    self._Append(RECORD + RECORD[:5])
+    reader = self._Reader()
+    self.assertEqual(self._ReadAll(reader), [PAYLOAD])
+    self.assertEqual(reader.offset(), len(RECORD))
+    self._Append(RECORD[5:20])
+    self.assertEqual(self._ReadAll(reader), [])
+    self.assertEqual(reader.offset(), len(RECORD))
+    self._Append(RECORD[20:])
+    self.assertEqual(self._ReadAll(reader), [PAYLOAD])
+    self.assertEqual(reader.offset(), 2 * len(RECORD))
+
+  def testStartOffset(self):
+    self._Append(RECORD + RECORD)
+    reader = self._Reader(len(RECORD))
+    self.assertEqual(self._ReadAll(reader), [PAYLOAD])
+
+  def testLargeRecordsSpanningReadBuffer(self):
+    payload = b'x' * (3 * pywrap_tensorflow._READ_BUFFER_SIZE + 7)
+    record = (struct.pack('<Q', len(payload)) + b'\0' * 4 +
+              payload + b'\0' * 4)
+    self._Append(record + RECORD)
+    reader = self._Reader()
+    self.assertEqual(self._ReadAll(reader), [payload, PAYLOAD])
+
+  def testVerifiedReadOfValidRecords(self):
+    self._Append(RECORD + RECORD)
+    reader = self._Reader(verify_checksums=True)
+    self.assertEqual(self._ReadAll(reader), [PAYLOAD, PAYLOAD])
+
+  def testCorruptPayloadRaisesDataLossErrorWhenVerifying(self):
+    corrupt = RECORD[:20] + b'X' + RECORD[21:]
+    self._Append(RECORD + corrupt)
+    self.assertEqual(self._ReadAll(self._Reader()), [PAYLOAD, corrupt[12:-4]])
+    reader = self._Reader(verify_checksums=True)
+    reader.GetNext()
+    with self.assertRaises(errors.DataLossError):
+      reader.GetNext()
+    self.assertEqual(reader.offset(), len(RECORD))
+
+  def testCorruptHeaderRaisesDataLossErrorWhenVerifying(self):
+    self._Append(b'\xff' + RECORD[1:])
+    reader = self._Reader(verify_checksums=True)
+    with self.assertRaises(errors.DataLossError):
+      reader.GetNext()
+    self.assertEqual(reader.offset(), 0)
+
+
+class CompressedPyRecordReaderTest(PyRecordReaderTest):
+  """Reads GZIP-compressed files written in several flushed pieces."""
+
+  COMPRESSION_TYPE = b'GZIP'
+  WBITS = 16 + zlib.MAX_WBITS
+
+  def setUp(self):
+    super(CompressedPyRecordReaderTest, self).setUp()
+    self._compressor = zlib.compressobj(9, zlib.DEFLATED, self.WBITS)
+
+  def _Append(self, data):
+    compressed = (self._compressor.compress(data) +
+                  self._compressor.flush(zlib.Z_SYNC_FLUSH))
+    with open(self._path, 'ab') as f:
+      f.write(compressed)
+
+  def _Reader(self, start_offset=0, **kwargs):
+    reader = pywrap_tensorflow.PyRecordReader_New(
+        self._path, start_offset, self.COMPRESSION_TYPE, None, **kwargs)
+    self.addCleanup(reader.Close)
+    return reader
+
+  def testPartiallyWrittenCompressedData(self):
+    compressor = zlib.compressobj(9, zlib.DEFLATED, self.WBITS)
+    compressed = compressor.compress(RECORD * 3) + compressor.flush()
+    reader = self._Reader()
+    records = []
+    for i in range(len(compressed)):
+      with open(self._path, 'ab') as f:
+        f.write(compressed[i:i + 1])
+      records.extend(self._ReadAll(reader))
+    self.assertEqual(records, [PAYLOAD] * 3)
+
+  def testCorruptCompressedDataRaisesDataLossError(self):
+    with open(self._path, 'wb') as f:
+      f.write(zlib.compress(RECORD)[:2] + b'\xff' * 32)
+    with self.assertRaises(errors.DataLossError):
+      self._Reader().GetNext()
+
+  def testUnsupportedCompressionType(self):
+    with self.assertRaises(errors.InvalidArgumentError):
+      pywrap_tensorflow.PyRecordReader_New(self._path, 0, b'LZ4', None)
+
+
+class ZlibPyRecordReaderTest(CompressedPyRecordReaderTest):
+
+  COMPRESSION_TYPE = 'ZLIB'
+  WBITS = zlib.MAX_WBITS
+
+
+class ConcatenatedGzipPyRecordReaderTest(unittest.TestCase):
+
+  def testReadsRecordsAcrossGzipMembers(self):
+    directory = tempfile.mkdtemp()
+    self.addCleanup(shutil.rmtree, directory)
+    path = os.path.join(directory, 'events.out.tfevents.1.gz')
+    with open(path, 'wb') as f:
+      for _ in range(3):
+        compressor = zlib.compressobj(9, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+        f.write(compressor.compress(RECORD) + compressor.flush())
+    reader = pywrap_tensorflow.PyRecordReader_New(path, 0, b'GZIP', None)
+    self.addCleanup(reader.Close)
+    for _ in range(3):
+      reader.GetNext()
+      self.assertEqual(reader.record(), PAYLOAD)
+    with self.assertRaises(errors.OutOfRangeError):
+      reader.GetNext()
+    self.assertEqual(reader.offset(), 3 * len(RECORD))
+
+
+if __name__ == '__main__':
+  unittest.main()
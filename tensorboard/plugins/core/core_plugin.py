@@ -24,6 +24,7 @@ import gzip
 import math
 import mimetypes
 import os
+import re
 import zipfile
 
 import six
@@ -68,6 +69,8 @@ class CorePlugin(base_plugin.TBPlugin):
         '/audio': self._redirect_to_index,
         '/data/environment': self._serve_environment,
         '/data/logdir': self._serve_logdir,
+        '/data/memory_usage': self._serve_memory_usage,
+        '/data/reload_schedule': self._serve_reload_schedule,
         '/data/runs': self._serve_runs,
         '/data/experiments': self._serve_experiments,
         '/data/experiment_runs': self._serve_experiment_runs,
@@ -129,6 +132,44 @@ class CorePlugin(base_plugin.TBPlugin):
     return http_util.Respond(
         request, {'logdir': self._logdir}, 'application/json')
 
+  @wrappers.Request.application
+  def _serve_memory_usage(self, request):
+    """Serve a JSON object with how many bytes the loaded data takes.
+
+    * runs maps each loaded run name to the bytes taken by each plugin.
+    * plugins maps each plugin name to the bytes taken in all runs.
+    * total_bytes is the bytes taken by all runs.
+    """
+    runs = {}
+    if self._multiplexer is not None and hasattr(self._multiplexer,
+                                                 'MemoryUsage'):
+      runs = self._multiplexer.MemoryUsage()
+    plugins = collections.Counter()
+    for usage in six.itervalues(runs):
+      plugins.update(usage)
+    return http_util.Respond(
+        request,
+        {
+            'runs': runs,
+            'plugins': dict(plugins),
+            'total_bytes': sum(six.itervalues(plugins)),
+        },
+        'application/json')
+
+  @wrappers.Request.application
+  def _serve_reload_schedule(self, request):
+    """Serve a JSON object with when each run is reloaded, for debugging.
+
+    It maps each run name to its schedule (see
+    `EventMultiplexer.ReloadSchedule`), and is empty unless runs are
+    scheduled with --max_reload_backoff.
+    """
+    schedule = {}
+    if self._multiplexer is not None and hasattr(self._multiplexer,
+                                                 'ReloadSchedule'):
+      schedule = self._multiplexer.ReloadSchedule()
+    return http_util.Respond(request, schedule, 'application/json')
+
   @wrappers.Request.application
   def _serve_window_properties(self, request):
     """Serve a JSON object containing this TensorBoard's window properties."""
@@ -323,6 +364,17 @@ disappearance. (default: %(default)s)\
 How often the backend should load more data, in seconds. Set to 0 to
 load just once at startup and a negative number to never reload at all.
 Not relevant for DB read-only mode. (default: %(default)s)\
+''')
+
+    parser.add_argument(
+        '--reload_on_change',
+        action='store_true',
+        help='''\
+[experimental] If passed, watch local logdirs for changes (with inotify, on
+Linux) and reload runs as soon as their event files change, rather than
+reloading every run each --reload_interval. Logdirs that cannot be watched,
+such as remote or network file systems, are still reloaded each
+--reload_interval. Not relevant for db mode.\
 ''')
 
     parser.add_argument(
@@ -377,6 +429,24 @@ See tensorboard/backend/event_processing/event_file_inspector.py for more info.\
         default='',
         help='tag to query for; used with --inspect')
 
+    parser.add_argument(
+        '--min_step',
+        metavar='STEP',
+        type=int,
+        default=None,
+        help='''\
+smallest step to query for; used with --inspect. Passing --min_step or
+--max_step reads event files through sidecar step indexes, which are
+written next to the event files if possible.\
+''')
+
+    parser.add_argument(
+        '--max_step',
+        metavar='STEP',
+        type=int,
+        default=None,
+        help='largest step to query for; used with --inspect')
+
     parser.add_argument(
         '--event_file',
         metavar='PATH',
@@ -418,6 +488,192 @@ routing of an elb when the website base_url is not available e.g.
 The max number of threads that TensorBoard can use to reload runs. Not
 relevant for db read-only mode. Each thread reloads one run at a time.
 (default: %(default)s)\
+''')
+
+    parser.add_argument(
+        '--mmap_event_files',
+        action='store_true',
+        help='''\
+[experimental] If passed, read local event files through memory maps rather
+than copying each record out of the file. Not relevant for db read-only mode
+or for remote logdirs.\
+''')
+
+    parser.add_argument(
+        '--discovery_threads',
+        metavar='COUNT',
+        type=int,
+        default=1,
+        help='''\
+[experimental] The number of threads that TensorBoard can use to scan a local
+logdir for new runs. Only the directories whose modification times have
+changed since the last scan are listed again. Not relevant for db read-only
+mode. (default: %(default)s)\
+''')
+
+    parser.add_argument(
+        '--concurrent_writers',
+        action='store_true',
+        help='''\
+[experimental] If passed, load the event files that different processes (such
+as the workers of a distributed job) write into the same run directory
+concurrently, rather than one file after another. Writers are told apart by
+the host name (and process ID) in the file names. Not relevant for db
+read-only mode.\
+''')
+
+    parser.add_argument(
+        '--snapshot_dir',
+        metavar='PATH',
+        type=str,
+        default='',
+        help='''\
+[experimental] A local directory in which to save a snapshot of the data
+loaded for each run every few minutes. When TensorBoard is restarted with the
+same directory and flags, it restores the snapshots and only reads the events
+written since, unless the event files of a run have shrunk or disappeared. Do
+not share the directory with other users. Not relevant for db read-only
+mode.\
+''')
+
+    parser.add_argument(
+        '--ingestion_dir',
+        metavar='PATH',
+        type=str,
+        default='',
+        help='''\
+[experimental] A local directory through which a separate ingestion process
+hands the loaded data to TensorBoard. The ingestion process loads the logdir
+(with all other loading flags), and after each reload writes what changed
+into the directory, which TensorBoard reads every few seconds. Requests are
+then not slowed down by reloads, and a restarted TensorBoard serves the data
+in the directory right away. Do not share the directory with other users.
+Not relevant for db modes.\
+''')
+
+    parser.add_argument(
+        '--lazy_load',
+        action='store_true',
+        help='''\
+[experimental] If passed, only load a run once its data is first requested,
+or once it is among the --warm_runs runs whose directories changed last, which
+are loaded in the background. Other runs are listed without their tags at
+first: once a dashboard lists them, they are loaded in the background, up to
+--warm_runs of them (at least one) per reload, and their tags then show up.
+Meant for logdirs with many more runs than are looked at. Not relevant for db
+modes.\
+''')
+
+    parser.add_argument(
+        '--warm_runs',
+        metavar='COUNT',
+        type=int,
+        default=10,
+        help='''\
+[experimental] With --lazy_load, the number of runs whose directories changed
+last to load ahead of time. (default: %(default)s)\
+''')
+
+    parser.add_argument(
+        '--max_memory_mb',
+        metavar='MB',
+        type=int,
+        default=0,
+        help='''\
+[experimental] If positive, roughly how much memory the loaded data of all runs
+may take. After each reload, the runs whose data was requested least recently
+are unloaded until the rest fits, and are loaded again once their data is
+requested. The memory taken by each run and plugin is served at
+/data/memory_usage. Not relevant for db modes. (default: %(default)s)\
+''')
+
+    parser.add_argument(
+        '--max_reload_backoff',
+        metavar='SECONDS',
+        type=float,
+        default=0,
+        help='''\
+[experimental] If positive, runs that have had no new data for a while are
+reloaded less often: a run that has been idle for some time is reloaded again
+after waiting as long, up to this many seconds, while runs with new data are
+reloaded every --reload_interval. A waiting run is reloaded as soon as a file
+is created in its directory, or with --reload_on_change, as soon as its event
+files change. The schedule of each run is served at /data/reload_schedule. Not
+relevant for db read-only mode. (default: %(default)s)\
+''')
+
+    parser.add_argument(
+        '--reload_workers',
+        metavar='COUNT',
+        type=int,
+        default=0,
+        help='''\
+[experimental] The number of worker processes in which TensorBoard loads runs.
+Runs are spread across the workers, which read and parse their event files
+and send the new data back to TensorBoard after each reload, so loading
+scales with the number of cores. With 0, runs are loaded on the reload threads
+of TensorBoard itself. --decode_processes is ignored with worker processes.
+Not relevant for db read-only mode. (default: %(default)s)\
+''')
+
+    parser.add_argument(
+        '--decode_processes',
+        metavar='COUNT',
+        type=int,
+        default=0,
+        help='''\
+[experimental] The number of worker processes that TensorBoard can use to
+decode events, shared by all reload threads. With 0, events are decoded on
+the reload threads themselves. Not relevant for db read-only mode.
+(default: %(default)s)\
+''')
+
+    parser.add_argument(
+        '--prefetch_threads',
+        metavar='COUNT',
+        type=int,
+        default=0,
+        help='''\
+[experimental] The number of threads that TensorBoard can use to read event
+files ahead of the reload threads, shared by all runs. This keeps slow file
+systems, such as network mounts, from stalling the parsing of events. With 0,
+event files are read on the reload threads themselves. Not relevant for db
+read-only mode. (default: %(default)s)\
+''')
+
+    parser.add_argument(
+        '--prefetch_buffer_mb',
+        metavar='MB',
+        type=int,
+        default=256,
+        help='''\
+[experimental] The approximate number of megabytes of event data that the
+threads of --prefetch_threads read ahead for all runs together.
+(default: %(default)s)\
+''')
+
+    parser.add_argument(
+        '--load_plugins',
+        metavar='NAMES',
+        type=str,
+        default='',
+        help='''\
+[experimental] An optional comma separated list of the names of the plugins
+whose data to load, e.g. "scalars,histograms". Events with data only for
+other plugins are skipped without being parsed, which saves time and memory
+for logdirs with large images or graphs. Not relevant for db read-only mode.
+By default, the data of all plugins is loaded.\
+''')
+
+    parser.add_argument(
+        '--tag_filter',
+        metavar='REGEX',
+        type=str,
+        default='',
+        help='''\
+[experimental] An optional regular expression that restricts loading to the
+tags that contain a match for it, e.g. "^(loss|accuracy)$". Not relevant for
+db read-only mode. By default, all tags are loaded.\
 ''')
 
     parser.add_argument(
@@ -445,8 +701,14 @@ unspecified plugins, TensorBoard randomly downsamples logged summaries
 to reasonable values to prevent out-of-memory errors for long running
 jobs. This flag allows fine control over that downsampling. Note that 0
 means keep all samples of that type. For instance "scalars=500,images=0"
-keeps 500 scalars and all images. Most users should not need to set this
-flag.\
+keeps 500 scalars and all images. [experimental] A number of samples can be
+prefixed with "stratified:" to keep samples that are spread over the steps,
+from dense recent ones to sparser older ones, and that don't change at
+random on reloads, as in "scalars=stratified:1000". [experimental] A size
+in bytes, like "images=200MB" (with a unit of B, KB, MB or GB), keeps as
+many samples of each tag as fit in that size. A key of the form
+"plugin_name:tag" sets the samples to keep for a single tag, as in
+"images:input/image/0=10MB". Most users should not need to set this flag.\
 ''')
 
   def fix_flags(self, flags):
@@ -466,6 +728,12 @@ flag.\
     if flags.path_prefix.endswith('/'):
       flags.path_prefix = flags.path_prefix[:-1]
 
+    if flags.tag_filter:
+      try:
+        re.compile(flags.tag_filter)
+      except re.error as e:
+        raise ValueError('Invalid --tag_filter %r: %s' % (flags.tag_filter, e))
+
   def load(self, context):
     """Creates CorePlugin instance."""
     return CorePlugin(context)
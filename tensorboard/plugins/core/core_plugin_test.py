@@ -51,12 +51,14 @@ class FakeFlags(object):
       logdir='',
       event_file='',
       db='',
-      path_prefix=''):
+      path_prefix='',
+      tag_filter=''):
     self.inspect = inspect
     self.logdir = logdir
     self.event_file = event_file
     self.db = db
     self.path_prefix = path_prefix
+    self.tag_filter = tag_filter
 
 
 class CorePluginTest(tf.test.TestCase):
@@ -107,6 +109,10 @@ class CorePluginTest(tf.test.TestCase):
     loader.fix_flags(flag)
     self.assertEqual(flag.path_prefix, 'hello')
 
+    loader.fix_flags(FakeFlags(inspect=False, logdir='/tmp', tag_filter='^a'))
+    with six.assertRaisesRegex(self, ValueError, r'Invalid --tag_filter'):
+      loader.fix_flags(FakeFlags(inspect=False, logdir='/tmp', tag_filter='('))
+
   def testIndex_returnsActualHtml(self):
     """Test the format of the /data/runs endpoint."""
     response = self.logdir_based_server.get('/')
@@ -159,6 +165,34 @@ class CorePluginTest(tf.test.TestCase):
     parsed_object = self._get_json(self.logdir_based_server, '/data/logdir')
     self.assertEqual(parsed_object, {'logdir': self.logdir})
 
+  def testMemoryUsage(self):
+    self._add_run('run1')
+    usage = self._get_json(self.logdir_based_server, '/data/memory_usage')
+    self.assertEqual(list(usage['runs']), ['run1'])
+    self.assertEqual(usage['plugins'], usage['runs']['run1'])
+    self.assertEqual(usage['total_bytes'], sum(usage['plugins'].values()))
+    self.assertGreater(usage['total_bytes'], 0)
+    self.assertEqual(
+        self._get_json(self.db_based_server, '/data/memory_usage'),
+        {'runs': {}, 'plugins': {}, 'total_bytes': 0})
+
+  def testReloadSchedule(self):
+    self._add_run('run1')
+    self.assertEqual(
+        self._get_json(self.logdir_based_server, '/data/reload_schedule'), {})
+    self.assertEqual(
+        self._get_json(self.db_based_server, '/data/reload_schedule'), {})
+
+    multiplexer = event_multiplexer.EventMultiplexer(max_reload_backoff=60)
+    multiplexer.AddRunsFromDirectory(self.logdir).Reload()
+    plugin = core_plugin.CorePlugin(base_plugin.TBContext(
+        logdir=self.logdir, multiplexer=multiplexer))
+    server = werkzeug_test.Client(application.TensorBoardWSGI([plugin]),
+                                  wrappers.BaseResponse)
+    schedule = self._get_json(server, '/data/reload_schedule')
+    self.assertEqual(list(schedule), ['run1'])
+    self.assertEqual(schedule['run1']['reloads'], 1)
+
   def testRuns(self):
     """Test the format of the /data/runs endpoint."""
     self._add_run('run1')
@@ -32,10 +32,10 @@ import numpy as np
 
 from tensorboard import plugin_util
 from tensorboard.backend import http_util
+from tensorboard.backend.event_processing import scalar_pyramid
 from tensorboard.compat import tf
 from tensorboard.plugins import base_plugin
 from tensorboard.plugins.scalar import metadata
-from tensorboard.util import tensor_util
 
 
 class OutputFormat(object):
@@ -124,8 +124,17 @@ class ScalarsPlugin(base_plugin.TBPlugin):
 
     return result
 
-  def scalars_impl(self, tag, run, experiment, output_format):
-    """Result of the form `(body, mime_type)`."""
+  def scalars_impl(self, tag, run, experiment, output_format,
+                   max_points=None):
+    """Result of the form `(body, mime_type)`.
+
+    If `max_points` is given, the scalars are aggregated over buckets of
+    steps, of which at most `max_points` are returned when possible, as rows
+    of wall time, step, mean, min, max, first and last values, and count.
+    The pyramids of the multiplexer answer this without reading every
+    scalar; scalars read from the database are aggregated in bulk on each
+    request.
+    """
     if self._db_connection_provider:
       db = self._db_connection_provider()
       # We select for steps greater than -1 because the writer inserts
@@ -154,17 +163,30 @@ class ScalarsPlugin(base_plugin.TBPlugin):
       ''', dict(exp=experiment, run=run, tag=tag, plugin=metadata.PLUGIN_NAME))
       values = [(wall_time, step, self._get_value(data, dtype_enum))
                 for (step, wall_time, data, dtype_enum) in cursor]
+      if max_points is not None:
+        pyramid = scalar_pyramid.ScalarPyramid()
+        if values:
+          (wall_times, steps, scalars) = zip(*values)
+          pyramid.AddArrays(wall_times, steps, scalars)
+        values = _bucket_rows(pyramid.Buckets(max_points))
+    elif max_points is not None:
+      values = _bucket_rows(
+          self._multiplexer.ScalarBuckets(run, tag, max_points))
     else:
-      tensor_events = self._multiplexer.Tensors(run, tag)
-      values = [(tensor_event.wall_time,
-                 tensor_event.step,
-                 tensor_util.make_ndarray(tensor_event.tensor_proto).item())
-                for tensor_event in tensor_events]
+      # The arrays are converted in bulk, without building an event for
+      # each scalar.
+      columns = self._multiplexer.ScalarColumns(run, tag)
+      values = list(zip(columns.wall_time.tolist(), columns.step.tolist(),
+                        columns.value.tolist()))
 
     if output_format == OutputFormat.CSV:
       string_io = StringIO()
       writer = csv.writer(string_io)
-      writer.writerow(['Wall time', 'Step', 'Value'])
+      if max_points is not None:
+        writer.writerow(['Wall time', 'Step', 'Value', 'Min', 'Max', 'First',
+                         'Last', 'Count'])
+      else:
+        writer.writerow(['Wall time', 'Step', 'Value'])
       writer.writerows(values)
       return (string_io.getvalue(), 'text/csv')
     else:
@@ -197,5 +219,18 @@ class ScalarsPlugin(base_plugin.TBPlugin):
     run = request.args.get('run')
     experiment = request.args.get('experiment')
     output_format = request.args.get('format')
-    (body, mime_type) = self.scalars_impl(tag, run, experiment, output_format)
+    max_points = request.args.get('max_points')
+    if max_points is not None:
+      max_points = int(max_points) if max_points.isdigit() else 0
+      if max_points < 1:
+        return http_util.Respond(
+            request, 'query parameter `max_points` must be a positive integer',
+            'text/plain', 400)
+    (body, mime_type) = self.scalars_impl(tag, run, experiment, output_format,
+                                          max_points=max_points)
     return http_util.Respond(request, body, mime_type)
+
+
+def _bucket_rows(buckets):
+  """Returns the rows of a `scalar_pyramid.ScalarBuckets`, as lists."""
+  return list(zip(*(array.tolist() for array in buckets)))
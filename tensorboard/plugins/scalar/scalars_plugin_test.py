@@ -26,6 +26,8 @@ import os.path
 from six import StringIO
 from six.moves import xrange  # pylint: disable=redefined-builtin
 import tensorflow as tf
+from werkzeug import test as werkzeug_test
+from werkzeug import wrappers
 
 from tensorboard.backend import application
 from tensorboard.backend.event_processing import plugin_event_accumulator as event_accumulator  # pylint: disable=line-too-long
@@ -214,6 +216,32 @@ class ScalarsPluginTest(tf.test.TestCase):
     self._test_scalars_csv(self._RUN_WITH_HISTOGRAM, self._HISTOGRAM_TAG,
                            should_work=False)
 
+  def test_scalars_with_max_points(self):
+    self.set_up_with_runs([self._RUN_WITH_SCALARS])
+    tag = '%s/scalar_summary' % self._SCALAR_TAG
+    (data, mime_type) = self.plugin.scalars_impl(
+        tag, self._RUN_WITH_SCALARS, None, scalars_plugin.OutputFormat.JSON,
+        max_points=10)
+    self.assertEqual('application/json', mime_type)
+    # The 99 steps fit in 7 buckets of 16 steps, of the values 6 + 3 * step.
+    self.assertEqual(len(data), 7)
+    self.assertEqual(list(data[0][1:]),
+                     [15, 28.5, 6.0, 51.0, 6.0, 51.0, 16])
+    self.assertEqual(sum(row[-1] for row in data), self._STEPS)
+    (data, mime_type) = self.plugin.scalars_impl(
+        tag, self._RUN_WITH_SCALARS, None, scalars_plugin.OutputFormat.CSV,
+        max_points=10)
+    reader = csv.reader(StringIO(data))
+    self.assertEqual(
+        ['Wall time', 'Step', 'Value', 'Min', 'Max', 'First', 'Last', 'Count'],
+        next(reader))
+    self.assertEqual(len(list(reader)), 7)
+    client = werkzeug_test.Client(self.plugin.get_plugin_apps()['/scalars'],
+                                  wrappers.BaseResponse)
+    response = client.get('/scalars?run=%s&tag=%s&max_points=0' %
+                          (self._RUN_WITH_SCALARS, tag))
+    self.assertEqual(response.status_code, 400)
+
   def test_active_with_legacy_scalars(self):
     self.set_up_with_runs([self._RUN_WITH_LEGACY_SCALARS])
     self.assertTrue(self.plugin.is_active())
@@ -203,7 +203,8 @@ class TensorBoard(object):
     if self.flags.inspect:
       logger.info('Not bringing up TensorBoard, but inspecting event files.')
       event_file = os.path.expanduser(self.flags.event_file)
-      efi.inspect(self.flags.logdir, event_file, self.flags.tag)
+      efi.inspect(self.flags.logdir, event_file, self.flags.tag,
+                  self.flags.min_step, self.flags.max_step)
       return 0
     try:
       server = self._make_server()